@@ -18,6 +18,7 @@ import getpass
 import logging
 import os
 import tempfile
+from functools import partial
 from typing import Optional
 
 import hvac
@@ -25,14 +26,16 @@ from packaging.version import Version
 
 from cou.apps.base import LONG_IDLE_TIMEOUT, OpenStackApplication
 from cou.apps.factory import AppFactory
-from cou.exceptions import ApplicationError
+from cou.exceptions import ApplicationError, ApplicationNotFound
 from cou.steps import (
     ApplicationUpgradePlan,
     PostUpgradeStep,
     PreUpgradeStep,
     UnitUpgradeStep,
+    get_machine_resource,
 )
 from cou.steps.ceph import set_require_osd_release_option_on_unit
+from cou.steps.waits import PostUpgradeIdleWaitStep, PreUpgradeIdleWaitStep
 from cou.utils import progress_indicator
 from cou.utils.juju_utils import Unit
 from cou.utils.openstack import (
@@ -144,6 +147,7 @@ class AuxiliaryApplication(OpenStackApplication):
         target: OpenStackRelease,
         force: bool,
         units: Optional[list[Unit]] = None,
+        wait: bool = True,
     ) -> ApplicationUpgradePlan:
         """Generate full upgrade plan for an Application.
 
@@ -155,6 +159,9 @@ class AuxiliaryApplication(OpenStackApplication):
         :type force: bool
         :param units: Units to generate upgrade plan, defaults to None
         :type units: Optional[list[Unit]], optional
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :return: Full upgrade plan if the Application is able to generate it.
         :rtype: ApplicationUpgradePlan
         """
@@ -164,7 +171,7 @@ class AuxiliaryApplication(OpenStackApplication):
                 "The upgrade will proceed using the all-in-one method.",
                 self.name,
             )
-        return super().generate_upgrade_plan(target, force, None)
+        return super().generate_upgrade_plan(target, force, None, wait)
 
     def _need_current_channel_refresh(self, target: OpenStackRelease) -> bool:
         """Check if the application needs to refresh the current channel.
@@ -206,21 +213,18 @@ class AuxiliaryApplication(OpenStackApplication):
             [
                 UnitUpgradeStep(
                     description=f"Execute run-deferred-hooks on unit: '{unit.name}'",
-                    coro=self.model.run_action(
-                        unit.name, "run-deferred-hooks", raise_on_failure=True
+                    coro=partial(
+                        self.model.run_action,
+                        unit.name,
+                        "run-deferred-hooks",
+                        raise_on_failure=True,
                     ),
+                    resource=get_machine_resource(unit.machine.machine_id),
                 )
                 for unit in units or self.units.values()
             ]
         )
-        wait_step = PreUpgradeStep(
-            description=(
-                f"Wait for up to {self.wait_timeout}s for app '{self.name}'"
-                " to reach the idle state"
-            ),
-            parallel=False,
-            coro=self.model.wait_for_idle(self.wait_timeout, apps=[self.name]),
-        )
+        wait_step = PreUpgradeIdleWaitStep(self.model, self.wait_timeout, [self.name])
         return [
             run_hook_step,
             wait_step,
@@ -241,14 +245,7 @@ class AuxiliaryApplication(OpenStackApplication):
         :return: Step for run deferred hooks and restart service
         :rtype: PostUpgradeStep
         """
-        wait_step = PostUpgradeStep(
-            description=(
-                f"Wait for up to {self.wait_timeout}s for app '{self.name}'"
-                " to reach the idle state"
-            ),
-            parallel=False,
-            coro=self.model.wait_for_idle(self.wait_timeout, apps=[self.name]),
-        )
+        wait_step = PostUpgradeIdleWaitStep(self.model, self.wait_timeout, [self.name])
         run_hook_step = PostUpgradeStep(
             description=(
                 f"Execute run-deferred-hooks for all '{self.name}' units "
@@ -260,9 +257,13 @@ class AuxiliaryApplication(OpenStackApplication):
             [
                 UnitUpgradeStep(
                     description=f"Execute run-deferred-hooks on unit: '{unit.name}'",
-                    coro=self.model.run_action(
-                        unit.name, "run-deferred-hooks", raise_on_failure=True
+                    coro=partial(
+                        self.model.run_action,
+                        unit.name,
+                        "run-deferred-hooks",
+                        raise_on_failure=True,
                     ),
+                    resource=get_machine_resource(unit.machine.machine_id),
                 )
                 for unit in units or self.units.values()
             ]
@@ -376,7 +377,7 @@ class CephMon(AuxiliaryApplication):
         ceph_mon_unit, *_ = self.units.values()
         return PreUpgradeStep(
             "Ensure that the 'require-osd-release' option matches the 'ceph-osd' version",
-            coro=set_require_osd_release_option_on_unit(self.model, ceph_mon_unit.name),
+            coro=partial(set_require_osd_release_option_on_unit, self.model, ceph_mon_unit.name),
         )
 
 
@@ -489,7 +490,7 @@ class CephOsd(AuxiliaryApplication):
         steps = [
             PreUpgradeStep(
                 description="Verify that all 'nova-compute' units has been upgraded",
-                coro=self._verify_nova_compute(target),
+                coro=partial(self._verify_nova_compute, target),
             )
         ]
         steps.extend(super().pre_upgrade_steps(target, units))
@@ -503,13 +504,15 @@ class CephOsd(AuxiliaryApplication):
         :raises ApplicationError: When any nova-compute app workload version isn't reached.
         """
         units_not_upgraded = []
-        apps = await self.model.get_applications()
+        try:
+            app_names = await self.model.get_application_names("nova-compute")
+        except ApplicationNotFound:
+            logger.debug("no nova-compute application found in the model")
+            return
 
-        for app in apps.values():
-            if app.charm != "nova-compute":
-                logger.debug("skipping application %s", app.name)
-                continue
+        apps = await self.model.get_applications(names=app_names)
 
+        for app in apps.values():
             for unit in app.units.values():
                 compatible_o7k_versions = OpenStackCodenameLookup.find_compatible_versions(
                     app.charm, unit.workload_version
@@ -655,17 +658,18 @@ class Vault(AuxiliaryApplication):
                             f"Wait for up to {self.wait_timeout}s"
                             " for vault to reach the sealed status"
                         ),
-                        coro=self._wait_for_sealed_status(),
+                        coro=self._wait_for_sealed_status,
                     ),
                     PostUpgradeStep(
                         description="Unseal vault",
-                        coro=self._unseal_vault(),
+                        coro=self._unseal_vault,
                     ),
                     PostUpgradeStep(
                         description=(
                             f"Wait for up to {self.wait_timeout}s for vault to reach active status"
                         ),
-                        coro=self.model.wait_for_idle(
+                        coro=partial(
+                            self.model.wait_for_idle,
                             timeout=self.wait_timeout,
                             status="active",
                             apps=[self.name],
@@ -677,7 +681,7 @@ class Vault(AuxiliaryApplication):
                     # Need to resolve them.
                     PostUpgradeStep(
                         description="Resolve all applications in error status",
-                        coro=self.model.resolve_all(),
+                        coro=self.model.resolve_all,
                     ),
                 ]
             )
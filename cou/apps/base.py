@@ -20,6 +20,7 @@ import logging
 import os
 from collections import defaultdict
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Optional
 
 import yaml
@@ -35,8 +36,15 @@ from cou.steps import (
     PreUpgradeStep,
     UnitUpgradeStep,
     UpgradeStep,
+    get_machine_resource,
+)
+from cou.steps.packages import PackageUpgradeStep
+from cou.steps.waits import (
+    IdleWaitStep,
+    PostUpgradeIdleWaitStep,
+    PreUpgradeIdleWaitStep,
+    WorkloadVerificationStep,
 )
-from cou.utils.app_utils import upgrade_packages
 from cou.utils.juju_utils import Application, Unit
 from cou.utils.openstack import (
     DISTRO_TO_OPENSTACK_MAPPING,
@@ -435,7 +443,11 @@ class OpenStackApplication(Application):
         ]
 
     def upgrade_steps(
-        self, target: OpenStackRelease, units: Optional[list[Unit]], force: bool
+        self,
+        target: OpenStackRelease,
+        units: Optional[list[Unit]],
+        force: bool,
+        wait: bool = True,
     ) -> list[UpgradeStep]:
         """Upgrade steps planning.
 
@@ -445,12 +457,15 @@ class OpenStackApplication(Application):
         :type units: Optional[list[Unit]]
         :param force: Whether the plan generation should be forced
         :type force: bool
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :return: List of upgrade steps.
         :rtype: list[UpgradeStep]
         """
         return [
             self._set_action_managed_upgrade(enable=bool(units)),
-            *self._get_upgrade_charm_steps(target),
+            *self._get_upgrade_charm_steps(target, wait),
             self._get_change_install_repository_step(target),
             self._get_units_upgrade_steps(units, force),
         ]
@@ -474,15 +489,39 @@ class OpenStackApplication(Application):
             self._get_reached_expected_target_step(target, units),
         ]
 
+    def canary_verification_steps(
+        self, target: OpenStackRelease, units: list[Unit]
+    ) -> list[PostUpgradeStep]:
+        """Canary units verification steps planning.
+
+        Wait until the application itself reaches the idle state and then check the target
+        workload of the canary units. Other post upgrade steps, e.g. waiting for the entire
+        model, are run only after all units are upgraded.
+
+        :param target: OpenStack release as target to upgrade.
+        :type target: OpenStackRelease
+        :param units: Canary units to verify
+        :type units: list[Unit]
+        :return: List of canary verification steps.
+        :rtype: list[PostUpgradeStep]
+        """
+        return [
+            PostUpgradeIdleWaitStep(self.model, self.wait_timeout, [self.name]),
+            self._get_reached_expected_target_step(target, units),
+        ]
+
     def generate_upgrade_plan(
         self,
         target: OpenStackRelease,
         force: bool,
         units: Optional[list[Unit]] = None,
+        wait: bool = True,
     ) -> ApplicationUpgradePlan:
         """Generate full upgrade plan for an Application.
 
-        Units are passed if the application should be upgraded unit by unit.
+        Units are passed if the application should be upgraded unit by unit. Applications
+        upgraded at the same time, e.g. subordinates, are waited for at once after all charm
+        upgrades, so the plan of each of them does not wait for the idle state.
 
         :param target: OpenStack codename to upgrade.
         :type target: OpenStackRelease
@@ -490,6 +529,9 @@ class OpenStackApplication(Application):
         :type force: bool
         :param units: Units to generate upgrade plan, defaults to None
         :type units: Optional[list[Unit]]
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :return: Full upgrade plan if the Application is able to generate it.
         :rtype: ApplicationUpgradePlan
         """
@@ -497,7 +539,7 @@ class OpenStackApplication(Application):
 
         upgrade_plan = ApplicationUpgradePlan(f"Upgrade plan for '{self.name}' to '{target}'")
         upgrade_plan.add_steps(self.pre_upgrade_steps(target, units))
-        upgrade_plan.add_steps(self.upgrade_steps(target, units, force))
+        upgrade_plan.add_steps(self.upgrade_steps(target, units, force, wait))
         upgrade_plan.add_steps(self.post_upgrade_steps(target, units))
 
         return upgrade_plan
@@ -555,10 +597,7 @@ class OpenStackApplication(Application):
             parallel=True,
         )
         step.add_steps(
-            UnitUpgradeStep(
-                description=f"Upgrade software packages on unit '{unit.name}'",
-                coro=upgrade_packages(unit.name, self.model, self.packages_to_hold),
-            )
+            PackageUpgradeStep(unit, self.model, self.packages_to_hold)
             for unit in units or self.units.values()
         )
 
@@ -573,12 +612,7 @@ class OpenStackApplication(Application):
         :return: Steps for refreshing the charm
         :rtype: list[PreUpgradeStep]
         """
-        wait_step = PreUpgradeStep(
-            description=f"Wait for up to {STANDARD_IDLE_TIMEOUT}s for "
-            f"app '{self.name}' to reach the idle state",
-            parallel=False,
-            coro=self.model.wait_for_idle(STANDARD_IDLE_TIMEOUT, apps=[self.name]),
-        )
+        wait_step = PreUpgradeIdleWaitStep(self.model, STANDARD_IDLE_TIMEOUT, [self.name])
         if self.is_from_charm_store:
             return [self._get_charmhub_migration_step(target), wait_step]
         if self.channel in LATEST_STABLE:
@@ -606,9 +640,13 @@ class OpenStackApplication(Application):
         """
         return PreUpgradeStep(
             f"Migrate '{self.name}' from charmstore to charmhub",
-            coro=self.model.upgrade_charm(
-                self.name, self.expected_current_channel(target), switch=f"ch:{self.charm}"
+            coro=partial(
+                self.model.upgrade_charm,
+                self.name,
+                self.expected_current_channel(target),
+                switch=f"ch:{self.charm}",
             ),
+            resource=self.name,
         )
 
     def _get_change_channel_possible_downgrade_step(
@@ -636,7 +674,9 @@ class OpenStackApplication(Application):
             f"{channel}. This may be a charm downgrade, which is generally not supported."
         )
         return PreUpgradeStep(
-            description=description, coro=self.model.upgrade_charm(self.name, channel)
+            description=description,
+            coro=partial(self.model.upgrade_charm, self.name, channel),
+            resource=self.name,
         )
 
     def _get_refresh_current_channel_step(self) -> PreUpgradeStep:
@@ -647,7 +687,8 @@ class OpenStackApplication(Application):
         """
         return PreUpgradeStep(
             f"Refresh '{self.name}' to the latest revision of '{self.channel}'",
-            coro=self.model.upgrade_charm(self.name, self.channel),
+            coro=partial(self.model.upgrade_charm, self.name, self.channel),
+            resource=self.name,
         )
 
     def _need_current_channel_refresh(self, target: OpenStackRelease) -> bool:
@@ -660,11 +701,16 @@ class OpenStackApplication(Application):
         """
         return bool(self.can_upgrade_to) and self.channel_o7k_release <= target
 
-    def _get_upgrade_charm_steps(self, target: OpenStackRelease) -> list[UpgradeStep]:
+    def _get_upgrade_charm_steps(
+        self, target: OpenStackRelease, wait: bool = True
+    ) -> list[UpgradeStep]:
         """Get steps for upgrading the charm.
 
         :param target: OpenStack release as target to upgrade.
         :type target: OpenStackRelease
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :raises ApplicationError: When the current channel is ahead of the upgrade target.
         :return: List of steps for upgrading the charm.
         :rtype: list[UpgradeStep]
@@ -679,19 +725,18 @@ class OpenStackApplication(Application):
         # However, when colocated with other app, the channel can be in a release lesser than the
         # workload version of the application.
         if self.channel_o7k_release <= self.o7k_release or self.multiple_channels:
-            return [
+            steps = [
                 UpgradeStep(
                     description=f"Upgrade '{self.name}' from '{channel}' to the new channel: "
                     f"'{self.target_channel(target)}'",
-                    coro=self.model.upgrade_charm(self.name, self.target_channel(target)),
-                ),
-                UpgradeStep(
-                    description=f"Wait for up to {STANDARD_IDLE_TIMEOUT}s for "
-                    f"app '{self.name}' to reach the idle state",
-                    parallel=False,
-                    coro=self.model.wait_for_idle(STANDARD_IDLE_TIMEOUT, apps=[self.name]),
-                ),
+                    coro=partial(self.model.upgrade_charm, self.name, self.target_channel(target)),
+                    resource=self.name,
+                )
             ]
+            if wait:
+                steps.append(IdleWaitStep(self.model, STANDARD_IDLE_TIMEOUT, [self.name]))
+
+            return steps
 
         raise ApplicationError(
             f"The '{self.name}' application is using an unexpected channel: '{self.channel}'. "
@@ -726,9 +771,12 @@ class OpenStackApplication(Application):
         return UpgradeStep(
             f"Change charm config of '{self.name}' 'action-managed-upgrade' "
             f"from '{amu_config}' to '{enable}'",
-            coro=self.model.set_application_config(
-                self.name, {"action-managed-upgrade": str(enable)}
+            coro=partial(
+                self.model.set_application_config,
+                self.name,
+                {"action-managed-upgrade": str(enable)},
             ),
+            resource=self.name,
         )
 
     def _get_pause_unit_step(self, unit: Unit, dependent: bool = False) -> UnitUpgradeStep:
@@ -743,8 +791,9 @@ class OpenStackApplication(Application):
         """
         return UnitUpgradeStep(
             description=f"Pause the unit: '{unit.name}'",
-            coro=self.model.run_action(unit.name, "pause", raise_on_failure=True),
+            coro=partial(self.model.run_action, unit.name, "pause", raise_on_failure=True),
             dependent=dependent,
+            resource=get_machine_resource(unit.machine.machine_id),
         )
 
     def _get_resume_unit_step(self, unit: Unit, dependent: bool = False) -> UnitUpgradeStep:
@@ -759,8 +808,9 @@ class OpenStackApplication(Application):
         """
         return UnitUpgradeStep(
             description=f"Resume the unit: '{unit.name}'",
-            coro=self.model.run_action(unit.name, "resume", raise_on_failure=True),
+            coro=partial(self.model.run_action, unit.name, "resume", raise_on_failure=True),
             dependent=dependent,
+            resource=get_machine_resource(unit.machine.machine_id),
         )
 
     def _get_openstack_upgrade_step(self, unit: Unit, dependent: bool = False) -> UnitUpgradeStep:
@@ -775,8 +825,11 @@ class OpenStackApplication(Application):
         """
         return UnitUpgradeStep(
             description=f"Upgrade the unit: '{unit.name}'",
-            coro=self.model.run_action(unit.name, "openstack-upgrade", raise_on_failure=True),
+            coro=partial(
+                self.model.run_action, unit.name, "openstack-upgrade", raise_on_failure=True
+            ),
             dependent=dependent,
+            resource=get_machine_resource(unit.machine.machine_id),
         )
 
     def _get_change_install_repository_step(self, target: OpenStackRelease) -> UpgradeStep:
@@ -791,9 +844,12 @@ class OpenStackApplication(Application):
             return UpgradeStep(
                 f"Change charm config of '{self.name}' '{self.origin_setting}' to "
                 f"'{self.new_origin(target)}'",
-                coro=self.model.set_application_config(
-                    self.name, {self.origin_setting: self.new_origin(target)}
+                coro=partial(
+                    self.model.set_application_config,
+                    self.name,
+                    {self.origin_setting: self.new_origin(target)},
                 ),
+                resource=self.name,
             )
         logger.warning(
             "Not changing the install repository of app %s: %s already set to %s",
@@ -818,10 +874,10 @@ class OpenStackApplication(Application):
         if not units:
             units = list(self.units.values())
 
-        return PostUpgradeStep(
+        return WorkloadVerificationStep(
             f"Verify that the workload of '{self.name}' has been upgraded on units: "
             f"{', '.join([unit.name for unit in units])}",
-            coro=self._verify_workload_upgrade(target, units),
+            coro=partial(self._verify_workload_upgrade, target, units),
         )
 
     def _get_wait_step(self) -> PostUpgradeStep:
@@ -830,24 +886,8 @@ class OpenStackApplication(Application):
         :return: Step waiting for entire model or application itself
         :rtype: PostUpgradeStep
         """
-        if self.wait_for_model:
-            description = (
-                f"Wait for up to {self.wait_timeout}s for model '{self.model.name}' "
-                "to reach the idle state"
-            )
-            apps = None
-        else:
-            description = (
-                f"Wait for up to {self.wait_timeout}s for app '{self.name}' "
-                "to reach the idle state"
-            )
-            apps = [self.name]
-
-        return PostUpgradeStep(
-            description=description,
-            parallel=False,
-            coro=self.model.wait_for_idle(self.wait_timeout, apps=apps),
-        )
+        apps = None if self.wait_for_model else [self.name]
+        return PostUpgradeIdleWaitStep(self.model, self.wait_timeout, apps)
 
     def _check_channel(self) -> None:
         """Check app channel from current data.
@@ -14,12 +14,19 @@
 
 """Core application class."""
 import logging
+from functools import partial
 from typing import Optional
 
 from cou.apps.base import LONG_IDLE_TIMEOUT, OpenStackApplication
 from cou.apps.factory import AppFactory
 from cou.exceptions import ActionFailed, ApplicationNotSupported
-from cou.steps import PostUpgradeStep, PreUpgradeStep, UnitUpgradeStep, UpgradeStep
+from cou.steps import (
+    PostUpgradeStep,
+    PreUpgradeStep,
+    UnitUpgradeStep,
+    UpgradeStep,
+    get_machine_resource,
+)
 from cou.utils.juju_utils import Model, Unit
 from cou.utils.nova_compute import verify_empty_hypervisor
 from cou.utils.openstack import OpenStackRelease
@@ -74,7 +81,11 @@ class NovaCompute(OpenStackApplication):
         return self._get_disable_scheduler_step(units) + super().pre_upgrade_steps(target, units)
 
     def upgrade_steps(
-        self, target: OpenStackRelease, units: Optional[list[Unit]], force: bool
+        self,
+        target: OpenStackRelease,
+        units: Optional[list[Unit]],
+        force: bool,
+        wait: bool = True,
     ) -> list[UpgradeStep]:
         """Upgrade steps planning.
 
@@ -84,13 +95,16 @@ class NovaCompute(OpenStackApplication):
         :type units: Optional[list[Unit]]
         :param force: Whether the plan generation should be forced.
         :type force: bool
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :return: List of upgrade steps.
         :rtype: list[UpgradeStep]
         """
         if units is None:
             units = list(self.units.values())
 
-        return super().upgrade_steps(target, units, force)
+        return super().upgrade_steps(target, units, force, wait)
 
     def post_upgrade_steps(
         self, target: OpenStackRelease, units: Optional[list[Unit]]
@@ -142,7 +156,7 @@ class NovaCompute(OpenStackApplication):
         """
         return UnitUpgradeStep(
             f"Verify that unit '{unit.name}' has no VMs running",
-            coro=verify_empty_hypervisor(unit, self.model),
+            coro=partial(verify_empty_hypervisor, unit, self.model),
         )
 
     def _get_enable_scheduler_step(self, units: Optional[list[Unit]]) -> list[PostUpgradeStep]:
@@ -157,9 +171,13 @@ class NovaCompute(OpenStackApplication):
         return [
             PostUpgradeStep(
                 description=f"Enable nova-compute scheduler from unit: '{unit.name}'",
-                coro=self.model.run_action(
-                    unit_name=unit.name, action_name="enable", raise_on_failure=True
+                coro=partial(
+                    self.model.run_action,
+                    unit_name=unit.name,
+                    action_name="enable",
+                    raise_on_failure=True,
                 ),
+                resource=get_machine_resource(unit.machine.machine_id),
             )
             for unit in units_to_enable
         ]
@@ -176,9 +194,13 @@ class NovaCompute(OpenStackApplication):
         return [
             PreUpgradeStep(
                 description=f"Disable nova-compute scheduler from unit: '{unit.name}'",
-                coro=self.model.run_action(
-                    unit_name=unit.name, action_name="disable", raise_on_failure=True
+                coro=partial(
+                    self.model.run_action,
+                    unit_name=unit.name,
+                    action_name="disable",
+                    raise_on_failure=True,
                 ),
+                resource=get_machine_resource(unit.machine.machine_id),
             )
             for unit in units_to_disable
         ]
@@ -196,8 +218,9 @@ class NovaCompute(OpenStackApplication):
         # workaround for https://bugs.launchpad.net/charm-ceilometer-agent/+bug/1947585
         return UnitUpgradeStep(
             description=(f"Resume the unit: '{unit.name}'"),
-            coro=resume_nova_compute_unit(self.model, unit),
+            coro=partial(resume_nova_compute_unit, self.model, unit),
             dependent=dependent,
+            resource=get_machine_resource(unit.machine.machine_id),
         )
 
 
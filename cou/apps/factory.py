@@ -59,6 +59,7 @@ class AppFactory:
                 units=app.units,
                 workload_version=app.workload_version,
                 actions=app.actions,
+                charm_url=app.charm_url,
             )
 
         logger.debug(
@@ -56,7 +56,11 @@ class SubordinateApplication(OpenStackApplication):
         return PreUpgradeStep()
 
     def upgrade_steps(
-        self, target: OpenStackRelease, units: Optional[list[Unit]], force: bool
+        self,
+        target: OpenStackRelease,
+        units: Optional[list[Unit]],
+        force: bool,
+        wait: bool = True,
     ) -> list[UpgradeStep]:
         """Upgrade steps planning.
 
@@ -66,10 +70,13 @@ class SubordinateApplication(OpenStackApplication):
         :type units: Optional[list[Unit]]
         :param force: Whether the plan generation should be forced
         :type force: bool
+        :param wait: Whether to wait for the application to reach the idle state after
+                     upgrading the charm, defaults to True
+        :type wait: bool
         :return: List of upgrade steps.
         :rtype: list[UpgradeStep]
         """
-        return self._get_upgrade_charm_steps(target)
+        return self._get_upgrade_charm_steps(target, wait)
 
     def post_upgrade_steps(
         self, target: OpenStackRelease, units: Optional[list[Unit]]
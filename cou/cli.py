@@ -24,21 +24,42 @@ from typing import Optional
 
 from juju.errors import JujuError
 
-from cou.commands import CLIargs, parse_args
+from cou.commands import DAG_POLICY, CLIargs, parse_args
 from cou.exceptions import COUException, HighestReleaseAchieved, TimeoutException
 from cou.logging import get_log_file, setup_logging
 from cou.steps import UpgradePlan
 from cou.steps.analyze import Analysis
+from cou.steps.dag import execute_dag
+from cou.steps.estimate import (
+    format_plan,
+    get_applications,
+    get_charms,
+    get_plan_estimate,
+    load_history,
+    record_durations,
+)
 from cou.steps.execute import apply_step
+from cou.steps.journal import ExecutionJournal, execution_journal
 from cou.steps.plan import (
     PlanStatus,
     generate_plan,
+    generate_prestage_plan,
     post_upgrade_sanity_checks,
     verify_cloud,
 )
+from cou.steps.plan_review import (
+    ReviewedPlan,
+    diff_plans,
+    get_fingerprint,
+    load_plan,
+    save_plan,
+)
+from cou.steps.report import generate_report
+from cou.steps.simulate import get_latencies, simulate_plan
+from cou.steps.tracing import StepTracer, step_tracer
 from cou.utils import print_and_debug, progress_indicator, prompt_input
 from cou.utils.cli import interrupt_handler
-from cou.utils.juju_utils import Model
+from cou.utils.juju_utils import Model, log_api_metrics
 
 AVAILABLE_OPTIONS = "cas"
 
@@ -126,15 +147,15 @@ async def get_model(args: CLIargs) -> Model:
     return model
 
 
-async def analyze_and_generate_plan(model: Model, args: CLIargs) -> UpgradePlan:
+async def analyze_and_generate_plan(model: Model, args: CLIargs) -> tuple[Analysis, UpgradePlan]:
     """Analyze the cloud and generate plan for cloud upgrade.
 
     :param model: The model to run on
     :type model: Model
     :param args: CLI arguments
     :type args: CLIargs
-    :return: The generated upgrade plan.
-    :rtype: UpgradePlan
+    :return: The analysis of the cloud and the generated upgrade plan.
+    :rtype: tuple[Analysis, UpgradePlan]
     :raises COUException: when cloud is not ready for upgrade
     """
     progress_indicator.start("Analyzing cloud...")
@@ -143,14 +164,17 @@ async def analyze_and_generate_plan(model: Model, args: CLIargs) -> UpgradePlan:
     progress_indicator.succeed()
 
     progress_indicator.start("Verifying cloud...")
-    await verify_cloud(analysis_result, args=args)
+    durations = await verify_cloud(analysis_result, args=args)
     progress_indicator.succeed()
+    if args.verbosity and not args.quiet:
+        for description, duration in durations.items():
+            print(f"Verifying {description} took {duration:.2f}s")
 
     progress_indicator.start("Generating upgrade plan...")
     upgrade_plan = await generate_plan(analysis_result, args)
     progress_indicator.succeed()
 
-    print_and_debug(upgrade_plan)
+    await print_upgrade_plan(analysis_result, upgrade_plan, args)
 
     for warning in PlanStatus.warning_messages:
         logger.warning(warning)
@@ -163,21 +187,84 @@ async def analyze_and_generate_plan(model: Model, args: CLIargs) -> UpgradePlan:
             "are resolved"
         )
 
+    if args.command == "plan":
+        fingerprint = get_fingerprint(analysis_result, args)
+        save_plan(model.name, ReviewedPlan(fingerprint, str(upgrade_plan)))
+
     print(
         "Please note that the actual upgrade steps could be different if the cloud state "
         "changes because the plan will be re-calculated at upgrade time."
     )
 
-    return upgrade_plan
+    return analysis_result, upgrade_plan
+
+
+async def print_upgrade_plan(
+    analysis_result: Analysis, upgrade_plan: UpgradePlan, args: CLIargs
+) -> None:
+    """Print upgrade plan and compare it with the plan saved by the plan subcommand.
+
+    When upgrading, the plan is followed by whether the model changed since the plan was
+    generated by the plan subcommand and by the difference of the plans if it did. The plan
+    is annotated with the durations estimated from the steps run before, if there are any.
+
+    :param analysis_result: Analysis result
+    :type analysis_result: Analysis
+    :param upgrade_plan: The generated upgrade plan
+    :type upgrade_plan: UpgradePlan
+    :param args: CLI arguments
+    :type args: CLIargs
+    """
+    estimate = await get_plan_estimate(analysis_result.model, upgrade_plan)
+    plan = format_plan(upgrade_plan, estimate) if estimate is not None else upgrade_plan
+    print_and_debug(plan)
+    saved_plan = load_plan(analysis_result.model.name) if args.command == "upgrade" else None
+    if saved_plan is None:
+        return
+
+    if saved_plan.fingerprint == get_fingerprint(analysis_result, args):
+        print("The cloud did not change since the upgrade plan was generated by 'cou plan'.")
+        return
+
+    print("The cloud changed since the upgrade plan was generated by 'cou plan':")
+    print_and_debug(
+        diff_plans(saved_plan.plan, str(upgrade_plan)) or "The upgrade plan did not change."
+    )
+
+
+def _print_upgrade_report(tracer: StepTracer, args: CLIargs) -> None:
+    """Print report of the critical path and stragglers of the upgrade.
+
+    :param tracer: Tracer recording the steps run
+    :type tracer: StepTracer
+    :param args: CLI arguments
+    :type args: CLIargs
+    """
+    if (report := generate_report(tracer.spans)) is None:
+        return
+
+    if args.quiet:
+        logger.info(report)
+    else:
+        print_and_debug(report)
 
 
-async def apply_upgrade_plan(upgrade_plan: UpgradePlan, args: CLIargs) -> None:
+async def apply_upgrade_plan(
+    upgrade_plan: UpgradePlan,
+    args: CLIargs,
+    journal: Optional[ExecutionJournal] = None,
+    tracer: Optional[StepTracer] = None,
+) -> None:
     """Apply upgrade plan to upgrade cloud.
 
     :param upgrade_plan: CLI arguments
     :type upgrade_plan: UpgradePlan
     :param args: CLI arguments
     :type args: CLIargs
+    :param journal: Journal recording the execution of the plan, defaults to None
+    :type journal: Optional[ExecutionJournal]
+    :param tracer: Tracer recording the steps run, defaults to None
+    :type tracer: Optional[StepTracer]
     """
     if args.prompt and not await continue_upgrade():
         return
@@ -191,21 +278,80 @@ async def apply_upgrade_plan(upgrade_plan: UpgradePlan, args: CLIargs) -> None:
     if not args.quiet:
         print("Running cloud upgrade...")
 
-    await apply_step(upgrade_plan, args.prompt)
+    token = execution_journal.set(journal)
+    tracer_token = step_tracer.set(tracer)
+    try:
+        if args.execution_policy == DAG_POLICY and not args.prompt:
+            await execute_dag(upgrade_plan)
+        else:
+            if args.execution_policy == DAG_POLICY:
+                logger.warning("The 'dag' execution policy requires --auto-approve, using 'tree'")
+            await apply_step(upgrade_plan, args.prompt)
+    finally:
+        execution_journal.reset(token)
+        step_tracer.reset(tracer_token)
+        log_api_metrics()
+        if tracer is not None:
+            tracer.export()
+            _print_upgrade_report(tracer, args)
+
+    if journal is not None and journal.is_completed(upgrade_plan):
+        journal.remove()
+
     print("Upgrade completed.")
 
 
-async def run_post_upgrade_sanity_check(args: CLIargs) -> None:
+async def run_upgrade_simulation(model: Model, upgrade_plan: UpgradePlan, args: CLIargs) -> None:
+    """Simulate the upgrade plan in virtual time without changing the cloud.
+
+    :param model: Model object
+    :type model: Model
+    :param upgrade_plan: The generated upgrade plan
+    :type upgrade_plan: UpgradePlan
+    :param args: CLI arguments
+    :type args: CLIargs
+    """
+    charms = await get_charms(model, get_applications(upgrade_plan))
+    latencies = get_latencies(upgrade_plan, load_history(), charms)
+    if not args.quiet:
+        print(f"Simulating cloud upgrade with the '{args.execution_policy}' execution policy...")
+
+    # NOTE: the simulation runs its own event loop, which cannot run in the thread of this one
+    progress_enabled, progress_indicator.enabled = progress_indicator.enabled, False
+    try:
+        tracer = await asyncio.to_thread(
+            simulate_plan, upgrade_plan, latencies, args.execution_policy
+        )
+    finally:
+        progress_indicator.enabled = progress_enabled
+
+    tracer.export()
+    _print_upgrade_report(tracer, args)
+    print("Simulation completed.")
+
+
+async def run_post_upgrade_sanity_check(
+    model: Model, analysis_result: Optional[Analysis], args: CLIargs
+) -> None:
     """Run post upgrade sanity check.
 
+    The analysis made before the upgrade is refreshed, so only the applications changed by
+    the upgrade are analyzed again. If the cloud was not analyzed, e.g. the analysis failed,
+    the whole cloud is analyzed.
+
+    :param model: Model object
+    :type model: Model
+    :param analysis_result: Analysis of the cloud before the upgrade, if any
+    :type analysis_result: Optional[Analysis]
     :param args: CLI arguments
     :type args: CLIargs
     """
     if not args.quiet:
         print("Running post upgrade sanity check...")
-    model = Model(args.model_name)
-    await model.connect()
-    analysis_result = await Analysis.create(model, skip_apps=args.skip_apps)
+    if analysis_result is None:
+        analysis_result = await Analysis.create(model, skip_apps=args.skip_apps)
+    else:
+        analysis_result = await analysis_result.refresh()
     await post_upgrade_sanity_checks(analysis_result)
     print("Post upgrade sanity check completed.")
 
@@ -223,12 +369,64 @@ async def run_plan_subcommand(args: CLIargs) -> None:
 async def run_upgrade_subcommand(args: CLIargs) -> None:
     """Run the `upgrade` subcommand.
 
+    The post upgrade sanity check runs even if the upgrade failed, but its own failure does not
+    replace the error of the upgrade.
+
     :param args: CLI arguments
     :type args: CLIargs
+    :raises Exception: Error of the upgrade, once the post upgrade sanity check has run.
     """
     model = await get_model(args)
-    cloud_upgrade_plan = await analyze_and_generate_plan(model, args)
-    await apply_upgrade_plan(cloud_upgrade_plan, args)
+    analysis_result: Optional[Analysis] = None
+    try:
+        analysis_result, cloud_upgrade_plan = await analyze_and_generate_plan(model, args)
+        if args.simulate:
+            await run_upgrade_simulation(model, cloud_upgrade_plan, args)
+            return
+
+        # NOTE: charms are resolved before the upgrade, so recording durations cannot fail on Juju
+        charms = await get_charms(model, get_applications(cloud_upgrade_plan))
+        journal = ExecutionJournal.open(model, cloud_upgrade_plan, resume=args.resume)
+        tracer = StepTracer(cloud_upgrade_plan)
+        try:
+            await apply_upgrade_plan(cloud_upgrade_plan, args, journal, tracer)
+        finally:
+            record_durations(tracer.spans, charms)
+    except Exception:
+        if not args.simulate:
+            try:
+                await run_post_upgrade_sanity_check(model, analysis_result, args)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.error("Post upgrade sanity check failed: %s", exc)
+        raise
+
+    await run_post_upgrade_sanity_check(model, analysis_result, args)
+
+
+async def run_prestage_subcommand(args: CLIargs) -> None:
+    """Run the `prestage` subcommand.
+
+    :param args: CLI arguments
+    :type args: CLIargs
+    """
+    model = await get_model(args)
+    progress_indicator.start("Analyzing cloud...")
+    analysis_result = await Analysis.create(model, skip_apps=args.skip_apps)
+    logger.info(analysis_result)
+    progress_indicator.succeed()
+
+    prestage_plan = generate_prestage_plan(analysis_result, args)
+    print_and_debug(prestage_plan)
+
+    loop = asyncio.get_event_loop()
+    loop.add_signal_handler(SIGINT, interrupt_handler, prestage_plan, loop, 130)
+    loop.add_signal_handler(SIGTERM, interrupt_handler, prestage_plan, loop, 143)
+
+    if not args.quiet:
+        print("Downloading software packages...")
+
+    await apply_step(prestage_plan, prompt=False)
+    print("Software packages downloaded.")
 
 
 async def _run_command(args: CLIargs) -> None:
@@ -242,6 +440,8 @@ async def _run_command(args: CLIargs) -> None:
             await run_plan_subcommand(args)
         case "upgrade":
             await run_upgrade_subcommand(args)
+        case "prestage":
+            await run_prestage_subcommand(args)
 
 
 def entrypoint() -> None:
@@ -298,8 +498,6 @@ def entrypoint() -> None:
         logger.exception(exc)
         sys.exit(2)
     finally:
-        if args.command == "upgrade":
-            asyncio.run(run_post_upgrade_sanity_check(args))
         if log_file is not None and not args.quiet:
             print(f"Full execution log: '{log_file}'")
         progress_indicator.stop()
@@ -23,6 +23,8 @@ from typing import Any, Iterable, Optional
 CONTROL_PLANE = "control-plane"
 DATA_PLANE = "data-plane"
 HYPERVISORS = "hypervisors"
+TREE_POLICY = "tree"
+DAG_POLICY = "dag"
 
 
 logger = logging.getLogger(__name__)
@@ -108,6 +110,38 @@ def batch_size_arg(value: str) -> int:
     return batch_size
 
 
+def positive_int_arg(value: str) -> int:
+    """Type converter for argparse.
+
+    :param value: input arg value to validate and convert
+    :type value: str
+    :return: the input value converted to an int
+    :rtype: int
+    :raises argparse.ArgumentTypeError: if integer is not greater than 0
+    """
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be greater than 0")
+    return number
+
+
+def max_unavailable_arg(value: str) -> str:
+    """Type converter for argparse.
+
+    :param value: input arg value to validate, a number of units or a percentage (e.g. 10%)
+    :type value: str
+    :return: same as input string
+    :rtype: str
+    :raises argparse.ArgumentTypeError: if value is not a positive number or a valid percentage
+    """
+    number = value[:-1] if value.endswith("%") else value
+    if not number.isdigit() or int(number) <= 0:
+        raise argparse.ArgumentTypeError("must be a positive number or a percentage, e.g. 10%")
+    if value.endswith("%") and int(number) > 100:
+        raise argparse.ArgumentTypeError("percentage must not be greater than 100%")
+    return value
+
+
 def purge_before_arg(value: str) -> str:
     """Verify the datetime string is acceptable.
 
@@ -127,6 +161,36 @@ def purge_before_arg(value: str) -> str:
     raise argparse.ArgumentTypeError("format must be YYYY-MM-DD[ HH:mm[:ss]]")
 
 
+def add_verbosity_args(parser: argparse.ArgumentParser) -> None:
+    """Add mutually exclusive quiet and verbose options to parser.
+
+    :param parser: parser to add the options to
+    :type parser: argparse.ArgumentParser
+    """
+    # quiet and verbose options are mutually exclusive
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--verbose",
+        "-v",
+        default=argparse.SUPPRESS,
+        action="count",
+        dest="verbosity",
+        help="Increase logging verbosity in STDOUT.\nMultiple 'v's yield progressively "
+        "more detail (up to 3).\nNote that by default the logfile will not include standard "
+        "logs\nfrom juju and websockets, as well as debug logs from all other\nmodules. "
+        "To also include the debug level logs from juju and\nwebsockets modules, use the "
+        "maximum verbosity.",
+    )
+    group.add_argument(
+        "--quiet",
+        "-q",
+        action="store_true",
+        dest="quiet",
+        help="Disable output in STDOUT.",
+        default=argparse.SUPPRESS,
+    )
+
+
 def get_subcommand_common_opts_parser() -> argparse.ArgumentParser:
     """Create a shared parser for options specific to subcommands.
 
@@ -203,6 +267,35 @@ def get_subcommand_common_opts_parser() -> argparse.ArgumentParser:
         type=purge_before_arg,
         required=False,
     )
+    subcommand_common_opts_parser.add_argument(
+        "--max-parallel-apps",
+        help="Number of control-plane principal applications to upgrade at\nthe same time. "
+        "Applications are upgraded as soon as all\napplications they depend on are upgraded, "
+        "e.g. after keystone.\nApplications are upgraded one by one in interactive mode.\n"
+        "Default to 1.",
+        dest="max_parallel_apps",
+        type=positive_int_arg,
+        default=argparse.SUPPRESS,
+    )
+    subcommand_common_opts_parser.add_argument(
+        "--max-parallel-subordinates",
+        help="Number of subordinate applications to upgrade at the same time.\n"
+        "All upgraded subordinates are waited for at once after\nthe charms are upgraded. "
+        "Subordinates are upgraded one by one\nin interactive mode.\nDefault to 1.",
+        dest="max_parallel_subordinates",
+        type=positive_int_arg,
+        default=argparse.SUPPRESS,
+    )
+    subcommand_common_opts_parser.add_argument(
+        "--skip-up-to-date-packages",
+        help="List upgradable software packages on all units when generating\nthe plan and "
+        "skip the package upgrade of units without any.\nNote that listing the packages runs "
+        "'apt-get update' on every\nunit, also with 'cou plan'.\nDefault to upgrade packages "
+        "on all units.",
+        action="store_true",
+        dest="skip_up_to_date_packages",
+        default=argparse.SUPPRESS,
+    )
     subcommand_common_opts_parser.add_argument(
         "--skip-apps",
         dest="skip_apps",
@@ -226,28 +319,7 @@ def get_subcommand_common_opts_parser() -> argparse.ArgumentParser:
         default=argparse.SUPPRESS,
     )
 
-    # quiet and verbose options are mutually exclusive
-    group = subcommand_common_opts_parser.add_mutually_exclusive_group()
-    group.add_argument(
-        "--verbose",
-        "-v",
-        default=argparse.SUPPRESS,
-        action="count",
-        dest="verbosity",
-        help="Increase logging verbosity in STDOUT.\nMultiple 'v's yield progressively "
-        "more detail (up to 3).\nNote that by default the logfile will not include standard "
-        "logs\nfrom juju and websockets, as well as debug logs from all other\nmodules. "
-        "To also include the debug level logs from juju and\nwebsockets modules, use the "
-        "maximum verbosity.",
-    )
-    group.add_argument(
-        "--quiet",
-        "-q",
-        action="store_true",
-        dest="quiet",
-        help="Disable output in STDOUT.",
-        default=argparse.SUPPRESS,
-    )
+    add_verbosity_args(subcommand_common_opts_parser)
 
     return subcommand_common_opts_parser
 
@@ -282,6 +354,45 @@ def get_hypervisors_common_opts_parser() -> argparse.ArgumentParser:
         dest="availability_zones",
         type=str,
     )
+    hypervisors_subparser.add_argument(
+        "--max-unavailable",
+        help="Maximum number of hypervisors in each availability zone to upgrade at\nthe same "
+        "time. This option accepts a number of hypervisors or\na percentage of hypervisors in "
+        "the availability zone, e.g. 10%%.\nThe next hypervisor starts upgrading as soon as "
+        "another one\nis done. Only the openstack-upgrade action (pause, upgrade and\n"
+        "resume of units) is limited. The nova-compute scheduler is\ndisabled and enabled and "
+        "software packages are upgraded on all\nhypervisors in the availability zone at once. "
+        "By default, all\nhypervisors in an availability zone are upgraded at the same time.",
+        dest="max_unavailable",
+        type=max_unavailable_arg,
+    )
+    hypervisors_subparser.add_argument(
+        "--max-parallel-azs",
+        help="Number of availability zones to upgrade at the same time.\nThe next availability "
+        "zone starts upgrading as soon as another\none is done. No new availability zone is "
+        "started once any\navailability zone failed. Default to 1.",
+        dest="max_parallel_azs",
+        type=positive_int_arg,
+        default=1,
+    )
+    hypervisors_subparser.add_argument(
+        "--max-unavailable-total",
+        help="Maximum number of hypervisors in all availability zones to\nupgrade at the same "
+        "time. By default, the number is limited\nonly by [--max-unavailable].",
+        dest="max_unavailable_total",
+        type=positive_int_arg,
+    )
+    hypervisors_subparser.add_argument(
+        "--canaries",
+        help="Number of canary hypervisors in each availability zone to\nupgrade and verify "
+        "first. The rest of hypervisors is upgraded\nin waves, each twice as large as the "
+        "previous one, starting\nwith twice the number of canaries. The waves are planned\n"
+        "in advance and do not depend on the upgrade results. Any\nfailure stops the upgrade "
+        "of the availability zone. By\ndefault, canaries are not used.",
+        dest="canaries",
+        type=positive_int_arg,
+        default=0,
+    )
     return hypervisors_subparser
 
 
@@ -374,6 +485,34 @@ def create_upgrade_subparser(
         dest="auto_approve",
         default=argparse.SUPPRESS,
     )
+    upgrade_args_parser.add_argument(
+        "--resume",
+        help="Resume an interrupted upgrade, skipping the steps already completed by\n"
+        "the previous run according to its execution journal.",
+        action="store_true",
+        dest="resume",
+        default=argparse.SUPPRESS,
+    )
+    upgrade_args_parser.add_argument(
+        "--execution-policy",
+        help="How to execute the upgrade plan. 'tree' runs the steps in the order of\n"
+        "the plan, 'dag' runs each step once its dependencies are done, while steps\n"
+        "changing the same application or machine never run at the same time. The\n"
+        "next application is verified while the previous one settles. The 'dag' policy\n"
+        "is used only together with --auto-approve. Default to 'tree'.",
+        dest="execution_policy",
+        choices=[TREE_POLICY, DAG_POLICY],
+        default=argparse.SUPPRESS,
+    )
+    upgrade_args_parser.add_argument(
+        "--simulate",
+        help="Simulate the upgrade without changing the cloud. The upgrade plan is run\n"
+        "in virtual time, each step taking the duration of the same type of step\n"
+        "from the previous upgrades or a random duration.",
+        action="store_true",
+        dest="simulate",
+        default=argparse.SUPPRESS,
+    )
     upgrade_parser = subparsers.add_parser(
         "upgrade",
         description="Run the cloud upgrade.\nIf upgrade-group is unspecified, "
@@ -428,6 +567,45 @@ def create_upgrade_subparser(
     )
 
 
+def create_prestage_subparser(subparsers: argparse._SubParsersAction) -> None:
+    """Create and configure 'prestage' subcommand parser.
+
+    :param subparsers: subparsers that 'prestage' subparser belongs to
+    :type subparsers: argparse.ArgumentParser
+    """
+    prestage_parser = subparsers.add_parser(
+        "prestage",
+        description="Download software packages on all machines ahead of the upgrade.\n"
+        "Packages are only downloaded to the APT cache and installed later\nby the upgrade.",
+        help="Download software packages on all machines ahead of the upgrade.",
+        usage="cou prestage [options]",
+        formatter_class=CapitalizeHelpFormatter,
+    )
+    prestage_parser.add_argument(
+        "--model",
+        dest="model_name",
+        type=str,
+        help="Set the model to operate on.\nIf not set, the currently active Juju model will "
+        "be used.",
+    )
+    prestage_parser.add_argument(
+        "--next-release",
+        help="Download also the software packages of the next OpenStack\nrelease from the "
+        "Ubuntu Cloud Archive. The next release is\nnot enabled on the machines.",
+        dest="download_next_release",
+        action="store_true",
+    )
+    prestage_parser.add_argument(
+        "--max-parallel-machines",
+        help="Number of machines to download software packages on at the\nsame time. "
+        "Default to 10.",
+        dest="max_parallel_machines",
+        type=positive_int_arg,
+        default=10,
+    )
+    add_verbosity_args(prestage_parser)
+
+
 def create_subparsers(parser: argparse.ArgumentParser) -> argparse._SubParsersAction:
     """Create and configure subparsers.
 
@@ -451,7 +629,7 @@ def create_subparsers(parser: argparse.ArgumentParser) -> argparse._SubParsersAc
     help_parser.add_argument(
         "subcommand",
         nargs="?",
-        choices=["plan", "upgrade"],
+        choices=["plan", "upgrade", "prestage"],
         type=str,
         help="A sub-command to get information of.",
     )
@@ -460,6 +638,7 @@ def create_subparsers(parser: argparse.ArgumentParser) -> argparse._SubParsersAc
     hypervisors_parser = get_hypervisors_common_opts_parser()
     create_plan_subparser(subparsers, subcommand_common_opts_parser, hypervisors_parser)
     create_upgrade_subparser(subparsers, subcommand_common_opts_parser, hypervisors_parser)
+    create_prestage_subparser(subparsers)
 
     return subparsers
 
@@ -490,6 +669,18 @@ class CLIargs:
     purge: bool = False
     purge_before: Optional[str] = None
     skip_apps: list[str] = field(default_factory=list)
+    max_unavailable: Optional[str] = None
+    max_parallel_azs: int = 1
+    max_unavailable_total: Optional[int] = None
+    canaries: int = 0
+    max_parallel_apps: int = 1
+    max_parallel_subordinates: int = 1
+    skip_up_to_date_packages: bool = False
+    download_next_release: bool = False
+    max_parallel_machines: int = 10
+    resume: bool = False
+    execution_policy: str = TREE_POLICY
+    simulate: bool = False
 
     @property
     def prompt(self) -> bool:
@@ -551,6 +742,8 @@ def parse_args(args: list[str]) -> CLIargs:  # pylint: disable=inconsistent-retu
                     subparsers.choices["plan"].print_help()
                 case "upgrade":
                     subparsers.choices["upgrade"].print_help()
+                case "prestage":
+                    subparsers.choices["prestage"].print_help()
             parser.exit()
 
         # validate arguments
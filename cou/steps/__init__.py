@@ -21,21 +21,40 @@ import inspect
 import logging
 import os
 import warnings
-from typing import Any, Coroutine, Iterable, List, Optional
+from typing import Any, Callable, Coroutine, Iterable, List, Optional, Union
 
 from cou.exceptions import CanceledStep
 
 logger = logging.getLogger(__name__)
 DEPENDENCY_DESCRIPTION_PREFIX = "├── "
+# coroutine of the step or a function creating it, e.g. functools.partial(coro_func, *args)
+StepCoroutine = Union[Coroutine, Callable[[], Coroutine]]
+# prefix of the resources of machines, which are never names of applications
+MACHINE_RESOURCE_PREFIX = "machine/"
 
 
-def compare_step_coroutines(coro1: Optional[Coroutine], coro2: Optional[Coroutine]) -> bool:
+def get_machine_resource(machine_id: str) -> str:
+    """Get resource of the machine changed by the steps running on its units.
+
+    :param machine_id: Juju machine id
+    :type machine_id: str
+    :return: Resource of the machine
+    :rtype: str
+    """
+    return f"{MACHINE_RESOURCE_PREFIX}{machine_id}"
+
+
+def compare_step_coroutines(
+    coro1: Optional[StepCoroutine], coro2: Optional[StepCoroutine]
+) -> bool:
     """Compare two coroutines.
 
+    The coroutines of functions are created only for the comparison and closed afterwards.
+
     :param coro1: coroutine to compare
-    :type coro1: Optional[coroutine]
+    :type coro1: Optional[StepCoroutine]
     :param coro2: coroutine to compare
-    :type coro2: Optional[coroutine]
+    :type coro2: Optional[StepCoroutine]
     :return: True if coroutines are equal
     :rtype: bool
     """
@@ -43,12 +62,19 @@ def compare_step_coroutines(coro1: Optional[Coroutine], coro2: Optional[Coroutin
         # compare two None or one None and one Coroutine
         return coro1 == coro2
 
-    return (
-        # check if same coroutine was used
-        coro1.cr_code == coro2.cr_code
-        # check coroutine arguments
-        and inspect.getcoroutinelocals(coro1) == inspect.getcoroutinelocals(coro2)
-    )
+    coroutine1 = coro1() if callable(coro1) else coro1
+    coroutine2 = coro2() if callable(coro2) else coro2
+    try:
+        return (
+            # check if same coroutine was used
+            coroutine1.cr_code == coroutine2.cr_code
+            # check coroutine arguments
+            and inspect.getcoroutinelocals(coroutine1) == inspect.getcoroutinelocals(coroutine2)
+        )
+    finally:
+        for coro, coroutine in ((coro1, coroutine1), (coro2, coroutine2)):
+            if callable(coro):
+                coroutine.close()
 
 
 class BaseStep:
@@ -71,8 +97,10 @@ class BaseStep:
         self,
         description: str = "",
         parallel: bool = False,
-        coro: Optional[Coroutine] = None,
+        coro: Optional[StepCoroutine] = None,
         dependent: bool = False,
+        max_parallel: Optional[int] = None,
+        resource: Optional[str] = None,
     ):
         """Initialize BaseStep.
 
@@ -83,20 +111,35 @@ class BaseStep:
         Each sub-step is also responsible to define if their sub-steps will run sequentially or
         in parallel.
         :type parallel: bool
-        :param coro: Step coroutine
-        :type coro: Optional[coroutine]
+        :param coro: Step coroutine or a function creating it, which is called only when the
+        step is run, so the steps which are not run do not hold any coroutine.
+        :type coro: Optional[StepCoroutine]
         :param dependent: Whether the step is dependent on another step.
         :type dependent: bool, defaults to False
+        :param max_parallel: Maximum number of sub-steps running at the same time if they are
+        run in parallel. The next sub-step starts as soon as another one is done.
+        :type max_parallel: Optional[int], defaults to None (no limit)
+        :param resource: Resource changed by the step coroutine, e.g. name of the application
+        or resource of the machine (see get_machine_resource). Steps changing the same resource
+        never run at the same time with the DAG execution policy.
+        :type resource: Optional[str], defaults to None
         """
-        if coro is not None:
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if coro is not None and not callable(coro):
             # NOTE(rgildein): We need to ignore coroutine not to be awaited if step is not run
             warnings.filterwarnings(
                 "ignore", message=f"coroutine '.*{coro.__name__}' was never awaited"
             )
 
-        self._coro: Optional[Coroutine] = coro
+        self._coro: Optional[StepCoroutine] = coro
         self.parallel = parallel
+        self.max_parallel = max_parallel
+        # semaphore shared with other steps, which is acquired while the step is running
+        self.slots: Optional[asyncio.Semaphore] = None
+        # sibling steps, which must be done before the step runs in parallel with its siblings
+        self.depends_on: List[BaseStep] = []
         self.dependent = dependent
+        self.resource = resource
         self.description = (
             DEPENDENCY_DESCRIPTION_PREFIX + description if dependent else description
         )
@@ -121,6 +164,7 @@ class BaseStep:
 
         return (
             other.parallel == self.parallel
+            and other.max_parallel == self.max_parallel
             and other.description == self.description
             and other.sub_steps == self.sub_steps
             and compare_step_coroutines(other._coro, self._coro)
@@ -201,6 +245,11 @@ class BaseStep:
         """Return boolean represent if step was canceled."""
         return self._canceled
 
+    @property
+    def stopped(self) -> bool:
+        """Return boolean represent if running step was canceled unsafely."""
+        return self._task is not None and self._task.cancelled()
+
     @property
     def done(self) -> bool:
         """Return boolean represent if step is done.
@@ -292,7 +341,8 @@ class BaseStep:
             return  # do nothing if coro was not provided
 
         try:
-            self._task = asyncio.create_task(self._coro, name=repr(self))
+            coro = self._coro() if callable(self._coro) else self._coro
+            self._task = asyncio.create_task(coro, name=repr(self))
             return await self._task  # wait until task is completed
         except asyncio.CancelledError:  # ignoring asyncio.CancelledError
             logger.warning("Task %s was stopped unsafely.", repr(self))
@@ -348,8 +398,8 @@ class HypervisorUpgradePlan(BaseStep):
     """Represents the plan for hypervisor upgrade.
 
     This class is intended to be used as a group by AZs. It doesn't accept coroutine or parallel
-    arguments as inputs. AZ groups will run sequentially and the units within the AZ will run in
-    parallel.
+    arguments as inputs. AZ groups will run sequentially, unless the hypervisors upgrade policy
+    allows more AZs at a time, and the units within the AZ will run in parallel.
     """
 
     prompt: bool = False
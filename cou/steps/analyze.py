@@ -15,9 +15,13 @@
 """Functions for analyzing an OpenStack cloud before an upgrade."""
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Any, Optional
+
+from juju.client._definitions import ApplicationStatus
 
 from cou.apps.base import OpenStackApplication
 from cou.apps.factory import AppFactory
@@ -27,6 +31,84 @@ from cou.utils.openstack import DATA_PLANE_CHARMS, UPGRADE_ORDER, OpenStackRelea
 logger = logging.getLogger(__name__)
 
 
+def _is_app_changed(
+    app: OpenStackApplication, status: ApplicationStatus, config: dict[str, Any]
+) -> bool:
+    """Check if the current state of an application differs from the analyzed application.
+
+    :param app: Analyzed application
+    :type app: OpenStackApplication
+    :param status: Current juju status of the application
+    :type status: ApplicationStatus
+    :param config: Current config of the application
+    :type config: dict[str, Any]
+    :return: True if the application changed, False otherwise
+    :rtype: bool
+    """
+    return (
+        status.charm != app.charm_url
+        or status.charm_channel != app.channel
+        or config != app.config
+        or status.can_upgrade_to != app.can_upgrade_to
+        or status.workload_version != app.workload_version
+        or {name: (unit.machine, unit.workload_version) for name, unit in status.units.items()}
+        != {
+            name: (unit.machine.machine_id, unit.workload_version)
+            for name, unit in app.units.items()
+        }
+    )
+
+
+@dataclass(frozen=True)
+class Topology:
+    """Index of where the applications and their units are deployed.
+
+    :param machine_apps: Principal applications with a unit on each machine, keyed by machine id
+    :type machine_apps: dict[str, list[OpenStackApplication]]
+    :param az_machines: Machines in each availability zone. Machines without AZ are not included
+    :type az_machines: dict[str, set[Machine]]
+    :param charm_units: Units of each charm
+    :type charm_units: dict[str, list[Unit]]
+    """
+
+    machine_apps: dict[str, list[OpenStackApplication]]
+    az_machines: dict[str, set[juju_utils.Machine]]
+    charm_units: dict[str, list[juju_utils.Unit]]
+
+    @classmethod
+    def from_apps(cls, apps: list[OpenStackApplication]) -> Topology:
+        """Build the topology index from applications.
+
+        :param apps: Applications to index
+        :type apps: list[OpenStackApplication]
+        :return: Topology of the applications
+        :rtype: Topology
+        """
+        machine_apps: dict[str, list[OpenStackApplication]] = defaultdict(list)
+        az_machines: dict[str, set[juju_utils.Machine]] = defaultdict(set)
+        charm_units: dict[str, list[juju_utils.Unit]] = defaultdict(list)
+        for app in apps:
+            for unit in app.units.values():
+                apps_on_machine = machine_apps[unit.machine.machine_id]
+                if app not in apps_on_machine:
+                    apps_on_machine.append(app)
+                if unit.machine.az is not None:
+                    az_machines[unit.machine.az].add(unit.machine)
+                charm_units[app.charm].append(unit)
+
+        return cls(dict(machine_apps), dict(az_machines), dict(charm_units))
+
+    def charm_machines(self, charm: str) -> set[juju_utils.Machine]:
+        """Get the machines with at least one unit of a charm.
+
+        :param charm: Charm name
+        :type charm: str
+        :return: Machines hosting the charm
+        :rtype: set[Machine]
+        """
+        return {unit.machine for unit in self.charm_units.get(charm, [])}
+
+
 @dataclass
 class Analysis:
     """Analyze result.
@@ -39,6 +121,8 @@ class Analysis:
     :type apps_data_plane:  list[OpenStackApplication]
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     model: juju_utils.Model
     apps: list[OpenStackApplication]
     min_o7k_version_control_plane: Optional[OpenStackRelease] = None
@@ -49,11 +133,45 @@ class Analysis:
 
     def __post_init__(self) -> None:
         """Initialize the Analysis dataclass."""
+        self._build_topology()
         self.min_o7k_version_control_plane = self.min_o7k_release_apps(self.apps_control_plane)
         self.min_o7k_version_data_plane = self.min_o7k_release_apps(self.apps_data_plane)
         self.current_cloud_o7k_release = self._get_minimum_cloud_o7k_release()
         self.current_cloud_series = self._get_minimum_cloud_series()
 
+    def _build_topology(self) -> None:
+        """Split applications into control and data plane and index their machines.
+
+        The partition and the machine maps are computed once, so accessing them later does not
+        rescan every application in the model.
+        """
+        self._topology = Topology.from_apps(self.apps)
+        self._nova_compute_units = set(self._topology.charm_units.get("nova-compute", []))
+        self._nova_compute_machines = self._topology.charm_machines("nova-compute")
+        self._apps_data_plane = [
+            app
+            for app in self.apps
+            if app.charm in DATA_PLANE_CHARMS
+            or (
+                not app.is_subordinate
+                and any(unit.machine in self._nova_compute_machines for unit in app.units.values())
+            )
+        ]
+        data_plane = set(self._apps_data_plane)
+        self._apps_control_plane = [app for app in self.apps if app not in data_plane]
+
+        self._data_plane_machines = {
+            machine_id: machine
+            for app in self._apps_data_plane
+            for machine_id, machine in app.machines.items()
+        }
+        self._control_plane_machines = {
+            machine_id: machine
+            for app in self._apps_control_plane
+            for machine_id, machine in app.machines.items()
+        }
+        self._machines = {**self._data_plane_machines, **self._control_plane_machines}
+
     @property
     def apps_control_plane(self) -> list[OpenStackApplication]:
         """Return list of control plane applications.
@@ -61,7 +179,7 @@ class Analysis:
         :return: Control plane application lists.
         :rtype: list[OpenStackApplication]
         """
-        return [app for app in self.apps if app not in self.apps_data_plane]
+        return self._apps_control_plane
 
     @property
     def apps_data_plane(self) -> list[OpenStackApplication]:
@@ -74,22 +192,34 @@ class Analysis:
         :return: data plane application lists.
         :rtype: list[OpenStackApplication]
         """
-        nova_compute_machines = set(
-            unit.machine
-            for app in self.apps
-            for unit in app.units.values()
-            if app.charm == "nova-compute"
-        )
+        return self._apps_data_plane
 
-        return [
-            app
-            for app in self.apps
-            if app.charm in DATA_PLANE_CHARMS
-            or (
-                not app.is_subordinate
-                and any(unit.machine in nova_compute_machines for unit in app.units.values())
-            )
-        ]
+    @property
+    def topology(self) -> Topology:
+        """Return the topology index of the analyzed applications.
+
+        :return: Topology index
+        :rtype: Topology
+        """
+        return self._topology
+
+    @property
+    def nova_compute_units(self) -> set[juju_utils.Unit]:
+        """Return all nova-compute units of the model.
+
+        :return: nova-compute units
+        :rtype: set[Unit]
+        """
+        return self._nova_compute_units
+
+    @property
+    def nova_compute_machines(self) -> set[juju_utils.Machine]:
+        """Return all machines with a nova-compute unit.
+
+        :return: nova-compute machines
+        :rtype: set[Machine]
+        """
+        return self._nova_compute_machines
 
     @classmethod
     async def create(cls, model: juju_utils.Model, skip_apps: list[str]) -> Analysis:
@@ -121,12 +251,36 @@ class Analysis:
         :rtype: List[OpenStackApplication]
         """
         juju_applications = await model.get_applications()
+        return cls._sort_apps(cls._create_apps(juju_applications))
+
+    @staticmethod
+    def _create_apps(
+        juju_applications: dict[str, juju_utils.Application]
+    ) -> set[OpenStackApplication]:
+        """Create OpenStack applications from Juju applications.
+
+        :param juju_applications: Juju applications by name
+        :type juju_applications: dict[str, Application]
+        :return: Supported OpenStack applications
+        :rtype: set[OpenStackApplication]
+        """
         apps = set()
         for name, app in juju_applications.items():
             if o7k_app := AppFactory.create(app):
                 apps.add(o7k_app)
                 logger.info("Found %s application:\n%s", name, o7k_app)
 
+        return apps
+
+    @staticmethod
+    def _sort_apps(apps: set[OpenStackApplication]) -> list[OpenStackApplication]:
+        """Sort applications in the upgrade order.
+
+        :param apps: Applications to sort
+        :type apps: set[OpenStackApplication]
+        :return: Applications in the upgrade order
+        :rtype: list[OpenStackApplication]
+        """
         apps_to_upgrade_in_order = {app for app in apps if app.charm in UPGRADE_ORDER}
         other_o7k_apps = apps - apps_to_upgrade_in_order
         sorted_apps_to_upgrade_in_order = sorted(
@@ -139,6 +293,36 @@ class Analysis:
         )
         return sorted_apps_to_upgrade_in_order + other_o7k_apps_sorted_by_name
 
+    async def refresh(self) -> Analysis:
+        """Get a new analysis of the model, rebuilding only the applications that changed.
+
+        The current juju status and config of the analyzed applications are compared with the
+        analysis and only applications with a different charm revision, channel, config,
+        available upgrade, units or workload versions are fetched again. Applications which
+        are no longer in the model are dropped.
+
+        :return: Analysis object populated with the refreshed applications.
+        :rtype: Analysis
+        """
+        status = await self.model.get_status()
+        current_apps = {app.name: app for app in self.apps if app.name in status.applications}
+        configs = await asyncio.gather(
+            *(self.model.get_application_config(name) for name in current_apps)
+        )
+        apps_to_rebuild = {
+            name
+            for (name, app), config in zip(current_apps.items(), configs)
+            if _is_app_changed(app, status.applications[name], config)
+        }
+        logger.info("Refreshing the analysis of applications: %s", sorted(apps_to_rebuild))
+
+        apps = {app for name, app in current_apps.items() if name not in apps_to_rebuild}
+        if apps_to_rebuild:
+            juju_applications = await self.model.get_applications(names=apps_to_rebuild)
+            apps.update(self._create_apps(juju_applications))
+
+        return Analysis(model=self.model, apps=self._sort_apps(apps))
+
     def __str__(self) -> str:
         """Dump as string.
 
@@ -207,11 +391,7 @@ class Analysis:
         :return: Data-plane machines of the model.
         :rtype: dict[str, Machine]
         """
-        return {
-            machine_id: app.machines[machine_id]
-            for app in self.apps_data_plane
-            for machine_id in app.machines
-        }
+        return self._data_plane_machines
 
     @property
     def control_plane_machines(self) -> dict[str, juju_utils.Machine]:
@@ -220,11 +400,7 @@ class Analysis:
         :return: Control-plane machines of the model.
         :rtype: dict[str, Machine]
         """
-        return {
-            machine_id: app.machines[machine_id]
-            for app in self.apps_control_plane
-            for machine_id in app.machines
-        }
+        return self._control_plane_machines
 
     @property
     def machines(self) -> dict[str, juju_utils.Machine]:
@@ -233,4 +409,4 @@ class Analysis:
         :return: All OpenStack machines of the model.
         :rtype: dict[str, Machine]
         """
-        return {**self.data_plane_machines, **self.control_plane_machines}
+        return self._machines
@@ -13,9 +13,12 @@
 # limitations under the License.
 
 """Functions for prereq steps related to ceph."""
+import asyncio
 import json
 import logging
-from typing import Sequence
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Sequence
 
 from cou.exceptions import (
     ApplicationError,
@@ -27,9 +30,103 @@ from cou.steps.analyze import Analysis
 from cou.utils.juju_utils import Application, Model, get_applications_by_charm_name
 from cou.utils.openstack import CEPH_RELEASES
 
+# collect `ceph versions` and `ceph osd dump` in a single exec on a ceph-mon unit
+CEPH_STATE_COMMAND = (
+    "versions=$(ceph versions -f json) && osd_dump=$(ceph osd dump -f json) && "
+    'printf \'{"versions": %s, "osd_dump": %s}\' "$versions" "$osd_dump"'
+)
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class CephState:
+    """State of a ceph cluster as seen by a ceph-mon unit."""
+
+    versions: dict[str, dict[str, int]]
+    osd_dump: dict[str, Any]
+
+    @property
+    def flags(self) -> list[str]:
+        """Get flags set on the cluster, e.g. noout.
+
+        :return: flags set on the cluster
+        :rtype: list[str]
+        """
+        return self.osd_dump.get("flags_set", [])
+
+    @property
+    def require_osd_release(self) -> str:
+        """Get the value of require-osd-release option.
+
+        :return: the value of require-osd-release option
+        :rtype: str
+        """
+        return self.osd_dump.get("require_osd_release", "")
+
+
+# ceph state collected for each model and ceph-mon unit, until it is invalidated
+_states: dict[tuple[str, str], asyncio.Future[CephState]] = {}
+
+
+async def _collect_state(model: Model, unit_name: str) -> CephState:
+    """Collect ceph cluster state from a ceph-mon unit.
+
+    :param model: Model object
+    :type model: Model
+    :param unit_name: The ceph-mon unit name where the command runs on.
+    :type unit_name: str
+    :return: ceph cluster state
+    :rtype: CephState
+    :raises CommandRunFailed: When a command fails to run.
+    """
+    result = await model.run_on_unit(unit_name=unit_name, command=CEPH_STATE_COMMAND, timeout=600)
+    return CephState(**json.loads(result["stdout"]))
+
+
+async def get_state(model: Model, unit_name: str) -> CephState:
+    """Get ceph cluster state from a ceph-mon unit.
+
+    The state is collected once and shared by all callers, including concurrent ones, until
+    it is invalidated by invalidate_state.
+
+    :param model: Model object
+    :type model: Model
+    :param unit_name: The ceph-mon unit name where the command runs on.
+    :type unit_name: str
+    :return: ceph cluster state
+    :rtype: CephState
+    :raises CommandRunFailed: When a command fails to run.
+    """
+    key = (model.name, unit_name)
+    if (state := _states.get(key)) is None:
+        state = _states[key] = asyncio.ensure_future(_collect_state(model, unit_name))
+        state.add_done_callback(partial(_forget_failed_state, key))
+
+    return await state
+
+
+def _forget_failed_state(key: tuple[str, str], state: asyncio.Future[CephState]) -> None:
+    """Forget ceph state which failed to be collected, so it is collected again next time.
+
+    :param key: Model name and ceph-mon unit name of the state
+    :type key: tuple[str, str]
+    :param state: Collected ceph state
+    :type state: asyncio.Future[CephState]
+    """
+    if (state.cancelled() or state.exception() is not None) and _states.get(key) is state:
+        del _states[key]
+
+
+def invalidate_state() -> None:
+    """Invalidate collected ceph cluster states.
+
+    This needs to be called after any change of the ceph clusters and at the start of each
+    phase (verification, upgrade, post upgrade checks).
+    """
+    _states.clear()
+
+
 # Private functions
 async def _get_required_osd_release(unit: str, model: Model) -> str:
     """Get the value of require-osd-release option on a ceph-mon unit.
@@ -42,14 +139,8 @@ async def _get_required_osd_release(unit: str, model: Model) -> str:
     :rtype: str
     :raises CommandRunFailed: When a command fails to run.
     """
-    check_command = "ceph osd dump -f json"
-
-    check_option_result = await model.run_on_unit(
-        unit_name=unit, command=check_command, timeout=600
-    )
-    current_require_osd_release = json.loads(check_option_result["stdout"]).get(
-        "require_osd_release", ""
-    )
+    state = await get_state(model, unit)
+    current_require_osd_release = state.require_osd_release
     logger.debug("Current require-osd-release is set to: %s", current_require_osd_release)
 
     return current_require_osd_release
@@ -69,11 +160,8 @@ async def _get_current_osd_release(unit: str, model: Model) -> str:
     :raises RunUpgradeError: When an upgrade fails.
     :raises CommandRunFailed: When a command fails to run.
     """
-    check_command = "ceph versions -f json"
-
-    check_osd_result = await model.run_on_unit(unit_name=unit, command=check_command, timeout=600)
-
-    osd_release_output = json.loads(check_osd_result["stdout"]).get("osd", None)
+    state = await get_state(model, unit)
+    osd_release_output = state.versions.get("osd", None)
     # throw exception if ceph-mon doesn't contain osd release information in `ceph`
     if not osd_release_output:
         raise RunUpgradeError(f"Cannot get OSD release information on ceph-mon unit '{unit}'.")
@@ -147,6 +235,7 @@ async def osd_noout(model: Model, apps: Sequence[Application], enable: bool) ->
         await model.run_action(
             ceph_mon_unit_name, f"{'set' if enable else 'unset'}-noout", raise_on_failure=True
         )
+        invalidate_state()
 
 
 async def get_osd_noout_state(model: Model, unit_name: str) -> bool:
@@ -159,8 +248,8 @@ async def get_osd_noout_state(model: Model, unit_name: str) -> bool:
     :return: True if noout is set, otherwise False
     :type: bool
     """
-    results = await model.run_on_unit(unit_name, "ceph osd dump -f json")
-    return "noout" in json.loads(results["stdout"].strip()).get("flags_set", [])
+    state = await get_state(model, unit_name)
+    return "noout" in state.flags
 
 
 async def assert_osd_noout_state(model: Model, apps: Sequence[Application], state: bool) -> None:
@@ -220,6 +309,8 @@ async def set_require_osd_release_option_on_unit(model: Model, unit_name: str) -
     :type unit_name: str
     :raises CommandRunFailed: When a command fails to run.
     """
+    # OSDs were upgraded since the state was collected
+    invalidate_state()
     # The current `require_osd_release` value set on the ceph-mon unit
     current_require_osd_release = await _get_required_osd_release(unit_name, model)
     # The actual release which OSDs are on
@@ -228,6 +319,7 @@ async def set_require_osd_release_option_on_unit(model: Model, unit_name: str) -
     if current_require_osd_release != current_running_osd_release:
         set_command = f"ceph osd require-osd-release {current_running_osd_release}"
         await model.run_on_unit(unit_name=unit_name, command=set_command, timeout=600)
+        invalidate_state()
 
 
 async def set_require_osd_release_option(model: Model, apps: Sequence[Application]) -> None:
@@ -319,5 +411,5 @@ async def get_versions(model: Model, ceph_mon_unit_name: str) -> dict[str, dict[
     :return: ceph version information
     :rtype: dict[str, dict[str, int]]
     """
-    result = await model.run_on_unit(ceph_mon_unit_name, "ceph versions -f json")
-    return json.loads(result["stdout"])
+    state = await get_state(model, ceph_mon_unit_name)
+    return state.versions
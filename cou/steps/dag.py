@@ -0,0 +1,409 @@
+#  Copyright 2024 Canonical Limited
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+"""Dependency-aware execution of the upgrade plan."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import AsyncExitStack, nullcontext
+from typing import Optional
+
+from cou.exceptions import HaltUpgradeExecution, RunUpgradeError
+from cou.steps import BaseStep, UpgradeStep, tracing
+from cou.steps.execute import GROUP_STEPS
+from cou.steps.journal import execution_journal
+from cou.steps.tracing import step_tracer
+from cou.utils import progress_indicator
+from cou.utils.juju_utils import api_calls
+
+DAG_MAX_WORKERS = int(os.environ.get("COU_DAG_MAX_WORKERS", 10))
+
+# states of the executed steps
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+HALTED = "halted"
+# the step did not run because of a failure of another step
+SKIPPED = "skipped"
+# the step did not run, but the execution continues, e.g. a dependent step after halting
+IGNORED = "ignored"
+FAILED_STATES = (FAILED, SKIPPED)
+# outcomes of the traced steps by their state
+TRACE_OUTCOMES = {SUCCEEDED: tracing.OK, FAILED: tracing.ERROR, HALTED: tracing.HALTED}
+
+logger = logging.getLogger(__name__)
+
+
+def _collect_resources(step: BaseStep, resources: dict[int, set[str]]) -> set[str]:
+    """Collect resources changed by the step and all its sub-steps.
+
+    :param step: Step of the plan
+    :type step: BaseStep
+    :param resources: Resources changed by the steps by id() of the steps, filled in place
+    :type resources: dict[int, set[str]]
+    :return: Resources changed by the step and all its sub-steps
+    :rtype: set[str]
+    """
+    changed = {step.resource} if step.resource else set()
+    for sub_step in step.sub_steps:
+        changed |= _collect_resources(sub_step, resources)
+
+    resources[id(step)] = changed
+    return changed
+
+
+def _get_chain_links(
+    previous: BaseStep, step: BaseStep, resources: dict[int, set[str]]
+) -> Optional[tuple[BaseStep, BaseStep]]:
+    """Get steps linking the upgrade of the step to the upgrade of the previous step.
+
+    Both steps must run their sub-steps sequentially and change different resources, e.g. the
+    upgrade plans of two applications.
+
+    :param previous: Step, which the step depends on
+    :type previous: BaseStep
+    :param step: Step of the plan
+    :type step: BaseStep
+    :param resources: Resources changed by the steps by id() of the steps
+    :type resources: dict[int, set[str]]
+    :return: The last sub-step of the previous step and the first sub-step of the step changing
+             any resource, or None if the steps cannot overlap
+    :rtype: Optional[tuple[BaseStep, BaseStep]]
+    """
+    if previous.parallel or step.parallel or step.resource:
+        return None
+
+    if resources[id(previous)] & resources[id(step)]:
+        return None
+
+    last = next(
+        (
+            sub_step
+            for sub_step in reversed(previous.sub_steps)
+            if sub_step and resources[id(sub_step)]
+        ),
+        None,
+    )
+    first = next(
+        (sub_step for sub_step in step.sub_steps if sub_step and resources[id(sub_step)]), None
+    )
+    if last is None or first is None:
+        return None
+
+    return last, first
+
+
+def get_dependencies(plan: BaseStep, chains: bool = True) -> dict[int, list[BaseStep]]:
+    """Get steps, which must be finished before each step of the plan starts.
+
+    A step depends on the previous sibling, if the parent runs the sub-steps sequentially, and
+    on the siblings in depends_on, if the parent runs the sub-steps in parallel. With chains,
+    a step changing other applications and machines than the step it depends on, e.g. the
+    upgrade of the next application, only waits for the last sub-step changing a resource,
+    e.g. the charm config change of the previous application. Its leading sub-steps without
+    any resource, e.g. verifications, then run while the previous application reaches the idle
+    state, and its first sub-step changing a resource, e.g. the software packages upgrade on
+    its machines, still waits for the whole previous step.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param chains: Whether the upgrades changing different resources overlap, defaults to True
+    :type chains: bool
+    :return: Steps, which must be finished before the step starts, by id() of the steps
+    :rtype: dict[int, list[BaseStep]]
+    """
+    resources: dict[int, set[str]] = {}
+    _collect_resources(plan, resources)
+    dependencies: defaultdict[int, list[BaseStep]] = defaultdict(list)
+    # NOTE: steps without any coroutine are not run, so nothing depends on them
+    groups = deque([plan])
+    while groups:
+        step = groups.popleft()
+        sub_steps = [sub_step for sub_step in step.sub_steps if sub_step]
+        groups.extend(sub_steps)
+        for i, sub_step in enumerate(sub_steps):
+            if step.parallel:
+                ids = {id(dependency) for dependency in sub_step.depends_on}
+                previous_steps = [other for other in sub_steps if id(other) in ids]
+            else:
+                previous_steps = sub_steps[max(i - 1, 0) : i]
+
+            for previous in previous_steps:
+                links = _get_chain_links(previous, sub_step, resources) if chains else None
+                if links is None:
+                    dependencies[id(sub_step)].append(previous)
+                    continue
+
+                last, first = links
+                dependencies[id(sub_step)].append(last)
+                dependencies[id(first)].append(previous)
+
+    return dict(dependencies)
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """Step of the plan with the steps it depends on."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, step: BaseStep, parent: Optional[_Node]):
+        """Initialize node.
+
+        :param step: Step of the plan
+        :type step: BaseStep
+        :param parent: Node of the parent step
+        :type parent: Optional[_Node]
+        """
+        self.step = step
+        self.parent = parent
+        self.children: list[_Node] = []
+        # nodes, which must be finished before the step starts
+        self.predecessors: list[_Node] = []
+        # limits the number of children running at the same time
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.overwrite_progress: bool = parent is not None and (
+            parent.overwrite_progress or isinstance(parent.step, GROUP_STEPS)
+        )
+        # set once the own coroutine of the step is done, so the children can start
+        self.started = asyncio.Event()
+        # set once the step and all its children are done
+        self.finished = asyncio.Event()
+        self.state: Optional[str] = None
+        # state of children, which must not run, e.g. after the step failed
+        self.blocked: Optional[str] = None
+        self.halted = False
+        self.failed = False
+
+
+class DAGExecutor:  # pylint: disable=too-few-public-methods
+    """Executor running the plan as a graph of steps with explicit dependencies.
+
+    Each step becomes a node of the graph, which starts once its parent ran its own coroutine
+    and the steps it depends on are finished (see get_dependencies). Unlike the tree execution,
+    the next application is verified while the previous application settles, if they change
+    different applications and machines.
+
+    A step is finished once it and all its sub-steps are done. Ready steps run in a pool of
+    workers, while steps changing the same resource (e.g. application or machine) never run at
+    the same time. The semantics of the tree execution are kept, a failed step prevents all the
+    steps depending on it and HaltUpgradeExecution only skips the following dependent steps of
+    the sequence.
+    """
+
+    def __init__(self, plan: BaseStep, max_workers: int = DAG_MAX_WORKERS):
+        """Initialize DAG executor.
+
+        :param plan: Upgrade plan to execute
+        :type plan: BaseStep
+        :param max_workers: Maximum number of steps running their coroutine at the same time
+        :type max_workers: int
+        """
+        self.plan = plan
+        self.nodes: list[_Node] = []
+        self.errors: list[str] = []
+        self._workers = asyncio.Semaphore(max_workers)
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._root = self._add_node(plan, None)
+        nodes = {id(node.step): node for node in self.nodes}
+        for step_id, dependencies in get_dependencies(plan).items():
+            nodes[step_id].predecessors = [nodes[id(dependency)] for dependency in dependencies]
+
+    def _add_node(self, step: BaseStep, parent: Optional[_Node]) -> _Node:
+        """Add node of the step and all its sub-steps to the graph.
+
+        :param step: Step of the plan
+        :type step: BaseStep
+        :param parent: Node of the parent step
+        :type parent: Optional[_Node]
+        :return: Node of the step
+        :rtype: _Node
+        """
+        node = _Node(step, parent)
+        self.nodes.append(node)
+        # NOTE: steps without any coroutine are not part of the graph, same as they are not run
+        node.children = [self._add_node(sub_step, node) for sub_step in step.sub_steps if sub_step]
+        if step.parallel:
+            node.semaphore = asyncio.Semaphore(step.max_parallel or len(node.children) or 1)
+
+        return node
+
+    def _get_blocked_state(self, node: _Node) -> Optional[str]:
+        """Get state of the node, which must not run.
+
+        :param node: Node of the graph
+        :type node: _Node
+        :return: State of the step if it must not run, otherwise None
+        :rtype: Optional[str]
+        """
+        step, parent = node.step, node.parent
+        journal = execution_journal.get()
+        if parent is not None and parent.blocked is not None:
+            return parent.blocked
+
+        if journal is not None and journal.is_completed(step):
+            logger.info("Skipping step completed before: %s", step.description)
+            return IGNORED
+
+        if any(predecessor.state in FAILED_STATES for predecessor in node.predecessors):
+            logger.warning("skipping step %s, its dependency failed", step.description)
+            return SKIPPED
+
+        if parent is not None and parent.halted and step.dependent:
+            logger.warning("skipping dependent step: %s", step.description)
+            return IGNORED
+
+        if parent is not None and parent.failed and parent.step.max_parallel:
+            logger.warning("skipping step %s, another step failed", step.description)
+            return SKIPPED
+
+        return None
+
+    def _fail(self, node: _Node, error: Optional[Exception] = None) -> None:
+        """Mark the node as failed.
+
+        :param node: Node of the graph
+        :type node: _Node
+        :param error: Error raised by the step coroutine, defaults to None (failed sub-step)
+        :type error: Optional[Exception]
+        """
+        node.state = FAILED
+        node.blocked = SKIPPED
+        if node.parent is not None:
+            node.parent.failed = True
+
+        if error is not None:
+            self.errors.append(f"{node.step.description}: {repr(error)}")
+
+    async def _run_step(self, node: _Node) -> None:
+        """Run coroutine of the step in one of the workers.
+
+        :param node: Node of the graph
+        :type node: _Node
+        """
+        step, parent = node.step, node.parent
+        journal = execution_journal.get()
+        logger.info("Running: %s", step.description)
+        if journal is not None:
+            journal.start(step)
+
+        lock = self._locks[step.resource] if step.resource else nullcontext()
+        try:
+            async with self._workers, lock:
+                if isinstance(step, UpgradeStep):
+                    progress_indicator.start(step.description)
+                    await step.run()
+                    if not node.overwrite_progress:
+                        progress_indicator.succeed()
+                else:
+                    await step.run()
+        except HaltUpgradeExecution as error:
+            if parent is None or parent.step.parallel:
+                self._fail(node, error)
+                return
+
+            logger.debug("halting step: %s", step.description)
+            node.state = HALTED
+            node.blocked = IGNORED
+            parent.halted = True
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._fail(node, error)
+
+    def _finish(self, node: _Node, start_time: float) -> None:
+        """Set state of the step, which ran, after all its sub-steps are done.
+
+        :param node: Node of the graph
+        :type node: _Node
+        :param start_time: Time when the step started
+        :type start_time: float
+        """
+        if any(child.state in FAILED_STATES for child in node.children):
+            self._fail(node)
+            return
+
+        node.state = SUCCEEDED
+        if (journal := execution_journal.get()) is not None:
+            journal.complete(node.step)
+
+        if isinstance(node.step, GROUP_STEPS) and progress_indicator.spinner_id is not None:
+            msg = f"{node.step.description} executed in {round(time.time() - start_time)} seconds"
+            logger.info(msg)
+            progress_indicator.succeed(msg)
+
+    async def _execute(self, node: _Node) -> None:
+        """Execute the step once its dependencies are finished.
+
+        :param node: Node of the graph
+        :type node: _Node
+        """
+        tracer = step_tracer.get()
+        try:
+            if node.parent is not None:
+                await node.parent.started.wait()
+
+            for predecessor in node.predecessors:
+                await predecessor.finished.wait()
+
+            async with AsyncExitStack() as stack:
+                if node.parent is not None and node.parent.semaphore is not None:
+                    await stack.enter_async_context(node.parent.semaphore)
+                if node.step.slots is not None:
+                    await stack.enter_async_context(node.step.slots)
+
+                start_time = time.time()
+                node.state = node.blocked = self._get_blocked_state(node)
+                run = node.state is None
+                if run:
+                    if tracer is not None:
+                        # NOTE: each node runs in its own task, so the context is not shared
+                        api_calls.set(tracer.start(node.step).api_calls)
+                    await self._run_step(node)
+
+                node.started.set()
+                for child in node.children:
+                    await child.finished.wait()
+
+                if node.state is None:
+                    self._finish(node, start_time)
+                if run and tracer is not None and node.state is not None:
+                    tracer.end(node.step, TRACE_OUTCOMES[node.state])
+        finally:
+            node.started.set()
+            node.finished.set()
+
+    async def run(self) -> None:
+        """Run the plan.
+
+        :raises RunUpgradeError: When any step failed, we gather all exceptions and raise them
+                                 as one.
+        """
+        logger.debug("running %d steps of %s as a graph", len(self.nodes), self.plan)
+        await asyncio.gather(*(self._execute(node) for node in self.nodes))
+        if self._root.state in FAILED_STATES:
+            errors = "\n".join(self.errors)
+            raise RunUpgradeError(
+                f"The following steps of '{self.plan.description}' failed\n{errors}"
+            )
+
+
+async def execute_dag(plan: BaseStep, max_workers: int = DAG_MAX_WORKERS) -> None:
+    """Execute the plan with the dependency-aware executor.
+
+    :param plan: Upgrade plan to execute
+    :type plan: BaseStep
+    :param max_workers: Maximum number of steps running their coroutine at the same time
+    :type max_workers: int
+    """
+    await DAGExecutor(plan, max_workers).run()
@@ -0,0 +1,506 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Estimation of the upgrade plan duration from the durations of the steps run before."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import statistics
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from cou.commands import DAG_POLICY, TREE_POLICY
+from cou.exceptions import ApplicationError, ApplicationNotFound
+from cou.steps import BaseStep
+from cou.steps.dag import DAG_MAX_WORKERS, get_dependencies
+from cou.steps.tracing import OK, Span, get_application_and_unit
+from cou.utils import COU_DATA
+from cou.utils.juju_utils import Model
+
+COU_HISTORY_FILE = COU_DATA / "history.json"
+# number of the last durations kept for each type of step
+HISTORY_SIZE = 20
+# charm used in the key of the steps, which do not change any application
+ANY_CHARM = "*"
+
+logger = logging.getLogger(__name__)
+
+
+def get_step_type(step_class: str, description: str) -> str:
+    """Get type of the step, which is the same for all applications, units and releases.
+
+    :param step_class: Name of the step class
+    :type step_class: str
+    :param description: Description of the step
+    :type description: str
+    :return: Type of the step, e.g. "UnitUpgradeStep: Upgrade the unit: '*'"
+    :rtype: str
+    """
+    description = re.sub(r"'[^']*'", "'*'", description)
+    return f"{step_class}: {re.sub(r'[0-9]+', 'N', description)}"
+
+
+def load_history() -> dict[str, dict[str, list[float]]]:
+    """Load durations of the steps run before.
+
+    :return: Durations by charm and type of the step
+    :rtype: dict[str, dict[str, list[float]]]
+    """
+    try:
+        return json.loads(COU_HISTORY_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        logger.debug("No history of the step durations found in %s", COU_HISTORY_FILE)
+    except ValueError as exc:
+        logger.warning(
+            "Ignoring invalid history of the step durations %s: %s", COU_HISTORY_FILE, exc
+        )
+
+    return {}
+
+
+async def get_charms(model: Model, applications: Iterable[Optional[str]]) -> dict[str, str]:
+    """Get charms of the applications.
+
+    :param model: Model object
+    :type model: Model
+    :param applications: Names of the applications
+    :type applications: Iterable[Optional[str]]
+    :return: Charm names by the application names, the application name is used if the charm
+             is not known
+    :rtype: dict[str, str]
+    """
+    charms = {}
+    for application in {application for application in applications if application}:
+        try:
+            charms[application] = await model.get_charm_name(application)
+        except (ApplicationError, ApplicationNotFound) as exc:
+            logger.debug("Using application name as charm of %s: %s", application, exc)
+            charms[application] = application
+
+    return charms
+
+
+def record_durations(spans: list[Span], charms: dict[str, str]) -> None:
+    """Add durations of the successfully finished steps to the history.
+
+    Only the steps without sub-steps are recorded, since they are the ones running the
+    coroutines. The charms are resolved before the upgrade, so recording the durations does
+    not talk to the model and cannot hide the failure of the upgrade.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :param charms: Charm names by the application names
+    :type charms: dict[str, str]
+    """
+    parents = {span.parent_id for span in spans}
+    leaves = [
+        span
+        for span in spans
+        if span.span_id not in parents and span.outcome == OK and span.end is not None
+    ]
+    if not leaves:
+        return
+
+    history = load_history()
+    for span in leaves:
+        charm = charms.get(span.application, ANY_CHARM) if span.application else ANY_CHARM
+        durations = history.setdefault(charm, {}).setdefault(
+            get_step_type(span.step_class, span.name), []
+        )
+        durations.append(round(span.duration, 3))
+        del durations[:-HISTORY_SIZE]
+
+    try:
+        COU_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        COU_HISTORY_FILE.write_text(json.dumps(history, sort_keys=True), encoding="utf-8")
+    except OSError as exc:
+        logger.warning("Cannot save durations of the steps to %s: %s", COU_HISTORY_FILE, exc)
+        return
+
+    logger.debug("Durations of %d steps saved to %s", len(leaves), COU_HISTORY_FILE)
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """Step of the plan in the simulated execution."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, step: BaseStep, parent: Optional[_Node], duration: Optional[float]):
+        """Initialize node.
+
+        :param step: Step of the plan
+        :type step: BaseStep
+        :param parent: Node of the parent step
+        :type parent: Optional[_Node]
+        :param duration: Estimated duration of the step coroutine, None if there is none
+        :type duration: Optional[float]
+        """
+        self.step = step
+        self.parent = parent
+        self.duration = duration
+        self.children: list[_Node] = []
+        self.predecessors: list[_Node] = []
+        # number of children started, which are not finished yet
+        self.running = 0
+        self.start: Optional[float] = None
+        self.started = False
+        self.end: Optional[float] = None
+
+
+class _Simulation:  # pylint: disable=too-few-public-methods
+    """Execution of the plan in virtual time with the estimated durations of the steps.
+
+    The steps depend on each other in the same way as with the execution policy. The tree
+    execution policy is simulated without overlapping upgrades of applications, without a limit
+    of workers and without locks of resources. Slots shared by the steps of different groups
+    are not taken into account.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        plan: BaseStep,
+        durations: dict[int, float],
+        max_workers: Optional[int],
+        dag: bool,
+    ):
+        """Initialize simulation.
+
+        :param plan: Upgrade plan
+        :type plan: BaseStep
+        :param durations: Estimated durations of the step coroutines by id() of the steps
+        :type durations: dict[int, float]
+        :param max_workers: Maximum number of step coroutines running at the same time
+        :type max_workers: Optional[int]
+        :param dag: Whether the plan runs with the DAG execution policy, i.e. upgrades of
+                    applications overlap and steps changing the same resource never run at the
+                    same time
+        :type dag: bool
+        """
+        self.nodes: list[_Node] = []
+        self.time = 0.0
+        self._durations = durations
+        self._max_workers = max_workers
+        self._locks = dag
+        self._workers = 0
+        self._locked: set[str] = set()
+        self._events: list[tuple[float, int, _Node]] = []
+        self._counter = itertools.count()
+        self._add_node(plan, None)
+        nodes = {id(node.step): node for node in self.nodes}
+        for step_id, dependencies in get_dependencies(plan, chains=dag).items():
+            nodes[step_id].predecessors = [nodes[id(dependency)] for dependency in dependencies]
+
+    def _add_node(self, step: BaseStep, parent: Optional[_Node]) -> _Node:
+        """Add node of the step and all its sub-steps.
+
+        :param step: Step of the plan
+        :type step: BaseStep
+        :param parent: Node of the parent step
+        :type parent: Optional[_Node]
+        :return: Node of the step
+        :rtype: _Node
+        """
+        node = _Node(step, parent, self._durations.get(id(step)))
+        self.nodes.append(node)
+        node.children = [self._add_node(sub_step, node) for sub_step in step.sub_steps if sub_step]
+        return node
+
+    def _is_ready(self, node: _Node) -> bool:
+        """Check if the step can start.
+
+        :param node: Node of the step
+        :type node: _Node
+        :return: True if the step can start
+        :rtype: bool
+        """
+        parent = node.parent
+        if node.start is not None or (parent is not None and not parent.started):
+            return False
+
+        if parent is not None and parent.step.parallel and parent.step.max_parallel is not None:
+            if parent.running >= parent.step.max_parallel:
+                return False
+
+        if any(predecessor.end is None for predecessor in node.predecessors):
+            return False
+
+        if node.duration is None:
+            return True
+
+        if self._max_workers is not None and self._workers >= self._max_workers:
+            return False
+
+        return not (self._locks and node.step.resource in self._locked)
+
+    def _start_ready(self) -> None:
+        """Start all the steps, which can start."""
+        started = True
+        while started:
+            started = False
+            for node in self.nodes:
+                if not self._is_ready(node):
+                    continue
+
+                started = True
+                node.start = self.time
+                if node.parent is not None:
+                    node.parent.running += 1
+                if node.duration is None:
+                    self._run_children(node)
+                    continue
+
+                self._workers += 1
+                if node.step.resource:
+                    self._locked.add(node.step.resource)
+                heapq.heappush(
+                    self._events, (self.time + node.duration, next(self._counter), node)
+                )
+
+    def _run_children(self, node: _Node) -> None:
+        """Let the sub-steps start once the step coroutine is done.
+
+        :param node: Node of the step
+        :type node: _Node
+        """
+        node.started = True
+        if all(child.end is not None for child in node.children):
+            self._finish(node)
+
+    def _finish(self, node: _Node) -> None:
+        """Finish the step and its parent if all its sub-steps are done.
+
+        :param node: Node of the step
+        :type node: _Node
+        """
+        node.end = self.time
+        parent = node.parent
+        if parent is not None:
+            parent.running -= 1
+            if parent.started and all(child.end is not None for child in parent.children):
+                self._finish(parent)
+
+    def run(self) -> dict[int, float]:
+        """Run the simulation.
+
+        :return: Durations of the steps including their sub-steps by id() of the steps
+        :rtype: dict[int, float]
+        """
+        self._start_ready()
+        while self._events:
+            self.time, _, node = heapq.heappop(self._events)
+            self._workers -= 1
+            if node.step.resource:
+                self._locked.discard(node.step.resource)
+            self._run_children(node)
+            self._start_ready()
+
+        return {
+            id(node.step): node.end - node.start
+            for node in self.nodes
+            if node.start is not None and node.end is not None
+        }
+
+
+@dataclass(frozen=True)
+class PlanEstimate:
+    """Estimated durations of the upgrade plan."""
+
+    # durations of the steps including their sub-steps by id() of the steps for each policy
+    durations: dict[str, dict[int, float]]
+    # number of the step coroutines without any history
+    unknown: int
+
+    def get_total(self, plan: BaseStep, policy: str = TREE_POLICY) -> float:
+        """Get estimated duration of the whole plan.
+
+        :param plan: Upgrade plan
+        :type plan: BaseStep
+        :param policy: Execution policy
+        :type policy: str
+        :return: Estimated duration in seconds
+        :rtype: float
+        """
+        return self.durations[policy].get(id(plan), 0.0)
+
+
+def get_step_samples(
+    step: BaseStep,
+    history: dict[str, dict[str, list[float]]],
+    charms: dict[str, str],
+    parent: tuple[Optional[str], Optional[str]] = (None, None),
+) -> dict[int, list[float]]:
+    """Get durations of the same type of steps run before for the step and all its sub-steps.
+
+    The durations of the same type of step for the same charm are used, otherwise the
+    durations of the same type of step for any charm.
+
+    :param step: Step
+    :type step: BaseStep
+    :param history: Durations by charm and type of the step
+    :type history: dict[str, dict[str, list[float]]]
+    :param charms: Charm names by the application names
+    :type charms: dict[str, str]
+    :param parent: Application and unit of the parent step
+    :type parent: tuple[Optional[str], Optional[str]]
+    :return: Durations, empty if there is no history, by id() of the steps with coroutine
+    :rtype: dict[int, list[float]]
+    """
+    application, unit = get_application_and_unit(step, *parent)
+    samples: dict[int, list[float]] = {}
+    if step._coro is not None:  # pylint: disable=protected-access
+        step_type = get_step_type(type(step).__name__, step.description)
+        charm = charms.get(application, ANY_CHARM) if application else ANY_CHARM
+        samples[id(step)] = history.get(charm, {}).get(step_type) or [
+            duration
+            for step_types in history.values()
+            for duration in step_types.get(step_type, [])
+        ]
+
+    for sub_step in step.sub_steps:
+        samples.update(get_step_samples(sub_step, history, charms, (application, unit)))
+
+    return samples
+
+
+def get_applications(
+    step: BaseStep, parent: tuple[Optional[str], Optional[str]] = (None, None)
+) -> set[str]:
+    """Get applications changed by the step and all its sub-steps.
+
+    :param step: Step
+    :type step: BaseStep
+    :param parent: Application and unit of the parent step
+    :type parent: tuple[Optional[str], Optional[str]]
+    :return: Names of the applications
+    :rtype: set[str]
+    """
+    application, unit = get_application_and_unit(step, *parent)
+    applications = {application} if application else set()
+    for sub_step in step.sub_steps:
+        applications |= get_applications(sub_step, (application, unit))
+
+    return applications
+
+
+def estimate_plan(
+    plan: BaseStep, history: dict[str, dict[str, list[float]]], charms: dict[str, str]
+) -> PlanEstimate:
+    """Estimate durations of the plan with the tree and DAG execution policies.
+
+    The median duration of the same type of step run before is used for each step.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param history: Durations by charm and type of the step
+    :type history: dict[str, dict[str, list[float]]]
+    :param charms: Charm names by the application names
+    :type charms: dict[str, str]
+    :return: Estimated durations of the plan
+    :rtype: PlanEstimate
+    """
+    step_samples = get_step_samples(plan, history, charms)
+    known = {
+        step_id: statistics.median(samples) if samples else 0.0
+        for step_id, samples in step_samples.items()
+    }
+    return PlanEstimate(
+        durations={
+            TREE_POLICY: _Simulation(plan, known, None, dag=False).run(),
+            DAG_POLICY: _Simulation(plan, known, DAG_MAX_WORKERS, dag=True).run(),
+        },
+        unknown=sum(not samples for samples in step_samples.values()),
+    )
+
+
+def format_duration(seconds: float) -> str:
+    """Format duration in a human readable way.
+
+    :param seconds: Duration in seconds
+    :type seconds: float
+    :return: Duration, e.g. "1h 5m" or "2m 30s"
+    :rtype: str
+    """
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+def format_plan(plan: BaseStep, estimate: PlanEstimate) -> str:
+    """Dump the plan with the estimated durations of the groups of steps.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param estimate: Estimated durations of the plan
+    :type estimate: PlanEstimate
+    :return: Plan with the estimated durations
+    :rtype: str
+    """
+    durations = estimate.durations[TREE_POLICY]
+    lines = []
+    for line, step in zip(str(plan).splitlines(), _iter_steps(plan)):
+        if any(step.sub_steps) and id(step) in durations:
+            line += f" (~{format_duration(durations[id(step)])})"
+        lines.append(line)
+
+    totals = ", ".join(
+        f"{format_duration(estimate.get_total(plan, policy))} with the '{policy}' policy"
+        for policy in (TREE_POLICY, DAG_POLICY)
+    )
+    lines.append(f"Estimated duration: {totals}")
+    if estimate.unknown:
+        lines.append(f"Steps without history of their duration: {estimate.unknown}")
+
+    return os.linesep.join(lines) + os.linesep
+
+
+def _iter_steps(step: BaseStep) -> Iterable[BaseStep]:  # pylint: disable=missing-yield-doc
+    """Iterate over the printed steps in the same order as they are printed.
+
+    :param step: Step
+    :type step: BaseStep
+    :yield: Step which is printed
+    :rtype: Iterable[BaseStep]
+    """
+    if step:
+        yield step
+        for sub_step in step.sub_steps:
+            yield from _iter_steps(sub_step)
+
+
+async def get_plan_estimate(model: Model, plan: BaseStep) -> Optional[PlanEstimate]:
+    """Estimate the plan from the history of the steps run before.
+
+    :param model: Model object
+    :type model: Model
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Estimated durations of the plan, None if there is no history
+    :rtype: Optional[PlanEstimate]
+    """
+    if not (history := load_history()):
+        return None
+
+    charms = await get_charms(model, get_applications(plan))
+    return estimate_plan(plan, history, charms)
@@ -16,6 +16,7 @@ import asyncio
 import logging
 import sys
 import time
+from contextlib import nullcontext
 
 from cou.exceptions import HaltUpgradeExecution, RunUpgradeError
 from cou.steps import (
@@ -24,6 +25,8 @@ from cou.steps import (
     HypervisorUpgradePlan,
     UpgradeStep,
 )
+from cou.steps.journal import execution_journal
+from cou.steps.tracing import trace_step
 from cou.utils import print_and_debug, progress_indicator, prompt_input
 
 GROUP_STEPS = (ApplicationUpgradePlan, HypervisorUpgradePlan)
@@ -38,7 +41,10 @@ async def _run_sub_steps_in_parallel(
     """Run all sub-steps of step in parallel.
 
     If any step fails, the error is caught and raised only after all steps have been completed.
-    This means that the steps are independent of each other.
+    This means that the steps are independent of each other, unless a sub-step defines
+    depends_on, in which case it starts only after its dependencies succeeded. If the step
+    defines max_parallel, at most that many sub-steps run at the same time and no new sub-step
+    is started after a failure.
 
     :param step: Step to be executed.
     :type step: BaseStep
@@ -51,9 +57,47 @@ async def _run_sub_steps_in_parallel(
     :raises RunUpgradeError: When any step failed, we gather all exceptions and raise them as one.
     """
     logger.debug("running all sub-steps of %s step in parallel", step)
-    grouped_coroutines = (
-        apply_step(sub_step, prompt, overwrite_progress) for sub_step in step.sub_steps
-    )
+    semaphore = asyncio.Semaphore(step.max_parallel or len(step.sub_steps) or 1)
+    finished = {id(sub_step): asyncio.Event() for sub_step in step.sub_steps}
+    succeeded: set[int] = set()
+    failed = False
+
+    async def _apply_sub_step(sub_step: BaseStep) -> None:
+        """Apply sub-step once its dependencies are done and there is a free slot.
+
+        If the number of sub-steps running at the same time is limited, no new sub-step is
+        started once any sub-step failed. A sub-step is skipped if any of its dependencies
+        did not succeed.
+
+        :param sub_step: Sub-step to be executed.
+        :type sub_step: BaseStep
+        :raises Exception: When sub-step failed.
+        """
+        nonlocal failed
+        try:
+            for dependency in sub_step.depends_on:
+                await finished[id(dependency)].wait()
+
+            async with semaphore:
+                if failed and step.max_parallel:
+                    logger.warning("skipping step %s, another step failed", sub_step.description)
+                    return
+
+                if any(id(dependency) not in succeeded for dependency in sub_step.depends_on):
+                    logger.warning("skipping step %s, its dependency failed", sub_step.description)
+                    return
+
+                try:
+                    await apply_step(sub_step, prompt, overwrite_progress)
+                except Exception:
+                    failed = True
+                    raise
+
+                succeeded.add(id(sub_step))
+        finally:
+            finished[id(sub_step)].set()
+
+    grouped_coroutines = (_apply_sub_step(sub_step) for sub_step in step.sub_steps)
     results = await asyncio.gather(*grouped_coroutines, return_exceptions=True)
     exceptions = [
         f"{sub_step.description}: {repr(result)}"
@@ -128,7 +172,9 @@ async def _run_step(step: BaseStep, prompt: bool, overwrite_progress: bool = Fal
     # sub-steps will get overwritten upon completion
     overwrite_substeps_progress = overwrite_progress or isinstance(step, GROUP_STEPS)
 
-    if step.parallel:
+    # NOTE: the user cannot be prompted for multiple sub-steps at the same time, so they run
+    #       sequentially in their order in interactive mode
+    if step.parallel and not (prompt and any(sub_step.prompt for sub_step in step.sub_steps)):
         await _run_sub_steps_in_parallel(step, prompt, overwrite_substeps_progress)
     else:
         await _run_sub_steps_sequentially(step, prompt, overwrite_substeps_progress)
@@ -146,6 +192,10 @@ async def _run_step(step: BaseStep, prompt: bool, overwrite_progress: bool = Fal
 async def apply_step(step: BaseStep, prompt: bool, overwrite_progress: bool = False) -> None:
     """Apply a step to execute.
 
+    If the execution is journaled, steps completed before are skipped and the start and
+    completion of the step is recorded in the journal. If the execution is traced, the run of
+    the step is recorded as a span.
+
     :param step: Step to be executed.
     :type step: BaseStep
     :param prompt: Whether to run upgrade step with prompt (interactive mode).
@@ -161,6 +211,11 @@ async def apply_step(step: BaseStep, prompt: bool, overwrite_progress: bool = Fa
     if not step:
         return
 
+    journal = execution_journal.get()
+    if journal is not None and journal.is_completed(step):
+        logger.info("Skipping step completed before: %s", step.description)
+        return
+
     # group and print all sub-steps with hierarchy for ApplicationUpgradePlan
     if isinstance(step, ApplicationUpgradePlan):
         description_to_prompt = str(step)
@@ -175,7 +230,13 @@ async def apply_step(step: BaseStep, prompt: bool, overwrite_progress: bool = Fa
         match result:
             case "y" | "yes":
                 logger.info("Running: %s", step.description)
-                await _run_step(step, prompt, overwrite_progress)
+                async with step.slots or nullcontext():
+                    if journal is not None:
+                        journal.start(step)
+                    with trace_step(step):
+                        await _run_step(step, prompt, overwrite_progress)
+                    if journal is not None:
+                        journal.complete(step)
             case "n" | "no":
                 logger.info("Aborting plan")
                 sys.exit(1)
@@ -13,17 +13,20 @@
 # limitations under the License.
 
 """Hypervisor planner."""
+import asyncio
 import logging
 from collections import defaultdict
 from dataclasses import dataclass
 from itertools import chain
-from typing import Any
+from typing import Any, Optional
 
 from cou.apps.base import OpenStackApplication
 from cou.steps import (
+    BaseStep,
     HypervisorUpgradePlan,
     PostUpgradeStep,
     PreUpgradeStep,
+    UnitUpgradeStep,
     UpgradePlan,
     UpgradeStep,
 )
@@ -57,6 +60,41 @@ class HypervisorGroup:
         return other.name == self.name and other.app_units == self.app_units
 
 
+def get_max_unavailable_units(max_unavailable: str, units_count: int) -> int:
+    """Get maximum number of units to upgrade at the same time.
+
+    :param max_unavailable: Number of units or percentage of units, e.g. "10%"
+    :type max_unavailable: str
+    :param units_count: Number of units in group
+    :type units_count: int
+    :return: Maximum number of units to upgrade at the same time, at least one.
+    :rtype: int
+    """
+    if max_unavailable.endswith("%"):
+        return max(1, units_count * int(max_unavailable[:-1]) // 100)
+
+    return int(max_unavailable)
+
+
+@dataclass(frozen=True)
+class HypervisorUpgradePolicy:
+    """Policy defining how many hypervisors can be upgraded at the same time.
+
+    Each AZ is a failure domain. By default, AZs are upgraded one after another and all
+    hypervisors in an AZ are upgraded at the same time.
+    """
+
+    # number or percentage of hypervisors in each AZ running the openstack-upgrade action at
+    # the same time, e.g. "10%"
+    max_unavailable: Optional[str] = None
+    # number of AZs to upgrade at the same time
+    max_parallel_azs: int = 1
+    # number of hypervisors in all AZs to upgrade at the same time
+    max_unavailable_total: Optional[int] = None
+    # number of canary hypervisors in each AZ to upgrade and verify before the others
+    canaries: int = 0
+
+
 class AZs(defaultdict):
     """AZs dictionary object with default value HypervisorGroup."""
 
@@ -85,7 +123,12 @@ class HypervisorUpgradePlanner:
     This planner is meant to be used to upgrade machines contains the nova-compute application.
     """
 
-    def __init__(self, apps: list[OpenStackApplication], machines: list[Machine]) -> None:
+    def __init__(
+        self,
+        apps: list[OpenStackApplication],
+        machines: list[Machine],
+        policy: Optional[HypervisorUpgradePolicy] = None,
+    ) -> None:
         """Initialize the Hypervisor class.
 
         The application should be sorted by upgrade order.
@@ -94,9 +137,17 @@ class HypervisorUpgradePlanner:
         :type apps: list[OpenStackApplication]
         :param machines: Hypervisor machines to generate upgrade plan.
         :type machines: list[Machine]
+        :param policy: Policy defining how many hypervisors can be upgraded at the same time.
+        :type policy: Optional[HypervisorUpgradePolicy]
         """
         self._apps = apps
         self._machines = machines
+        self._policy = policy or HypervisorUpgradePolicy()
+        self._slots = None
+        if self._policy.max_unavailable_total is not None:
+            # NOTE: units in all AZs share the same slots, so the number of hypervisors under
+            #       maintenance never exceeds the limit even when AZs are upgraded in parallel
+            self._slots = asyncio.Semaphore(self._policy.max_unavailable_total)
 
     @property
     def apps(self) -> list[OpenStackApplication]:
@@ -116,6 +167,15 @@ class HypervisorUpgradePlanner:
         """
         return self._machines
 
+    @property
+    def policy(self) -> HypervisorUpgradePolicy:
+        """Return the policy defining how many hypervisors can be upgraded at the same time.
+
+        :return: Hypervisor upgrade policy.
+        :rtype: HypervisorUpgradePolicy
+        """
+        return self._policy
+
     def get_azs(self, target: OpenStackRelease) -> AZs:
         """Return a list of AZs defined in individual applications.
 
@@ -143,9 +203,10 @@ class HypervisorUpgradePlanner:
         :rtype: dict[str, HypervisorGroup]
         """
         azs = AZs()
+        machines = set(self.machines)
         for app in self.apps:
             for unit in app.units.values():
-                if unit.machine not in self.machines:
+                if unit.machine not in machines:
                     logger.debug("skipping machine %s", unit.machine.machine_id)
                     continue
 
@@ -241,10 +302,147 @@ class HypervisorUpgradePlanner:
 
             units = group.app_units[app.name]
             logger.info("generating upgrade steps for %s units of %s app", app.name, units)
-            steps.extend(app.upgrade_steps(target, units, force))
+            app_steps = app.upgrade_steps(target, units, force)
+            max_parallel = None
+            if self.policy.max_unavailable is not None:
+                max_parallel = get_max_unavailable_units(self.policy.max_unavailable, len(units))
+
+            if self.policy.canaries:
+                app_steps = self._generate_canary_upgrade_steps(
+                    target, app, units, app_steps, max_parallel
+                )
+
+            if max_parallel is not None:
+                self._limit_units_upgrade_steps(app_steps, max_parallel)
+
+            if self._slots is not None:
+                for step in filter(self._is_units_upgrade_step, app_steps):
+                    for unit_step in step.sub_steps:
+                        unit_step.slots = self._slots
+
+            steps.extend(app_steps)
 
         return steps
 
+    @staticmethod
+    def _is_units_upgrade_step(step: UpgradeStep) -> bool:
+        """Check if step is upgrading units in parallel.
+
+        :param step: Upgrade step of application
+        :type step: UpgradeStep
+        :return: True if step has sub-step for each unit, which run in parallel
+        :rtype: bool
+        """
+        return (
+            step.parallel
+            and bool(step.sub_steps)
+            and all(isinstance(sub_step, UnitUpgradeStep) for sub_step in step.sub_steps)
+        )
+
+    def _generate_canary_upgrade_steps(
+        self,
+        target: OpenStackRelease,
+        app: OpenStackApplication,
+        units: list[Unit],
+        steps: list[UpgradeStep],
+        max_parallel: Optional[int],
+    ) -> list[UpgradeStep]:
+        """Upgrade canary units first and then the rest of units in growing waves.
+
+        The canary units are verified by waiting only for their application and checking their
+        workload before the upgrade continues. The waves are planned in advance, the size of
+        each next wave is double the size of previous one. Each wave starts only after the
+        previous one was upgraded successfully and any failure stops the upgrade of the group.
+
+        :param target: OpenStack codename to upgrade.
+        :type target: OpenStackRelease
+        :param app: Application to upgrade
+        :type app: OpenStackApplication
+        :param units: Units to upgrade, in the same order as their upgrade steps
+        :type units: list[Unit]
+        :param steps: Upgrade steps of application
+        :type steps: list[UpgradeStep]
+        :param max_parallel: Maximum number of units to upgrade at the same time, the last wave
+                             contains all remaining units once the wave size reaches it
+        :type max_parallel: Optional[int]
+        :return: Upgrade steps of application with canary units upgraded first
+        :rtype: list[UpgradeStep]
+        """
+        canaries = self.policy.canaries
+        new_steps: list[UpgradeStep] = []
+        for step in steps:
+            if (
+                not self._is_units_upgrade_step(step)
+                or len(step.sub_steps) != len(units)
+                or len(units) <= canaries
+            ):
+                new_steps.append(step)
+                continue
+
+            canary_units = units[:canaries]
+            canary_names = ", ".join(unit.name for unit in canary_units)
+            canary_step = UpgradeStep(f"Upgrade plan for canary units: {canary_names}", True)
+            canary_step.add_steps(step.sub_steps[:canaries])
+            verify_step = UpgradeStep(f"Verify upgrade of canary units: {canary_names}")
+            verify_step.add_steps(app.canary_verification_steps(target, canary_units))
+            new_steps.extend([canary_step, verify_step])
+            new_steps.extend(
+                self._generate_units_upgrade_waves(
+                    list(zip(units, step.sub_steps))[canaries:], 2 * canaries, max_parallel
+                )
+            )
+
+        return new_steps
+
+    @staticmethod
+    def _generate_units_upgrade_waves(
+        units_steps: list[tuple[Unit, BaseStep]], wave_size: int, max_parallel: Optional[int]
+    ) -> list[UpgradeStep]:
+        """Split upgrade of units to waves with doubling size.
+
+        :param units_steps: Units with their upgrade step
+        :type units_steps: list[tuple[Unit, BaseStep]]
+        :param wave_size: Size of the first wave
+        :type wave_size: int
+        :param max_parallel: Maximum number of units to upgrade at the same time, the last wave
+                             contains all remaining units once the wave size reaches it
+        :type max_parallel: Optional[int]
+        :return: Upgrade step for each wave
+        :rtype: list[UpgradeStep]
+        """
+        waves = []
+        while units_steps:
+            if max_parallel is not None and wave_size >= max_parallel:
+                wave_size = len(units_steps)
+
+            wave, units_steps = units_steps[:wave_size], units_steps[wave_size:]
+            wave_step = UpgradeStep(
+                f"Upgrade plan for units: {', '.join(unit.name for unit, _ in wave)}", True
+            )
+            wave_step.add_steps(unit_step for _, unit_step in wave)
+            waves.append(wave_step)
+            wave_size *= 2
+
+        return waves
+
+    def _limit_units_upgrade_steps(self, steps: list[UpgradeStep], max_parallel: int) -> None:
+        """Limit number of units upgraded at the same time.
+
+        The units are upgraded in a rolling way, so the next unit starts as soon as another one
+        is done. Steps of each unit stay in the same order. Only the openstack-upgrade steps of
+        units are limited, the nova-compute scheduler and software packages are handled by
+        pre-upgrade and post-upgrade steps of all units in the group at once.
+
+        :param steps: Upgrade steps of application
+        :type steps: list[UpgradeStep]
+        :param max_parallel: Maximum number of units to upgrade at the same time
+        :type max_parallel: int
+        """
+        for step in filter(self._is_units_upgrade_step, steps):
+            if len(step.sub_steps) > max_parallel:
+                step.max_parallel = max_parallel
+                step.description += f" (at most {max_parallel} at a time)"
+
     def _generate_post_upgrade_steps(
         self, target: OpenStackRelease, group: HypervisorGroup
     ) -> list[PostUpgradeStep]:
@@ -276,10 +474,37 @@ class HypervisorUpgradePlanner:
 
         return steps
 
+    def _create_upgrade_plan(self, azs: AZs) -> UpgradePlan:
+        """Create upgrade plan for all AZs according to the policy.
+
+        :param azs: AZs to upgrade
+        :type azs: AZs
+        :return: Empty upgrade plan
+        :rtype: UpgradePlan
+        """
+        limits = []
+        parallel_azs = self.policy.max_parallel_azs > 1 and len(azs) > 1
+        if parallel_azs:
+            limits.append(f"at most {self.policy.max_parallel_azs} availability zones")
+
+        if self.policy.max_unavailable_total is not None:
+            limits.append(f"at most {self.policy.max_unavailable_total} hypervisors")
+
+        description = "Upgrading all applications deployed on machines with hypervisor"
+        plan = UpgradePlan(
+            f"{description} ({', '.join(limits)} at a time)." if limits else f"{description}."
+        )
+        if parallel_azs:
+            plan.parallel = True
+            plan.max_parallel = self.policy.max_parallel_azs
+
+        return plan
+
     def generate_upgrade_plan(self, target: OpenStackRelease, force: bool) -> UpgradePlan:
         """Generate full upgrade plan for all hypervisors.
 
-        This plan will be based on multiple HypervisorUpgradePlan.
+        This plan will be based on multiple HypervisorUpgradePlan, which are upgraded in
+        parallel if the policy allows more than one AZ at a time.
 
         :param target: OpenStack codename to upgrade.
         :type target: OpenStackRelease
@@ -288,8 +513,9 @@ class HypervisorUpgradePlanner:
         :return: Full upgrade plan
         :rtype: UpgradePlan
         """
-        plan = UpgradePlan("Upgrading all applications deployed on machines with hypervisor.")
-        for az, group in self.get_azs(target).items():
+        azs = self.get_azs(target)
+        plan = self._create_upgrade_plan(azs)
+        for az, group in azs.items():
             units = list(chain(*group.app_units.values()))
             hypervisor_plan = HypervisorUpgradePlan(
                 f"Upgrade plan for {units} in '{group.name}' to '{target}'"
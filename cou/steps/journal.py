@@ -0,0 +1,246 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Journal of the upgrade plan execution, which allows to resume an interrupted upgrade."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Optional
+
+from cou.steps import BaseStep
+from cou.utils import COU_DATA
+from cou.utils.juju_utils import Model
+
+COU_DIR_JOURNAL = COU_DATA / "journal"
+STARTED = "started"
+COMPLETED = "completed"
+PLAN_ID = "plan"
+
+logger = logging.getLogger(__name__)
+
+# execution journal of the currently applied plan
+execution_journal: ContextVar[Optional[ExecutionJournal]] = ContextVar(
+    "execution_journal", default=None
+)
+
+
+def get_model_fingerprint(model: Model) -> str:
+    """Get fingerprint of the model, which does not change during the upgrade.
+
+    :param model: Model object
+    :type model: Model
+    :return: Fingerprint as hex digest
+    :rtype: str
+    """
+    return hashlib.sha256(f"{model.name}:{model.uuid}".encode()).hexdigest()
+
+
+def get_journal_file(model_name: str) -> Path:
+    """Get path of the execution journal for a model.
+
+    :param model_name: Name of the model
+    :type model_name: str
+    :return: Path to the execution journal
+    :rtype: Path
+    """
+    return COU_DIR_JOURNAL / f"{model_name.replace('/', '_')}.jsonl"
+
+
+def _get_step_ids(step: BaseStep, parent_id: str = "") -> dict[int, str]:
+    """Get stable identities of the step and all its sub-steps.
+
+    The identity of a step is derived from the descriptions of the step and all its parents.
+    Sub-steps with the same description are told apart by their order.
+
+    :param step: Step
+    :type step: BaseStep
+    :param parent_id: Identity of the parent step
+    :type parent_id: str
+    :return: Identities of steps by id() of the step objects
+    :rtype: dict[int, str]
+    """
+    step_ids = {}
+    occurrences: defaultdict[str, int] = defaultdict(int)
+    for sub_step in step.sub_steps:
+        key = f"{parent_id}/{sub_step.description}#{occurrences[sub_step.description]}"
+        occurrences[sub_step.description] += 1
+        step_id = hashlib.sha256(key.encode()).hexdigest()
+        step_ids[id(sub_step)] = step_id
+        step_ids.update(_get_step_ids(sub_step, step_id))
+
+    return step_ids
+
+
+class ExecutionJournal:
+    """Durable record of steps started and completed during the upgrade.
+
+    Each record is appended as a JSON line and synced to the disk before the execution
+    continues, so the journal is kept even if COU is killed. The first record holds the
+    fingerprint of the model the plan is executed on.
+    """
+
+    def __init__(self, path: Path, fingerprint: str, plan: BaseStep, completed: set[str]):
+        """Initialize execution journal.
+
+        :param path: Path to the journal file
+        :type path: Path
+        :param fingerprint: Fingerprint of the model
+        :type fingerprint: str
+        :param plan: Executed upgrade plan
+        :type plan: BaseStep
+        :param completed: Identities of the steps completed before
+        :type completed: set[str]
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed = completed
+        # NOTE: the description of the whole plan is not part of the identities, since it shows
+        # statistics of the plan, which differ when the plan is generated again
+        self._step_ids = {id(plan): PLAN_ID, **_get_step_ids(plan)}
+
+    @classmethod
+    def open(cls, model: Model, plan: BaseStep, resume: bool = False) -> ExecutionJournal:
+        """Open the execution journal of the plan.
+
+        When resuming, steps completed according to the existing journal of the same model are
+        loaded. Otherwise, or if the journal belongs to another model, a new journal is started.
+
+        :param model: Model object
+        :type model: Model
+        :param plan: Upgrade plan to execute
+        :type plan: BaseStep
+        :param resume: Whether to resume the execution recorded in the existing journal
+        :type resume: bool
+        :return: Execution journal
+        :rtype: ExecutionJournal
+        """
+        path = get_journal_file(model.name)
+        fingerprint = get_model_fingerprint(model)
+        completed: Optional[set[str]] = _load_completed(path, fingerprint) if resume else None
+        if completed is None:
+            COU_DIR_JOURNAL.mkdir(parents=True, exist_ok=True)
+            path.write_text("", encoding="utf-8")
+            journal = cls(path, fingerprint, plan, set())
+            journal._write({"fingerprint": fingerprint, "plan": plan.description})
+            logger.debug("Execution journal started in %s", path)
+            return journal
+
+        logger.info("Resuming the upgrade with %d steps completed before", len(completed))
+        return cls(path, fingerprint, plan, completed)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        """Append record to the journal and sync it to the disk.
+
+        :param record: Record to append
+        :type record: dict[str, Any]
+        """
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _record(self, event: str, step: BaseStep) -> None:
+        """Record event of step.
+
+        :param event: Event of the step, started or completed
+        :type event: str
+        :param step: Step
+        :type step: BaseStep
+        """
+        if (step_id := self._step_ids.get(id(step))) is None:
+            logger.debug("Step %s is not part of the journaled plan", repr(step))
+            return
+
+        self._write(
+            {"event": event, "step": step_id, "description": step.description, "time": time.time()}
+        )
+        if event == COMPLETED:
+            self.completed.add(step_id)
+
+    def is_completed(self, step: BaseStep) -> bool:
+        """Check if step was confirmed as completed.
+
+        :param step: Step
+        :type step: BaseStep
+        :return: True if step was completed, False otherwise
+        :rtype: bool
+        """
+        return self._step_ids.get(id(step)) in self.completed
+
+    def start(self, step: BaseStep) -> None:
+        """Record the start of the step.
+
+        :param step: Step
+        :type step: BaseStep
+        """
+        self._record(STARTED, step)
+
+    def complete(self, step: BaseStep) -> None:
+        """Record the completion of the step.
+
+        The step is completed only if it was not stopped and all its sub-steps which run were
+        completed, e.g. dependent sub-steps skipped after halting the execution are not.
+
+        :param step: Step
+        :type step: BaseStep
+        """
+        if step.stopped:
+            logger.debug("Step %s was stopped, not recording its completion", repr(step))
+            return
+
+        if not all(self.is_completed(sub_step) for sub_step in step.sub_steps if sub_step):
+            logger.debug("Step %s has incomplete sub-steps", repr(step))
+            return
+
+        self._record(COMPLETED, step)
+
+    def remove(self) -> None:
+        """Remove the journal after the whole plan was executed."""
+        self.path.unlink(missing_ok=True)
+        logger.debug("Execution journal %s removed", self.path)
+
+
+def _load_completed(path: Path, fingerprint: str) -> Optional[set[str]]:
+    """Load identities of completed steps from the journal.
+
+    :param path: Path to the journal file
+    :type path: Path
+    :param fingerprint: Fingerprint of the model
+    :type fingerprint: str
+    :return: Identities of completed steps or None if there is no valid journal for the model.
+    :rtype: Optional[set[str]]
+    """
+    try:
+        header, *records = [
+            json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line
+        ]
+    except FileNotFoundError:
+        logger.warning("No execution journal found in %s, starting from the beginning", path)
+        return None
+    except ValueError as exc:
+        logger.warning("Ignoring invalid execution journal %s: %s", path, exc)
+        return None
+
+    if header.get("fingerprint") != fingerprint:
+        logger.warning("Ignoring execution journal %s of another model", path)
+        return None
+
+    return {record["step"] for record in records if record.get("event") == COMPLETED}
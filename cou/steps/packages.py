@@ -0,0 +1,228 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Steps upgrading software packages of units."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from functools import partial
+from typing import Optional
+
+from cou.steps import BaseStep, UnitUpgradeStep, get_machine_resource
+from cou.utils.app_utils import get_upgradable_packages, upgrade_packages
+from cou.utils.juju_utils import Model, Unit
+
+# maximum number of units listing their upgradable packages at the same time
+PACKAGES_PROBE_CONCURRENCY: int = int(os.environ.get("COU_PACKAGES_PROBE_CONCURRENCY", 20))
+
+logger = logging.getLogger(__name__)
+
+
+class PackageUpgradeStep(UnitUpgradeStep):
+    """Represents the software packages upgrade on an individual unit."""
+
+    def __init__(
+        self,
+        unit: Unit,
+        model: Model,
+        packages_to_hold: Optional[list] = None,
+        description: str = "",
+    ):
+        """Initialize software packages upgrade step.
+
+        :param unit: Unit where the package upgrade runs on.
+        :type unit: Unit
+        :param model: Model object
+        :type model: Model
+        :param packages_to_hold: A list of packages to put on hold during package upgrade.
+        :type packages_to_hold: Optional[list]
+        :param description: Description of the step, defaults to the upgrade of the unit.
+        :type description: str
+        """
+        super().__init__(
+            description=description or f"Upgrade software packages on unit '{unit.name}'",
+            coro=partial(upgrade_packages, unit.name, model, packages_to_hold),
+            resource=get_machine_resource(unit.machine.machine_id),
+        )
+        self.unit = unit
+        self.model = model
+        self.packages_to_hold = packages_to_hold
+
+
+def _find_package_upgrade_steps(
+    plan: BaseStep,
+) -> list[tuple[BaseStep, PackageUpgradeStep]]:
+    """Find all software packages upgrade steps in the plan.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Package upgrade steps with their parent step in the order of the plan.
+    :rtype: list[tuple[BaseStep, PackageUpgradeStep]]
+    """
+    found = []
+    for step in plan.sub_steps:
+        if isinstance(step, PackageUpgradeStep):
+            found.append((plan, step))
+        else:
+            found.extend(_find_package_upgrade_steps(step))
+
+    return found
+
+
+def _find_package_upgrade_phases(
+    plan: BaseStep,
+) -> list[list[tuple[BaseStep, PackageUpgradeStep]]]:
+    """Find software packages upgrade steps grouped by the upgrade phase they belong to.
+
+    The phase is the step grouping the package upgrades of applications, e.g. the upgrade plan
+    of units on hypervisors in an availability zone or the upgrade plan of an application.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Package upgrade steps with their parent step for each phase in the order of the plan.
+    :rtype: list[list[tuple[BaseStep, PackageUpgradeStep]]]
+    """
+    phase = [
+        (group, step)
+        for group in plan.sub_steps
+        for step in group.sub_steps
+        if isinstance(step, PackageUpgradeStep)
+    ]
+    phases = [phase] if phase else []
+    for step in plan.sub_steps:
+        phases.extend(_find_package_upgrade_phases(step))
+
+    return phases
+
+
+def deduplicate_package_upgrades(plan: BaseStep) -> int:
+    """Upgrade software packages only once on each machine in an upgrade phase.
+
+    Colocated applications upgraded in the same phase, e.g. cinder-volume and nova-compute on
+    the same hypervisor, would otherwise run the same package upgrade on a machine several
+    times. The last step in the phase upgrading a machine holds the packages of all its units
+    and the previous steps for the machine in the phase are removed from the plan, so packages
+    are never upgraded before the guards of any colocated application, e.g. nova-compute
+    packages are upgraded only after its scheduler is disabled. Steps in different phases are
+    kept, because each phase runs behind its own guards, e.g. ceph-osd units are upgraded only
+    after all nova-compute units.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Number of removed package upgrade steps.
+    :rtype: int
+    """
+    machine_steps: defaultdict[tuple[int, str], list[tuple[BaseStep, PackageUpgradeStep]]] = (
+        defaultdict(list)
+    )
+    for phase_id, phase in enumerate(_find_package_upgrade_phases(plan)):
+        for parent, step in phase:
+            machine_steps[(phase_id, step.unit.machine.machine_id)].append((parent, step))
+
+    removed = 0
+    for (_, machine_id), steps in machine_steps.items():
+        if len(steps) == 1:
+            continue
+
+        *duplicates, (last_parent, last_step) = steps
+        units = ", ".join(f"'{step.unit.name}'" for _, step in steps)
+        packages_to_hold = sorted(
+            {package for _, step in steps for package in step.packages_to_hold or []}
+        )
+        index = next(i for i, step in enumerate(last_parent.sub_steps) if step is last_step)
+        last_parent.sub_steps[index] = PackageUpgradeStep(
+            last_step.unit,
+            last_step.model,
+            packages_to_hold or None,
+            f"Upgrade software packages on machine '{machine_id}' for units {units}",
+        )
+        for parent, step in duplicates:
+            parent.sub_steps[:] = [
+                sub_step for sub_step in parent.sub_steps if sub_step is not step
+            ]
+            logger.debug(
+                "Software packages on unit '%s' are upgraded with unit '%s'",
+                step.unit.name,
+                last_step.unit.name,
+            )
+
+        removed += len(duplicates)
+
+    return removed
+
+
+async def _has_upgradable_packages(step: PackageUpgradeStep, semaphore: asyncio.Semaphore) -> bool:
+    """Check if the package upgrade step has any package to upgrade.
+
+    Packages on hold during the package upgrade are not considered.
+
+    :param step: Package upgrade step
+    :type step: PackageUpgradeStep
+    :param semaphore: Semaphore limiting units listing packages at the same time
+    :type semaphore: asyncio.Semaphore
+    :return: True if there is any package to upgrade, False otherwise
+    :rtype: bool
+    """
+    async with semaphore:
+        packages = await get_upgradable_packages(step.unit.name, step.model)
+
+    packages_to_hold = set(step.packages_to_hold or [])
+    return any(package not in packages_to_hold for package in packages)
+
+
+async def skip_up_to_date_package_upgrades(plan: BaseStep) -> tuple[int, int]:
+    """Remove package upgrades of units without any package to upgrade.
+
+    Upgradable packages are listed on all units at the same time, at most
+    PACKAGES_PROBE_CONCURRENCY units at once. If the packages cannot be listed on a unit for
+    any reason, e.g. the command fails or the unit is not found, its package upgrade is kept.
+    The step grouping the package upgrades of an application shows how many of them were
+    skipped.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Number of skipped package upgrades and number of all package upgrades.
+    :rtype: tuple[int, int]
+    """
+    steps = _find_package_upgrade_steps(plan)
+    semaphore = asyncio.Semaphore(PACKAGES_PROBE_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_has_upgradable_packages(step, semaphore) for _, step in steps), return_exceptions=True
+    )
+
+    parents: dict[int, BaseStep] = {}
+    parents_skipped: defaultdict[int, int] = defaultdict(int)
+    for (parent, step), upgradable in zip(steps, results):
+        if isinstance(upgradable, Exception):
+            logger.warning(
+                "Cannot list upgradable packages on unit '%s': %s", step.unit.name, upgradable
+            )
+            continue
+
+        if upgradable:
+            continue
+
+        logger.debug("Unit '%s' has no software packages to upgrade", step.unit.name)
+        parent.sub_steps[:] = [sub_step for sub_step in parent.sub_steps if sub_step is not step]
+        parents[id(parent)] = parent
+        parents_skipped[id(parent)] += 1
+
+    for parent_id, parent in parents.items():
+        skipped = parents_skipped[parent_id]
+        total = skipped + len(parent.sub_steps)
+        parent.description += f" (skipped {skipped} of {total} without upgradable packages)"
+
+    return sum(parents_skipped.values()), len(steps)
@@ -13,12 +13,17 @@
 # limitations under the License.
 
 """Upgrade planning utilities."""
+# pylint: disable=too-many-lines
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
+from contextvars import ContextVar
 from enum import Enum
-from typing import Optional, Union
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional, Union
 
 # NOTE we need to import the modules to register the charms with the register_application
 # decorator
@@ -35,7 +40,7 @@ from cou.apps.auxiliary_subordinate import (  # noqa: F401
     HACluster,
     OVNSubordinate,
 )
-from cou.apps.base import OpenStackApplication
+from cou.apps.base import STANDARD_IDLE_TIMEOUT, OpenStackApplication
 from cou.apps.channel_based import ChannelBasedApplication  # noqa: F401
 from cou.apps.core import Keystone, Octavia, Swift  # noqa: F401
 from cou.apps.subordinate import SubordinateApplication  # noqa: F401
@@ -50,13 +55,26 @@ from cou.exceptions import (
     OutOfSupportRange,
     VaultSealed,
 )
-from cou.steps import PostUpgradeStep, PreUpgradeStep, UpgradePlan, ceph
-from cou.steps.analyze import Analysis
+from cou.steps import (
+    PostUpgradeStep,
+    PreUpgradeStep,
+    UnitUpgradeStep,
+    UpgradePlan,
+    ceph,
+    get_machine_resource,
+)
+from cou.steps.analyze import Analysis, Topology
 from cou.steps.backup import backup
-from cou.steps.hypervisor import HypervisorUpgradePlanner
+from cou.steps.hypervisor import HypervisorUpgradePlanner, HypervisorUpgradePolicy
 from cou.steps.nova_cloud_controller import archive, purge
+from cou.steps.packages import (
+    deduplicate_package_upgrades,
+    skip_up_to_date_package_upgrades,
+)
 from cou.steps.vault import verify_vault_is_unsealed
+from cou.steps.waits import PostUpgradeIdleWaitStep, merge_idle_waits
 from cou.utils import print_and_debug
+from cou.utils.app_utils import download_packages
 from cou.utils.juju_utils import (
     DEFAULT_TIMEOUT,
     Machine,
@@ -64,7 +82,11 @@ from cou.utils.juju_utils import (
     get_applications_by_charm_name,
 )
 from cou.utils.nova_compute import get_empty_hypervisors
-from cou.utils.openstack import LTS_TO_OS_RELEASE, OpenStackRelease
+from cou.utils.openstack import (
+    LTS_TO_OS_RELEASE,
+    OpenStackRelease,
+    get_upgrade_dependencies,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +98,12 @@ class MessageType(Enum):
     WARNING = 2
 
 
+# messages of a verification running concurrently with others, see _run_verification
+_pending_messages: ContextVar[Optional[list[tuple[str, MessageType]]]] = ContextVar(
+    "pending_messages", default=None
+)
+
+
 class PlanStatus:  # pylint: disable=too-few-public-methods
     """Representation of a collection of statuses from cloud verification and plan generation.
 
@@ -95,6 +123,10 @@ class PlanStatus:  # pylint: disable=too-few-public-methods
         :param message_type: The type of the message
         :type message_type: str
         """
+        if (pending_messages := _pending_messages.get()) is not None:
+            pending_messages.append((message, message_type))
+            return
+
         match message_type:
             case MessageType.ERROR:
                 cls.error_messages.append(message)
@@ -102,7 +134,7 @@ class PlanStatus:  # pylint: disable=too-few-public-methods
                 cls.warning_messages.append(message)
 
 
-async def verify_cloud(analysis_result: Analysis, args: CLIargs) -> None:
+async def verify_cloud(analysis_result: Analysis, args: CLIargs) -> dict[str, float]:
     """Verify the cloud is ready for upgrade.
 
     This will run a sequence of verification functions which populate the
@@ -112,16 +144,78 @@ async def verify_cloud(analysis_result: Analysis, args: CLIargs) -> None:
     :type analysis_result: Analysis
     :param args: CLI arguments
     :type args: CLIargs
+    :return: Duration in seconds of each verification waiting for Juju, by its description.
+    :rtype: dict[str, float]
     """
     _verify_supported_series(analysis_result)
     _verify_highest_release_achieved(analysis_result)
     _verify_data_plane_ready_to_upgrade(args, analysis_result)
     _verify_hypervisors_cli_input(args, analysis_result)
     _verify_nova_cloud_controller_scheduler_default_filters(args, analysis_result)
-    await _verify_vault_is_unsealed(analysis_result)
-    await _verify_ceph_running_versions_consistent(analysis_result)
-    await _verify_osd_noout_unset(analysis_result)
-    await _verify_model_idle(analysis_result)
+
+    ceph.invalidate_state()
+    # NOTE: The checks below are independent and only wait for Juju, so they run concurrently.
+    # Their messages are added to PlanStatus afterwards in this order to keep them stable.
+    # All checks are waited for, even if any of them fails, and the first error is raised.
+    verifications = [
+        ("vault is unsealed", _verify_vault_is_unsealed),
+        ("ceph running versions are consistent", _verify_ceph_running_versions_consistent),
+        ("ceph osd noout is unset", _verify_osd_noout_unset),
+        ("model is idle", _verify_model_idle),
+    ]
+    results = await asyncio.gather(
+        *(
+            _run_verification(description, verification, analysis_result)
+            for description, verification in verifications
+        ),
+        return_exceptions=True,
+    )
+    durations = {}
+    errors = []
+    for (description, _), result in zip(verifications, results):
+        if isinstance(result, BaseException):
+            errors.append(result)
+            continue
+
+        messages, durations[description] = result
+        for message, message_type in messages:
+            PlanStatus.add_message(message, message_type)
+
+    if errors:
+        raise errors[0]
+
+    return durations
+
+
+async def _run_verification(
+    description: str,
+    verification: Callable[[Analysis], Awaitable[None]],
+    analysis_result: Analysis,
+) -> tuple[list[tuple[str, MessageType]], float]:
+    """Run a verification and collect its messages instead of adding them to PlanStatus.
+
+    asyncio.gather runs each verification in a task with its own copy of the context, so the
+    messages collected here are not mixed with those from other verifications.
+
+    :param description: Description of the verification
+    :type description: str
+    :param verification: Verification to run
+    :type verification: Callable[[Analysis], Awaitable[None]]
+    :param analysis_result: Analysis result
+    :type analysis_result: Analysis
+    :return: Messages with their type added by the verification and its duration in seconds
+    :rtype: tuple[list[tuple[str, MessageType]], float]
+    """
+    messages: list[tuple[str, MessageType]] = []
+    _pending_messages.set(messages)
+    start = time.monotonic()
+    try:
+        await verification(analysis_result)
+    finally:
+        duration = time.monotonic() - start
+        logger.debug("Verifying %s took %.2fs", description, duration)
+
+    return messages, duration
 
 
 async def generate_plan(analysis_result: Analysis, args: CLIargs) -> UpgradePlan:
@@ -144,7 +238,13 @@ async def generate_plan(analysis_result: Analysis, args: CLIargs) -> UpgradePlan
     # upgrade_group == None means that the user wants to upgrade the whole cloud.
     if args.upgrade_group in {CONTROL_PLANE, None}:
         plan.add_steps(
-            _generate_control_plane_plan(target, analysis_result.apps_control_plane, args.force)
+            _generate_control_plane_plan(
+                target,
+                analysis_result.apps_control_plane,
+                args.force,
+                args.max_parallel_apps,
+                args.max_parallel_subordinates,
+            )
         )
 
     if args.upgrade_group in {DATA_PLANE, HYPERVISORS, None}:
@@ -152,6 +252,67 @@ async def generate_plan(analysis_result: Analysis, args: CLIargs) -> UpgradePlan
 
     plan.add_steps(_get_post_upgrade_steps(analysis_result, args))
 
+    if removed := deduplicate_package_upgrades(plan):
+        logger.info("Skipped %d package upgrades of units on already upgraded machines", removed)
+
+    if args.skip_up_to_date_packages:
+        skipped, total = await skip_up_to_date_package_upgrades(plan)
+        logger.info(
+            "Skipped %d of %d package upgrades without upgradable packages", skipped, total
+        )
+        plan.description += f" (skipped {skipped} of {total} package upgrades)"
+
+    # NOTE: merge the waits after removing package upgrades, which may leave waits adjacent
+    if removed := merge_idle_waits(plan):
+        logger.info("Merged %d redundant waits for the idle state", removed)
+
+    return plan
+
+
+def generate_prestage_plan(analysis_result: Analysis, args: CLIargs) -> UpgradePlan:
+    """Generate plan to download software packages ahead of the upgrade.
+
+    Packages are downloaded only once on each machine, using the first unit deployed on it.
+
+    :param analysis_result: Analysis result
+    :type analysis_result: Analysis
+    :param args: CLI arguments
+    :type args: CLIargs
+    :return: A plan downloading software packages on all machines.
+    :rtype: UpgradePlan
+    """
+    target = _determine_upgrade_target(analysis_result) if args.download_next_release else None
+    plan = UpgradePlan(
+        f"Download software packages (at most {args.max_parallel_machines} machines at a time)"
+    )
+    plan.parallel = True
+    plan.max_parallel = args.max_parallel_machines
+
+    machines = set()
+    for app in analysis_result.apps:
+        for unit in app.units.values():
+            if unit.machine.machine_id in machines:
+                continue
+
+            machines.add(unit.machine.machine_id)
+            description = (
+                f"Download software packages on machine '{unit.machine.machine_id}' "
+                f"using unit '{unit.name}'"
+            )
+            cloud_pocket = f"{app.series}-{target.codename}" if target else None
+            if cloud_pocket:
+                description += f" including '{cloud_pocket}' packages"
+
+            plan.add_step(
+                UnitUpgradeStep(
+                    description,
+                    coro=partial(
+                        download_packages, unit.name, analysis_result.model, cloud_pocket
+                    ),
+                    resource=get_machine_resource(unit.machine.machine_id),
+                )
+            )
+
     return plan
 
 
@@ -162,6 +323,7 @@ async def post_upgrade_sanity_checks(analysis_result: Analysis) -> None:
     :type analysis_result: Analysis
     """
     messages = []
+    ceph.invalidate_state()
     try:
         await ceph.assert_osd_noout_state(
             analysis_result.model, analysis_result.apps_control_plane, state=False
@@ -206,7 +368,7 @@ async def _generate_data_plane_plan(
     :rtype: list[UpgradePlan]
     """
     hypervisor_apps, non_hypervisors_apps = _separate_hypervisors_apps(
-        analysis_result.apps_data_plane
+        analysis_result.apps_data_plane, analysis_result.topology
     )
 
     plans = [
@@ -472,9 +634,7 @@ def _verify_hypervisors_cli_input(args: CLIargs, analysis_result: Analysis) -> N
     :param analysis_result: Analysis result
     :type analysis_result: Analysis
     """
-    _, nova_compute_machines = _get_nova_compute_units_and_machines(
-        analysis_result.apps_data_plane
-    )
+    nova_compute_machines = analysis_result.nova_compute_machines
     if args.machines:
         verify_hypervisors_membership(
             all_options=set(analysis_result.machines.keys()),
@@ -590,7 +750,7 @@ def _get_backup_steps(analysis_result: Analysis, args: CLIargs) -> list[PreUpgra
         return [
             PreUpgradeStep(
                 description="Back up MySQL databases",
-                coro=backup(analysis_result.model),
+                coro=partial(backup, analysis_result.model),
             )
         ]
     return []
@@ -621,7 +781,8 @@ def _get_purge_data_steps(analysis_result: Analysis, args: CLIargs) -> list[PreU
         return [
             PreUpgradeStep(
                 description=msg,
-                coro=purge(
+                coro=partial(
+                    purge,
                     analysis_result.model,
                     analysis_result.apps_data_plane,  # we only need to pass nova-cloud-controller
                     before=args.purge_before,
@@ -645,7 +806,8 @@ def _get_archive_data_steps(analysis_result: Analysis, args: CLIargs) -> list[Pr
         return [
             PreUpgradeStep(
                 description="Archive old database data on nova-cloud-controller",
-                coro=archive(
+                coro=partial(
+                    archive,
                     analysis_result.model,
                     analysis_result.apps_control_plane,
                     batch_size=args.archive_batch_size,
@@ -669,8 +831,11 @@ def _get_set_noout_steps(analysis_result: Analysis, args: CLIargs) -> list[PreUp
         return [
             PreUpgradeStep(
                 description="Set ceph cluster 'noout' flag before data plane upgrade",
-                coro=ceph.osd_noout(
-                    analysis_result.model, analysis_result.apps_control_plane, enable=True
+                coro=partial(
+                    ceph.osd_noout,
+                    analysis_result.model,
+                    analysis_result.apps_control_plane,
+                    enable=True,
                 ),
             )
         ]
@@ -698,8 +863,10 @@ def _get_post_upgrade_steps(analysis_result: Analysis, args: CLIargs) -> list[Po
         steps.append(
             PostUpgradeStep(
                 "Ensure ceph-mon's 'require-osd-release' option matches the 'ceph-osd' version",
-                coro=ceph.set_require_osd_release_option(
-                    analysis_result.model, analysis_result.apps_control_plane
+                coro=partial(
+                    ceph.set_require_osd_release_option,
+                    analysis_result.model,
+                    analysis_result.apps_control_plane,
                 ),
             )
         )
@@ -707,8 +874,11 @@ def _get_post_upgrade_steps(analysis_result: Analysis, args: CLIargs) -> list[Po
             steps.append(
                 PostUpgradeStep(
                     description="Unset ceph cluster 'noout' flag after data plane upgrade",
-                    coro=ceph.osd_noout(
-                        analysis_result.model, analysis_result.apps_control_plane, enable=False
+                    coro=partial(
+                        ceph.osd_noout,
+                        analysis_result.model,
+                        analysis_result.apps_control_plane,
+                        enable=False,
                     ),
                 )
             )
@@ -716,7 +886,11 @@ def _get_post_upgrade_steps(analysis_result: Analysis, args: CLIargs) -> list[Po
 
 
 def _generate_control_plane_plan(
-    target: OpenStackRelease, apps: list[OpenStackApplication], force: bool
+    target: OpenStackRelease,
+    apps: list[OpenStackApplication],
+    force: bool,
+    max_parallel: int = 1,
+    max_parallel_subordinates: int = 1,
 ) -> list[UpgradePlan]:
     """Generate upgrade plan for control plane.
 
@@ -726,6 +900,11 @@ def _generate_control_plane_plan(
     :type apps: list[OpenStackApplication]
     :param force: Whether the plan generation should be forced
     :type force: bool
+    :param max_parallel: Number of principal applications to upgrade at the same time
+    :type max_parallel: int
+    :param max_parallel_subordinates: Number of subordinate applications to upgrade at the
+                                      same time
+    :type max_parallel_subordinates: int
     :return: A list containing control plane (Principal and Subordinate) upgrade plans.
     :rtype: list[UpgradePlan]
     """
@@ -734,16 +913,17 @@ def _generate_control_plane_plan(
         description="Control Plane principal(s) upgrade plan",
         target=target,
         force=force,
+        max_parallel=max_parallel,
     )
 
     # NOTE: these are all subordinates on the cloud,
     # not just those related to the control plane.
     # This should be refactored later to separate from control plane methods.
-    subordinate_upgrade_plan = _create_upgrade_group(
+    subordinate_upgrade_plan = _create_subordinate_upgrade_group(
         apps=[app for app in apps if app.is_subordinate],
-        description="Subordinate(s) upgrade plan",
         target=target,
         force=force,
+        max_parallel=max_parallel_subordinates,
     )
 
     logger.debug("Generation of the control plane upgrade plan complete")
@@ -757,22 +937,28 @@ def _generate_control_plane_plan(
 
 
 def _separate_hypervisors_apps(
-    apps: list[OpenStackApplication],
+    apps: list[OpenStackApplication], topology: Topology
 ) -> tuple[list[OpenStackApplication], list[OpenStackApplication]]:
     """Separate what is considered hypervisors apps from non-hypervisors apps.
 
     :param apps: Applications from data-plane
     :type apps: list[OpenStackApplication]
+    :param topology: Topology index of the model
+    :type topology: Topology
     :raises DataPlaneCannotUpgrade: When an unknown data-plane app is passed.
     :return: Tuple containing two lists of hypervisors and non-hypervisors apps
     :rtype: tuple[list[OpenStackApplication], list[OpenStackApplication]]
     """
     hypervisor_apps = []
     non_hypervisors_apps = []
-    _, nova_compute_machines = _get_nova_compute_units_and_machines(apps)
+    colocated_with_nova_compute = {
+        app
+        for machine in topology.charm_machines("nova-compute")
+        for app in topology.machine_apps.get(machine.machine_id, [])
+    }
     for app in apps:
         if (
-            any(unit.machine in nova_compute_machines for unit in app.units.values())
+            app in colocated_with_nova_compute
             and app.charm != "ceph-osd"
             and not app.is_subordinate
         ):
@@ -803,7 +989,13 @@ async def _generate_data_plane_hypervisors_plan(
     """
     hypervisors_machines = await _filter_hypervisors_machines(args, analysis_result)
     logger.info("Hypervisors selected: %s", hypervisors_machines)
-    hypervisor_planner = HypervisorUpgradePlanner(apps, hypervisors_machines)
+    policy = HypervisorUpgradePolicy(
+        max_unavailable=args.max_unavailable,
+        max_parallel_azs=args.max_parallel_azs,
+        max_unavailable_total=args.max_unavailable_total,
+        canaries=args.canaries,
+    )
+    hypervisor_planner = HypervisorUpgradePlanner(apps, hypervisors_machines, policy)
     # NOTE(agileshaw): Assign an empty UpgradePlan for hypervisor_plan if _generate_instance_plan
     #                  returns None
     hypervisor_plan = _generate_instance_plan(
@@ -843,6 +1035,9 @@ def _generate_data_plane_remaining_plan(
 async def _filter_hypervisors_machines(args: CLIargs, analysis_result: Analysis) -> list[Machine]:
     """Filter the hypervisors to generate plan and upgrade.
 
+    The machines and availability zones from the CLI are applied first, so that only the
+    selected hypervisors are checked for running instances.
+
     :param args: CLI arguments
     :type args: CLIargs
     :param analysis_result: Analysis result
@@ -850,57 +1045,64 @@ async def _filter_hypervisors_machines(args: CLIargs, analysis_result: Analysis)
     :return: hypervisors filtered to generate plan and upgrade.
     :rtype: list[Machine]
     """
-    hypervisors_machines = await _get_upgradable_hypervisors_machines(args.force, analysis_result)
+    nova_compute_units = sorted(analysis_result.nova_compute_units, key=lambda unit: unit.name)
 
     if cli_machines := args.machines:
-        return [machine for machine in hypervisors_machines if machine.machine_id in cli_machines]
-
-    if cli_azs := args.availability_zones:
-        return [machine for machine in hypervisors_machines if machine.az in cli_azs]
+        nova_compute_units = [
+            unit for unit in nova_compute_units if unit.machine.machine_id in cli_machines
+        ]
+    elif cli_azs := args.availability_zones:
+        az_machines = analysis_result.topology.az_machines
+        selected_machines = set().union(*(az_machines.get(az, set()) for az in cli_azs))
+        nova_compute_units = [
+            unit for unit in nova_compute_units if unit.machine in selected_machines
+        ]
 
-    return hypervisors_machines
+    return await _get_upgradable_hypervisors_machines(
+        args.force, nova_compute_units, analysis_result
+    )
 
 
 async def _get_upgradable_hypervisors_machines(
-    cli_force: bool, analysis_result: Analysis
+    cli_force: bool, nova_compute_units: list[Unit], analysis_result: Analysis
 ) -> list[Machine]:
     """Get the hypervisors that are possible to upgrade.
 
     :param cli_force: If force is used, it gets all hypervisors, otherwise just the empty ones
     :type cli_force: bool
+    :param nova_compute_units: nova-compute units selected to upgrade
+    :type nova_compute_units: list[Unit]
     :param analysis_result: Analysis result
     :type analysis_result: Analysis
     :return: List of nova-compute units to upgrade
     :rtype: list[Machine]
     """
-    nova_compute_units, nova_compute_machines = _get_nova_compute_units_and_machines(
-        analysis_result.apps_data_plane
-    )
-
     if cli_force:
-        logger.info(
-            "Selected all hypervisors: %s", sorted(nova_compute_units, key=lambda unit: unit.name)
-        )
-        return nova_compute_machines
+        logger.info("Selected all hypervisors: %s", nova_compute_units)
+        return [unit.machine for unit in nova_compute_units]
 
-    return await get_empty_hypervisors(nova_compute_units, analysis_result.model)
+    return await get_empty_hypervisors(
+        nova_compute_units,
+        analysis_result.model,
+        _get_nova_cloud_controller_unit(analysis_result),
+    )
 
 
-def _get_nova_compute_units_and_machines(
-    apps: list[OpenStackApplication],
-) -> tuple[list[Unit], list[Machine]]:
-    """Get the nova-compute units and machines.
+def _get_nova_cloud_controller_unit(analysis_result: Analysis) -> Optional[str]:
+    """Get name of a nova-cloud-controller unit.
 
-    :param apps: Data-plane apps
-    :type apps: list[OpenStackApplication]
-    :return: A tuple containing a list of nova-compute units and a list of machines
-    :rtype: tuple[list[Unit], list[Machine]]
+    :param analysis_result: Analysis result
+    :type analysis_result: Analysis
+    :return: Name of the first nova-cloud-controller unit or None if there is no unit
+    :rtype: Optional[str]
     """
-    nova_compute_units = [
-        unit for app in apps for unit in app.units.values() if app.charm == "nova-compute"
-    ]
+    try:
+        apps = get_applications_by_charm_name(analysis_result.apps, "nova-cloud-controller")
+    except ApplicationNotFound:
+        return None
 
-    return nova_compute_units, [unit.machine for unit in nova_compute_units]
+    units = sorted(unit.name for app in apps for unit in app.units.values())
+    return units[0] if units else None
 
 
 def _create_upgrade_group(
@@ -908,11 +1110,13 @@ def _create_upgrade_group(
     target: OpenStackRelease,
     description: str,
     force: bool,
+    max_parallel: int = 1,
 ) -> UpgradePlan:
     """Create upgrade group.
 
     COUExceptions (except HaltUpgradePlanGeneration) raised by application will be stored
-    in the PlanStatus object.
+    in the PlanStatus object. If more than one application can be upgraded at the same time,
+    each application is upgraded as soon as all applications it depends on are upgraded.
 
     :param apps: Apps to create the group.
     :type apps: list[OpenStackApplication]
@@ -922,23 +1126,103 @@ def _create_upgrade_group(
     :type description: str
     :param force: Whether the plan generation should be forced
     :type force: bool
+    :param max_parallel: Number of applications to upgrade at the same time
+    :type max_parallel: int
     :raises Exception: When cannot generate upgrade plan.
     :return: Upgrade plan of an upgrade group.
     :rtype: UpgradePlan
     """
     group_upgrade_plan = UpgradePlan(description)
+    upgraded_apps = []
 
     for app in apps:
         if app_upgrade_plan := _generate_instance_plan(app, target, force):
             group_upgrade_plan.add_step(app_upgrade_plan)
+            upgraded_apps.append(app)
+
+    if max_parallel > 1 and len(upgraded_apps) > 1:
+        _set_upgrade_dependencies(group_upgrade_plan, upgraded_apps, max_parallel)
+
+    return group_upgrade_plan
+
+
+def _create_subordinate_upgrade_group(
+    apps: list[OpenStackApplication],
+    target: OpenStackRelease,
+    force: bool,
+    max_parallel: int = 1,
+) -> UpgradePlan:
+    """Create upgrade group for subordinate applications.
+
+    If more than one subordinate can be upgraded at the same time, the charms are upgraded
+    in parallel and all upgraded subordinates are waited for at once afterwards.
+
+    :param apps: Subordinate apps to create the group.
+    :type apps: list[OpenStackApplication]
+    :param target: Target OpenStack release.
+    :type target: OpenStackRelease
+    :param force: Whether the plan generation should be forced
+    :type force: bool
+    :param max_parallel: Number of applications to upgrade at the same time
+    :type max_parallel: int
+    :return: Upgrade plan of the subordinates upgrade group.
+    :rtype: UpgradePlan
+    """
+    description = "Subordinate(s) upgrade plan"
+    if max_parallel <= 1:
+        return _create_upgrade_group(apps, target, description, force)
+
+    group_upgrade_plan = UpgradePlan(description)
+    charms_upgrade_plan = UpgradePlan(
+        f"Upgrade subordinate charms (at most {max_parallel} applications at a time)"
+    )
+    charms_upgrade_plan.parallel = True
+    charms_upgrade_plan.max_parallel = max_parallel
+    upgraded_apps = []
+
+    for app in apps:
+        if app_upgrade_plan := _generate_instance_plan(app, target, force, wait=False):
+            charms_upgrade_plan.add_step(app_upgrade_plan)
+            upgraded_apps.append(app)
+
+    if upgraded_apps:
+        names = [app.name for app in upgraded_apps]
+        group_upgrade_plan.add_step(charms_upgrade_plan)
+        group_upgrade_plan.add_step(
+            PostUpgradeIdleWaitStep(upgraded_apps[0].model, STANDARD_IDLE_TIMEOUT, names)
+        )
 
     return group_upgrade_plan
 
 
+def _set_upgrade_dependencies(
+    plan: UpgradePlan, apps: list[OpenStackApplication], max_parallel: int
+) -> None:
+    """Upgrade applications in parallel following their dependencies.
+
+    :param plan: Upgrade plan with sub-step for each application
+    :type plan: UpgradePlan
+    :param apps: Applications in the same order as the sub-steps
+    :type apps: list[OpenStackApplication]
+    :param max_parallel: Number of applications to upgrade at the same time
+    :type max_parallel: int
+    """
+    plan.parallel = True
+    plan.max_parallel = max_parallel
+    plan.description += f" (at most {max_parallel} applications at a time)"
+    dependencies = get_upgrade_dependencies([app.charm for app in apps])
+    for app_upgrade_plan, app_dependencies in zip(plan.sub_steps, dependencies):
+        app_upgrade_plan.depends_on = [plan.sub_steps[i] for i in sorted(app_dependencies)]
+        if app_dependencies:
+            names = ", ".join(f"'{apps[i].name}'" for i in sorted(app_dependencies))
+            app_upgrade_plan.description += f" after {names}"
+
+
 def _generate_instance_plan(
     instance: Union[HypervisorUpgradePlanner, OpenStackApplication],
     target: OpenStackRelease,
     force: bool,
+    **kwargs: Any,
 ) -> Optional[UpgradePlan]:
     """Generate upgrade plan for an instance and handle exceptions.
 
@@ -952,6 +1236,8 @@ def _generate_instance_plan(
     :type target: OpenStackRelease
     :param force: Whether the plan generation should be forced
     :type force: bool
+    :param kwargs: Additional arguments of the instance plan generation
+    :type kwargs: Any
     :raises Exception: When cannot generate upgrade plan.
     :return: Upgrade plan of an instance.
     :rtype: Optional[UpgradePlan]:
@@ -963,7 +1249,7 @@ def _generate_instance_plan(
     )
 
     try:
-        instance_upgrade_plan = instance.generate_upgrade_plan(target, force)
+        instance_upgrade_plan = instance.generate_upgrade_plan(target, force, **kwargs)
         return instance_upgrade_plan
     except HaltUpgradePlanGeneration as exc:
         # we do not care if applications halt the upgrade plan generation
@@ -0,0 +1,154 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Review of the upgrade plan generated by the plan subcommand for a model.
+
+The plan reviewed with `cou plan` is saved and compared with the plan generated again by
+`cou upgrade`, so changes of the cloud since the review are shown. Nothing is reused from the
+saved plan, the upgrade always runs the plan generated from the current state of the model.
+"""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from cou.commands import CLIargs
+from cou.steps.analyze import Analysis
+from cou.utils import COU_DATA
+
+COU_DIR_PLAN = COU_DATA / "plan"
+# arguments which do not change the generated plan
+IGNORED_ARGS = {
+    "command",
+    "subcommand",
+    "verbosity",
+    "quiet",
+    "auto_approve",
+    "resume",
+    "execution_policy",
+    "simulate",
+}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReviewedPlan:
+    """Reviewed plan with the fingerprint of the model and arguments it was generated for."""
+
+    fingerprint: str
+    plan: str
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize sets in a stable order.
+
+    :param obj: Object which is not serializable by default
+    :type obj: Any
+    :return: Serializable object
+    :rtype: Any
+    """
+    return sorted(obj)
+
+
+def get_fingerprint(analysis_result: Analysis, args: CLIargs) -> str:
+    """Get fingerprint of the model and the CLI arguments used to generate the plan.
+
+    The fingerprint covers the analyzed applications (channels, origin config, units,
+    workload versions and machines), their charm revisions and the CLI arguments which affect
+    the plan. It is computed only from the analysis, without any further call to Juju.
+
+    :param analysis_result: Analysis result
+    :type analysis_result: Analysis
+    :param args: CLI arguments
+    :type args: CLIargs
+    :return: Fingerprint as hex digest
+    :rtype: str
+    """
+    data = {
+        "apps": [str(app) for app in analysis_result.apps],
+        "charms": {app.name: app.charm_url for app in analysis_result.apps},
+        "args": {key: value for key, value in asdict(args).items() if key not in IGNORED_ARGS},
+    }
+    serialized = json.dumps(data, sort_keys=True, default=_json_default)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+def get_plan_file(model_name: str) -> Path:
+    """Get path of the reviewed plan for a model.
+
+    :param model_name: Name of the model
+    :type model_name: str
+    :return: Path to the reviewed plan
+    :rtype: Path
+    """
+    return COU_DIR_PLAN / f"{model_name.replace('/', '_')}.json"
+
+
+def save_plan(model_name: str, reviewed_plan: ReviewedPlan) -> None:
+    """Save the reviewed plan for a model.
+
+    :param model_name: Name of the model
+    :type model_name: str
+    :param reviewed_plan: Plan to save
+    :type reviewed_plan: ReviewedPlan
+    """
+    COU_DIR_PLAN.mkdir(parents=True, exist_ok=True)
+    plan_file = get_plan_file(model_name)
+    plan_file.write_text(json.dumps(asdict(reviewed_plan)), encoding="utf-8")
+    logger.debug("Upgrade plan saved to %s", plan_file)
+
+
+def load_plan(model_name: str) -> Optional[ReviewedPlan]:
+    """Load the saved reviewed plan for a model.
+
+    :param model_name: Name of the model
+    :type model_name: str
+    :return: Saved plan or None if there is no valid saved plan.
+    :rtype: Optional[ReviewedPlan]
+    """
+    plan_file = get_plan_file(model_name)
+    try:
+        return ReviewedPlan(**json.loads(plan_file.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        logger.debug("No saved upgrade plan found in %s", plan_file)
+    except (ValueError, TypeError) as exc:
+        logger.warning("Ignoring invalid saved upgrade plan %s: %s", plan_file, exc)
+
+    return None
+
+
+def diff_plans(old_plan: str, new_plan: str) -> str:
+    """Get difference between two plans.
+
+    :param old_plan: Previous plan
+    :type old_plan: str
+    :param new_plan: Current plan
+    :type new_plan: str
+    :return: Unified diff of the plans
+    :rtype: str
+    """
+    return "".join(
+        difflib.unified_diff(
+            old_plan.splitlines(keepends=True),
+            new_plan.splitlines(keepends=True),
+            fromfile="saved plan",
+            tofile="current plan",
+        )
+    )
@@ -0,0 +1,210 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Report of the critical path and stragglers of the executed upgrade plan."""
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from collections import defaultdict
+from typing import Optional
+
+from cou.steps.tracing import Span
+from cou.utils.juju_utils import API_ACTION, API_EXEC, API_READ, API_REFRESH, API_WAIT
+
+REPORT_TOP_STEPS: int = int(os.environ.get("COU_REPORT_TOP_STEPS", 5))
+# the slowest step of a parallel group is a straggler if it took at least this many times
+# longer than the median of the other steps
+STRAGGLER_RATIO: float = 2.0
+OPERATION_NAMES: dict[str, str] = {
+    API_WAIT: "idle waits",
+    API_ACTION: "actions",
+    API_EXEC: "commands run on units",
+    API_REFRESH: "charm refreshes and config changes",
+    API_READ: "status and config reads",
+}
+
+
+def _end(span: Span) -> float:
+    """Get end of the span, unfinished spans last until now.
+
+    :param span: Span
+    :type span: Span
+    :return: End time
+    :rtype: float
+    """
+    return span.end or time.time()
+
+
+def _get_children(spans: list[Span]) -> defaultdict[Optional[int], list[Span]]:
+    """Get child spans of each span, the spans without parent are children of None.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :return: Child spans by span id of the parent
+    :rtype: defaultdict[Optional[int], list[Span]]
+    """
+    children = defaultdict(list)
+    for span in spans:
+        children[span.parent_id].append(span)
+
+    return children
+
+
+def _get_critical_path_of(
+    children: defaultdict[Optional[int], list[Span]], parent_id: Optional[int], end: float
+) -> list[Span]:
+    """Get critical path through the children ending before the end.
+
+    Starting with the child ending last, the path goes through the child ending last before
+    the previous one started. Each child is on the path at most once, even if it took no
+    time. Each child on the path is replaced by the path through its own children.
+
+    :param children: Child spans by span id of the parent
+    :type children: defaultdict[Optional[int], list[Span]]
+    :param parent_id: Span id of the parent
+    :type parent_id: Optional[int]
+    :param end: End of the path
+    :type end: float
+    :return: Spans without children on the critical path ordered by time
+    :rtype: list[Span]
+    """
+    path: list[Span] = []
+    candidates = sorted(children[parent_id], key=_end)
+    while candidates := [span for span in candidates if _end(span) <= end]:
+        span = candidates.pop()
+        if children[span.span_id]:
+            path = _get_critical_path_of(children, span.span_id, _end(span)) + path
+        else:
+            path.insert(0, span)
+
+        end = span.start
+
+    return path
+
+
+def get_critical_path(spans: list[Span]) -> list[Span]:
+    """Get the critical path through the executed plan.
+
+    The critical path is the chain of steps, which determined the duration of the upgrade.
+    Shortening any other step would not make the upgrade faster.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :return: Spans without children on the critical path ordered by time
+    :rtype: list[Span]
+    """
+    return _get_critical_path_of(_get_children(spans), None, float("inf"))
+
+
+def get_stragglers(spans: list[Span]) -> list[tuple[Span, Span, float, float]]:
+    """Get parallel groups, where one straggler held the other steps back.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :return: Parallel group, straggler, median duration of the other steps and the time
+             the straggler held the group back, ordered from the longest hold
+    :rtype: list[tuple[Span, Span, float, float]]
+    """
+    children = _get_children(spans)
+    stragglers = []
+    for span in spans:
+        if not span.parallel or len(group := children[span.span_id]) < 2:
+            continue
+
+        straggler, *others = sorted(group, key=lambda span: span.duration, reverse=True)
+        median = statistics.median(other.duration for other in others)
+        if straggler.duration >= STRAGGLER_RATIO * median:
+            held_back = _end(straggler) - max(_end(other) for other in others)
+            if held_back > 0:
+                stragglers.append((span, straggler, median, held_back))
+
+    return sorted(stragglers, key=lambda straggler: straggler[3], reverse=True)
+
+
+def get_time_breakdown(spans: list[Span]) -> dict[str, float]:
+    """Get wall-clock time spent in each class of Juju API operations.
+
+    Operations of the same class running at the same time are counted only once.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :return: Wall-clock time in seconds by the class of Juju API operations
+    :rtype: dict[str, float]
+    """
+    intervals = defaultdict(list)
+    for span in spans:
+        for operation, start, end in span.api_calls:
+            intervals[operation].append((start, end))
+
+    breakdown = {}
+    for operation, operation_intervals in intervals.items():
+        total, covered_until = 0.0, float("-inf")
+        for start, end in sorted(operation_intervals):
+            start = max(start, covered_until)
+            if end > start:
+                total += end - start
+                covered_until = end
+
+        breakdown[operation] = total
+
+    return breakdown
+
+
+def generate_report(spans: list[Span], top: int = REPORT_TOP_STEPS) -> Optional[str]:
+    """Generate report of the executed plan.
+
+    :param spans: Spans of the steps run
+    :type spans: list[Span]
+    :param top: Number of the slowest steps to show
+    :type top: int
+    :return: Report or None if no step was run
+    :rtype: Optional[str]
+    """
+    if not spans:
+        return None
+
+    total = max(_end(span) for span in spans) - min(span.start for span in spans)
+    children = _get_children(spans)
+    critical_path = get_critical_path(spans)
+    slowest_on_path = sorted(critical_path, key=lambda span: span.duration, reverse=True)[:top]
+    leaves = [span for span in spans if not children[span.span_id]]
+    slowest = sorted(leaves, key=lambda span: span.duration, reverse=True)[:top]
+    lines = [
+        f"Upgrade took {total:.0f}s",
+        f"Critical path of {len(critical_path)} steps took "
+        f"{sum(span.duration for span in critical_path):.0f}s, the slowest of them:",
+        *(f"    {span.duration:.0f}s {span.name}" for span in slowest_on_path),
+        f"Top {len(slowest)} slowest steps:",
+        *(f"    {span.duration:.0f}s {span.name}" for span in slowest),
+    ]
+
+    if stragglers := get_stragglers(spans)[:top]:
+        lines.append("Parallel groups held back by a straggler:")
+        lines.extend(
+            f"    {group.name}: waited {held_back:.0f}s for {straggler.name} "
+            f"({straggler.duration:.0f}s, median of the others {median:.0f}s)"
+            for group, straggler, median, held_back in stragglers
+        )
+
+    if breakdown := get_time_breakdown(spans):
+        lines.append("Time spent in Juju operations:")
+        lines.extend(
+            f"    {OPERATION_NAMES.get(operation, operation)}: {duration:.0f}s "
+            f"({duration / total if total else 0:.0%})"
+            for operation, duration in sorted(breakdown.items(), key=lambda item: -item[1])
+        )
+
+    return "\n".join(lines)
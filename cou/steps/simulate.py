@@ -0,0 +1,190 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Simulated execution of the upgrade plan in virtual time."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import random
+import selectors
+from functools import partial
+from typing import Optional
+
+from cou.commands import DAG_POLICY, TREE_POLICY
+from cou.steps import BaseStep
+from cou.steps.dag import execute_dag
+from cou.steps.estimate import get_step_samples
+from cou.steps.execute import apply_step
+from cou.steps.tracing import StepTracer, step_tracer
+
+# median duration of the steps, which were never run before
+SIMULATE_LATENCY = float(os.environ.get("COU_SIMULATE_LATENCY", 30))
+# spread of the log-normal distribution of the durations of steps, which were never run before
+SIMULATE_LATENCY_SIGMA = 0.5
+SIMULATE_SEED = os.environ.get("COU_SIMULATE_SEED")
+
+logger = logging.getLogger(__name__)
+
+
+class _VirtualTimeSelector(selectors.DefaultSelector):  # pylint: disable=too-many-ancestors
+    """Selector, which moves the virtual time forward instead of waiting for a timeout."""
+
+    def __init__(self) -> None:
+        """Initialize selector."""
+        super().__init__()
+        self.time = 0.0
+
+    def select(self, timeout: Optional[float] = None) -> list:
+        """Poll the registered file objects and move the time forward if none is ready.
+
+        :param timeout: Time until the next scheduled callback, None if there is none
+        :type timeout: Optional[float]
+        :return: Ready file objects with their events
+        :rtype: list
+        """
+        if timeout is None:
+            return super().select()  # nothing is scheduled, wait for the I/O
+
+        events = super().select(0)
+        if not events:
+            self.time += timeout
+
+        return events
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """Event loop, where the time moves forward as soon as all the tasks wait for it.
+
+    Sleeps and timeouts finish immediately in the order of their deadlines, so hours of the
+    upgrade play out in a fraction of a second.
+    """
+
+    def __init__(self) -> None:
+        """Initialize event loop with virtual time starting at 0."""
+        self._virtual_selector = _VirtualTimeSelector()
+        super().__init__(self._virtual_selector)
+
+    def time(self) -> float:
+        """Get the virtual time.
+
+        :return: Virtual time in seconds
+        :rtype: float
+        """
+        return self._virtual_selector.time
+
+
+def get_latencies(
+    plan: BaseStep,
+    history: dict[str, dict[str, list[float]]],
+    charms: dict[str, str],
+    seed: Optional[str] = SIMULATE_SEED,
+) -> dict[int, float]:
+    """Sample durations of the steps of the plan.
+
+    A duration of the same type of step run before is picked at random, otherwise the
+    duration is sampled from a log-normal distribution with the median of SIMULATE_LATENCY.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param history: Durations by charm and type of the step
+    :type history: dict[str, dict[str, list[float]]]
+    :param charms: Charm names by the application names
+    :type charms: dict[str, str]
+    :param seed: Seed of the random generator, defaults to COU_SIMULATE_SEED
+    :type seed: Optional[str]
+    :return: Durations by id() of the steps with coroutine
+    :rtype: dict[int, float]
+    """
+    rng = random.Random(seed)
+    return {
+        step_id: (
+            rng.choice(samples)
+            if samples
+            else rng.lognormvariate(math.log(SIMULATE_LATENCY), SIMULATE_LATENCY_SIGMA)
+        )
+        for step_id, samples in get_step_samples(plan, history, charms).items()
+    }
+
+
+def _replace_coroutines(step: BaseStep, latencies: dict[int, float]) -> None:
+    """Replace coroutines of the step and all its sub-steps with sleeping for their duration.
+
+    :param step: Step
+    :type step: BaseStep
+    :param latencies: Durations by id() of the steps with coroutine
+    :type latencies: dict[int, float]
+    """
+    # pylint: disable=protected-access
+    if step._coro is not None:
+        if not callable(step._coro):
+            step._coro.close()  # the original coroutine is never awaited
+
+        step._coro = partial(asyncio.sleep, latencies.get(id(step), 0.0))
+
+    for sub_step in step.sub_steps:
+        _replace_coroutines(sub_step, latencies)
+
+
+async def _run_plan(plan: BaseStep, policy: str, tracer: StepTracer) -> None:
+    """Run the plan with the executor of the execution policy.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param policy: Execution policy
+    :type policy: str
+    :param tracer: Tracer recording the steps run
+    :type tracer: StepTracer
+    """
+    token = step_tracer.set(tracer)
+    try:
+        if policy == DAG_POLICY:
+            await execute_dag(plan)
+        else:
+            await apply_step(plan, prompt=False)
+    finally:
+        step_tracer.reset(token)
+
+
+def simulate_plan(
+    plan: BaseStep, latencies: dict[int, float], policy: str = TREE_POLICY
+) -> StepTracer:
+    """Run the plan in virtual time without changing the cloud.
+
+    The plan is run by the same executor as the upgrade, but the coroutine of each step only
+    sleeps for its duration. Since the coroutines are replaced, the plan cannot be applied
+    afterwards. The simulation runs its own event loop, so it must not be called from a
+    running event loop.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :param latencies: Durations by id() of the steps with coroutine
+    :type latencies: dict[int, float]
+    :param policy: Execution policy, defaults to TREE_POLICY
+    :type policy: str
+    :return: Tracer with the steps run in virtual time
+    :rtype: StepTracer
+    """
+    _replace_coroutines(plan, latencies)
+    loop = VirtualTimeEventLoop()
+    tracer = StepTracer(plan, clock=loop.time)
+    try:
+        loop.run_until_complete(_run_plan(plan, policy, tracer))
+    finally:
+        loop.close()
+
+    logger.debug("simulated %d steps in %.0fs of virtual time", len(tracer.spans), loop.time())
+    return tracer
@@ -0,0 +1,382 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tracing of the steps run during the upgrade."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from cou.exceptions import HaltUpgradeExecution
+from cou.steps import MACHINE_RESOURCE_PREFIX, BaseStep
+from cou.utils import COU_DATA
+from cou.utils.juju_utils import api_calls
+
+COU_DIR_TRACE = COU_DATA / "trace"
+# outcomes of the traced steps
+OK = "ok"
+ERROR = "error"
+HALTED = "halted"
+CANCELED = "canceled"
+UNFINISHED = "unfinished"
+
+APP_PLAN_PATTERN = re.compile(r"^Upgrade plan for '([\w-]+)'")
+UNIT_PATTERN = re.compile(r"'([\w-]+/\d+)'")
+
+logger = logging.getLogger(__name__)
+
+# tracer of the currently applied plan
+step_tracer: ContextVar[Optional[StepTracer]] = ContextVar("step_tracer", default=None)
+
+
+@dataclass
+class Span:
+    """Run of a single step."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    step_class: str
+    application: Optional[str]
+    unit: Optional[str]
+    start: float
+    end: Optional[float] = None
+    outcome: Optional[str] = None
+    parallel: bool = False
+    # Juju API operations called by the step as (operation, start, end) tuples
+    api_calls: list[tuple[str, float, float]] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        """Duration of the span, unfinished spans last until now.
+
+        :return: Duration in seconds
+        :rtype: float
+        """
+        return (self.end or time.time()) - self.start
+
+    @property
+    def attributes(self) -> dict[str, str]:
+        """Attributes of the span describing the step.
+
+        :return: Attributes of the span which are known
+        :rtype: dict[str, str]
+        """
+        attributes = {
+            "cou.step.class": self.step_class,
+            "cou.step.outcome": self.outcome or UNFINISHED,
+            "cou.application": self.application,
+            "cou.unit": self.unit,
+        }
+        return {key: value for key, value in attributes.items() if value is not None}
+
+
+def get_trace_files() -> tuple[Path, Path]:
+    """Get paths of the trace files in Chrome trace-event and OTLP-JSON format.
+
+    :return: Paths of the Chrome trace-event and OTLP-JSON files
+    :rtype: tuple[Path, Path]
+    """
+    time_stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    return (
+        COU_DIR_TRACE / f"cou-{time_stamp}.trace.json",
+        COU_DIR_TRACE / f"cou-{time_stamp}.otlp.json",
+    )
+
+
+def _get_parents(step: BaseStep) -> dict[int, BaseStep]:
+    """Get parents of the step and all its sub-steps.
+
+    :param step: Step
+    :type step: BaseStep
+    :return: Parent steps by id() of the step objects
+    :rtype: dict[int, BaseStep]
+    """
+    parents = {}
+    for sub_step in step.sub_steps:
+        parents[id(sub_step)] = step
+        parents.update(_get_parents(sub_step))
+
+    return parents
+
+
+def get_application_and_unit(
+    step: BaseStep, parent_application: Optional[str], parent_unit: Optional[str]
+) -> tuple[Optional[str], Optional[str]]:
+    """Get application and unit changed by the step.
+
+    The application and unit are taken from the resource of the step, unless it is a machine,
+    and from the names quoted in its description, otherwise they are inherited from the parent
+    step.
+
+    :param step: Step
+    :type step: BaseStep
+    :param parent_application: Application of the parent step
+    :type parent_application: Optional[str]
+    :param parent_unit: Unit of the parent step
+    :type parent_unit: Optional[str]
+    :return: Application and unit
+    :rtype: tuple[Optional[str], Optional[str]]
+    """
+    unit, application = parent_unit, step.resource
+    if application is not None and application.startswith(MACHINE_RESOURCE_PREFIX):
+        application = None
+    if match := UNIT_PATTERN.search(step.description):
+        unit = match.group(1)
+
+    if application is None and (match := APP_PLAN_PATTERN.search(step.description)):
+        application = match.group(1)
+    if application is None and unit is not None:
+        application = unit.split("/")[0]
+    if application is None:
+        application = parent_application
+
+    return application, unit
+
+
+class StepTracer:
+    """Recorder of the spans of the steps run during the upgrade.
+
+    The application and unit of a span are found by get_application_and_unit.
+    """
+
+    def __init__(self, plan: BaseStep, clock: Callable[[], float] = time.time):
+        """Initialize step tracer.
+
+        :param plan: Upgrade plan to trace
+        :type plan: BaseStep
+        :param clock: Function returning the current time in seconds, defaults to time.time
+        :type clock: Callable[[], float]
+        """
+        self.plan = plan
+        self.clock = clock
+        self.spans: list[Span] = []
+        self._parents = _get_parents(plan)
+        self._spans: dict[int, Span] = {}
+
+    def start(self, step: BaseStep) -> Span:
+        """Start span of the step.
+
+        :param step: Step
+        :type step: BaseStep
+        :return: Started span
+        :rtype: Span
+        """
+        parent = self._parents.get(id(step))
+        parent_span = self._spans.get(id(parent)) if parent is not None else None
+        application, unit = get_application_and_unit(
+            step,
+            parent_span.application if parent_span is not None else None,
+            parent_span.unit if parent_span is not None else None,
+        )
+        span = Span(
+            span_id=len(self.spans) + 1,
+            parent_id=parent_span.span_id if parent_span is not None else None,
+            name=step.description,
+            step_class=type(step).__name__,
+            application=application,
+            unit=unit,
+            start=self.clock(),
+            parallel=step.parallel,
+        )
+        self.spans.append(span)
+        self._spans[id(step)] = span
+        return span
+
+    def end(self, step: BaseStep, outcome: str) -> None:
+        """End span of the step.
+
+        :param step: Step
+        :type step: BaseStep
+        :param outcome: Outcome of the step run
+        :type outcome: str
+        """
+        if (span := self._spans.get(id(step))) is None:
+            logger.debug("Step %s was not traced", repr(step))
+            return
+
+        span.end = self.clock()
+        span.outcome = CANCELED if outcome == OK and step.stopped else outcome
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Get spans as Chrome trace events.
+
+        Every span is a complete event on a thread (lane) together with its parents, so steps
+        running in parallel are shown next to each other.
+
+        :return: Chrome trace-event document
+        :rtype: dict[str, Any]
+        """
+        now = self.clock()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.step_class,
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(((span.end or now) - span.start) * 1e6),
+                "pid": 1,
+                "tid": lane,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attributes},
+            }
+            for span, lane in self._get_lanes(now)
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _get_lanes(self, now: float) -> list[tuple[Span, int]]:
+        """Assign spans to lanes, where each span is nested in the spans running before.
+
+        :param now: Time used as end of unfinished spans
+        :type now: float
+        :return: Spans with their lanes
+        :rtype: list[tuple[Span, int]]
+        """
+        spans = {span.span_id: span for span in self.spans}
+        lanes: list[list[Span]] = []  # stacks of spans running in each lane
+        result = []
+        for span in sorted(self.spans, key=lambda span: (span.start, span.span_id)):
+            ancestors = set()
+            parent_id = span.parent_id
+            while parent_id is not None:
+                ancestors.add(parent_id)
+                parent_id = spans[parent_id].parent_id
+
+            for stack in lanes:
+                while stack and (stack[-1].end or now) <= span.start:
+                    stack.pop()
+
+            lane = next(
+                (
+                    i
+                    for i, stack in enumerate(lanes)
+                    if not stack or stack[-1].span_id in ancestors
+                ),
+                len(lanes),
+            )
+            if lane == len(lanes):
+                lanes.append([])
+
+            lanes[lane].append(span)
+            result.append((span, lane))
+
+        return result
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Get spans as OTLP-JSON document.
+
+        :return: OTLP-JSON document with spans of one trace
+        :rtype: dict[str, Any]
+        """
+        trace_id = os.urandom(16).hex()
+        now = self.clock()
+        spans = [
+            {
+                "traceId": trace_id,
+                "spanId": f"{span.span_id:016x}",
+                "parentSpanId": f"{span.parent_id:016x}" if span.parent_id is not None else "",
+                "name": span.name,
+                "kind": 1,  # internal span
+                "startTimeUnixNano": str(round(span.start * 1e9)),
+                "endTimeUnixNano": str(round((span.end or now) * 1e9)),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": value}}
+                    for key, value in span.attributes.items()
+                ],
+                "status": {"code": 1 if span.outcome == OK else 2},
+            }
+            for span in self.spans
+        ]
+        service = [{"key": "service.name", "value": {"stringValue": "cou"}}]
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": service},
+                    "scopeSpans": [{"scope": {"name": "cou"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export(self) -> Optional[tuple[Path, Path]]:
+        """Write spans to the trace files.
+
+        Failing to write the trace files does not fail the upgrade, it is only logged.
+
+        :return: Paths of the Chrome trace-event and OTLP-JSON files, None if nothing was traced
+                 or the files cannot be written
+        :rtype: Optional[tuple[Path, Path]]
+        """
+        if not self.spans:
+            return None
+
+        try:
+            COU_DIR_TRACE.mkdir(parents=True, exist_ok=True)
+            chrome_file, otlp_file = get_trace_files()
+            chrome_file.write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+            otlp_file.write_text(json.dumps(self.to_otlp()), encoding="utf-8")
+        except OSError as exc:
+            logger.warning("Cannot save trace of the upgrade to %s: %s", COU_DIR_TRACE, exc)
+            return None
+
+        logger.info("Trace of the upgrade saved to %s and %s", chrome_file, otlp_file)
+        return chrome_file, otlp_file
+
+
+@contextmanager
+def trace_step(step: BaseStep) -> Iterator[None]:  # pylint: disable=missing-yield-doc
+    """Trace the step run in the context, if the execution is traced.
+
+    Juju API operations called in the context are recorded in the span of the step.
+
+    :param step: Step
+    :type step: BaseStep
+    :yield: Once the span of the step is started
+    :rtype: Iterator[None]
+    :raises HaltUpgradeExecution: When the step halted the execution.
+    :raises asyncio.CancelledError: When the step was canceled.
+    :raises Exception: When the step failed.
+    """
+    tracer = step_tracer.get()
+    if tracer is None:
+        yield
+        return
+
+    span = tracer.start(step)
+    token = api_calls.set(span.api_calls)
+    try:
+        yield
+    except HaltUpgradeExecution:
+        tracer.end(step, HALTED)
+        raise
+    except asyncio.CancelledError:
+        tracer.end(step, CANCELED)
+        raise
+    except Exception:
+        tracer.end(step, ERROR)
+        raise
+    finally:
+        api_calls.reset(token)
+
+    tracer.end(step, OK)
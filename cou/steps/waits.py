@@ -0,0 +1,120 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Steps waiting for applications to reach the idle state."""
+from __future__ import annotations
+
+import logging
+from functools import partial
+from typing import Optional
+
+from cou.steps import BaseStep, PostUpgradeStep, PreUpgradeStep, UpgradeStep
+from cou.utils.juju_utils import Model
+
+logger = logging.getLogger(__name__)
+
+
+class IdleWaitStep(UpgradeStep):
+    """Represents the wait for applications or the entire model to reach the idle state."""
+
+    def __init__(self, model: Model, timeout: int, apps: Optional[list[str]] = None):
+        """Initialize idle wait step.
+
+        :param model: Model object
+        :type model: Model
+        :param timeout: How long (in seconds) to wait for the applications to reach the idle state.
+        :type timeout: int
+        :param apps: Applications to wait for, defaults to None (entire model)
+        :type apps: Optional[list[str]]
+        """
+        if apps is None:
+            target = f"model '{model.name}'"
+        elif len(apps) == 1:
+            target = f"app '{apps[0]}'"
+        else:
+            target = f"apps {', '.join(repr(app) for app in apps)}"
+
+        super().__init__(
+            description=f"Wait for up to {timeout}s for {target} to reach the idle state",
+            parallel=False,
+            coro=partial(model.wait_for_idle, timeout, apps=apps),
+        )
+        self.model = model
+        self.timeout = timeout
+        self.apps = apps
+
+    def merge(self, other: IdleWaitStep) -> IdleWaitStep:
+        """Merge two waits into a single one.
+
+        The merged wait keeps the type of this step, waits for the applications of both steps
+        and uses the longest timeout. Waiting for the entire model covers any application.
+
+        :param other: Wait step to merge with
+        :type other: IdleWaitStep
+        :return: Wait step covering both waits
+        :rtype: IdleWaitStep
+        """
+        apps = None
+        if self.apps is not None and other.apps is not None:
+            apps = self.apps + [app for app in other.apps if app not in self.apps]
+
+        return type(self)(self.model, max(self.timeout, other.timeout), apps)
+
+
+class PreUpgradeIdleWaitStep(IdleWaitStep, PreUpgradeStep):
+    """Represents the pre-upgrade wait for applications to reach the idle state."""
+
+
+class PostUpgradeIdleWaitStep(IdleWaitStep, PostUpgradeStep):
+    """Represents the post-upgrade wait for applications to reach the idle state."""
+
+
+class WorkloadVerificationStep(PostUpgradeStep):
+    """Represents the post-upgrade check of the workload, which does not change the model."""
+
+
+def merge_idle_waits(plan: BaseStep) -> int:
+    """Merge redundant waits for the idle state in the plan.
+
+    A wait is merged into the previous wait of the same sequential step if only other waits or
+    workload verifications run between them, since nothing changes the model in the meantime.
+    The merged wait runs in place of the first one, so every step still runs after waiting for
+    all the applications it waited for before. Waits of steps running in parallel are kept.
+
+    :param plan: Upgrade plan
+    :type plan: BaseStep
+    :return: Number of removed wait steps.
+    :rtype: int
+    """
+    removed = 0
+    if not plan.parallel:
+        sub_steps: list[BaseStep] = []
+        last_wait: Optional[IdleWaitStep] = None  # the last wait, which next waits merge into
+        last_wait_index = 0
+        for step in plan.sub_steps:
+            if isinstance(step, IdleWaitStep):
+                if last_wait is not None and last_wait.model is step.model:
+                    logger.debug("Merging '%s' into '%s'", step.description, last_wait.description)
+                    last_wait = sub_steps[last_wait_index] = last_wait.merge(step)
+                    removed += 1
+                    continue
+
+                last_wait, last_wait_index = step, len(sub_steps)
+            elif step and not isinstance(step, WorkloadVerificationStep):
+                last_wait = None
+
+            sub_steps.append(step)
+
+        plan.sub_steps[:] = sub_steps
+
+    return removed + sum(merge_idle_waits(step) for step in plan.sub_steps)
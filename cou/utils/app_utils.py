@@ -20,6 +20,10 @@ from cou.utils.juju_utils import Model
 
 logger = logging.getLogger(__name__)
 
+UCA_ARCHIVE = "http://ubuntu-cloud.archive.canonical.com/ubuntu"
+# APT configuration used to download packages from a pocket which is not enabled on the unit
+PRESTAGE_APT_DIR = "/tmp/cou-prestage"
+
 
 async def upgrade_packages(unit: str, model: Model, packages_to_hold: Optional[list]) -> None:
     """Run package updates and upgrades on each unit of an Application.
@@ -39,3 +43,60 @@ async def upgrade_packages(unit: str, model: Model, packages_to_hold: Optional[l
         command = f"apt-mark hold {packages} && {command} ; apt-mark unhold {packages}"
 
     await model.run_on_unit(unit_name=unit, command=command, timeout=600)
+
+
+async def download_packages(unit: str, model: Model, cloud_pocket: Optional[str] = None) -> None:
+    """Download packages to upgrade on a unit without installing them.
+
+    The packages are stored in the APT cache of the unit, so the package upgrade later installs
+    them without downloading. If the Ubuntu Cloud Archive pocket is provided, the packages of
+    the pocket are downloaded as well. The pocket is added only to a temporary APT configuration,
+    so it is not enabled on the unit.
+
+    :param unit: Unit name where the packages are downloaded.
+    :type unit: str
+    :param model: Model object
+    :type model: Model
+    :param cloud_pocket: Ubuntu Cloud Archive pocket, e.g. focal-victoria, defaults to None
+    :type cloud_pocket: Optional[str]
+    :raises CommandRunFailed: When a command fails to run.
+    """
+    command = "apt-get update && apt-get dist-upgrade --download-only -y"
+    if cloud_pocket:
+        series, release = cloud_pocket.split("-", maxsplit=1)
+        source = f"deb {UCA_ARCHIVE} {series}-updates/{release} main"
+        apt_opts = (
+            f"-o Dir::Etc::SourceParts={PRESTAGE_APT_DIR}/sources.list.d "
+            f"-o Dir::State::Lists={PRESTAGE_APT_DIR}/lists"
+        )
+        command = (
+            f"{command} && rm -rf {PRESTAGE_APT_DIR} && "
+            f"mkdir -p {PRESTAGE_APT_DIR}/lists/partial && "
+            f"cp -r /etc/apt/sources.list.d {PRESTAGE_APT_DIR}/ && "
+            f"echo '{source}' > {PRESTAGE_APT_DIR}/sources.list.d/cou-{cloud_pocket}.list && "
+            f"apt-get {apt_opts} update && "
+            f"apt-get {apt_opts} dist-upgrade --download-only -y"
+        )
+
+    await model.run_on_unit(unit_name=unit, command=command, timeout=600)
+
+
+async def get_upgradable_packages(unit: str, model: Model) -> list[str]:
+    """Get packages which can be upgraded on a unit from the current APT repositories.
+
+    :param unit: Unit name where the packages are listed.
+    :type unit: str
+    :param model: Model object
+    :type model: Model
+    :return: Names of the upgradable packages
+    :rtype: list[str]
+    :raises CommandRunFailed: When a command fails to run.
+    """
+    command = "apt-get update -qq && apt list --upgradable 2>/dev/null"
+    result = await model.run_on_unit(unit_name=unit, command=command, timeout=600)
+    # e.g. "nova-common/focal-updates 2:21.2.4-0ubuntu2.7 all [upgradable from: ...]"
+    return [
+        line.split("/", maxsplit=1)[0]
+        for line in result.get("stdout", "").splitlines()
+        if "[upgradable from:" in line
+    ]
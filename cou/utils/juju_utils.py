@@ -19,9 +19,12 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Callable, List, Optional, Sequence
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Sequence
 
 from juju.action import Action
 from juju.application import Application as JujuApplication
@@ -56,9 +59,29 @@ DEFAULT_WAIT: float = 1.1
 DEFAULT_MODEL_RETRIES: int = int(os.environ.get("COU_MODEL_RETRIES", 5))
 DEFAULT_MODEL_RETRY_BACKOFF: int = int(os.environ.get("COU_MODEL_RETRY_BACKOFF", 2))
 DEFAULT_MODEL_IDLE_PERIOD: int = 30
+# classes of Juju API operations limited by APILimiter
+API_READ = "read"
+API_ACTION = "action"
+API_EXEC = "exec"
+API_REFRESH = "refresh"
+API_WAIT = "wait"
+# default limits of operations running at the same time and started per second (0 = no limit)
+DEFAULT_API_CONCURRENCY: dict[str, int] = {
+    API_READ: 10,
+    API_ACTION: 50,
+    API_EXEC: 50,
+    API_REFRESH: 5,
+    API_WAIT: 0,
+}
+DEFAULT_API_RATE: float = 0
 
 logger = logging.getLogger(__name__)
 
+# Juju API operations called by the currently traced step as (operation, start, end) tuples
+api_calls: ContextVar[Optional[list[tuple[str, float, float]]]] = ContextVar(
+    "api_calls", default=None
+)
+
 
 def _convert_base_to_series(base: Base) -> str:
     """Convert base to series.
@@ -116,6 +139,160 @@ def retry(
     return _wrapper
 
 
+class APILimiter:
+    """Limiter of Juju API operations of one class shared by the whole process.
+
+    The limiter allows at most `concurrency` operations to run at the same time and starts at
+    most `rate` operations per second. It also keeps metrics of the operations queued for a free
+    slot and of the time they waited.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, operation: str, concurrency: int, rate: float):
+        """Initialize API limiter.
+
+        :param operation: Class of the Juju API operations, e.g. read
+        :type operation: str
+        :param concurrency: Maximum number of operations running at the same time, 0 for no limit
+        :type concurrency: int
+        :param rate: Maximum number of operations started per second, 0 for no limit
+        :type rate: float
+        """
+        self.operation = operation
+        self.concurrency = concurrency
+        self.rate = rate
+        self.calls = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._next_start = 0.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __repr__(self) -> str:
+        """Representation of the API limiter with its metrics."""
+        return (
+            f"{self.operation}: {self.calls} calls, max queue depth {self.max_queued}, "
+            f"waited {self.wait_time:.1f}s in total and {self.max_wait_time:.1f}s at most"
+        )
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        """Get semaphore limiting operations running in the current event loop.
+
+        :return: Semaphore or None if the number of operations is not limited
+        :rtype: Optional[asyncio.Semaphore]
+        """
+        if self.concurrency <= 0:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+
+        return self._semaphore
+
+    async def _throttle(self) -> None:
+        """Wait until the operation can start according to the rate limit."""
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    @asynccontextmanager
+    async def limit(self) -> AsyncIterator[None]:  # pylint: disable=missing-yield-doc
+        """Limit the operation run in the context.
+
+        :yield: Once the operation can run
+        :rtype: AsyncIterator[None]
+        """
+        semaphore = self._get_semaphore()
+        start_time = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        try:
+            await self._throttle()
+            wait_time = time.monotonic() - start_time
+            self.calls += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+
+def _get_api_limit(operation: str, limit: str, default: float) -> float:
+    """Get limit of API operations from environment variable.
+
+    :param operation: Class of the Juju API operations, e.g. read
+    :type operation: str
+    :param limit: Name of the limit, concurrency or rate
+    :type limit: str
+    :param default: Default value of the limit
+    :type default: float
+    :return: Value of the limit
+    :rtype: float
+    """
+    return float(os.environ.get(f"COU_JUJU_API_{operation.upper()}_{limit.upper()}", default))
+
+
+# process-wide limiters of the Juju API operations shared by all models and steps
+API_LIMITERS: dict[str, APILimiter] = {
+    operation: APILimiter(
+        operation,
+        int(_get_api_limit(operation, "concurrency", concurrency)),
+        _get_api_limit(operation, "rate", DEFAULT_API_RATE),
+    )
+    for operation, concurrency in DEFAULT_API_CONCURRENCY.items()
+}
+
+
+def limit_api(operation: str) -> Callable:
+    """Limit the Juju API operation of Model by the process-wide limiter of its class.
+
+    The time the operation ran is recorded in api_calls, if they are collected.
+
+    :param operation: Class of the Juju API operations, e.g. read
+    :type operation: str
+    :return: wrapped function
+    :rtype: Callable
+    """
+
+    def _wrapper(func: Callable) -> Callable:  # pylint: disable=W9011
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:  # pylint: disable=W9011
+            async with API_LIMITERS[operation].limit():
+                start_time = time.time()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    if (calls := api_calls.get()) is not None:
+                        calls.append((operation, start_time, time.time()))
+
+        return wrapper
+
+    return _wrapper
+
+
+def log_api_metrics() -> None:
+    """Log metrics of the Juju API limiters."""
+    for limiter in API_LIMITERS.values():
+        if limiter.calls:
+            logger.debug("Juju API %s", limiter)
+
+
 @dataclass(frozen=True)
 class Machine:
     """Representation of a juju machine."""
@@ -123,6 +300,7 @@ class Machine:
     machine_id: str
     apps_charms: tuple[tuple[str, str], ...]
     az: Optional[str] = None  # simple deployments may not have azs
+    hostname: Optional[str] = field(default=None, compare=False)
 
 
 @dataclass(frozen=True)
@@ -178,6 +356,8 @@ class Application:
     units: dict[str, Unit]
     workload_version: str
     actions: dict[str, str] = field(default_factory=lambda: {}, compare=False)
+    # charm URL with the revision, e.g. "ch:amd64/focal/keystone-638"
+    charm_url: str = ""
 
     @property
     def is_subordinate(self) -> bool:
@@ -236,6 +416,11 @@ class Model:
 
         return self._name
 
+    @property
+    def uuid(self) -> str:
+        """Return model UUID of the connected model."""
+        return self._model.info.uuid
+
     @retry(no_retry_exceptions=(ActionFailed,))
     async def _get_waited_action_object(self, action: Action, raise_on_failure: bool) -> Action:
         """Get waited action object.
@@ -289,6 +474,7 @@ class Model:
                 machine_id=machine.id,
                 apps_charms=self._get_machine_apps_and_charms(machine.id),
                 az=machine.hardware_characteristics.get("availability-zone"),
+                hostname=machine.hostname,
             )
             for machine in model.machines.values()
         }
@@ -356,9 +542,13 @@ class Model:
         )
 
     @retry
-    async def get_applications(self) -> dict[str, Application]:
+    async def get_applications(
+        self, names: Optional[Iterable[str]] = None
+    ) -> dict[str, Application]:
         """Return list of applications with all relevant information.
 
+        :param names: Names of the applications to get, defaults to all applications
+        :type names: Optional[Iterable[str]]
         :returns: list of application with all information
         :rtype: list[Application]
         """
@@ -400,11 +590,14 @@ class Model:
                 },
                 workload_version=status.workload_version,
                 actions=await model.applications[app].get_actions(),
+                charm_url=status.charm,
             )
             for app, status in full_status.applications.items()
+            if names is None or app in names
         }
 
     @retry(no_retry_exceptions=(ApplicationNotFound,))
+    @limit_api(API_READ)
     async def get_application_config(self, name: str) -> dict:
         """Return application configuration.
 
@@ -433,6 +626,7 @@ class Model:
         return app.charm_name
 
     @retry
+    @limit_api(API_READ)
     async def get_status(self) -> FullStatus:
         """Return the full juju status output.
 
@@ -499,6 +693,7 @@ class Model:
 
     # NOTE (rgildein): There is no need to add retry here, because we don't want to repeat
     # `unit.run_action(...)` and the rest of the function is covered by retry.
+    @limit_api(API_ACTION)
     async def run_action(
         self,
         unit_name: str,
@@ -529,6 +724,7 @@ class Model:
 
     # NOTE (rgildein): There is no need to add retry here, because we don't want to repeat
     # `unit.run(...)` and the rest of the function is static.
+    @limit_api(API_EXEC)
     async def run_on_unit(
         self, unit_name: str, command: str, timeout: Optional[int] = None
     ) -> dict[str, str]:
@@ -558,6 +754,7 @@ class Model:
         return results
 
     @retry(no_retry_exceptions=(ApplicationNotFound,))
+    @limit_api(API_REFRESH)
     async def set_application_config(self, name: str, configuration: dict[str, str]) -> None:
         """Set application configuration.
 
@@ -570,6 +767,7 @@ class Model:
         await app.set_config(configuration)
 
     @retry(no_retry_exceptions=(UnitNotFound,))
+    @limit_api(API_EXEC)
     async def scp_from_unit(  # pylint: disable=too-many-arguments,too-many-positional-arguments
         self,
         unit_name: str,
@@ -606,6 +804,7 @@ class Model:
             JujuError,
         )
     )
+    @limit_api(API_REFRESH)
     async def upgrade_charm(  # pylint: disable=too-many-arguments,too-many-positional-arguments
         self,
         application_name: str,
@@ -647,6 +846,7 @@ class Model:
             switch=switch,
         )
 
+    @limit_api(API_WAIT)
     async def wait_for_idle(  # pylint: disable=too-many-arguments,too-many-positional-arguments
         self,
         timeout: int,
@@ -741,6 +941,7 @@ class Model:
             raise ApplicationNotFound(f"Cannot find '{charm_name}' charm in model '{self.name}'.")
         return app_names
 
+    @limit_api(API_READ)
     async def get_application_status(self, app_name: str) -> ApplicationStatus:
         """Get ApplicationStatus by charm name.
 
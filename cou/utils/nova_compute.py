@@ -15,28 +15,83 @@
 """Nova Compute utilities."""
 
 import asyncio
+import json
 import logging
+import os
+from collections import defaultdict
+from typing import Optional
 
-from cou.exceptions import HaltUpgradeExecution
+from juju.errors import JujuError
+
+from cou.exceptions import COUException, HaltUpgradeExecution
+from cou.utils import progress_indicator
 from cou.utils.juju_utils import Machine, Model, Unit
 
+# maximum number of instance-count actions running at the same time
+INSTANCE_COUNT_CONCURRENCY: int = int(os.environ.get("COU_INSTANCE_COUNT_CONCURRENCY", 20))
+# file with the admin credentials of the cloud on the nova-cloud-controller unit
+NOVA_CLOUD_CONTROLLER_OPENRC: str = os.environ.get(
+    "COU_NOVA_CLOUD_CONTROLLER_OPENRC", "/root/admin-openrc"
+)
+# number of instances running on each hypervisor of all cells from the compute API, the
+# running_vms field was removed from the hypervisors API in microversion 2.88
+HYPERVISORS_INSTANCE_COUNT_COMMAND = f""". {NOVA_CLOUD_CONTROLLER_OPENRC} && python3 - <<'EOF'
+import json
+import openstack
+connection = openstack.connect(compute_api_version="2.87")
+hypervisors = connection.compute.hypervisors(details=True)
+print(json.dumps({{hypervisor.name: hypervisor.running_vms for hypervisor in hypervisors}}))
+EOF"""
+
 logger = logging.getLogger(__name__)
 
 
-async def get_empty_hypervisors(units: list[Unit], model: Model) -> list[Machine]:
+async def get_empty_hypervisors(
+    units: list[Unit], model: Model, nova_cloud_controller_unit: Optional[str] = None
+) -> list[Machine]:
     """Get the empty hypervisors in the model.
 
+    If a nova-cloud-controller unit is provided, the instance counts of all hypervisors are
+    obtained from the compute API with a single request run on it. The instance-count action
+    is used for the units, whose hypervisor was not found, or for all units if the request
+    failed.
+
     :param units: All nova-compute units.
     :type units: list[Unit]
     :param model: Model object
     :type model: Model
+    :param nova_cloud_controller_unit: Name of nova-cloud-controller unit to run the request on
+    :type nova_cloud_controller_unit: Optional[str]
     :return: List with just the empty hypervisors machines.
     :rtype: list[Machine]
     """
-    tasks = [get_instance_count(unit.name, model) for unit in units]
-    instances = await asyncio.gather(*tasks)
-    units_instances = zip(units, instances)
-    empty_units = {unit for unit, instances in units_instances if instances == 0}
+    instance_counts = {}
+    if nova_cloud_controller_unit is not None:
+        try:
+            hypervisors_instance_count = await get_hypervisors_instance_count(
+                nova_cloud_controller_unit, model
+            )
+        except (
+            COUException,
+            JujuError,
+            asyncio.TimeoutError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ) as exc:
+            logger.warning(
+                "Failed to get the instance counts from %s, the instance-count action will be "
+                "used instead: %s",
+                nova_cloud_controller_unit,
+                exc,
+            )
+        else:
+            instance_counts = _match_hypervisors(units, hypervisors_instance_count)
+
+    remaining_units = [unit for unit in units if unit.name not in instance_counts]
+    instances = await _get_units_instance_count(remaining_units, model)
+    instance_counts.update(zip((unit.name for unit in remaining_units), instances))
+    empty_units = {unit for unit in units if instance_counts[unit.name] == 0}
     skipped_units = set(units) - empty_units
 
     if skipped_units:
@@ -48,7 +103,123 @@ async def get_empty_hypervisors(units: list[Unit], model: Model) -> list[Machine
         )
     logger.info("Selected hypervisors: %s", sorted(empty_units, key=lambda unit: unit.name))
 
-    return [unit.machine for unit in empty_units]
+    return [unit.machine for unit in units if unit in empty_units]
+
+
+async def _get_units_instance_count(units: list[Unit], model: Model) -> list[int]:
+    """Get instance count on nova-compute units using the instance-count action.
+
+    The action runs on at most INSTANCE_COUNT_CONCURRENCY units at the same time and the
+    number of checked units is shown in the progress indicator.
+
+    :param units: nova-compute units
+    :type units: list[Unit]
+    :param model: Model object
+    :type model: Model
+    :return: Instance count of each unit
+    :rtype: list[int]
+    """
+    semaphore = asyncio.Semaphore(INSTANCE_COUNT_CONCURRENCY)
+    progress_text = progress_indicator.text
+    checked_units = 0
+
+    async def get_unit_instance_count(unit: Unit) -> int:
+        """Get instance count on a nova-compute unit and show the progress.
+
+        :param unit: nova-compute unit where the action runs on.
+        :type unit: Unit
+        :return: Instance count of the nova-compute unit
+        :rtype: int
+        """
+        nonlocal checked_units
+        async with semaphore:
+            instance_count = await get_instance_count(unit.name, model)
+
+        checked_units += 1
+        progress_indicator.text = (
+            f"{progress_text} (checked instances on {checked_units}/{len(units)} hypervisors)"
+        )
+        return instance_count
+
+    try:
+        return await asyncio.gather(*(get_unit_instance_count(unit) for unit in units))
+    finally:
+        progress_indicator.text = progress_text
+
+
+def _match_hypervisors(
+    units: list[Unit], hypervisors_instance_count: dict[str, int]
+) -> dict[str, int]:
+    """Get instance count of the units from the hypervisors they are running on.
+
+    The hostname of the unit's machine must be the hypervisor hostname, or one of them must
+    be the FQDN of the other and no other hypervisor has the same short name.
+
+    :param units: nova-compute units
+    :type units: list[Unit]
+    :param hypervisors_instance_count: Instance count of each hypervisor by its hostname
+    :type hypervisors_instance_count: dict[str, int]
+    :return: Instance count of the matched units by their name
+    :rtype: dict[str, int]
+    """
+    hypervisors_by_short_name = defaultdict(list)
+    for hypervisor in hypervisors_instance_count:
+        hypervisors_by_short_name[hypervisor.split(".")[0]].append(hypervisor)
+
+    instance_counts = {}
+    for unit in units:
+        hostname = unit.machine.hostname or ""
+        short_name = hostname.split(".")[0]
+        hypervisors = (
+            [hostname]
+            if hostname in hypervisors_instance_count
+            else [
+                hypervisor
+                for hypervisor in hypervisors_by_short_name.get(short_name, [])
+                if short_name in (hostname, hypervisor)
+            ]
+        )
+        if len(hypervisors) == 1:
+            instance_counts[unit.name] = hypervisors_instance_count[hypervisors[0]]
+        else:
+            logger.warning(
+                "Could not match %s with hostname '%s' to a single hypervisor (found %s), "
+                "the instance-count action will be used instead",
+                unit.name,
+                hostname,
+                hypervisors,
+            )
+
+    return instance_counts
+
+
+async def get_hypervisors_instance_count(
+    nova_cloud_controller_unit: str, model: Model
+) -> dict[str, int]:
+    """Get instance count on all hypervisors with a single request to the compute API.
+
+    The request is run on the nova-cloud-controller unit with the admin credentials from
+    the NOVA_CLOUD_CONTROLLER_OPENRC file.
+
+    :param nova_cloud_controller_unit: Name of nova-cloud-controller unit to run the request on
+    :type nova_cloud_controller_unit: str
+    :param model: Model object
+    :type model: Model
+    :return: Instance count of each hypervisor by its hostname
+    :rtype: dict[str, int]
+    :raises ValueError: When the result is not valid.
+    """
+    result = await model.run_on_unit(
+        nova_cloud_controller_unit, HYPERVISORS_INSTANCE_COUNT_COMMAND, timeout=600
+    )
+    hypervisors_instance_count = json.loads(result["stdout"])
+    if not isinstance(hypervisors_instance_count, dict) or not all(
+        isinstance(count, int) for count in hypervisors_instance_count.values()
+    ):
+        raise ValueError(f"No valid instance counts found in the result: {result['stdout']}")
+
+    logger.debug("Instance count of hypervisors: %s", hypervisors_instance_count)
+    return hypervisors_instance_count
 
 
 async def get_instance_count(unit: str, model: Model) -> int:
@@ -82,6 +82,47 @@ NON_UCA_UPGRADE_ORDER = ["vault", "rabbitmq-server"]
 
 UPGRADE_ORDER = NON_UCA_UPGRADE_ORDER + UCA_UPGRADE_ORDER
 
+# Charms which must be upgraded before the charm. Charms without dependency between each other
+# can be upgraded at the same time. Every dependency must be before the charm in UPGRADE_ORDER.
+UPGRADE_DEPENDENCIES = {
+    "vault": set(),
+    "rabbitmq-server": {"vault"},
+    "ceph-mon": {"vault", "rabbitmq-server"},
+    "keystone": {"ceph-mon"},
+    "aodh": {"keystone"},
+    "barbican": {"keystone"},
+    "ceilometer": {"keystone"},
+    "ceph-fs": {"keystone"},
+    "ceph-radosgw": {"keystone"},
+    "cinder": {"keystone"},
+    "designate": {"keystone"},
+    "designate-bind": {"designate"},
+    "glance": {"keystone"},
+    "gnocchi": {"keystone"},
+    "heat": {"keystone"},
+    "manila": {"keystone"},
+    "manila-ganesha": {"manila"},
+    "neutron-api": {"keystone"},
+    "neutron-gateway": {"neutron-api"},
+    "ovn-dedicated-chassis": {"neutron-api"},
+    "ovn-central": {"ovn-dedicated-chassis"},
+    "placement": {"keystone"},
+    "nova-cloud-controller": {
+        "cinder",
+        "glance",
+        "neutron-api",
+        "neutron-gateway",
+        "ovn-central",
+        "placement",
+    },
+    "nova-compute": {"nova-cloud-controller"},
+    "openstack-dashboard": {"keystone"},
+    "ceph-osd": {"ceph-mon"},
+    "swift-proxy": {"keystone"},
+    "swift-storage": {"swift-proxy"},
+    "octavia": {"neutron-api", "nova-cloud-controller"},
+}
+
 SUBORDINATES = [
     "barbican-vault",
     "ceilometer-agent",
@@ -471,6 +512,48 @@ def is_charm_supported(charm: str) -> bool:
     )
 
 
+def _get_charm_ancestors(charm: str) -> set[str]:
+    """Get all charms which must be upgraded before the charm.
+
+    :param charm: Name of the charm.
+    :type charm: str
+    :return: Charms upgraded before the charm, directly or through other charms.
+    :rtype: set[str]
+    """
+    ancestors = set()
+    for dependency in UPGRADE_DEPENDENCIES.get(charm, set()):
+        ancestors |= {dependency} | _get_charm_ancestors(dependency)
+
+    return ancestors
+
+
+def get_upgrade_dependencies(charms: list[str]) -> list[set[int]]:
+    """Get dependencies between applications sorted in the upgrade order.
+
+    Applications whose charm is not in UPGRADE_DEPENDENCIES must be upgraded after all
+    applications before them. Only direct dependencies are returned, e.g. nova-compute depends
+    on nova-cloud-controller, but not on keystone.
+
+    :param charms: Charm of each application in the upgrade order.
+    :type charms: list[str]
+    :return: Indexes of applications which must be upgraded before each application.
+    :rtype: list[set[int]]
+    """
+    ancestors: list[set[int]] = []
+    for index, charm in enumerate(charms):
+        if charm in UPGRADE_DEPENDENCIES:
+            charm_ancestors = _get_charm_ancestors(charm)
+            ancestors.append({i for i, other in enumerate(charms) if other in charm_ancestors})
+        else:
+            ancestors.append(set(range(index)))
+
+    # NOTE: keep only dependencies which are not already dependencies of another dependency
+    return [
+        {i for i in app_ancestors if not any(i in ancestors[j] for j in app_ancestors)}
+        for app_ancestors in ancestors
+    ]
+
+
 def _generate_track_mapping() -> tuple[
     defaultdict[tuple[str, str, str], list[str]],
     defaultdict[tuple[str, str, str], list[OpenStackRelease]],
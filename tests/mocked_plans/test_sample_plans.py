@@ -22,8 +22,9 @@ from cou.steps.plan import generate_plan
 
 
 @pytest.mark.asyncio
+@patch("cou.utils.nova_compute.get_hypervisors_instance_count", return_value={})
 @patch("cou.utils.nova_compute.get_instance_count", return_value=0)
-async def test_plans_with_empty_hypervisors(_, sample_plan):
+async def test_plans_with_empty_hypervisors(_, __, sample_plan):
     """Testing all the plans on sample_plans folder considering all hypervisors empty."""
     model, exp_plan = sample_plan
     args = CLIargs("plan", auto_approve=True)
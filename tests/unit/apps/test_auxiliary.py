@@ -26,7 +26,11 @@ from cou.apps.auxiliary import (
     Vault,
 )
 from cou.apps.core import NovaCompute
-from cou.exceptions import ApplicationError, HaltUpgradePlanGeneration
+from cou.exceptions import (
+    ApplicationError,
+    ApplicationNotFound,
+    HaltUpgradePlanGeneration,
+)
 from cou.steps import (
     ApplicationUpgradePlan,
     PostUpgradeStep,
@@ -1557,11 +1561,12 @@ async def test_ceph_osd_verify_nova_compute_no_app(model):
         },
         workload_version="15.2.0",
     )
-    model.get_applications.return_value = {"ceph-osd": app}
+    model.get_application_names.side_effect = ApplicationNotFound
 
     await app._verify_nova_compute(target)
 
-    model.get_applications.assert_awaited_once_with()
+    model.get_application_names.assert_awaited_once_with("nova-compute")
+    model.get_applications.assert_not_awaited()
 
 
 @patch("cou.apps.base.OpenStackApplication.generate_upgrade_plan")
@@ -1605,7 +1610,7 @@ def test_auxiliary_upgrade_by_unit(mock_super, model):
 
     # Parent class was called with units=None even that units were passed to the
     # Auxiliary app, meaning that will create all-in-one upgrade strategy
-    mock_super.assert_called_with(target, False, None)
+    mock_super.assert_called_with(target, False, None, True)
 
 
 @pytest.mark.asyncio
@@ -1639,11 +1644,13 @@ async def test_ceph_osd_verify_nova_compute_pass(mock_lookup, model):
         },
         workload_version="17.0.1",
     )
-    model.get_applications.return_value = {"ceph-osd": app, "nova-compute": nova_compute}
+    model.get_application_names.return_value = ["nova-compute"]
+    model.get_applications.return_value = {"nova-compute": nova_compute}
 
     await app._verify_nova_compute(target)
 
-    model.get_applications.assert_awaited_once_with()
+    model.get_application_names.assert_awaited_once_with("nova-compute")
+    model.get_applications.assert_awaited_once_with(names=["nova-compute"])
     mock_lookup.assert_any_call("nova-compute", "22.0.0")
 
 
@@ -1678,7 +1685,8 @@ async def test_ceph_osd_verify_nova_compute_fail(mock_lookup, model):
         },
         workload_version="17.0.1",
     )
-    model.get_applications.return_value = {"ceph-osd": app, "nova-compute": nova_compute}
+    model.get_application_names.return_value = ["nova-compute"]
+    model.get_applications.return_value = {"nova-compute": nova_compute}
 
     with pytest.raises(ApplicationError, match=f"Units 'nova-compute/0' did not reach {target}."):
         await app._verify_nova_compute(target)
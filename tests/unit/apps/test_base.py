@@ -142,7 +142,7 @@ def test_get_pause_unit_step(model):
     charm = "app"
     app_name = "my_app"
     channel = "ussuri/stable"
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     unit = Unit(
         name=f"{app_name}/0",
         workload_version="1",
@@ -169,13 +169,14 @@ def test_get_pause_unit_step(model):
 
     step = app._get_pause_unit_step(unit)
     assert_steps(step, expected_upgrade_step)
+    assert step.resource == "machine/0"
 
 
 def test_get_resume_unit_step(model):
     charm = "app"
     app_name = "my_app"
     channel = "ussuri/stable"
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     unit = Unit(
         name=f"{app_name}/0",
         workload_version="1",
@@ -202,13 +203,14 @@ def test_get_resume_unit_step(model):
 
     step = app._get_resume_unit_step(unit)
     assert_steps(step, expected_upgrade_step)
+    assert step.resource == "machine/0"
 
 
 def test_get_openstack_upgrade_step(model):
     charm = "app"
     app_name = "my_app"
     channel = "ussuri/stable"
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     unit = Unit(
         name=f"{app_name}/0",
         workload_version="1",
@@ -235,8 +237,10 @@ def test_get_openstack_upgrade_step(model):
 
     step = app._get_openstack_upgrade_step(unit)
     assert_steps(step, expected_upgrade_step)
+    assert step.resource == "machine/0"
 
 
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     "units",
     [
@@ -246,8 +250,8 @@ def test_get_openstack_upgrade_step(model):
         [Unit(f"my_app/{unit}", MagicMock(), MagicMock()) for unit in range(3)],
     ],
 )
-@patch("cou.apps.base.upgrade_packages")
-def test_get_upgrade_current_release_packages_step(mock_upgrade_packages, units, model):
+@patch("cou.steps.packages.upgrade_packages")
+async def test_get_upgrade_current_release_packages_step(mock_upgrade_packages, units, model):
     charm = "app"
     app_name = "my_app"
     channel = "ussuri/stable"
@@ -265,10 +269,15 @@ def test_get_upgrade_current_release_packages_step(mock_upgrade_packages, units,
         else [call(unit.name, model, None) for unit in app_units.values()]
     )
 
-    app._get_upgrade_current_release_packages_step(units)
-    mock_upgrade_packages.assert_has_calls(expected_calls)
+    step = app._get_upgrade_current_release_packages_step(units)
+    mock_upgrade_packages.assert_not_called()
+    for sub_step in step.sub_steps:
+        await sub_step.run()
 
+    mock_upgrade_packages.assert_has_awaits(expected_calls)
 
+
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     "units",
     [
@@ -279,7 +288,7 @@ def test_get_upgrade_current_release_packages_step(mock_upgrade_packages, units,
     ],
 )
 @patch("cou.apps.base.OpenStackApplication._verify_workload_upgrade")
-def test_get_reached_expected_target_step(mock_workload_upgrade, units, model):
+async def test_get_reached_expected_target_step(mock_workload_upgrade, units, model):
     target = OpenStackRelease("victoria")
     mock = MagicMock()
     charm = "app"
@@ -293,8 +302,11 @@ def test_get_reached_expected_target_step(mock_workload_upgrade, units, model):
 
     expected_calls = [call(target, units)] if units else [call(target, list(app.units.values()))]
 
-    app._get_reached_expected_target_step(target, units)
-    mock_workload_upgrade.assert_has_calls(expected_calls)
+    step = app._get_reached_expected_target_step(target, units)
+    mock_workload_upgrade.assert_not_called()
+    await step.run()
+
+    mock_workload_upgrade.assert_has_awaits(expected_calls)
 
 
 @pytest.mark.parametrize("origin", ["cs", "ch"])
@@ -683,6 +683,21 @@ def test_nova_compute_post_upgrade_steps(mock_enable, mock_expected_target, mock
     mock_wait_step.assert_called_once_with()
 
 
+def test_nova_compute_canary_verification_steps(model):
+    """Test verifying canary units of nova-compute without enabling the scheduler."""
+    app = _generate_nova_compute_app(model)
+    target = OpenStackRelease("victoria")
+    canary_units = list(app.units.values())[:1]
+
+    steps = app.canary_verification_steps(target, canary_units)
+
+    assert [step.description for step in steps] == [
+        f"Wait for up to 2400s for app '{app.name}' to reach the idle state",
+        f"Verify that the workload of '{app.name}' has been upgraded on units: "
+        f"{canary_units[0].name}",
+    ]
+
+
 @pytest.mark.parametrize("force", [True, False])
 # add_step check if the step added is from BaseStep, so the return is an empty UnitUpgradeStep
 @patch("cou.apps.core.NovaCompute._get_resume_unit_step", return_value=UnitUpgradeStep())
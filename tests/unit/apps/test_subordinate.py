@@ -94,6 +94,49 @@ def test_generate_upgrade_plan(model):
     assert_steps(upgrade_plan, expected_plan)
 
 
+def test_generate_upgrade_plan_without_wait(model):
+    """Test generate upgrade plan for SubordinateApplication without waiting for idle state."""
+    target = OpenStackRelease("victoria")
+    machines = {"0": generate_cou_machine("0", "az-0")}
+    app = SubordinateApplication(
+        name="keystone-ldap",
+        can_upgrade_to="ussuri/stable",
+        charm="keystone-ldap",
+        channel="ussuri/stable",
+        config={},
+        machines=machines,
+        model=model,
+        origin="ch",
+        series="focal",
+        subordinate_to=["nova-compute"],
+        units={},
+        workload_version="18.1.0",
+    )
+    expected_plan = ApplicationUpgradePlan(f"Upgrade plan for '{app.name}' to '{target}'")
+    upgrade_steps = [
+        PreUpgradeStep(
+            description=f"Refresh '{app.name}' to the latest revision of 'ussuri/stable'",
+            parallel=False,
+            coro=model.upgrade_charm(app.name, "ussuri/stable"),
+        ),
+        UpgradeStep(
+            description=f"Wait for up to 300s for app '{app.name}' to reach the idle state",
+            parallel=False,
+            coro=model.wait_for_idle(300, apps=[app.name]),
+        ),
+        UpgradeStep(
+            description=f"Upgrade '{app.name}' from 'ussuri/stable' to the new channel: "
+            "'victoria/stable'",
+            parallel=False,
+            coro=model.upgrade_charm(app.name, "victoria/stable"),
+        ),
+    ]
+    expected_plan.add_steps(upgrade_steps)
+
+    upgrade_plan = app.generate_upgrade_plan(target, False, wait=False)
+    assert_steps(upgrade_plan, expected_plan)
+
+
 @pytest.mark.parametrize(
     "channel",
     [
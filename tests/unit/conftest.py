@@ -17,6 +17,7 @@ from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 import pytest
 
 from cou.commands import CLIargs
+from cou.steps import ceph
 from cou.steps.plan import PlanStatus
 from cou.utils.juju_utils import Model
 from tests.unit.utils import get_charm_name, get_status
@@ -46,7 +47,10 @@ def model() -> AsyncMock:
 @pytest.fixture(scope="session", autouse=True)
 def cou_data(tmp_path_factory):
     cou_test = tmp_path_factory.mktemp("cou_test")
-    with patch("cou.utils.COU_DATA", cou_test):
+    with (
+        patch("cou.utils.COU_DATA", cou_test),
+        patch("cou.steps.estimate.COU_HISTORY_FILE", cou_test / "history.json"),
+    ):
         yield
 
 
@@ -58,7 +62,21 @@ def cli_args() -> MagicMock:
     :rtype: MagicMock
     """
     # spec_set needs an instantiated class to be strict with the fields.
-    return MagicMock(spec_set=CLIargs(command="plan"))()
+    cli_args = MagicMock(spec_set=CLIargs(command="plan"))()
+    # hypervisors upgrade policy is compared with numbers during plan generation
+    cli_args.max_unavailable = None
+    cli_args.max_parallel_azs = 1
+    cli_args.max_unavailable_total = None
+    cli_args.canaries = 0
+    cli_args.max_parallel_apps = 1
+    cli_args.max_parallel_subordinates = 1
+    cli_args.skip_up_to_date_packages = False
+    cli_args.download_next_release = False
+    cli_args.max_parallel_machines = 10
+    cli_args.resume = False
+    cli_args.execution_policy = "tree"
+    cli_args.simulate = False
+    return cli_args
 
 
 @pytest.fixture(autouse=True)
@@ -66,3 +84,9 @@ def plan_status() -> None:
     """Get an empty PlanStatus for every test case."""
     PlanStatus.error_messages = []
     PlanStatus.warning_messages = []
+
+
+@pytest.fixture(autouse=True)
+def ceph_state() -> None:
+    """Get no collected ceph state for every test case."""
+    ceph.invalidate_state()
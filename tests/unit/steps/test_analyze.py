@@ -22,7 +22,7 @@ from cou.apps.channel_based import ChannelBasedApplication
 from cou.apps.core import Keystone
 from cou.apps.subordinate import SubordinateApplication
 from cou.steps import analyze
-from cou.steps.analyze import Analysis
+from cou.steps.analyze import Analysis, Topology
 from cou.utils.juju_utils import Application, Machine, Unit
 from cou.utils.openstack import OpenStackRelease
 from tests.unit.utils import generate_cou_machine
@@ -256,7 +256,7 @@ async def test_populate_model(mock_create, model):
 @patch.object(analyze.Analysis, "_populate", new_callable=AsyncMock)
 async def test_analysis_create(mock_populate, model):
     """Test analysis object creation."""
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     keystone = Keystone(
         name="keystone",
         can_upgrade_to="ussuri/stable",
@@ -335,7 +335,7 @@ async def test_analysis_create(mock_populate, model):
 @patch.object(analyze.Analysis, "_populate", new_callable=AsyncMock)
 async def test_analysis_create_with_skip_apps(mock_populate, model):
     """Test analysis object creation with skip_apps."""
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     keystone = Keystone(
         name="keystone",
         can_upgrade_to="ussuri/stable",
@@ -435,7 +435,7 @@ async def test_analysis_create_with_skip_apps(mock_populate, model):
 
 @pytest.mark.asyncio
 async def test_analysis_detect_current_cloud_o7k_release_different_releases(model):
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     keystone = Keystone(
         name="keystone",
         can_upgrade_to="wallaby/stable",
@@ -508,7 +508,7 @@ async def test_analysis_detect_current_cloud_o7k_release_different_releases(mode
 @pytest.mark.asyncio
 async def test_analysis_detect_current_cloud_series_different_series(model):
     """Check current_cloud_series getting lowest series in apps."""
-    machines = {"0": MagicMock(spec_set=Machine)}
+    machines = {"0": generate_cou_machine("0")}
     keystone = Keystone(
         name="keystone",
         can_upgrade_to="ussuri/stable",
@@ -589,7 +589,7 @@ def _app(name, machine_ids, is_subordinate):
     app.series = "jammy"
     app.units = {machine_id: _unit(machine_id) for machine_id in machine_ids}
     app.is_subordinate = is_subordinate
-    app.machines = [unit.machine for unit in app.units.values()]
+    app.machines = {unit.machine.machine_id: unit.machine for unit in app.units.values()}
     return app
 
 
@@ -698,3 +698,129 @@ def test_min_o7k_release_apps(model, channel_keystone, channel_gnocchi, origin,
     )
 
     assert Analysis.min_o7k_release_apps([keystone, gnocchi]) == exp_release
+
+
+def test_analysis_topology():
+    """Test that the partition and machine maps are computed once from the applications."""
+    nova_compute = _app("nova-compute", ["0", "1"], False)
+    keystone = _app("keystone", ["2"], False)
+    ceph_osd = _app("ceph-osd", ["3"], False)
+    analysis = Analysis(model=MagicMock(), apps=[keystone, nova_compute, ceph_osd])
+
+    assert analysis.nova_compute_units == set(nova_compute.units.values())
+    assert analysis.nova_compute_machines == {unit.machine for unit in nova_compute.units.values()}
+    assert set(analysis.data_plane_machines) == {"0", "1", "3"}
+    assert set(analysis.control_plane_machines) == {"2"}
+    assert set(analysis.machines) == {"0", "1", "2", "3"}
+    # the partition is cached and not rebuilt on each access
+    assert analysis.apps_data_plane is analysis.apps_data_plane
+    assert analysis.apps_control_plane is analysis.apps_control_plane
+
+
+def test_topology_from_apps():
+    """Test building the topology index from applications."""
+    nova_compute = _app("nova-compute", ["0", "1"], False)
+    cinder = _app("cinder", ["1"], False)
+    ovn_chassis = _app("ovn-chassis", [], True)
+    machine = Machine("2", (), None)
+    keystone = _app("keystone", ["2"], False)
+    keystone.units = {"keystone/0": MagicMock(spec_set=Unit).return_value}
+    keystone.units["keystone/0"].machine = machine
+
+    topology = Topology.from_apps([nova_compute, cinder, ovn_chassis, keystone])
+
+    assert topology.machine_apps == {
+        "0": [nova_compute],
+        "1": [nova_compute, cinder],
+        "2": [keystone],
+    }
+    # machine without AZ is not part of any AZ
+    assert topology.az_machines == {
+        "zone-1": {unit.machine for unit in [*nova_compute.units.values(), *cinder.units.values()]}
+    }
+    assert topology.charm_units == {
+        "nova-compute": list(nova_compute.units.values()),
+        "cinder": list(cinder.units.values()),
+        "keystone": list(keystone.units.values()),
+    }
+    assert topology.charm_machines("nova-compute") == {
+        unit.machine for unit in nova_compute.units.values()
+    }
+    assert topology.charm_machines("ceph-osd") == set()
+
+
+def _app_status(app):
+    status = MagicMock()
+    status.charm = app.charm_url
+    status.charm_channel = app.channel
+    status.can_upgrade_to = app.can_upgrade_to
+    status.workload_version = app.workload_version
+    status.units = {
+        name: MagicMock(machine=unit.machine.machine_id, workload_version=unit.workload_version)
+        for name, unit in app.units.items()
+    }
+    return status
+
+
+@pytest.mark.asyncio
+@patch("cou.apps.factory.AppFactory.create")
+async def test_analysis_refresh(mock_create, model):
+    """Test refreshing the analysis rebuilds only the changed applications."""
+    apps = {}
+    for charm in ["keystone", "cinder", "glance", "rabbitmq-server", "nova-compute", "ceph-osd"]:
+        app = _app(charm, ["0"], False)
+        app.charm_url = f"ch:amd64/focal/{charm}-1"
+        app.channel, app.can_upgrade_to, app.workload_version = "ussuri/stable", "", "1.0"
+        app.config = {"debug": False}
+        for unit in app.units.values():
+            unit.workload_version = "1.0"
+        apps[app.name] = app
+
+    changed_apps = ["cinder-name", "glance-name", "rabbitmq-server-name", "nova-compute-name"]
+    status = {name: _app_status(app) for name, app in apps.items() if name != "ceph-osd-name"}
+    status["cinder-name"].charm_channel = "victoria/stable"
+    status["glance-name"].units["0"].workload_version = "2.0"
+    # the charm revision changed within the same channel
+    status["nova-compute-name"].charm = "ch:amd64/focal/nova-compute-2"
+    model.get_status.side_effect = None
+    model.get_status.return_value.applications = status
+    model.get_application_config.side_effect = lambda name: (
+        {"debug": True} if name == "rabbitmq-server-name" else {"debug": False}
+    )
+    new_apps = {name: _app(apps[name].charm, ["0"], False) for name in status}
+    for name, app in new_apps.items():
+        app.name = name
+    model.get_applications.return_value = {name: new_apps[name] for name in changed_apps}
+    mock_create.side_effect = lambda app: app
+    analysis = Analysis(model=model, apps=list(apps.values()))
+
+    result = await analysis.refresh()
+
+    model.get_status.assert_awaited_once_with()
+    model.get_applications.assert_awaited_once_with(names=set(changed_apps))
+    assert result.apps == [
+        new_apps["rabbitmq-server-name"],
+        apps["keystone-name"],
+        new_apps["cinder-name"],
+        new_apps["glance-name"],
+        new_apps["nova-compute-name"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_analysis_refresh_no_changes(model):
+    """Test refreshing the analysis without any change does not fetch applications."""
+    app = _app("keystone", ["0"], False)
+    app.charm_url, app.channel, app.can_upgrade_to, app.workload_version = "ch:k-1", "a", "", "1"
+    app.config = {}
+    for unit in app.units.values():
+        unit.workload_version = "1"
+    model.get_status.side_effect = None
+    model.get_status.return_value.applications = {app.name: _app_status(app)}
+    model.get_application_config.return_value = {}
+    analysis = Analysis(model=model, apps=[app])
+
+    result = await analysis.refresh()
+
+    model.get_applications.assert_not_awaited()
+    assert result.apps == [app]
@@ -11,16 +11,72 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
 import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from cou.exceptions import ApplicationError, RunUpgradeError, UnitNotFound
+from cou.exceptions import (
+    ApplicationError,
+    CommandRunFailed,
+    RunUpgradeError,
+    UnitNotFound,
+)
 from cou.steps import ceph
 from tests.unit.utils import get_applications
 
 
+def _state_output(versions: str, osd_dump: str = "{}") -> str:
+    """Get output of the ceph state command."""
+    return f'{{"versions": {versions}, "osd_dump": {osd_dump}}}'
+
+
+@pytest.mark.asyncio
+async def test_get_state(model) -> None:
+    """Test ceph state is collected once for concurrent and later calls."""
+    model.run_on_unit.return_value = {
+        "stdout": _state_output('{"osd": {}}', '{"flags_set": ["noout"]}')
+    }
+
+    states = await asyncio.gather(*(ceph.get_state(model, "ceph-mon/0") for _ in range(3)))
+    state = await ceph.get_state(model, "ceph-mon/0")
+
+    model.run_on_unit.assert_awaited_once_with(
+        unit_name="ceph-mon/0", command=ceph.CEPH_STATE_COMMAND, timeout=600
+    )
+    assert states == [state] * 3
+    assert state == ceph.CephState(versions={"osd": {}}, osd_dump={"flags_set": ["noout"]})
+    assert state.flags == ["noout"]
+    assert state.require_osd_release == ""
+
+
+@pytest.mark.asyncio
+async def test_get_state_invalidate(model) -> None:
+    """Test ceph state is collected again after invalidation."""
+    model.run_on_unit.return_value = {"stdout": _state_output("{}")}
+
+    await ceph.get_state(model, "ceph-mon/0")
+    ceph.invalidate_state()
+    await ceph.get_state(model, "ceph-mon/0")
+
+    assert model.run_on_unit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_state_failed(model) -> None:
+    """Test failure to collect ceph state is not kept."""
+    model.run_on_unit.side_effect = [
+        CommandRunFailed(ceph.CEPH_STATE_COMMAND, {"return-code": 1}),
+        {"stdout": _state_output("{}")},
+    ]
+
+    with pytest.raises(CommandRunFailed):
+        await ceph.get_state(model, "ceph-mon/0")
+
+    assert await ceph.get_state(model, "ceph-mon/0") == ceph.CephState({}, {})
+
+
 @pytest.mark.asyncio
 async def test_get_unit_name(model) -> None:
     apps = get_applications("ceph-mon")
@@ -39,13 +95,15 @@ async def test_get_unit_name_error(model) -> None:
 
 
 @pytest.mark.asyncio
-async def test_osd_noout(model) -> None:
+@patch("cou.steps.ceph.invalidate_state")
+async def test_osd_noout(mock_invalidate_state, model) -> None:
     apps = get_applications("ceph-mon", app_count=2)
 
     await ceph.osd_noout(model, apps, True)
 
     model.run_action.assert_awaited()
     assert model.run_action.await_count == 2
+    assert mock_invalidate_state.call_count == 2
 
 
 @pytest.mark.asyncio
@@ -145,7 +203,9 @@ async def test_set_require_osd_release_option_no_units(
 @pytest.mark.asyncio
 @pytest.mark.parametrize("flags_set,expected_noout_state", [([], False), (["noout"], True)])
 async def test_get_osd_noout_state(flags_set, expected_noout_state, model) -> None:
-    model.run_on_unit.return_value = {"stdout": json.dumps({"flags_set": flags_set})}
+    model.run_on_unit.return_value = {
+        "stdout": json.dumps({"versions": {}, "osd_dump": {"flags_set": flags_set}})
+    }
 
     noout_state = await ceph.get_osd_noout_state(model, "ceph-mon/0")
     assert noout_state == expected_noout_state
@@ -160,11 +220,13 @@ async def test_get_osd_noout_state(flags_set, expected_noout_state, model) -> No
         ("pacific", "quincy"),
     ],
 )
+@patch("cou.steps.ceph.invalidate_state")
 @patch("cou.steps.ceph._get_required_osd_release", new_callable=AsyncMock)
 @patch("cou.steps.ceph._get_current_osd_release", new_callable=AsyncMock)
 async def test_set_require_osd_release_option_different_releases(
     mock_get_current_osd_release,
     mock_get_required_osd_release,
+    mock_invalidate_state,
     model,
     current_required_osd_release,
     current_osd_release,
@@ -180,6 +242,8 @@ async def test_set_require_osd_release_option_different_releases(
         command=f"ceph osd require-osd-release {current_osd_release}",
         timeout=600,
     )
+    # invalidated before collecting the state and after changing the option
+    assert mock_invalidate_state.call_count == 2
 
 
 @pytest.mark.asyncio
@@ -211,14 +275,15 @@ async def test_set_require_osd_release_option_same_release(
 async def test_get_required_osd_release(model):
     expected_current_release = "octopus"
     check_result = """
-        {"crush_version":7,"min_compat_client":"jewel","require_osd_release":"octopus"}
+        {"versions": {}, "osd_dump":
+        {"crush_version":7,"min_compat_client":"jewel","require_osd_release":"octopus"}}
     """
     model.run_on_unit.return_value = {"return-code": 0, "stdout": check_result}
     actual_current_release = await ceph._get_required_osd_release(unit="ceph-mon/0", model=model)
 
     model.run_on_unit.assert_called_once_with(
         unit_name="ceph-mon/0",
-        command="ceph osd dump -f json",
+        command=ceph.CEPH_STATE_COMMAND,
         timeout=600,
     )
     assert actual_current_release == expected_current_release
@@ -246,12 +311,12 @@ async def test_get_current_osd_release(model):
     """ % (
         expected_osd_release
     )
-    model.run_on_unit.return_value = {"return-code": 0, "stdout": check_output}
+    model.run_on_unit.return_value = {"return-code": 0, "stdout": _state_output(check_output)}
     actual_osd_release = await ceph._get_current_osd_release(unit="ceph-mon/0", model=model)
 
     model.run_on_unit.assert_called_once_with(
         unit_name="ceph-mon/0",
-        command="ceph versions -f json",
+        command=ceph.CEPH_STATE_COMMAND,
         timeout=600,
     )
 
@@ -300,13 +365,13 @@ async def test_get_current_osd_release_unsuccessful(model, osd_release_output, e
     """ % (
         json.dumps(osd_release_output)
     )
-    model.run_on_unit.return_value = {"return-code": 0, "stdout": check_output}
+    model.run_on_unit.return_value = {"return-code": 0, "stdout": _state_output(check_output)}
     with pytest.raises(RunUpgradeError, match=error_message):
         await ceph._get_current_osd_release(unit="ceph-mon/0", model=model)
 
     model.run_on_unit.assert_called_once_with(
         unit_name="ceph-mon/0",
-        command="ceph versions -f json",
+        command=ceph.CEPH_STATE_COMMAND,
         timeout=600,
     )
 
@@ -330,13 +395,14 @@ async def test_get_versions(model):
         }
     }
     """
-    model.run_on_unit.return_value = {"return-code": 0, "stdout": check_output}
+    model.run_on_unit.return_value = {"return-code": 0, "stdout": _state_output(check_output)}
 
     versions = await ceph.get_versions(model, "my-ceph-mon/0")
 
     model.run_on_unit.assert_called_once_with(
-        "my-ceph-mon/0",
-        "ceph versions -f json",
+        unit_name="my-ceph-mon/0",
+        command=ceph.CEPH_STATE_COMMAND,
+        timeout=600,
     )
 
     assert (
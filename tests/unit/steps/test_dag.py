@@ -0,0 +1,415 @@
+#  Copyright 2024 Canonical Limited
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+import asyncio
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from cou.exceptions import HaltUpgradeExecution, RunUpgradeError
+from cou.steps import (
+    ApplicationUpgradePlan,
+    PostUpgradeStep,
+    PreUpgradeStep,
+    UpgradePlan,
+    UpgradeStep,
+    get_machine_resource,
+)
+from cou.steps.dag import DAGExecutor, execute_dag, get_dependencies
+from cou.steps.journal import ExecutionJournal, execution_journal
+from cou.steps.tracing import StepTracer, step_tracer
+
+
+def _step(description, events, error=None, step_type=UpgradeStep, **kwargs):
+    """Get step recording its start and end in events."""
+
+    async def _record():
+        events.append(f"start {description}")
+        await asyncio.sleep(0.01)
+        events.append(f"end {description}")
+        if error is not None:
+            raise error
+
+    return step_type(description, coro=_record(), **kwargs)
+
+
+def _group(description, sub_steps, parallel=False, max_parallel=None):
+    """Get group of sub-steps."""
+    step = PreUpgradeStep(description, parallel=parallel, max_parallel=max_parallel)
+    step.add_steps(sub_steps)
+    return step
+
+
+@pytest.mark.asyncio
+async def test_dag_executor_graph():
+    """Test building graph with dependencies of steps."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    step_a, step_b, step_c = (_step(name, events) for name in "abc")
+    step_c.depends_on = [step_a, UpgradeStep("not in the plan")]
+    parallel_group = _group("parallel", [step_a, step_b, step_c], parallel=True, max_parallel=2)
+    step_d = _step("d", events)
+    plan.add_steps([parallel_group, UpgradeStep("empty step"), step_d])
+
+    executor = DAGExecutor(plan)
+
+    root, parallel_node, node_a, node_b, node_c, node_d = executor.nodes
+    assert [node.step for node in executor.nodes] == [
+        plan,
+        parallel_group,
+        step_a,
+        step_b,
+        step_c,
+        step_d,
+    ]
+    assert root.children == [parallel_node, node_d]
+    assert root.semaphore is None
+    assert node_d.predecessors == [parallel_node]
+    assert parallel_node.children == [node_a, node_b, node_c]
+    assert parallel_node.semaphore._value == 2
+    assert node_a.predecessors == node_b.predecessors == []
+    assert node_c.predecessors == [node_a]
+
+
+def _app_plan(app, events, machine="0"):
+    """Get upgrade plan of the application deployed on the machine."""
+    app_plan = ApplicationUpgradePlan(f"Upgrade plan for '{app}'")
+    app_plan.add_steps(
+        [
+            _step(f"{app} verify", events, step_type=PreUpgradeStep),
+            _step(
+                f"{app} packages",
+                events,
+                step_type=PreUpgradeStep,
+                resource=get_machine_resource(machine),
+            ),
+            _step(f"{app} refresh", events, resource=app),
+            _step(f"{app} wait", events),
+        ]
+    )
+    return app_plan
+
+
+@pytest.mark.asyncio
+async def test_get_dependencies():
+    """Test dependencies of the upgrades of applications changing different resources."""
+    plan = UpgradePlan("Upgrade cloud")
+    glance = _app_plan("glance", [], "0")
+    keystone, keystone_again = _app_plan("keystone", [], "1"), _app_plan("keystone", [], "2")
+    plan.add_steps([glance, keystone, keystone_again])
+
+    dependencies = get_dependencies(plan)
+
+    # keystone starts once glance refresh is done and keystone packages wait for glance
+    assert dependencies[id(keystone)] == [glance.sub_steps[2]]
+    assert dependencies[id(keystone.sub_steps[1])] == [glance, keystone.sub_steps[0]]
+    # the upgrades of the same application do not overlap
+    assert dependencies[id(keystone_again)] == [keystone]
+    assert dependencies[id(keystone_again.sub_steps[1])] == [keystone_again.sub_steps[0]]
+    assert id(glance) not in dependencies
+    assert get_dependencies(plan, chains=False)[id(keystone)] == [glance]
+
+
+@pytest.mark.asyncio
+async def test_get_dependencies_same_machine():
+    """Test dependencies of the upgrades of applications deployed on the same machine."""
+    plan = UpgradePlan("Upgrade cloud")
+    glance, keystone = _app_plan("glance", []), _app_plan("keystone", [])
+    plan.add_steps([glance, keystone])
+
+    assert get_dependencies(plan)[id(keystone)] == [glance]
+
+
+@pytest.mark.asyncio
+async def test_get_dependencies_not_overlapping():
+    """Test dependencies of the steps, which cannot overlap."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    parallel_group = _group("parallel", [_step("a", events, resource="glance")], parallel=True)
+    without_resources = _group("without resources", [_step("b", events)])
+    plan.add_steps([parallel_group, _app_plan("keystone", events), without_resources])
+
+    dependencies = get_dependencies(plan)
+
+    assert dependencies[id(plan.sub_steps[1])] == [parallel_group]
+    assert dependencies[id(without_resources)] == [plan.sub_steps[1]]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag():
+    """Test executing steps in order of their dependencies."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    step_a, step_b, step_c = (_step(name, events) for name in "abc")
+    step_c.depends_on = [step_a]
+    plan.add_steps(
+        [_group("parallel", [step_a, step_b, step_c], parallel=True), _step("d", events)]
+    )
+
+    await execute_dag(plan)
+
+    assert events.index("start c") > events.index("end a")
+    assert events.index("start b") < events.index("end a")
+    assert events[-2:] == ["start d", "end d"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_application_chains():
+    """Test verifying the next application while the previous one reaches the idle state."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps([_app_plan("glance", events, "0"), _app_plan("keystone", events, "1")])
+
+    await execute_dag(plan)
+
+    assert events.index("start keystone verify") > events.index("end glance refresh")
+    assert events.index("start keystone verify") < events.index("end glance wait")
+    # software packages are upgraded only after the previous application is done
+    assert events.index("start keystone packages") > events.index("end glance wait")
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_application_chains_failure():
+    """Test skipping changes of the next application after the previous one failed."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    glance = ApplicationUpgradePlan("Upgrade plan for 'glance'")
+    glance.add_steps(
+        [
+            _step("glance refresh", events, resource="glance"),
+            _step("glance wait", events, error=Exception("not idle")),
+        ]
+    )
+    plan.add_steps([glance, _app_plan("keystone", events)])
+
+    with pytest.raises(RunUpgradeError, match="glance wait: Exception\\('not idle'\\)"):
+        await execute_dag(plan)
+
+    assert "start keystone verify" in events
+    assert "start keystone packages" not in events
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_max_workers():
+    """Test limiting the number of steps running at the same time."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_group("parallel", [_step(name, events) for name in "abc"], parallel=True))
+
+    await DAGExecutor(plan, max_workers=1).run()
+
+    assert events == ["start a", "end a", "start b", "end b", "start c", "end c"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_resource():
+    """Test not running steps changing the same resource at the same time."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(
+        _group(
+            "parallel",
+            [
+                _step("a", events, resource="keystone"),
+                _step("b", events, resource="glance"),
+                _step("c", events, resource="keystone"),
+            ],
+            parallel=True,
+        )
+    )
+
+    await execute_dag(plan)
+
+    assert events.index("start c") > events.index("end a")
+    assert events.index("start b") < events.index("end a")
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_slots():
+    """Test holding slots of the step until all its sub-steps are done."""
+    events = []
+    slots = asyncio.Semaphore(1)
+    group_a = _group("group a", [_step("a1", events), _step("a2", events)])
+    group_b = _group("group b", [_step("b1", events)])
+    group_a.slots = group_b.slots = slots
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_group("parallel", [group_a, group_b], parallel=True))
+
+    await execute_dag(plan)
+
+    assert events == ["start a1", "end a1", "start a2", "end a2", "start b1", "end b1"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_sequential_failure():
+    """Test not running steps after failed step of sequence."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps(
+        [
+            _group("group", [_step("a", events, error=ValueError("a")), _step("b", events)]),
+            _step("c", events),
+        ]
+    )
+
+    with pytest.raises(RunUpgradeError, match="a: ValueError\\('a'\\)"):
+        await execute_dag(plan)
+
+    assert events == ["start a", "end a"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_parallel_failure():
+    """Test running independent parallel steps after failure and skipping dependent ones."""
+    events = []
+    step_a, step_b, step_c = (
+        _step("a", events, error=ValueError("a")),
+        _step("b", events),
+        _step("c", events),
+    )
+    step_c.depends_on = [step_a]
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_group("parallel", [step_a, step_b, step_c], parallel=True))
+
+    with pytest.raises(RunUpgradeError, match="a: ValueError"):
+        await execute_dag(plan)
+
+    assert sorted(events) == ["end a", "end b", "start a", "start b"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_max_parallel_failure():
+    """Test not starting parallel steps after failure when their number is limited."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(
+        _group(
+            "parallel",
+            [_step("a", events, error=ValueError("a")), _step("b", events)],
+            parallel=True,
+            max_parallel=1,
+        )
+    )
+
+    with pytest.raises(RunUpgradeError):
+        await execute_dag(plan)
+
+    assert events == ["start a", "end a"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_halt():
+    """Test skipping only dependent steps after halting the sequence."""
+    events = []
+    halted_step = _step("a", events, error=HaltUpgradeExecution("halt"))
+    halted_step.add_step(_step("a1", events))
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps(
+        [
+            halted_step,
+            _step("b", events, dependent=True),
+            _step("c", events),
+        ]
+    )
+
+    await execute_dag(plan)
+
+    assert events == ["start a", "end a", "start c", "end c"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_halt_parallel():
+    """Test halting step running in parallel fails the execution."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(
+        _group(
+            "parallel",
+            [_step("a", events, error=HaltUpgradeExecution("halt")), _step("b", events)],
+            parallel=True,
+        )
+    )
+
+    with pytest.raises(RunUpgradeError, match="a: HaltUpgradeExecution"):
+        await execute_dag(plan)
+
+    assert sorted(events) == ["end a", "end b", "start a", "start b"]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_journal():
+    """Test skipping steps completed before and recording the execution in journal."""
+    events = []
+    step_a, step_b = _step("a", events), _step("b", events)
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps([step_a, step_b])
+    journal = MagicMock(spec_set=ExecutionJournal)
+    journal.is_completed.side_effect = lambda step: step is step_a
+
+    token = execution_journal.set(journal)
+    try:
+        await execute_dag(plan)
+    finally:
+        execution_journal.reset(token)
+
+    assert events == ["start b", "end b"]
+    journal.start.assert_has_calls([call(plan), call(step_b)])
+    journal.complete.assert_has_calls([call(step_b), call(plan)])
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.dag.progress_indicator")
+async def test_execute_dag_progress(mock_progress_indicator):
+    """Test progress indication of steps and application plans."""
+    events = []
+    app_plan = ApplicationUpgradePlan("Upgrade plan for 'keystone'")
+    app_plan.add_step(_step("a", events, step_type=PostUpgradeStep))
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps([_step("b", events), app_plan])
+
+    await execute_dag(plan)
+
+    mock_progress_indicator.start.assert_has_calls([call("b"), call("a")])
+    # the progress of the application plan sub-steps is overwritten by the plan message
+    assert mock_progress_indicator.succeed.call_args_list == [
+        call(),
+        call("Upgrade plan for 'keystone' executed in 0 seconds"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_execute_dag_tracer():
+    """Test recording spans of the steps run."""
+    events = []
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps(
+        [
+            _step("a", events, error=HaltUpgradeExecution("halt")),
+            _step("b", events, dependent=True),
+            _step("c", events, error=ValueError("c")),
+        ]
+    )
+    tracer = StepTracer(plan)
+
+    token = step_tracer.set(tracer)
+    try:
+        with pytest.raises(RunUpgradeError):
+            await execute_dag(plan)
+    finally:
+        step_tracer.reset(token)
+
+    assert [(span.name, span.parent_id, span.outcome) for span in tracer.spans] == [
+        ("Upgrade cloud", None, "error"),
+        ("a", 1, "halted"),
+        ("c", 1, "error"),
+    ]
@@ -0,0 +1,275 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from textwrap import dedent
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from cou.exceptions import ApplicationNotFound
+from cou.steps import (
+    ApplicationUpgradePlan,
+    PreUpgradeStep,
+    UnitUpgradeStep,
+    UpgradePlan,
+    UpgradeStep,
+)
+from cou.steps import estimate as cou_estimate
+from tests.unit.utils import (
+    generate_span,
+    generate_units_upgrade_step,
+    generate_upgrade_plan,
+)
+
+HISTORY = {
+    "*": {"PreUpgradeStep: Back up MySQL databases": [5.0, 10.0, 20.0]},
+    "keystone": {"UpgradeStep: Change config of '*'": [20.0]},
+    # units of keystone were never upgraded, so the durations of other charms are used
+    "glance": {"UnitUpgradeStep: Upgrade the unit: '*'": [30.0]},
+}
+
+
+def _plan():
+    """Get plan with parallel groups, one of them changing the same application."""
+    units = generate_units_upgrade_step("keystone-app", 3)
+    units.sub_steps[1].depends_on = [units.sub_steps[0]]
+    config = UpgradeStep("Change config", parallel=True)
+    config.add_steps(
+        [
+            UpgradeStep(
+                f"Change config of '{option}'", coro=AsyncMock()(), resource="keystone-app"
+            )
+            for option in ("debug", "verbose")
+        ]
+    )
+    return generate_upgrade_plan(
+        [
+            units,
+            config,
+            UpgradeStep("Wait for up to 300s for app 'keystone-app'", coro=AsyncMock()()),
+            UpgradeStep("Not run"),
+        ],
+        app="keystone-app",
+    )
+
+
+def test_get_step_type():
+    """Test getting step type without names and numbers."""
+    assert (
+        cou_estimate.get_step_type("UpgradeStep", "Wait for up to 300s for app 'keystone'")
+        == "UpgradeStep: Wait for up to Ns for app '*'"
+    )
+
+
+def test_load_history(tmp_path):
+    """Test loading history of the step durations."""
+    history_file = tmp_path / "history.json"
+    with patch("cou.steps.estimate.COU_HISTORY_FILE", history_file):
+        assert cou_estimate.load_history() == {}
+
+        history_file.write_text("invalid", encoding="utf-8")
+        assert cou_estimate.load_history() == {}
+
+        history_file.write_text(json.dumps(HISTORY), encoding="utf-8")
+        assert cou_estimate.load_history() == HISTORY
+
+
+@pytest.mark.asyncio
+async def test_get_charms(model):
+    """Test getting charms of the applications or their names if the charm is not known."""
+    model.get_charm_name.side_effect = ["keystone", ApplicationNotFound("not found")]
+
+    charms = await cou_estimate.get_charms(model, ["keystone-app", None, "keystone-app"])
+    assert charms == {"keystone-app": "keystone"}
+    assert await cou_estimate.get_charms(model, ["removed"]) == {"removed": "removed"}
+
+
+def test_record_durations(tmp_path):
+    """Test recording durations of successfully finished steps without sub-steps."""
+    charms = {"keystone-app": "keystone"}
+    history_file = tmp_path / "cou" / "history.json"
+    spans = [
+        generate_span(
+            1,
+            None,
+            "Upgrade plan for 'keystone-app'",
+            0.0,
+            9.0,
+            step_class="ApplicationUpgradePlan",
+            application="ks",
+        ),
+        generate_span(2, 1, "Change config of 'debug'", 0.0, 2.0, application="keystone-app"),
+        generate_span(
+            3, 1, "Change config of 'verbose'", 0.0, 3.0, "error", application="keystone-app"
+        ),
+        generate_span(4, 1, "Wait for up to 300s", 0.0, None, None, application="keystone-app"),
+        generate_span(5, None, "Back up MySQL databases", 0.0, 4.0, step_class="PreUpgradeStep"),
+    ]
+
+    with (
+        patch("cou.steps.estimate.COU_HISTORY_FILE", history_file),
+        patch("cou.steps.estimate.HISTORY_SIZE", 2),
+    ):
+        cou_estimate.record_durations([], charms)
+        assert not history_file.exists()
+
+        cou_estimate.record_durations(spans, charms)
+        cou_estimate.record_durations(spans[1:], charms)
+        spans[1].end = 1.0
+        cou_estimate.record_durations(spans[1:], charms)
+
+        assert cou_estimate.load_history() == {
+            "*": {"PreUpgradeStep: Back up MySQL databases": [4.0, 4.0]},
+            "keystone": {"UpgradeStep: Change config of '*'": [2.0, 1.0]},
+        }
+
+
+def test_record_durations_write_error():
+    """Test recording durations when the history cannot be saved."""
+    history_file = MagicMock()
+    history_file.read_text.side_effect = FileNotFoundError
+    history_file.write_text.side_effect = PermissionError
+
+    with patch("cou.steps.estimate.COU_HISTORY_FILE", history_file):
+        cou_estimate.record_durations(
+            [
+                generate_span(
+                    1, None, "Back up MySQL databases", 0.0, 4.0, step_class="PreUpgradeStep"
+                )
+            ],
+            {},
+        )
+
+    history_file.write_text.assert_called_once()
+
+
+def test_estimate_plan():
+    """Test estimating plan with the tree and DAG execution policies."""
+    plan = _plan()
+    app_plan = plan.sub_steps[1]
+    units, config = app_plan.sub_steps[:2]
+
+    estimate = cou_estimate.estimate_plan(plan, HISTORY, {"keystone-app": "keystone"})
+
+    # the second unit depends on the first one and the config changes lock the application
+    assert estimate.get_total(plan) == 10.0 + 60.0 + 20.0
+    assert estimate.get_total(plan, "dag") == 10.0 + 60.0 + 40.0
+    assert estimate.durations["tree"][id(units)] == 60.0
+    assert estimate.durations["tree"][id(config)] == 20.0
+    assert estimate.durations["dag"][id(config)] == 40.0
+    # wait for the idle state has no history
+    assert estimate.unknown == 1
+
+
+def test_estimate_plan_application_chains():
+    """Test estimating upgrades of applications overlapping with the DAG execution policy."""
+    history = {
+        "*": {
+            "PreUpgradeStep: Verify '*' before the upgrade": [30.0],
+            "UpgradeStep: Refresh '*'": [10.0],
+            "UpgradeStep: Wait for up to Ns for app '*'": [60.0],
+        }
+    }
+    plan = UpgradePlan("Upgrade cloud from 'ussuri' to 'victoria'")
+    for app in ("glance", "keystone"):
+        app_plan = ApplicationUpgradePlan(f"Upgrade plan for '{app}' to 'victoria'")
+        app_plan.add_steps(
+            [
+                PreUpgradeStep(f"Verify '{app}' before the upgrade", coro=AsyncMock()()),
+                UpgradeStep(f"Refresh '{app}'", coro=AsyncMock()(), resource=app),
+                UpgradeStep(f"Wait for up to 300s for app '{app}'", coro=AsyncMock()()),
+            ]
+        )
+        plan.add_step(app_plan)
+
+    estimate = cou_estimate.estimate_plan(plan, history, {})
+
+    assert estimate.get_total(plan) == 2 * (30.0 + 10.0 + 60.0)
+    # keystone is verified while glance reaches the idle state
+    assert estimate.get_total(plan, "dag") == 30.0 + 10.0 + 60.0 + 10.0 + 60.0
+
+
+@pytest.mark.parametrize("max_parallel, exp_duration", [(None, 30.0), (1, 90.0), (2, 60.0)])
+def test_estimate_plan_max_parallel(max_parallel, exp_duration):
+    """Test estimating parallel group with limited number of steps running at the same time."""
+    plan = UpgradeStep("Upgrade units", parallel=True, max_parallel=max_parallel)
+    plan.add_steps(
+        [UnitUpgradeStep(f"Upgrade the unit: 'glance/{i}'", coro=AsyncMock()()) for i in range(3)]
+    )
+
+    estimate = cou_estimate.estimate_plan(plan, HISTORY, {})
+
+    assert estimate.get_total(plan) == exp_duration
+    assert estimate.unknown == 0
+
+
+def test_estimate_plan_max_workers():
+    """Test estimating plan with limited number of DAG workers."""
+    plan = _plan()
+
+    with patch("cou.steps.estimate.DAG_MAX_WORKERS", 1):
+        estimate = cou_estimate.estimate_plan(plan, HISTORY, {"keystone-app": "keystone"})
+
+    assert estimate.get_total(plan, "dag") == 10.0 + 90.0 + 40.0
+
+
+@pytest.mark.parametrize(
+    "seconds, exp_duration",
+    [(0.4, "0s"), (59, "59s"), (150.2, "2m 30s"), (3600, "1h 0m"), (5430, "1h 30m")],
+)
+def test_format_duration(seconds, exp_duration):
+    """Test formatting duration."""
+    assert cou_estimate.format_duration(seconds) == exp_duration
+
+
+def test_format_plan():
+    """Test dumping plan with the estimated durations of the groups of steps."""
+    plan = _plan()
+    estimate = cou_estimate.estimate_plan(plan, HISTORY, {"keystone-app": "keystone"})
+
+    assert cou_estimate.format_plan(plan, estimate) == dedent(
+        """\
+        Upgrade cloud from 'ussuri' to 'victoria' (~1m 30s)
+        \tBack up MySQL databases
+        \tUpgrade plan for 'keystone-app' to 'victoria' (~1m 20s)
+        \t\tUpgrade units (~1m 0s)
+        \t\t\tΨ Upgrade the unit: 'keystone-app/0'
+        \t\t\tΨ Upgrade the unit: 'keystone-app/1'
+        \t\t\tΨ Upgrade the unit: 'keystone-app/2'
+        \t\tChange config (~20s)
+        \t\t\tΨ Change config of 'debug'
+        \t\t\tΨ Change config of 'verbose'
+        \t\tWait for up to 300s for app 'keystone-app'
+        Estimated duration: 1m 30s with the 'tree' policy, 1m 50s with the 'dag' policy
+        Steps without history of their duration: 1
+        """
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_plan_estimate(model, tmp_path):
+    """Test estimating plan from the history, if there is any."""
+    model.get_charm_name.side_effect = None
+    model.get_charm_name.return_value = "keystone"
+    plan = _plan()
+    history_file = tmp_path / "history.json"
+
+    with patch("cou.steps.estimate.COU_HISTORY_FILE", history_file):
+        assert await cou_estimate.get_plan_estimate(model, plan) is None
+
+        history_file.write_text(json.dumps(HISTORY), encoding="utf-8")
+        estimate = await cou_estimate.get_plan_estimate(model, plan)
+
+    model.get_charm_name.assert_awaited_once_with("keystone-app")
+    assert estimate.get_total(plan) == 90.0
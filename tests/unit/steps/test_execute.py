@@ -34,6 +34,8 @@ from cou.steps.execute import (
     _run_sub_steps_sequentially,
     apply_step,
 )
+from cou.steps.journal import ExecutionJournal, execution_journal
+from cou.steps.tracing import StepTracer, step_tracer
 
 
 @pytest.mark.asyncio
@@ -42,6 +44,7 @@ async def test_run_sub_steps_in_parallel(mock_apply_step):
     """Test running all sub-steps of step in parallel."""
     upgrade_step = MagicMock(spec_set=UpgradeStep())
     upgrade_step.parallel = True
+    upgrade_step.max_parallel = None
     upgrade_step.sub_steps = sub_steps = [
         PreUpgradeStep("pre-upgrade"),
         UpgradeStep("upgrade"),
@@ -69,6 +72,7 @@ async def test_run_sub_steps_in_parallel_fail(mock_apply_step):
 
     upgrade_step = MagicMock(spec_set=UpgradeStep())
     upgrade_step.parallel = True
+    upgrade_step.max_parallel = None
     upgrade_step.sub_steps = sub_steps = [
         PreUpgradeStep("pre-upgrade"),
         UpgradeStep("upgrade 1"),
@@ -90,6 +94,190 @@ async def test_run_sub_steps_in_parallel_fail(mock_apply_step):
     mock_apply_step.assert_has_awaits([call(step, False, False) for step in sub_steps])
 
 
+@pytest.mark.asyncio
+@patch("cou.steps.execute.apply_step")
+async def test_run_sub_steps_in_parallel_max_parallel(mock_apply_step):
+    """Test running sub-steps in parallel with limited number of running sub-steps."""
+    running, max_running, started = set(), [], []
+
+    async def _apply_step(step, *args, **kwargs):
+        started.append(step.description)
+        running.add(step.description)
+        max_running.append(len(running))
+        # the first unit takes longer, so the next ones start as soon as a slot is free
+        await asyncio.sleep(0.2 if step.description == "unit 0" else 0.01)
+        running.remove(step.description)
+
+    upgrade_step = UpgradeStep("upgrade units", parallel=True, max_parallel=2)
+    upgrade_step.add_steps(UpgradeStep(f"unit {i}", coro=AsyncMock()) for i in range(5))
+    mock_apply_step.side_effect = _apply_step
+
+    await _run_sub_steps_in_parallel(upgrade_step, False, False)
+
+    assert max(max_running) == 2
+    assert started == [f"unit {i}" for i in range(5)]
+    # all other units were upgraded while the first one was still running
+    assert max_running[-1] == 2
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.execute.apply_step")
+async def test_run_sub_steps_in_parallel_max_parallel_fail(mock_apply_step):
+    """Test no new sub-step is started after a failure if number of sub-steps is limited."""
+    started = []
+
+    async def _apply_step(step, *args, **kwargs):
+        started.append(step.description)
+        await asyncio.sleep(0.01)
+        if step.description == "az 1":
+            raise Exception(step.description)
+
+    upgrade_step = UpgradeStep("upgrade azs", parallel=True, max_parallel=2)
+    upgrade_step.add_steps(UpgradeStep(f"az {i}", coro=AsyncMock()) for i in range(4))
+    mock_apply_step.side_effect = _apply_step
+
+    with pytest.raises(RunUpgradeError, match="az 1: Exception"):
+        await _run_sub_steps_in_parallel(upgrade_step, False, False)
+
+    assert started == ["az 0", "az 1"]
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.execute.apply_step")
+async def test_run_sub_steps_in_parallel_dependencies(mock_apply_step):
+    """Test running sub-steps in parallel after their dependencies."""
+    started, finished = [], []
+
+    async def _apply_step(step, *args, **kwargs):
+        started.append(step.description)
+        await asyncio.sleep(0.05 if step.description == "glance" else 0.01)
+        if step.description == "cinder":
+            raise Exception(step.description)
+
+        finished.append(step.description)
+
+    upgrade_step = UpgradeStep("upgrade apps", parallel=True)
+    keystone, glance, cinder, nova, octavia = steps = [
+        UpgradeStep(name, coro=AsyncMock())
+        for name in ["keystone", "glance", "cinder", "nova", "octavia"]
+    ]
+    upgrade_step.add_steps(steps)
+    glance.depends_on = cinder.depends_on = [keystone]
+    nova.depends_on = [glance]
+    octavia.depends_on = [nova, cinder]
+    mock_apply_step.side_effect = _apply_step
+
+    with pytest.raises(RunUpgradeError, match="cinder: Exception"):
+        await _run_sub_steps_in_parallel(upgrade_step, False, False)
+
+    # glance and cinder run at the same time after keystone, octavia is skipped
+    assert started == ["keystone", "glance", "cinder", "nova"]
+    assert finished == ["keystone", "glance", "nova"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prompt, exp_parallel", [(True, False), (False, True)])
+@patch("cou.steps.execute._run_sub_steps_sequentially")
+@patch("cou.steps.execute._run_sub_steps_in_parallel")
+async def test_run_step_parallel_prompt(mock_parallel, mock_sequentially, prompt, exp_parallel):
+    """Test running sub-steps with prompt sequentially."""
+    plan = UpgradePlan("upgrade apps")
+    plan.parallel = True
+    for name in ["keystone", "glance"]:
+        app_plan = ApplicationUpgradePlan(f"upgrade {name}")
+        app_plan.add_step(UpgradeStep(f"upgrade {name} charm", coro=AsyncMock()))
+        plan.add_step(app_plan)
+
+    await _run_step(plan, prompt)
+
+    if exp_parallel:
+        mock_parallel.assert_awaited_once_with(plan, prompt, False)
+        mock_sequentially.assert_not_awaited()
+    else:
+        mock_sequentially.assert_awaited_once_with(plan, prompt, False)
+        mock_parallel.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_apply_step_shared_slots():
+    """Test steps sharing slots in different parallel groups."""
+    slots = asyncio.Semaphore(2)
+    running, max_running = set(), []
+
+    async def _upgrade_unit(name):
+        running.add(name)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(name)
+
+    plan = UpgradeStep("upgrade azs", parallel=True)
+    for az in range(2):
+        units_step = UpgradeStep(f"upgrade units in az{az}", parallel=True)
+        for unit in range(3):
+            unit_step = UpgradeStep(f"unit {az}/{unit}", coro=_upgrade_unit(f"{az}/{unit}"))
+            unit_step.slots = slots
+            units_step.add_step(unit_step)
+
+        plan.add_step(units_step)
+
+    await apply_step(plan, False)
+
+    assert len(max_running) == 6
+    assert max(max_running) == 2
+
+
+@pytest.mark.asyncio
+async def test_apply_step_journal():
+    """Test skipping steps completed before and recording the execution in journal."""
+    plan = UpgradeStep("upgrade plan")
+    completed_step = UpgradeStep("completed step", coro=AsyncMock()())
+    step = UpgradeStep("step", coro=AsyncMock()())
+    plan.add_steps([completed_step, step])
+    journal = MagicMock(spec_set=ExecutionJournal)
+    journal.is_completed.side_effect = lambda step: step is completed_step
+    token = execution_journal.set(journal)
+
+    try:
+        await apply_step(plan, False)
+    finally:
+        execution_journal.reset(token)
+
+    assert completed_step.done is False
+    assert step.done is True
+    journal.start.assert_has_calls([call(plan), call(step)])
+    journal.complete.assert_has_calls([call(step), call(plan)])
+    assert journal.start.call_count == journal.complete.call_count == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error, exp_outcome",
+    [
+        (None, "ok"),
+        (HaltUpgradeExecution("halt"), "halted"),
+        (asyncio.CancelledError(), "canceled"),
+        (ValueError("failure"), "error"),
+    ],
+)
+async def test_apply_step_tracer(error, exp_outcome):
+    """Test recording span of the step run."""
+    step = UpgradeStep("step", coro=AsyncMock(side_effect=error)())
+    tracer = StepTracer(step)
+    token = step_tracer.set(tracer)
+
+    try:
+        await apply_step(step, False)
+    except (HaltUpgradeExecution, asyncio.CancelledError, ValueError):
+        pass
+    finally:
+        step_tracer.reset(token)
+
+    (span,) = tracer.spans
+    assert span.name == "step"
+    assert span.outcome == exp_outcome
+    assert span.end >= span.start
+
+
 @pytest.mark.asyncio
 @patch("cou.steps.execute.apply_step")
 async def test_run_sub_steps_sequentially(mock_apply_step):
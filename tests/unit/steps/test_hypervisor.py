@@ -16,15 +16,24 @@
 
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
+import pytest
+
 from cou.apps.base import OpenStackApplication
 from cou.apps.core import NovaCompute
 from cou.steps import (
     HypervisorUpgradePlan,
     PostUpgradeStep,
     PreUpgradeStep,
+    UnitUpgradeStep,
     UpgradeStep,
 )
-from cou.steps.hypervisor import AZs, HypervisorGroup, HypervisorUpgradePlanner
+from cou.steps.hypervisor import (
+    AZs,
+    HypervisorGroup,
+    HypervisorUpgradePlanner,
+    HypervisorUpgradePolicy,
+    get_max_unavailable_units,
+)
 from cou.utils.juju_utils import Application, Machine, SubordinateUnit, Unit
 from cou.utils.openstack import OpenStackRelease
 from tests.unit.utils import dedent_plan, generate_cou_machine
@@ -39,6 +48,9 @@ def _generate_app(name: str) -> MagicMock:
     app.post_upgrade_steps.return_value = [
         PostUpgradeStep(f"{name}-post-upgrade", coro=AsyncMock())
     ]
+    app.canary_verification_steps.return_value = [
+        PostUpgradeStep(f"{name}-canary-verification", coro=AsyncMock())
+    ]
     return app
 
 
@@ -108,6 +120,72 @@ def test_generate_upgrade_steps():
     assert steps == exp_steps
 
 
+@pytest.mark.parametrize(
+    "max_unavailable, units_count, exp_result",
+    [("2", 10, 2), ("20", 10, 20), ("10%", 300, 30), ("25%", 10, 2), ("10%", 5, 1)],
+)
+def test_get_max_unavailable_units(max_unavailable, units_count, exp_result):
+    """Test getting maximum number of units upgraded at the same time."""
+    assert get_max_unavailable_units(max_unavailable, units_count) == exp_result
+
+
+def _generate_units_upgrade_steps(app, units):
+    units_step = UpgradeStep(
+        f"Upgrade plan for units: {', '.join(unit.name for unit in units)}", parallel=True
+    )
+    units_step.add_steps(
+        UnitUpgradeStep(f"Upgrade plan for unit '{unit.name}'", coro=AsyncMock()) for unit in units
+    )
+    packages_step = UpgradeStep("Upgrade packages", parallel=True)
+    packages_step.add_steps(
+        UpgradeStep(f"Upgrade packages on {unit.name}", coro=AsyncMock()) for unit in units
+    )
+    app.upgrade_steps.return_value = [packages_step, units_step]
+    return packages_step, units_step
+
+
+@pytest.mark.parametrize("max_unavailable, exp_max_parallel", [("2", 2), ("50%", 1), ("3", None)])
+def test_generate_upgrade_steps_max_unavailable(max_unavailable, exp_max_parallel):
+    """Test generating of upgrade steps with limited number of units upgraded at same time."""
+    target = OpenStackRelease("victoria")
+    machines = [Machine(f"{i}", (), "az0") for i in range(3)]
+    units = [Unit(f"app1/{i}", machines[i], "1") for i in range(3)]
+    app = _generate_app("app1")
+    packages_step, units_step = _generate_units_upgrade_steps(app, units)
+    policy = HypervisorUpgradePolicy(max_unavailable=max_unavailable)
+    planner = HypervisorUpgradePlanner([app], machines, policy)
+
+    steps = planner._generate_upgrade_steps(target, False, HypervisorGroup("az0", {"app1": units}))
+
+    assert steps == [packages_step, units_step]
+    assert packages_step.max_parallel is None
+    assert units_step.max_parallel == exp_max_parallel
+    if exp_max_parallel:
+        assert units_step.description.endswith(f"(at most {exp_max_parallel} at a time)")
+
+
+def test_generate_upgrade_steps_max_unavailable_total():
+    """Test generating of upgrade steps sharing slots for units in all AZs."""
+    target = OpenStackRelease("victoria")
+    machines = [Machine(f"{i}", (), f"az{i % 2}") for i in range(4)]
+    units = [Unit(f"app1/{i}", machines[i], "1") for i in range(4)]
+    app = _generate_app("app1")
+    planner = HypervisorUpgradePlanner(
+        [app], machines, HypervisorUpgradePolicy(max_unavailable_total=3)
+    )
+
+    packages_step_az0, units_step_az0 = _generate_units_upgrade_steps(app, units[::2])
+    planner._generate_upgrade_steps(target, False, HypervisorGroup("az0", {"app1": units[::2]}))
+    packages_step_az1, units_step_az1 = _generate_units_upgrade_steps(app, units[1::2])
+    planner._generate_upgrade_steps(target, False, HypervisorGroup("az1", {"app1": units[1::2]}))
+
+    assert all(step.slots is None for step in packages_step_az0.sub_steps)
+    assert all(step.slots is None for step in packages_step_az1.sub_steps)
+    unit_steps = units_step_az0.sub_steps + units_step_az1.sub_steps
+    assert all(step.slots is planner._slots for step in unit_steps)
+    assert planner._slots._value == 3
+
+
 def test_generate_post_upgrade_steps():
     """Test generating of post-upgrade steps."""
     target = OpenStackRelease("victoria")
@@ -171,6 +249,146 @@ def test_generate_upgrade_plan(
     )
 
 
+@pytest.mark.parametrize(
+    "units_count, policy, exp_plan",
+    [
+        (
+            2,
+            HypervisorUpgradePolicy(canaries=2),
+            """\
+            Upgrade AZ
+                Upgrade packages
+                    Ψ Upgrade packages on app1/0
+                    Ψ Upgrade packages on app1/1
+                Upgrade plan for units: app1/0, app1/1
+                    Ψ Upgrade plan for unit 'app1/0'
+                    Ψ Upgrade plan for unit 'app1/1'
+            """,
+        ),
+        (
+            8,
+            HypervisorUpgradePolicy(canaries=1),
+            """\
+            Upgrade AZ
+                Upgrade packages
+                    Ψ Upgrade packages on app1/0
+                    Ψ Upgrade packages on app1/1
+                    Ψ Upgrade packages on app1/2
+                    Ψ Upgrade packages on app1/3
+                    Ψ Upgrade packages on app1/4
+                    Ψ Upgrade packages on app1/5
+                    Ψ Upgrade packages on app1/6
+                    Ψ Upgrade packages on app1/7
+                Upgrade plan for canary units: app1/0
+                    Ψ Upgrade plan for unit 'app1/0'
+                Verify upgrade of canary units: app1/0
+                    app1-canary-verification
+                Upgrade plan for units: app1/1, app1/2
+                    Ψ Upgrade plan for unit 'app1/1'
+                    Ψ Upgrade plan for unit 'app1/2'
+                Upgrade plan for units: app1/3, app1/4, app1/5, app1/6
+                    Ψ Upgrade plan for unit 'app1/3'
+                    Ψ Upgrade plan for unit 'app1/4'
+                    Ψ Upgrade plan for unit 'app1/5'
+                    Ψ Upgrade plan for unit 'app1/6'
+                Upgrade plan for units: app1/7
+                    Ψ Upgrade plan for unit 'app1/7'
+            """,
+        ),
+        (
+            7,
+            HypervisorUpgradePolicy(canaries=1, max_unavailable="3"),
+            """\
+            Upgrade AZ
+                Upgrade packages
+                    Ψ Upgrade packages on app1/0
+                    Ψ Upgrade packages on app1/1
+                    Ψ Upgrade packages on app1/2
+                    Ψ Upgrade packages on app1/3
+                    Ψ Upgrade packages on app1/4
+                    Ψ Upgrade packages on app1/5
+                    Ψ Upgrade packages on app1/6
+                Upgrade plan for canary units: app1/0
+                    Ψ Upgrade plan for unit 'app1/0'
+                Verify upgrade of canary units: app1/0
+                    app1-canary-verification
+                Upgrade plan for units: app1/1, app1/2
+                    Ψ Upgrade plan for unit 'app1/1'
+                    Ψ Upgrade plan for unit 'app1/2'
+                Upgrade plan for units: app1/3, app1/4, app1/5, app1/6 (at most 3 at a time)
+                    Ψ Upgrade plan for unit 'app1/3'
+                    Ψ Upgrade plan for unit 'app1/4'
+                    Ψ Upgrade plan for unit 'app1/5'
+                    Ψ Upgrade plan for unit 'app1/6'
+            """,
+        ),
+    ],
+)
+def test_generate_upgrade_steps_canaries(units_count, policy, exp_plan):
+    """Test generating of upgrade steps with canary units."""
+    target = OpenStackRelease("victoria")
+    machines = [Machine(f"{i}", (), "az0") for i in range(units_count)]
+    units = [Unit(f"app1/{i}", machines[i], "1") for i in range(units_count)]
+    app = _generate_app("app1")
+    _generate_units_upgrade_steps(app, units)
+    planner = HypervisorUpgradePlanner([app], machines, policy)
+    plan = UpgradeStep("Upgrade AZ")
+
+    plan.add_steps(
+        planner._generate_upgrade_steps(target, False, HypervisorGroup("az0", {"app1": units}))
+    )
+
+    assert str(plan) == dedent_plan(exp_plan)
+    if policy.canaries < units_count:
+        app.canary_verification_steps.assert_called_once_with(target, units[: policy.canaries])
+
+
+@pytest.mark.parametrize(
+    "policy, azs, exp_description, exp_parallel, exp_max_parallel",
+    [
+        (
+            HypervisorUpgradePolicy(),
+            ["az0", "az1"],
+            "Upgrading all applications deployed on machines with hypervisor.",
+            False,
+            None,
+        ),
+        (
+            HypervisorUpgradePolicy(max_parallel_azs=2),
+            ["az0"],
+            "Upgrading all applications deployed on machines with hypervisor.",
+            False,
+            None,
+        ),
+        (
+            HypervisorUpgradePolicy(max_parallel_azs=2),
+            ["az0", "az1", "az2"],
+            "Upgrading all applications deployed on machines with hypervisor "
+            "(at most 2 availability zones at a time).",
+            True,
+            2,
+        ),
+        (
+            HypervisorUpgradePolicy(max_parallel_azs=3, max_unavailable_total=10),
+            ["az0", "az1", "az2"],
+            "Upgrading all applications deployed on machines with hypervisor "
+            "(at most 3 availability zones, at most 10 hypervisors at a time).",
+            True,
+            3,
+        ),
+    ],
+)
+def test_create_upgrade_plan(policy, azs, exp_description, exp_parallel, exp_max_parallel):
+    """Test creating upgrade plan according to policy."""
+    planner = HypervisorUpgradePlanner([], [], policy)
+
+    plan = planner._create_upgrade_plan({az: MagicMock(spec_set=HypervisorGroup)() for az in azs})
+
+    assert plan.description == exp_description
+    assert plan.parallel is exp_parallel
+    assert plan.max_parallel == exp_max_parallel
+
+
 def test_hypervisor_group():
     """Test base logic of HypervisorGroup object."""
     group1 = HypervisorGroup("test", {"app1": []})
@@ -0,0 +1,170 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from unittest.mock import AsyncMock, PropertyMock, patch
+
+import pytest
+
+from cou.steps import UpgradeStep
+from cou.steps import journal as cou_journal
+from cou.steps.journal import ExecutionJournal
+from tests.unit.utils import generate_upgrade_plan
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    """Use temporary directory for execution journals."""
+    with patch("cou.steps.journal.COU_DIR_JOURNAL", tmp_path):
+        yield tmp_path
+
+
+def _plan():
+    return generate_upgrade_plan(
+        [
+            UpgradeStep("Wait for keystone", coro=AsyncMock()()),
+            UpgradeStep("Change config of keystone", coro=AsyncMock()()),
+            UpgradeStep("Wait for keystone", coro=AsyncMock()()),
+        ]
+    )
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_get_model_fingerprint(model):
+    """Test model fingerprint depends on model name and UUID."""
+    type(model).uuid = PropertyMock(return_value="uuid-1")
+    fingerprint = cou_journal.get_model_fingerprint(model)
+
+    assert cou_journal.get_model_fingerprint(model) == fingerprint
+    type(model).uuid = PropertyMock(return_value="uuid-2")
+    assert cou_journal.get_model_fingerprint(model) != fingerprint
+
+
+def test_get_journal_file():
+    """Test journal file of model."""
+    assert cou_journal.get_journal_file("admin/test-model") == (
+        cou_journal.COU_DIR_JOURNAL / "admin_test-model.jsonl"
+    )
+
+
+def test_get_step_ids():
+    """Test step identities are stable and unique."""
+    plan = _plan()
+
+    step_ids = cou_journal._get_step_ids(plan)
+
+    assert list(step_ids.values()) == list(cou_journal._get_step_ids(_plan()).values())
+    assert len(step_ids) == 5
+    assert len(set(step_ids.values())) == 5
+
+
+def test_journal_open(journal_dir, model):
+    """Test starting new journal."""
+    (journal_dir / "test_model.jsonl").write_text("previous journal")
+    plan = _plan()
+
+    journal = ExecutionJournal.open(model, plan)
+
+    assert journal.path == journal_dir / "test_model.jsonl"
+    assert journal.completed == set()
+    assert _records(journal.path) == [
+        {"fingerprint": journal.fingerprint, "plan": plan.description}
+    ]
+
+
+def test_journal_record_steps(journal_dir, model):
+    """Test recording start and completion of steps."""
+    plan = _plan()
+    journal = ExecutionJournal.open(model, plan)
+    app_plan = plan.sub_steps[1]
+
+    journal.start(app_plan)
+    journal.start(app_plan.sub_steps[0])
+    journal.complete(app_plan.sub_steps[0])
+    journal.complete(app_plan)  # not all sub-steps are completed
+    journal.complete(UpgradeStep("Step of another plan", coro=AsyncMock()()))
+
+    assert [(record["event"], record["description"]) for record in _records(journal.path)[1:]] == [
+        ("started", "Upgrade plan for 'keystone' to 'victoria'"),
+        ("started", "Wait for keystone"),
+        ("completed", "Wait for keystone"),
+    ]
+    assert journal.is_completed(app_plan.sub_steps[0]) is True
+    assert journal.is_completed(app_plan.sub_steps[2]) is False
+    assert journal.is_completed(app_plan) is False
+
+
+def test_journal_record_stopped_step(journal_dir, model):
+    """Test not recording completion of stopped step."""
+    plan = _plan()
+    journal = ExecutionJournal.open(model, plan)
+    step = plan.sub_steps[0]
+
+    with patch.object(UpgradeStep, "stopped", new_callable=PropertyMock, return_value=True):
+        journal.complete(step)
+
+    assert journal.is_completed(step) is False
+    assert len(_records(journal.path)) == 1
+
+
+def test_journal_resume(journal_dir, model):
+    """Test resuming with steps completed in previous run."""
+    previous_plan = _plan()
+    journal = ExecutionJournal.open(model, previous_plan)
+    journal.complete(previous_plan.sub_steps[0])
+    journal.complete(previous_plan.sub_steps[1].sub_steps[0])
+
+    plan = _plan()
+    journal = ExecutionJournal.open(model, plan, resume=True)
+
+    assert journal.is_completed(plan.sub_steps[0]) is True
+    assert journal.is_completed(plan.sub_steps[1].sub_steps[0]) is True
+    assert journal.is_completed(plan.sub_steps[1].sub_steps[2]) is False
+    assert journal.is_completed(plan) is False
+
+    for step in plan.sub_steps[1].sub_steps[1:]:
+        journal.complete(step)
+    journal.complete(plan.sub_steps[1])
+    journal.complete(plan)
+
+    assert journal.is_completed(plan) is True
+    journal.remove()
+    assert not journal.path.exists()
+
+
+def test_journal_resume_another_model(journal_dir, model):
+    """Test ignoring journal of another model with the same name."""
+    plan = _plan()
+    journal = ExecutionJournal.open(model, plan)
+    journal.complete(plan.sub_steps[0])
+    type(model).uuid = PropertyMock(return_value="another-uuid")
+
+    journal = ExecutionJournal.open(model, plan, resume=True)
+
+    assert journal.completed == set()
+    assert len(_records(journal.path)) == 1
+
+
+@pytest.mark.parametrize("content", [None, "", "invalid"])
+def test_journal_resume_no_journal(content, journal_dir, model):
+    """Test resuming without valid journal starts from the beginning."""
+    if content is not None:
+        (journal_dir / "test_model.jsonl").write_text(content)
+
+    journal = ExecutionJournal.open(model, _plan(), resume=True)
+
+    assert journal.completed == set()
+    assert len(_records(journal.path)) == 1
@@ -0,0 +1,188 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from juju.errors import JujuError
+
+from cou.exceptions import CommandRunFailed, UnitNotFound
+from cou.steps import PreUpgradeStep, UpgradePlan
+from cou.steps.packages import (
+    PackageUpgradeStep,
+    deduplicate_package_upgrades,
+    skip_up_to_date_package_upgrades,
+)
+from cou.utils.juju_utils import Unit
+from tests.unit.utils import dedent_plan, generate_cou_machine
+
+
+def _packages_step(app, units, model, packages_to_hold=None):
+    step = PreUpgradeStep(f"Upgrade software packages of '{app}'", parallel=True)
+    step.add_steps(PackageUpgradeStep(unit, model, packages_to_hold) for unit in units)
+    return step
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.packages.upgrade_packages")
+async def test_package_upgrade_step(mock_upgrade_packages, model):
+    """Test PackageUpgradeStep upgrading packages on unit."""
+    unit = Unit("mysql/0", generate_cou_machine("0"), "8.0")
+
+    step = PackageUpgradeStep(unit, model, ["mysql-server-core-8.0"])
+
+    assert step.description == "Upgrade software packages on unit 'mysql/0'"
+    assert step.unit == unit
+    assert step.model == model
+    assert step.packages_to_hold == ["mysql-server-core-8.0"]
+    mock_upgrade_packages.assert_not_called()
+
+    await step.run()
+
+    mock_upgrade_packages.assert_awaited_once_with("mysql/0", model, ["mysql-server-core-8.0"])
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.packages.upgrade_packages")
+async def test_deduplicate_package_upgrades(mock_upgrade_packages, model):
+    """Test upgrading packages only once on machines with colocated units."""
+    machines = [generate_cou_machine(str(i)) for i in range(3)]
+    cinder_units = [Unit(f"cinder-volume/{i}", machines[i], "17.0.1") for i in range(2)]
+    nova_units = [Unit(f"nova-compute/{i}", machines[i + 1], "21.2.4") for i in range(2)]
+    plan = UpgradePlan("Upgrade cloud")
+    hypervisor_plan = UpgradePlan("Upgrade plan for hypervisors in 'az1'")
+    hypervisor_plan.add_step(_packages_step("cinder-volume", cinder_units, model, ["cinder"]))
+    hypervisor_plan.add_step(PreUpgradeStep("Disable nova-compute scheduler", coro=AsyncMock()()))
+    hypervisor_plan.add_step(_packages_step("nova-compute", nova_units, model))
+    plan.add_step(hypervisor_plan)
+
+    removed = deduplicate_package_upgrades(plan)
+
+    assert removed == 1
+    assert str(plan) == dedent_plan(
+        """\
+        Upgrade cloud
+            Upgrade plan for hypervisors in 'az1'
+                Upgrade software packages of 'cinder-volume'
+                    Ψ Upgrade software packages on unit 'cinder-volume/0'
+                Disable nova-compute scheduler
+                Upgrade software packages of 'nova-compute'
+                    Ψ Upgrade software packages on machine '1' for units 'cinder-volume/1', 'nova-compute/0'
+                    Ψ Upgrade software packages on unit 'nova-compute/1'
+        """  # noqa: E501 line too long
+    )
+    merged_step = hypervisor_plan.sub_steps[2].sub_steps[0]
+    assert merged_step.unit == nova_units[0]
+    assert merged_step.packages_to_hold == ["cinder"]
+
+    await merged_step.run()
+
+    mock_upgrade_packages.assert_awaited_once_with("nova-compute/0", model, ["cinder"])
+
+
+def test_deduplicate_package_upgrades_different_phases(model):
+    """Test upgrading packages of colocated units in different phases of the plan."""
+    machines = [generate_cou_machine(str(i)) for i in range(2)]
+    nova_units = [Unit(f"nova-compute/{i}", machines[i], "21.2.4") for i in range(2)]
+    ceph_units = [Unit(f"ceph-osd/{i}", machines[i], "15.2.0") for i in range(2)]
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(PreUpgradeStep("Set 'noout' on ceph cluster"))
+    hypervisor_plan = UpgradePlan("Upgrade plan for hypervisors in 'az1'")
+    hypervisor_plan.add_step(_packages_step("nova-compute", nova_units, model))
+    plan.add_step(hypervisor_plan)
+    ceph_plan = UpgradePlan("Upgrade plan for 'ceph-osd'")
+    ceph_plan.add_step(_packages_step("ceph-osd", ceph_units, model, ["ceph"]))
+    plan.add_step(ceph_plan)
+    expected_plan = str(plan)
+
+    assert deduplicate_package_upgrades(plan) == 0
+    assert str(plan) == expected_plan
+    assert [step.unit for step in ceph_plan.sub_steps[0].sub_steps] == ceph_units
+    assert all(step.packages_to_hold == ["ceph"] for step in ceph_plan.sub_steps[0].sub_steps)
+
+
+def test_deduplicate_package_upgrades_no_colocation(model):
+    """Test upgrading packages of units on different machines."""
+    units = [Unit(f"keystone/{i}", generate_cou_machine(str(i)), "17.0.1") for i in range(2)]
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_packages_step("keystone", units, model))
+    expected_plan = str(plan)
+
+    assert deduplicate_package_upgrades(plan) == 0
+    assert str(plan) == expected_plan
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.packages.get_upgradable_packages", new_callable=AsyncMock)
+async def test_skip_up_to_date_package_upgrades(mock_get_upgradable_packages, model):
+    """Test skipping package upgrades of units without upgradable packages."""
+    upgradable_packages = {
+        "keystone/0": [],
+        "keystone/1": ["python3-keystone"],
+        "keystone/2": CommandRunFailed("apt list --upgradable", {"return-code": 1}),
+        "mysql/0": ["mysql-server-core-8.0"],
+    }
+
+    def get_upgradable_packages(unit, _):
+        if isinstance(result := upgradable_packages[unit], Exception):
+            raise result
+        return result
+
+    mock_get_upgradable_packages.side_effect = get_upgradable_packages
+    keystone_units = [
+        Unit(f"keystone/{i}", generate_cou_machine(str(i)), "17.0.1") for i in range(3)
+    ]
+    mysql_units = [Unit("mysql/0", generate_cou_machine("3"), "8.0")]
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_packages_step("keystone", keystone_units, model))
+    plan.add_step(_packages_step("mysql", mysql_units, model, ["mysql-server-core-8.0"]))
+
+    skipped, total = await skip_up_to_date_package_upgrades(plan)
+
+    assert (skipped, total) == (2, 4)
+    assert str(plan) == dedent_plan(
+        """\
+        Upgrade cloud
+            Upgrade software packages of 'keystone' (skipped 1 of 3 without upgradable packages)
+                Ψ Upgrade software packages on unit 'keystone/1'
+                Ψ Upgrade software packages on unit 'keystone/2'
+        """
+    )
+    assert plan.sub_steps[1].description == (
+        "Upgrade software packages of 'mysql' (skipped 1 of 1 without upgradable packages)"
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [
+        CommandRunFailed("apt list --upgradable", {"return-code": 1}),
+        UnitNotFound("Unit keystone/0 was not found"),
+        JujuError("connection lost"),
+        asyncio.TimeoutError(),
+        KeyError("stdout"),
+    ],
+)
+@patch("cou.steps.packages.get_upgradable_packages", new_callable=AsyncMock)
+async def test_skip_up_to_date_package_upgrades_error(mock_get_upgradable_packages, error, model):
+    """Test keeping package upgrades of units where the packages cannot be listed."""
+    mock_get_upgradable_packages.side_effect = error
+    units = [Unit(f"keystone/{i}", generate_cou_machine(str(i)), "17.0.1") for i in range(2)]
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(_packages_step("keystone", units, model))
+    expected_plan = str(plan)
+
+    assert await skip_up_to_date_package_upgrades(plan) == (0, 2)
+    assert str(plan) == expected_plan
@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
+import logging
 from unittest.mock import AsyncMock, MagicMock, PropertyMock, call, patch
 
 import pytest
@@ -42,10 +44,14 @@ from cou.steps import (
     ceph,
 )
 from cou.steps import plan as cou_plan
-from cou.steps.analyze import Analysis
+from cou.steps.analyze import Analysis, Topology
 from cou.steps.backup import backup
 from cou.steps.ceph import set_require_osd_release_option
-from cou.steps.hypervisor import HypervisorGroup, HypervisorUpgradePlanner
+from cou.steps.hypervisor import (
+    HypervisorGroup,
+    HypervisorUpgradePlanner,
+    HypervisorUpgradePolicy,
+)
 from cou.steps.nova_cloud_controller import archive, purge
 from cou.utils import app_utils
 from cou.utils.juju_utils import Machine, Unit
@@ -540,6 +546,120 @@ async def test_pre_plan_sanity_checks(
     mock_verify_model_idle.assert_awaited_once_with(mock_analysis_result)
 
 
+@pytest.mark.asyncio
+@patch("cou.steps.plan._verify_model_idle")
+@patch("cou.steps.plan._verify_osd_noout_unset")
+@patch("cou.steps.plan._verify_ceph_running_versions_consistent")
+@patch("cou.steps.plan._verify_vault_is_unsealed")
+@patch("cou.steps.plan._verify_hypervisors_cli_input", new=MagicMock())
+@patch("cou.steps.plan._verify_supported_series", new=MagicMock())
+@patch("cou.steps.plan._verify_highest_release_achieved", new=MagicMock())
+@patch("cou.steps.plan._verify_data_plane_ready_to_upgrade", new=MagicMock())
+@patch("cou.steps.plan._verify_nova_cloud_controller_scheduler_default_filters", new=MagicMock())
+async def test_verify_cloud_concurrent_checks_messages_order(
+    mock_verify_vault_is_unsealed,
+    mock_verify_ceph_running_versions_consistent,
+    mock_verify_osd_noout_unset,
+    mock_verify_model_idle,
+    cli_args,
+    caplog,
+):
+    """Test concurrent verifications add their messages in a deterministic order."""
+    started = asyncio.Event()
+
+    async def verification(message, message_type, wait=False):
+        if wait:
+            # wait for another verification to start, so they are running concurrently
+            await started.wait()
+        else:
+            started.set()
+        cou_plan.PlanStatus.add_message(message, message_type)
+
+    async def verify_vault_is_unsealed(_):
+        await verification("vault", cou_plan.MessageType.ERROR, wait=True)
+
+    async def verify_ceph_running_versions_consistent(_):
+        await verification("ceph", cou_plan.MessageType.WARNING, wait=True)
+
+    async def verify_osd_noout_unset(_):
+        await verification("noout", cou_plan.MessageType.ERROR, wait=True)
+
+    async def verify_model_idle(_):
+        await verification("idle", cou_plan.MessageType.ERROR)
+
+    mock_verify_vault_is_unsealed.side_effect = verify_vault_is_unsealed
+    mock_verify_ceph_running_versions_consistent.side_effect = (
+        verify_ceph_running_versions_consistent
+    )
+    mock_verify_osd_noout_unset.side_effect = verify_osd_noout_unset
+    mock_verify_model_idle.side_effect = verify_model_idle
+
+    with caplog.at_level(logging.DEBUG):
+        durations = await cou_plan.verify_cloud(MagicMock(spec=Analysis)(), cli_args)
+
+    assert cou_plan.PlanStatus.error_messages == ["vault", "noout", "idle"]
+    assert cou_plan.PlanStatus.warning_messages == ["ceph"]
+    assert list(durations) == [
+        "vault is unsealed",
+        "ceph running versions are consistent",
+        "ceph osd noout is unset",
+        "model is idle",
+    ]
+    assert "Verifying model is idle took" in caplog.text
+
+
+@pytest.mark.asyncio
+@patch("cou.steps.plan._verify_model_idle")
+@patch("cou.steps.plan._verify_osd_noout_unset")
+@patch("cou.steps.plan._verify_ceph_running_versions_consistent")
+@patch("cou.steps.plan._verify_vault_is_unsealed")
+@patch("cou.steps.plan._verify_hypervisors_cli_input", new=MagicMock())
+@patch("cou.steps.plan._verify_supported_series", new=MagicMock())
+@patch("cou.steps.plan._verify_highest_release_achieved", new=MagicMock())
+@patch("cou.steps.plan._verify_data_plane_ready_to_upgrade", new=MagicMock())
+@patch("cou.steps.plan._verify_nova_cloud_controller_scheduler_default_filters", new=MagicMock())
+async def test_verify_cloud_concurrent_checks_failed(
+    mock_verify_vault_is_unsealed,
+    mock_verify_ceph_running_versions_consistent,
+    mock_verify_osd_noout_unset,
+    mock_verify_model_idle,
+    cli_args,
+):
+    """Test failed concurrent verifications raise the first error after all are done."""
+    finished = asyncio.Event()
+
+    async def verify_osd_noout_unset(_):
+        cou_plan.PlanStatus.add_message("noout", cou_plan.MessageType.WARNING)
+
+    async def verify_model_idle(_):
+        await asyncio.sleep(0)
+        cou_plan.PlanStatus.add_message("idle", cou_plan.MessageType.ERROR)
+        finished.set()
+
+    mock_verify_vault_is_unsealed.side_effect = COUException("vault")
+    mock_verify_ceph_running_versions_consistent.side_effect = ValueError("ceph")
+    mock_verify_osd_noout_unset.side_effect = verify_osd_noout_unset
+    mock_verify_model_idle.side_effect = verify_model_idle
+
+    with pytest.raises(COUException, match="vault"):
+        await cou_plan.verify_cloud(MagicMock(spec=Analysis)(), cli_args)
+
+    assert finished.is_set()
+    assert cou_plan.PlanStatus.warning_messages == ["noout"]
+    assert cou_plan.PlanStatus.error_messages == ["idle"]
+
+
+@pytest.mark.asyncio
+async def test_run_verification_failed(caplog):
+    """Test failing verification still reports its duration."""
+    verification = AsyncMock(side_effect=ValueError("test"))
+
+    with caplog.at_level(logging.DEBUG), pytest.raises(ValueError, match="test"):
+        await cou_plan._run_verification("something", verification, MagicMock())
+
+    assert "Verifying something took" in caplog.text
+
+
 @pytest.mark.parametrize(
     "o7k_release, current_series, exp_error_msg",
     [
@@ -840,11 +960,118 @@ def test_create_upgrade_plan(force):
     app.generate_upgrade_plan.assert_called_once_with(target, force)
 
 
-@patch("cou.steps.plan._get_nova_compute_units_and_machines")
+def test_create_upgrade_plan_parallel():
+    """Test _create_upgrade_group upgrading applications in parallel."""
+    target = OpenStackRelease("victoria")
+    apps = []
+    for name, charm in [
+        ("keystone", "keystone"),
+        ("glance", "glance"),
+        ("cinder", "cinder"),
+        ("my-app", "my-charm"),
+    ]:
+        app = MagicMock(spec=OpenStackApplication)
+        app.name = name
+        app.charm = charm
+        app.generate_upgrade_plan.return_value = ApplicationUpgradePlan(
+            f"Upgrade plan for '{name}' to '{target}'"
+        )
+        app.generate_upgrade_plan.return_value.add_step(UpgradeStep(name, coro=AsyncMock()))
+        apps.append(app)
+
+    plan = cou_plan._create_upgrade_group(apps, target, "Upgrade group", False, max_parallel=2)
+
+    assert str(plan) == dedent_plan(
+        """\
+        Upgrade group (at most 2 applications at a time)
+            Ψ Upgrade plan for 'keystone' to 'victoria'
+                keystone
+            Ψ Upgrade plan for 'glance' to 'victoria' after 'keystone'
+                glance
+            Ψ Upgrade plan for 'cinder' to 'victoria' after 'keystone'
+                cinder
+            Ψ Upgrade plan for 'my-app' to 'victoria' after 'glance', 'cinder'
+                my-app
+        """
+    )
+    assert plan.max_parallel == 2
+    keystone_plan, glance_plan, cinder_plan, my_app_plan = plan.sub_steps
+    assert keystone_plan.depends_on == []
+    assert glance_plan.depends_on == [keystone_plan]
+    assert cinder_plan.depends_on == [keystone_plan]
+    assert my_app_plan.depends_on == [glance_plan, cinder_plan]
+
+
+@patch("cou.steps.plan._create_upgrade_group")
+def test_create_subordinate_upgrade_group_sequential(mock_create_upgrade_group):
+    """Test _create_subordinate_upgrade_group upgrading subordinates one by one."""
+    target = OpenStackRelease("victoria")
+    apps = [MagicMock(spec=SubordinateApplication)]
+
+    plan = cou_plan._create_subordinate_upgrade_group(apps, target, False)
+
+    assert plan == mock_create_upgrade_group.return_value
+    mock_create_upgrade_group.assert_called_once_with(
+        apps, target, "Subordinate(s) upgrade plan", False
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_subordinate_upgrade_group_parallel(model):
+    """Test _create_subordinate_upgrade_group upgrading subordinates in parallel."""
+    target = OpenStackRelease("victoria")
+    apps = []
+    for name in ["keystone-ldap", "hacluster", "mysql-router"]:
+        app = MagicMock(spec=SubordinateApplication)
+        app.name = name
+        app.model = model
+        app.generate_upgrade_plan.return_value = ApplicationUpgradePlan(
+            f"Upgrade plan for '{name}' to '{target}'"
+        )
+        app.generate_upgrade_plan.return_value.add_step(UpgradeStep(name, coro=AsyncMock()))
+        apps.append(app)
+
+    # mysql-router does not need to be upgraded
+    apps[2].generate_upgrade_plan.side_effect = HaltUpgradePlanGeneration
+
+    plan = cou_plan._create_subordinate_upgrade_group(apps, target, False, max_parallel=2)
+
+    assert str(plan) == dedent_plan(
+        """\
+        Subordinate(s) upgrade plan
+            Upgrade subordinate charms (at most 2 applications at a time)
+                Ψ Upgrade plan for 'keystone-ldap' to 'victoria'
+                    keystone-ldap
+                Ψ Upgrade plan for 'hacluster' to 'victoria'
+                    hacluster
+            Wait for up to 300s for apps 'keystone-ldap', 'hacluster' to reach the idle state
+        """
+    )
+    charms_upgrade_plan, wait_step = plan.sub_steps
+    assert charms_upgrade_plan.max_parallel == 2
+    assert wait_step.parallel is False
+    model.wait_for_idle.assert_not_called()
+    await wait_step.run()
+    model.wait_for_idle.assert_awaited_once_with(300, apps=["keystone-ldap", "hacluster"])
+    for app in apps:
+        app.generate_upgrade_plan.assert_called_once_with(target, False, wait=False)
+
+
+def test_create_subordinate_upgrade_group_parallel_empty():
+    """Test _create_subordinate_upgrade_group without any subordinate to upgrade."""
+    target = OpenStackRelease("victoria")
+    app = MagicMock(spec=SubordinateApplication)
+    app.name = "keystone-ldap"
+    app.generate_upgrade_plan.side_effect = HaltUpgradePlanGeneration
+
+    plan = cou_plan._create_subordinate_upgrade_group([app], target, False, max_parallel=2)
+
+    assert plan.description == "Subordinate(s) upgrade plan"
+    assert plan.sub_steps == []
+
+
 @patch("cou.steps.plan.verify_hypervisors_membership")
-def test_verify_hypervisors_cli_input_machines(
-    mock_verify_hypervisors_membership, mock_nova_compute, cli_args
-):
+def test_verify_hypervisors_cli_input_machines(mock_verify_hypervisors_membership, cli_args):
     machine0 = MagicMock(spec_set=Machine)()
     machine0.machine_id = "0"
     machine0.az = "zone-0"
@@ -853,13 +1080,13 @@ def test_verify_hypervisors_cli_input_machines(
     machine1.machine_id = "1"
     machine1.az = "zone-1"
 
-    nova_compute_machines = [machine0]
-    mock_nova_compute.return_value = (MagicMock(), nova_compute_machines)
+    nova_compute_machines = {machine0}
     cli_args.machines = {"0"}
     cli_args.availability_zones = None
 
     analysis_result = MagicMock(spec_set=Analysis)()
     analysis_result.machines.return_value = {"0": machine0, "1": machine1}
+    analysis_result.nova_compute_machines = nova_compute_machines
 
     assert cou_plan._verify_hypervisors_cli_input(cli_args, analysis_result) is None
 
@@ -871,11 +1098,8 @@ def test_verify_hypervisors_cli_input_machines(
     )
 
 
-@patch("cou.steps.plan._get_nova_compute_units_and_machines")
 @patch("cou.steps.plan.verify_hypervisors_membership")
-def test_verify_hypervisors_cli_input_azs(
-    mock_verify_hypervisors_membership, mock_nova_compute, cli_args
-):
+def test_verify_hypervisors_cli_input_azs(mock_verify_hypervisors_membership, cli_args):
     machine0 = MagicMock(spec_set=Machine)()
     machine0.machine_id = "0"
     machine0.az = "zone-0"
@@ -884,13 +1108,13 @@ def test_verify_hypervisors_cli_input_azs(
     machine1.machine_id = "1"
     machine1.az = "zone-1"
 
-    nova_compute_machines = [machine0]
-    mock_nova_compute.return_value = (MagicMock(), nova_compute_machines)
+    nova_compute_machines = {machine0}
     cli_args.machines = None
     cli_args.availability_zones = {"zone-0"}
 
     analysis_result = MagicMock(spec_set=Analysis)()
     analysis_result.machines.return_value = {"0": machine0, "1": machine1}
+    analysis_result.nova_compute_machines = nova_compute_machines
 
     assert cou_plan._verify_hypervisors_cli_input(cli_args, analysis_result) is None
 
@@ -906,12 +1130,8 @@ def test_verify_hypervisors_cli_input_azs(
     )
 
 
-@patch("cou.steps.plan._get_nova_compute_units_and_machines")
 @patch("cou.steps.plan.verify_hypervisors_membership")
-def test_verify_hypervisors_cli_input_None(
-    mock_verify_hypervisors_membership, mock_nova_compute, cli_args
-):
-    mock_nova_compute.return_value = [MagicMock(), MagicMock()]
+def test_verify_hypervisors_cli_input_None(mock_verify_hypervisors_membership, cli_args):
     cli_args.machines = None
     cli_args.availability_zones = None
 
@@ -919,7 +1139,6 @@ def test_verify_hypervisors_cli_input_None(
 
     assert cou_plan._verify_hypervisors_cli_input(cli_args, analysis_result) is None
 
-    mock_nova_compute.assert_called_once_with(analysis_result.apps_data_plane)
     mock_verify_hypervisors_membership.assert_not_called()
 
 
@@ -1022,58 +1241,52 @@ def test_verify_hypervisors_membership_raise_valid_openstack(
 
 
 @pytest.mark.parametrize(
-    "force, cli_machines, cli_azs, expected_machines",
+    "cli_machines, cli_azs, expected_machines",
     [
         # machines input
-        (False, {"0", "1", "2"}, None, {"0", "1"}),
-        (False, {"2"}, None, set()),
-        (False, {"0", "1"}, None, {"0", "1"}),
-        (False, {"0"}, None, {"0"}),
-        (True, {"0", "1", "2"}, None, {"0", "1", "2"}),
-        (True, {"2"}, None, {"2"}),
-        (True, {"0"}, None, {"0"}),
+        ({"0", "1", "2"}, None, ["0", "1", "2"]),
+        ({"2"}, None, ["2"]),
+        ({"0", "3"}, None, ["0"]),
         # az input
-        (False, None, {"zone-1", "zone-2", "zone-3"}, {"0", "1"}),
-        (False, None, {"zone-3"}, set()),
-        (False, None, {"zone-1", "zone-2"}, {"0", "1"}),
-        (False, None, {"zone-1"}, {"0"}),
-        (True, None, {"zone-1", "zone-2", "zone-3"}, {"0", "1", "2"}),
-        (True, None, {"zone-3"}, {"2"}),
-        (True, None, {"zone-1"}, {"0"}),
+        (None, {"zone-1", "zone-2", "zone-3"}, ["0", "1", "2"]),
+        (None, {"zone-3"}, ["2"]),
+        (None, {"zone-1", "zone-4"}, ["0"]),
         # no input
-        (False, None, None, {"0", "1"}),
-        (True, None, None, {"0", "1", "2"}),
+        (None, None, ["0", "1", "2"]),
     ],
 )
 @pytest.mark.asyncio
 @patch("cou.steps.plan._get_upgradable_hypervisors_machines")
 async def test_filter_hypervisors_machines(
     mock_hypervisors_machines,
-    force,
     cli_machines,
     cli_azs,
     expected_machines,
     cli_args,
 ):
-    empty_hypervisors_machines = {
-        Machine(str(machine_id), (), f"zone-{machine_id + 1}") for machine_id in range(2)
-    }
-    # assuming that machine-2 has some VMs running
-    non_empty_hypervisor_machine = Machine("2", (), "zone-3")
-
-    upgradable_hypervisors = empty_hypervisors_machines
-    if force:
-        upgradable_hypervisors.add(non_empty_hypervisor_machine)
-
-    mock_hypervisors_machines.return_value = upgradable_hypervisors
+    """Test filtering hypervisors before checking if they can be upgraded."""
+    machines = [Machine(str(machine_id), (), f"zone-{machine_id + 1}") for machine_id in range(3)]
+    units = [Unit(f"nova-compute/{machine.machine_id}", machine, "21.0.0") for machine in machines]
 
     cli_args.machines = cli_machines
     cli_args.availability_zones = cli_azs
-    cli_args.force = force
 
-    machines = await cou_plan._filter_hypervisors_machines(cli_args, MagicMock())
+    analysis_result = MagicMock(spec_set=Analysis)()
+    analysis_result.nova_compute_units = set(units)
+    analysis_result.topology = Topology(
+        machine_apps={},
+        az_machines={machine.az: {machine} for machine in machines},
+        charm_units={},
+    )
 
-    assert {machine.machine_id for machine in machines} == expected_machines
+    machines = await cou_plan._filter_hypervisors_machines(cli_args, analysis_result)
+
+    assert machines == mock_hypervisors_machines.return_value
+    mock_hypervisors_machines.assert_awaited_once_with(
+        cli_args.force,
+        [unit for unit in units if unit.machine.machine_id in expected_machines],
+        analysis_result,
+    )
 
 
 @pytest.mark.parametrize(
@@ -1103,29 +1316,26 @@ async def test_get_upgradable_hypervisors_machines(
     mock_empty_hypervisors, cli_force, empty_hypervisors, expected_result
 ):
     machines = {f"{i}": Machine(f"{i}", (), f"zone-{i + 1}") for i in range(3)}
-    nova_compute = MagicMock(spec_set=OpenStackApplication)()
-    nova_compute.charm = "nova-compute"
-    nova_compute.units = {
-        f"nova-compute/{i}": Unit(
+    units = [
+        Unit(
             name=f"nova-compute/{i}",
             workload_version="21.0.0",
             machine=machines[f"{i}"],
         )
         for i in range(3)
-    }
+    ]
     analysis_result = MagicMock(spec_set=Analysis)()
-    analysis_result.data_plane_machines = analysis_result.machines = machines
-    analysis_result.apps_data_plane = [nova_compute]
+    analysis_result.apps = get_applications("nova-cloud-controller")
     mock_empty_hypervisors.return_value = {
         machines[f"{machine_id}"] for machine_id in empty_hypervisors
     }
     hypervisors_possible_to_upgrade = await cou_plan._get_upgradable_hypervisors_machines(
-        cli_force, analysis_result
+        cli_force, units, analysis_result
     )
 
     if not cli_force:
         mock_empty_hypervisors.assert_called_once_with(
-            [unit for unit in nova_compute.units.values()], analysis_result.model
+            units, analysis_result.model, "nova-cloud-controller-0/0"
         )
     else:
         mock_empty_hypervisors.assert_not_called()
@@ -1135,6 +1345,22 @@ async def test_get_upgradable_hypervisors_machines(
     } == expected_result
 
 
+@pytest.mark.parametrize(
+    "apps, exp_unit",
+    [
+        ([], None),
+        (get_applications("nova-cloud-controller", unit_count=0), None),
+        (get_applications("nova-cloud-controller", unit_count=3), "nova-cloud-controller-0/0"),
+    ],
+)
+def test_get_nova_cloud_controller_unit(apps, exp_unit):
+    """Test getting nova-cloud-controller unit to query instance counts."""
+    analysis_result = MagicMock(spec_set=Analysis)()
+    analysis_result.apps = apps
+
+    assert cou_plan._get_nova_cloud_controller_unit(analysis_result) == exp_unit
+
+
 @patch("cou.steps.plan._get_purge_data_steps", return_value=["purge_step"])
 @patch("cou.steps.plan._get_archive_data_steps", return_value=["archive_step"])
 @patch("cou.steps.plan._get_backup_steps", return_value=["backup_step"])
@@ -1329,8 +1555,9 @@ def test_get_post_upgrade_steps_ceph_mon(upgrade_group):
     ]
 
 
+@patch("cou.steps.plan._create_subordinate_upgrade_group")
 @patch("cou.steps.plan._create_upgrade_group")
-def test_generate_control_plane_plan(mock_create_upgrade_group):
+def test_generate_control_plane_plan(mock_create_upgrade_group, mock_create_subordinate_group):
     target = OpenStackRelease("victoria")
     force = False
 
@@ -1340,27 +1567,23 @@ def test_generate_control_plane_plan(mock_create_upgrade_group):
     keystone_ldap = MagicMock(spec_set=SubordinateApplication)()
     keystone_ldap.is_subordinate = True
 
-    cou_plan._generate_control_plane_plan(target, [keystone, keystone_ldap], force)
-
-    expected_calls = [
-        call(
-            apps=[keystone],
-            description="Control Plane principal(s) upgrade plan",
-            target=target,
-            force=force,
-        ),
-        call(
-            apps=[keystone_ldap],
-            description="Subordinate(s) upgrade plan",
-            target=target,
-            force=force,
-        ),
-    ]
+    cou_plan._generate_control_plane_plan(target, [keystone, keystone_ldap], force, 3, 4)
 
-    mock_create_upgrade_group.assert_has_calls(expected_calls)
+    mock_create_upgrade_group.assert_called_once_with(
+        apps=[keystone],
+        description="Control Plane principal(s) upgrade plan",
+        target=target,
+        force=force,
+        max_parallel=3,
+    )
+    mock_create_subordinate_group.assert_called_once_with(
+        apps=[keystone_ldap], target=target, force=force, max_parallel=4
+    )
 
 
 @pytest.mark.asyncio
+@patch("cou.steps.plan.merge_idle_waits", return_value=3)
+@patch("cou.steps.plan.deduplicate_package_upgrades", return_value=2)
 @patch("cou.steps.plan._determine_upgrade_target")
 @patch("cou.steps.plan._get_pre_upgrade_steps")
 @patch("cou.steps.plan._generate_control_plane_plan", return_value=MagicMock())
@@ -1379,12 +1602,17 @@ async def test_generate_plan_upgrade_group_None(
     mock_control_plane,
     mock_pre_upgrade_steps,
     mock_determine_upgrade_target,
+    mock_deduplicate_package_upgrades,
+    mock_merge_idle_waits,
     cli_args,
 ):
     cli_args.upgrade_group = None
     mock_analysis_result = MagicMock(spec=Analysis)()
 
-    await cou_plan.generate_plan(mock_analysis_result, cli_args)
+    plan = await cou_plan.generate_plan(mock_analysis_result, cli_args)
+
+    mock_deduplicate_package_upgrades.assert_called_once_with(plan)
+    mock_merge_idle_waits.assert_called_once_with(plan)
 
     mock_determine_upgrade_target.assert_called_once()
     mock_pre_upgrade_steps.assert_called_once()
@@ -1396,6 +1624,33 @@ async def test_generate_plan_upgrade_group_None(
     mock_post_upgrade_steps.assert_called_once()
 
 
+@pytest.mark.asyncio
+@patch("cou.steps.plan.skip_up_to_date_package_upgrades", return_value=(3, 10))
+@patch("cou.steps.plan._determine_upgrade_target", return_value=OpenStackRelease("victoria"))
+@patch("cou.steps.plan._get_pre_upgrade_steps", return_value=[])
+@patch("cou.steps.plan._get_post_upgrade_steps", return_value=[])
+async def test_generate_plan_skip_up_to_date_packages(
+    mock_post_upgrade_steps,
+    mock_pre_upgrade_steps,
+    mock_determine_upgrade_target,
+    mock_skip_up_to_date_package_upgrades,
+    cli_args,
+):
+    """Test generating plan skipping package upgrades without upgradable packages."""
+    cli_args.upgrade_group = CONTROL_PLANE
+    cli_args.skip_up_to_date_packages = True
+    analysis_result = MagicMock(spec=Analysis)()
+    analysis_result.current_cloud_o7k_release = OpenStackRelease("ussuri")
+    analysis_result.apps_control_plane = []
+
+    plan = await cou_plan.generate_plan(analysis_result, cli_args)
+
+    mock_skip_up_to_date_package_upgrades.assert_awaited_once_with(plan)
+    assert plan.description == (
+        "Upgrade cloud from 'ussuri' to 'victoria' (skipped 3 of 10 package upgrades)"
+    )
+
+
 @pytest.mark.asyncio
 @patch("cou.steps.plan._determine_upgrade_target")
 @patch("cou.steps.plan._get_pre_upgrade_steps")
@@ -1616,15 +1871,14 @@ def test_separate_hypervisors_apps(model):
         workload_version="17.0.1",
     )
 
-    result = cou_plan._separate_hypervisors_apps(
-        [
-            nova_compute,
-            cinder,
-            ceph_osd_colocated,
-            ceph_osd_not_colocated,
-            ovn_chassis,
-        ]
-    )
+    apps = [
+        nova_compute,
+        cinder,
+        ceph_osd_colocated,
+        ceph_osd_not_colocated,
+        ovn_chassis,
+    ]
+    result = cou_plan._separate_hypervisors_apps(apps, Topology.from_apps(apps))
     assert result == (
         [nova_compute, cinder],
         [ceph_osd_colocated, ceph_osd_not_colocated, ovn_chassis],
@@ -1648,7 +1902,9 @@ async def test_generate_data_plane_hypervisors_plan(
     await cou_plan._generate_data_plane_hypervisors_plan(target, analysis_result, cli_args, apps)
 
     mock_filter_hypervisors.assert_called_once_with(cli_args, analysis_result)
-    mock_hypervisor_planner.assert_called_once_with(apps, hypervisors_machines)
+    mock_hypervisor_planner.assert_called_once_with(
+        apps, hypervisors_machines, HypervisorUpgradePolicy()
+    )
     hypervisor_planner_instance.generate_upgrade_plan.assert_called_once_with(
         target, cli_args.force
     )
@@ -1676,7 +1932,9 @@ async def test_generate_data_plane_hypervisors_plan_None(
 
     assert isinstance(plan, UpgradePlan)  # plan is not None
     mock_filter_hypervisors.assert_called_once_with(cli_args, analysis_result)
-    mock_hypervisor_planner.assert_called_once_with(apps, hypervisors_machines)
+    mock_hypervisor_planner.assert_called_once_with(
+        apps, hypervisors_machines, HypervisorUpgradePolicy()
+    )
 
 
 @patch("cou.steps.plan._create_upgrade_group")
@@ -1774,6 +2032,58 @@ def test_create_upgrade_plan_failed():
         cou_plan._create_upgrade_group([app], "victoria", "test", False)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "download_next_release, suffix",
+    [(False, ""), (True, " including 'focal-victoria' packages")],
+)
+@patch("cou.steps.plan.download_packages")
+@patch("cou.steps.plan._determine_upgrade_target", return_value=OpenStackRelease("victoria"))
+async def test_generate_prestage_plan(
+    mock_determine_upgrade_target,
+    mock_download_packages,
+    download_next_release,
+    suffix,
+    model,
+    cli_args,
+):
+    """Test generating plan to download packages once on each machine."""
+    cli_args.download_next_release = download_next_release
+    cli_args.max_parallel_machines = 2
+    machines = [generate_cou_machine(str(i)) for i in range(2)]
+    keystone = MagicMock(spec_set=OpenStackApplication)()
+    keystone.series = "focal"
+    keystone.units = {"keystone/0": Unit("keystone/0", machines[0], "17.0.1")}
+    nova_compute = MagicMock(spec_set=OpenStackApplication)()
+    nova_compute.series = "focal"
+    nova_compute.units = {
+        f"nova-compute/{i}": Unit(f"nova-compute/{i}", machines[i], "21.2.4") for i in range(2)
+    }
+    analysis_result = MagicMock(spec_set=Analysis)()
+    analysis_result.model = model
+    analysis_result.apps = [keystone, nova_compute]
+
+    plan = cou_plan.generate_prestage_plan(analysis_result, cli_args)
+
+    assert str(plan) == dedent_plan(
+        f"""\
+        Download software packages (at most 2 machines at a time)
+            Ψ Download software packages on machine '0' using unit 'keystone/0'{suffix}
+            Ψ Download software packages on machine '1' using unit 'nova-compute/1'{suffix}
+        """
+    )
+    assert plan.max_parallel == 2
+    mock_download_packages.assert_not_called()
+    for step in plan.sub_steps:
+        await step.run()
+
+    pocket = "focal-victoria" if download_next_release else None
+    mock_download_packages.assert_has_awaits(
+        [call("keystone/0", model, pocket), call("nova-compute/1", model, pocket)]
+    )
+    assert mock_determine_upgrade_target.called is download_next_release
+
+
 @pytest.mark.asyncio
 @patch("cou.steps.plan.print_and_debug")
 @patch("cou.steps.analyze.Analysis")
@@ -0,0 +1,96 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cou.commands import CLIargs
+from cou.steps import plan_review
+from cou.steps.analyze import Analysis
+from cou.steps.plan_review import ReviewedPlan
+
+
+def _analysis(model, apps):
+    analysis_result = MagicMock(spec_set=Analysis)()
+    analysis_result.model = model
+    analysis_result.apps = apps
+    return analysis_result
+
+
+def _app(name, summary, charm_url="ch:amd64/focal/keystone-1"):
+    app = MagicMock()
+    app.name = name
+    app.charm_url = charm_url
+    app.__str__.return_value = summary
+    return app
+
+
+def test_get_fingerprint(model):
+    """Test fingerprint changes only with the model or with arguments affecting the plan."""
+    args = CLIargs(command="plan", machines={"2", "1"})
+    analysis_result = _analysis(model, [_app("keystone", "keystone summary")])
+
+    fingerprint = plan_review.get_fingerprint(analysis_result, args)
+
+    # arguments not affecting the plan
+    args_upgrade = CLIargs(command="upgrade", machines={"1", "2"}, verbosity=2, quiet=True)
+    assert plan_review.get_fingerprint(analysis_result, args_upgrade) == fingerprint
+    # arguments affecting the plan
+    args_backup = CLIargs(command="plan", machines={"1", "2"}, backup=False)
+    assert plan_review.get_fingerprint(analysis_result, args_backup) != fingerprint
+    # different applications
+    analysis_result.apps = [_app("keystone", "keystone changed summary")]
+    assert plan_review.get_fingerprint(analysis_result, args) != fingerprint
+    # different charm revision
+    analysis_result.apps = [_app("keystone", "keystone summary", "ch:amd64/focal/keystone-2")]
+    assert plan_review.get_fingerprint(analysis_result, args) != fingerprint
+    # the fingerprint does not need the juju status
+    model.get_status.assert_not_awaited()
+
+
+def test_save_and_load_plan(tmp_path):
+    """Test saving and loading a plan."""
+    reviewed_plan = ReviewedPlan("fingerprint", "Upgrade cloud")
+
+    with patch("cou.steps.plan_review.COU_DIR_PLAN", tmp_path / "plan"):
+        plan_review.save_plan("admin/test-model", reviewed_plan)
+
+        assert (tmp_path / "plan" / "admin_test-model.json").exists()
+        assert plan_review.load_plan("admin/test-model") == reviewed_plan
+
+
+@pytest.mark.parametrize("content", [None, "not json", '{"plan": "Upgrade cloud"}'])
+def test_load_plan_missing_or_invalid(content, tmp_path):
+    """Test loading a plan which was not saved or is not valid."""
+    if content is not None:
+        (tmp_path / "test-model.json").write_text(content, encoding="utf-8")
+
+    with patch("cou.steps.plan_review.COU_DIR_PLAN", tmp_path):
+        assert plan_review.load_plan("test-model") is None
+
+
+def test_diff_plans():
+    """Test difference between two plans."""
+    old_plan = "Upgrade cloud\n\tUpgrade keystone\n"
+    new_plan = "Upgrade cloud\n\tUpgrade glance\n"
+
+    assert plan_review.diff_plans(old_plan, old_plan) == ""
+    assert plan_review.diff_plans(old_plan, new_plan) == (
+        "--- saved plan\n"
+        "+++ current plan\n"
+        "@@ -1,2 +1,2 @@\n"
+        " Upgrade cloud\n"
+        "-\tUpgrade keystone\n"
+        "+\tUpgrade glance\n"
+    )
@@ -0,0 +1,133 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from textwrap import dedent
+from unittest.mock import patch
+
+from cou.steps import report
+from tests.unit.utils import generate_span
+
+
+def _spans():
+    """Get spans of plan upgrading AZ with one slow unit followed by application upgrade."""
+    return [
+        generate_span(1, None, "Upgrade cloud", 0.0, 100.0),
+        generate_span(2, 1, "Upgrade AZ 'zone-1'", 0.0, 60.0, parallel=True),
+        generate_span(
+            3, 2, "Upgrade unit 'nova-compute/0'", 0.0, 10.0, api_calls=[("action", 1, 9)]
+        ),
+        generate_span(
+            4, 2, "Upgrade unit 'nova-compute/1'", 0.0, 12.0, api_calls=[("action", 2, 11)]
+        ),
+        generate_span(
+            5, 2, "Upgrade unit 'nova-compute/2'", 0.0, 60.0, api_calls=[("action", 5, 55)]
+        ),
+        generate_span(6, 1, "Upgrade plan for 'ceph-osd'", 60.0, 100.0),
+        generate_span(7, 6, "Refresh 'ceph-osd'", 60.0, 70.0, api_calls=[("refresh", 60, 70)]),
+        generate_span(8, 6, "Wait for 'ceph-osd'", 70.0, 100.0, api_calls=[("wait", 70, 100)]),
+    ]
+
+
+def test_get_critical_path():
+    """Test getting critical path going through the straggler of parallel group."""
+    assert [span.span_id for span in report.get_critical_path(_spans())] == [5, 7, 8]
+
+
+def test_get_critical_path_parallel_roots():
+    """Test getting critical path through spans without parent."""
+    spans = [
+        generate_span(1, None, "a", 0.0, 10.0),
+        generate_span(2, None, "b", 0.0, 5.0),
+        generate_span(3, None, "c", 10.0, None),  # unfinished span
+    ]
+
+    with patch("cou.steps.report.time.time", return_value=20.0):
+        assert [span.span_id for span in report.get_critical_path(spans)] == [1, 3]
+
+
+def test_get_critical_path_zero_length():
+    """Test getting critical path through spans, which took no time."""
+    spans = [
+        generate_span(1, None, "a", 1.0, 2.0),
+        generate_span(2, None, "b", 2.0, 2.0),
+        generate_span(3, None, "c", 2.0, 2.0),
+    ]
+
+    assert [span.span_id for span in report.get_critical_path(spans)] == [1, 2, 3]
+
+
+def test_get_stragglers():
+    """Test getting parallel groups held back by one step."""
+    spans = _spans()
+    spans += [
+        # parallel group without straggler
+        generate_span(9, 1, "Upgrade AZ 'zone-2'", 0.0, 20.0, parallel=True),
+        generate_span(10, 9, "Upgrade unit 'nova-compute/3'", 0.0, 20.0),
+        generate_span(11, 9, "Upgrade unit 'nova-compute/4'", 0.0, 18.0),
+        # parallel group, where the slowest step started first
+        generate_span(12, 1, "Upgrade AZ 'zone-3'", 0.0, 20.0, parallel=True),
+        generate_span(13, 12, "Upgrade unit 'nova-compute/5'", 0.0, 10.0),
+        generate_span(14, 12, "Upgrade unit 'nova-compute/6'", 15.0, 20.0),
+        # parallel group with single step
+        generate_span(15, 1, "Upgrade AZ 'zone-4'", 0.0, 20.0, parallel=True),
+        generate_span(16, 15, "Upgrade unit 'nova-compute/7'", 0.0, 20.0),
+    ]
+
+    stragglers = report.get_stragglers(spans)
+
+    assert [
+        (group.span_id, straggler.span_id, median, held_back)
+        for group, straggler, median, held_back in stragglers
+    ] == [(2, 5, 11.0, 48.0)]
+
+
+def test_get_time_breakdown():
+    """Test counting time of operations running at the same time only once."""
+    assert report.get_time_breakdown(_spans()) == {"action": 54.0, "refresh": 10.0, "wait": 30.0}
+
+
+def test_generate_report():
+    """Test generating report of the executed plan."""
+    assert report.generate_report(_spans(), top=2) == dedent(
+        """\
+        Upgrade took 100s
+        Critical path of 3 steps took 100s, the slowest of them:
+            60s Upgrade unit 'nova-compute/2'
+            30s Wait for 'ceph-osd'
+        Top 2 slowest steps:
+            60s Upgrade unit 'nova-compute/2'
+            30s Wait for 'ceph-osd'
+        Parallel groups held back by a straggler:
+            Upgrade AZ 'zone-1': waited 48s for Upgrade unit 'nova-compute/2' (60s, median of the others 11s)
+        Time spent in Juju operations:
+            actions: 54s (54%)
+            idle waits: 30s (30%)
+            charm refreshes and config changes: 10s (10%)"""  # noqa: E501
+    )
+
+
+def test_generate_report_no_spans():
+    """Test no report if no step was run."""
+    assert report.generate_report([]) is None
+
+
+def test_generate_report_short():
+    """Test generating report without stragglers and Juju operations."""
+    spans = [
+        generate_span(1, None, "Back up MySQL databases", 0.0, 0.0, api_calls=[("read", 0, 0)])
+    ]
+
+    assert report.generate_report(spans).splitlines()[-2:] == [
+        "Time spent in Juju operations:",
+        "    status and config reads: 0s (0%)",
+    ]
@@ -0,0 +1,94 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cou.steps import UpgradeStep
+from cou.steps import simulate as cou_simulate
+from cou.steps.tracing import step_tracer
+from tests.unit.utils import generate_upgrade_plan
+
+
+def _plan():
+    """Get plan with parallel group of steps changing the same application."""
+    config = UpgradeStep("Change config", parallel=True)
+    config.add_steps(
+        [
+            UpgradeStep(f"Change config of '{option}'", coro=AsyncMock(), resource="keystone")
+            for option in ("debug", "verbose")
+        ]
+    )
+    return generate_upgrade_plan(
+        [UpgradeStep("Refresh 'keystone'", coro=AsyncMock()(), resource="keystone"), config],
+        backup=False,
+    )
+
+
+def test_virtual_time_event_loop():
+    """Test moving virtual time forward while waiting for I/O of other threads."""
+
+    async def _wait():
+        await asyncio.gather(asyncio.sleep(3600), asyncio.sleep(60))
+        # nothing is scheduled while the thread is running, so the loop waits for its result
+        return await asyncio.to_thread(lambda: time.sleep(0.1) or "done")
+
+    loop = cou_simulate.VirtualTimeEventLoop()
+    start = time.monotonic()
+    try:
+        assert loop.run_until_complete(_wait()) == "done"
+        assert loop.time() == 3600
+    finally:
+        loop.close()
+
+    assert time.monotonic() - start < 60
+
+
+def test_get_latencies():
+    """Test sampling durations from the history or from the distribution."""
+    plan = _plan()
+    refresh_step = plan.sub_steps[0].sub_steps[0]
+    config_steps = plan.sub_steps[0].sub_steps[1].sub_steps
+    history = {"keystone": {"UpgradeStep: Refresh '*'": [5.0, 5.0]}}
+
+    latencies = cou_simulate.get_latencies(plan, history, {"keystone": "keystone"}, seed="1")
+
+    assert latencies[refresh_step_id := id(refresh_step)] == 5.0
+    assert set(latencies) == {refresh_step_id, *(id(step) for step in config_steps)}
+    assert all(latencies[id(step)] > 0 for step in config_steps)
+    assert latencies == cou_simulate.get_latencies(plan, history, {}, seed="1")
+
+
+@pytest.mark.parametrize("policy, exp_duration", [("tree", 30.0), ("dag", 50.0)])
+def test_simulate_plan(policy, exp_duration):
+    """Test running plan in virtual time with the executor of the execution policy."""
+    plan = _plan()
+    refresh_step = plan.sub_steps[0].sub_steps[0]
+    coro = refresh_step._coro
+    config_steps = plan.sub_steps[0].sub_steps[1].sub_steps
+    coro_factories = [step._coro for step in config_steps]
+    latencies = {id(refresh_step): 10.0}
+    latencies.update({id(step): 20.0 for step in config_steps})
+
+    tracer = cou_simulate.simulate_plan(plan, latencies, policy)
+
+    # the original coroutines were closed or never created
+    assert coro.cr_frame is None
+    for coro_factory in coro_factories:
+        coro_factory.assert_not_called()
+    assert (tracer.spans[0].start, tracer.spans[0].end) == (0.0, exp_duration)
+    assert [span.outcome for span in tracer.spans] == ["ok"] * 6
+    assert step_tracer.get() is None
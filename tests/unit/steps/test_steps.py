@@ -15,7 +15,9 @@
 """Test steps package."""
 import asyncio
 import re
-from unittest.mock import MagicMock
+import warnings
+from functools import partial
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -42,6 +44,11 @@ async def mock_coro(*args, **kwargs): ...
         (mock_coro(), mock_coro(arg1=True), False),
         (mock_coro(), mock_coro(), True),
         (mock_coro(1, 2, 3, kwarg1=True), mock_coro(1, 2, 3, kwarg1=True), True),
+        (None, partial(mock_coro), False),
+        (partial(mock_coro, 1), partial(mock_coro, 2), False),
+        (partial(mock_coro, 1, kwarg1=True), partial(mock_coro, 1, kwarg1=True), True),
+        (mock_coro, mock_coro(), True),
+        (partial(mock_coro, 1), mock_coro(1), True),
     ],
 )
 def test_compare_step_coroutines(coro1, coro2, exp_result):
@@ -68,6 +75,14 @@ def test_step_init(description, parallel):
     assert step.prompt is True
     assert step._canceled is False
     assert step._task is None
+    assert step.resource is None
+
+
+def test_step_resource():
+    """Test BaseStep changing resource."""
+    step = BaseStep("test", coro=mock_coro(), resource="keystone")
+
+    assert step.resource == "keystone"
 
 
 def test_step_hash():
@@ -300,6 +315,21 @@ async def test_step_run():
     assert value == 25
 
 
+@pytest.mark.asyncio
+async def test_step_run_lazy_coroutine():
+    """Test BaseStep creating coroutine only when the step is run."""
+    coro_func = AsyncMock(return_value=25)
+    filters = list(warnings.filters)
+
+    step = BaseStep(description="plan", coro=partial(coro_func, 5))
+
+    # no coroutine was created and no filter of the never awaited coroutine was added
+    coro_func.assert_not_called()
+    assert warnings.filters == filters
+    assert await step.run() == 25
+    coro_func.assert_awaited_once_with(5)
+
+
 @pytest.mark.asyncio
 async def test_step_run_canceled():
     """Test BaseStep run canceled step."""
@@ -330,6 +360,18 @@ async def test_step_cancel_task():
 
     assert step._task is not None
     assert step._task.cancelled() == 1  # task was canceled once
+    assert step.stopped is True
+
+
+@pytest.mark.asyncio
+async def test_step_stopped():
+    """Test BaseStep is stopped only if its task was canceled."""
+    step = BaseStep(description="test plan", coro=mock_coro())
+    assert step.stopped is False
+
+    await step.run()
+
+    assert step.stopped is False
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,220 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from cou.steps import UnitUpgradeStep, UpgradePlan, UpgradeStep, get_machine_resource
+from cou.steps import tracing as cou_tracing
+from cou.steps.tracing import StepTracer, step_tracer, trace_step
+from cou.utils.juju_utils import api_calls
+from tests.unit.utils import (
+    generate_span,
+    generate_units_upgrade_step,
+    generate_upgrade_plan,
+)
+
+
+def test_step_tracer_spans():
+    """Test recording spans with parent links, application and unit."""
+    plan = generate_upgrade_plan(
+        [
+            UpgradeStep("Refresh charm", coro=AsyncMock()(), resource="keystone"),
+            generate_units_upgrade_step("keystone", 2),
+        ]
+    )
+    app_plan = plan.sub_steps[1]
+    unit_step = app_plan.sub_steps[1].sub_steps[1]
+    tracer = StepTracer(plan)
+
+    for step in [plan, plan.sub_steps[0], app_plan, app_plan.sub_steps[0], unit_step]:
+        tracer.start(step)
+    tracer.end(unit_step, cou_tracing.ERROR)
+    tracer.end(UpgradeStep("not traced"), cou_tracing.OK)
+
+    assert [
+        (span.span_id, span.parent_id, span.step_class, span.application, span.unit)
+        for span in tracer.spans
+    ] == [
+        (1, None, "UpgradePlan", None, None),
+        (2, 1, "PreUpgradeStep", None, None),
+        (3, 1, "ApplicationUpgradePlan", "keystone", None),
+        (4, 3, "UpgradeStep", "keystone", None),
+        # parent of the unit step was not traced
+        (5, None, "UnitUpgradeStep", "keystone", "keystone/1"),
+    ]
+    assert tracer.spans[4].outcome == "error"
+    assert tracer.spans[4].end >= tracer.spans[4].start
+    assert tracer.spans[0].attributes == {
+        "cou.step.class": "UpgradePlan",
+        "cou.step.outcome": "unfinished",
+    }
+
+
+def test_step_tracer_inherit_unit():
+    """Test inheriting unit from the parent span of the step changing machine."""
+    unit_plan = UnitUpgradeStep("Upgrade plan for unit 'nova-compute/0'")
+    step = UpgradeStep(
+        "Disable nova-compute scheduler", coro=AsyncMock()(), resource=get_machine_resource("0")
+    )
+    unit_plan.add_step(step)
+    tracer = StepTracer(unit_plan)
+
+    tracer.start(unit_plan)
+    span = tracer.start(step)
+
+    assert (span.application, span.unit) == ("nova-compute", "nova-compute/0")
+
+
+def test_step_tracer_chrome_trace():
+    """Test spans in Chrome trace-event format with steps running in parallel in own lanes."""
+    tracer = StepTracer(UpgradePlan("Upgrade cloud"), clock=lambda: 6.0)
+    tracer.spans = [
+        generate_span(1, None, "step 1", 1.0, 5.0),
+        generate_span(2, 1, "step 2", 1.0, 3.0),
+        generate_span(3, 2, "step 3", 1.5, 2.0),
+        generate_span(4, 1, "step 4", 2.0, 4.0),  # running in parallel with step 2
+        generate_span(5, 1, "step 5", 4.0, None, None),  # unfinished step
+    ]
+
+    trace = tracer.to_chrome_trace()
+
+    assert trace["displayTimeUnit"] == "ms"
+    assert [(event["args"]["span_id"], event["tid"]) for event in trace["traceEvents"]] == [
+        (1, 0),
+        (2, 0),
+        (3, 0),
+        (4, 1),
+        (5, 0),
+    ]
+    assert trace["traceEvents"][0] == {
+        "name": "step 1",
+        "cat": "UpgradeStep",
+        "ph": "X",
+        "ts": 1000000,
+        "dur": 4000000,
+        "pid": 1,
+        "tid": 0,
+        "args": {
+            "span_id": 1,
+            "parent_id": None,
+            "cou.step.class": "UpgradeStep",
+            "cou.step.outcome": "ok",
+        },
+    }
+    assert trace["traceEvents"][4]["dur"] == 2000000
+
+
+def test_step_tracer_otlp():
+    """Test spans in OTLP-JSON format."""
+    tracer = StepTracer(UpgradePlan("Upgrade cloud"), clock=lambda: 3.0)
+    tracer.spans = [
+        generate_span(1, None, "step 1", 1.0, 2.0),
+        generate_span(2, 1, "step 2", 1.0, None, None),
+    ]
+
+    otlp = tracer.to_otlp()
+
+    (resource_spans,) = otlp["resourceSpans"]
+    assert resource_spans["resource"]["attributes"] == [
+        {"key": "service.name", "value": {"stringValue": "cou"}}
+    ]
+    span, child_span = resource_spans["scopeSpans"][0]["spans"]
+    assert len(span["traceId"]) == 32
+    assert child_span["traceId"] == span["traceId"]
+    assert span["spanId"] == child_span["parentSpanId"] == "0000000000000001"
+    assert span["parentSpanId"] == ""
+    assert span["startTimeUnixNano"] == "1000000000"
+    assert span["endTimeUnixNano"] == "2000000000"
+    assert child_span["endTimeUnixNano"] == "3000000000"
+    assert span["status"] == {"code": 1}
+    assert child_span["status"] == {"code": 2}
+    assert {"key": "cou.step.outcome", "value": {"stringValue": "ok"}} in span["attributes"]
+
+
+def test_step_tracer_export(tmp_path):
+    """Test writing spans to the trace files."""
+    tracer = StepTracer(UpgradePlan("Upgrade cloud"))
+    assert tracer.export() is None
+
+    tracer.spans = [generate_span(1, None, "step 1", 1.0, 2.0)]
+    with patch("cou.steps.tracing.COU_DIR_TRACE", tmp_path / "trace"):
+        chrome_file, otlp_file = tracer.export()
+
+    assert chrome_file.parent == otlp_file.parent == tmp_path / "trace"
+    assert chrome_file.name.endswith(".trace.json")
+    assert otlp_file.name.endswith(".otlp.json")
+    assert len(json.loads(chrome_file.read_text())["traceEvents"]) == 1
+    assert len(json.loads(otlp_file.read_text())["resourceSpans"]) == 1
+
+
+def test_step_tracer_export_error(tmp_path, caplog):
+    """Test failing to write the trace files."""
+    trace_dir = tmp_path / "trace"
+    trace_dir.write_text("not a directory")
+    tracer = StepTracer(UpgradePlan("Upgrade cloud"))
+    tracer.spans = [generate_span(1, None, "step 1", 1.0, 2.0)]
+
+    with patch("cou.steps.tracing.COU_DIR_TRACE", trace_dir):
+        assert tracer.export() is None
+
+    assert f"Cannot save trace of the upgrade to {trace_dir}" in caplog.text
+
+
+def test_trace_step_no_tracer():
+    """Test running step without tracer."""
+    with trace_step(UpgradeStep("step")):
+        pass
+
+    assert step_tracer.get() is None
+
+
+@pytest.mark.parametrize(
+    "error, exp_outcome",
+    [(asyncio.CancelledError, "canceled"), (ValueError, "error")],
+)
+def test_trace_step_error(error, exp_outcome):
+    """Test tracing step, which raised an error."""
+    step = UpgradeStep("step")
+    tracer = StepTracer(step)
+    token = step_tracer.set(tracer)
+
+    try:
+        with pytest.raises(error):
+            with trace_step(step):
+                raise error()
+    finally:
+        step_tracer.reset(token)
+
+    assert tracer.spans[0].outcome == exp_outcome
+
+
+def test_trace_step_api_calls():
+    """Test recording Juju API operations called by the step in its span."""
+    step = UpgradeStep("step", parallel=True)
+    tracer = StepTracer(step)
+    token = step_tracer.set(tracer)
+
+    try:
+        with trace_step(step):
+            api_calls.get().append(("read", 1.0, 2.0))
+    finally:
+        step_tracer.reset(token)
+
+    assert api_calls.get() is None
+    assert tracer.spans[0].api_calls == [("read", 1.0, 2.0)]
+    assert tracer.spans[0].parallel is True
+    assert tracer.spans[0].duration == tracer.spans[0].end - tracer.spans[0].start
@@ -0,0 +1,141 @@
+# Copyright 2024 Canonical Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest.mock import AsyncMock
+
+import pytest
+
+from cou.steps import PostUpgradeStep, PreUpgradeStep, UpgradePlan, UpgradeStep
+from cou.steps.waits import (
+    IdleWaitStep,
+    PostUpgradeIdleWaitStep,
+    PreUpgradeIdleWaitStep,
+    WorkloadVerificationStep,
+    merge_idle_waits,
+)
+from tests.unit.utils import dedent_plan
+
+
+@pytest.mark.parametrize(
+    "apps, exp_description",
+    [
+        (None, "Wait for up to 300s for model 'test_model' to reach the idle state"),
+        (["keystone"], "Wait for up to 300s for app 'keystone' to reach the idle state"),
+        (
+            ["keystone", "glance"],
+            "Wait for up to 300s for apps 'keystone', 'glance' to reach the idle state",
+        ),
+    ],
+)
+def test_idle_wait_step(apps, exp_description, model):
+    """Test IdleWaitStep waiting for applications or the entire model."""
+    step = IdleWaitStep(model, 300, apps)
+
+    assert step.description == exp_description
+    assert step.parallel is False
+    assert step.timeout == 300
+    assert step.apps == apps
+    assert step == UpgradeStep(exp_description, coro=model.wait_for_idle(300, apps=apps))
+
+
+@pytest.mark.parametrize(
+    "apps, other_apps, exp_apps",
+    [
+        (["keystone"], ["glance", "keystone"], ["keystone", "glance"]),
+        (["keystone"], None, None),
+        (None, ["keystone"], None),
+    ],
+)
+def test_idle_wait_step_merge(apps, other_apps, exp_apps, model):
+    """Test merging two waits into one waiting for applications of both."""
+    step = PreUpgradeIdleWaitStep(model, 300, apps)
+
+    merged_step = step.merge(IdleWaitStep(model, 2400, other_apps))
+
+    assert isinstance(merged_step, PreUpgradeIdleWaitStep)
+    assert merged_step.timeout == 2400
+    assert merged_step.apps == exp_apps
+
+
+def test_merge_idle_waits(model):
+    """Test merging waits only separated by other waits or workload verifications."""
+    plan = UpgradePlan("Upgrade cloud")
+    app_plan = UpgradePlan("Upgrade plan for 'nova-compute'")
+    app_plan.add_steps(
+        [
+            PreUpgradeStep("Refresh 'nova-compute'", coro=AsyncMock()()),
+            PreUpgradeIdleWaitStep(model, 300, ["nova-compute"]),
+            UpgradeStep("Change charm config of 'nova-compute'", coro=AsyncMock()()),
+            PostUpgradeIdleWaitStep(model, 2400, ["nova-compute"]),
+            WorkloadVerificationStep(
+                "Verify that the workload of 'nova-compute'", coro=AsyncMock()()
+            ),
+            UpgradeStep(),  # empty step is not run
+            PostUpgradeIdleWaitStep(model, 300, ["cinder"]),
+            WorkloadVerificationStep("Verify that the workload of 'cinder'", coro=AsyncMock()()),
+            PostUpgradeStep("Resolve all applications in error status", coro=AsyncMock()()),
+            PostUpgradeIdleWaitStep(model, 300, None),
+        ]
+    )
+    plan.add_step(app_plan)
+
+    removed = merge_idle_waits(plan)
+
+    assert removed == 1
+    assert str(plan) == dedent_plan(
+        """\
+        Upgrade cloud
+            Upgrade plan for 'nova-compute'
+                Refresh 'nova-compute'
+                Wait for up to 300s for app 'nova-compute' to reach the idle state
+                Change charm config of 'nova-compute'
+                Wait for up to 2400s for apps 'nova-compute', 'cinder' to reach the idle state
+                Verify that the workload of 'nova-compute'
+                Verify that the workload of 'cinder'
+                Resolve all applications in error status
+                Wait for up to 300s for model 'test_model' to reach the idle state
+        """
+    )
+    assert isinstance(app_plan.sub_steps[3], PostUpgradeIdleWaitStep)
+
+
+def test_merge_idle_waits_parallel(model):
+    """Test keeping waits of steps running in parallel."""
+    plan = UpgradePlan("Upgrade cloud")
+    plan.parallel = True
+    plan.add_steps(
+        [
+            PostUpgradeIdleWaitStep(model, 300, ["keystone"]),
+            PostUpgradeIdleWaitStep(model, 300, ["glance"]),
+        ]
+    )
+    expected_plan = str(plan)
+
+    assert merge_idle_waits(plan) == 0
+    assert str(plan) == expected_plan
+
+
+def test_merge_idle_waits_different_models(model):
+    """Test keeping waits for applications of different models."""
+    other_model = AsyncMock()
+    other_model.name = "other_model"
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_steps(
+        [
+            PostUpgradeIdleWaitStep(model, 300, None),
+            PostUpgradeIdleWaitStep(other_model, 300, None),
+        ]
+    )
+
+    assert merge_idle_waits(plan) == 0
+    assert len(plan.sub_steps) == 2
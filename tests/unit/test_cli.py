@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 from juju.errors import JujuError
@@ -21,7 +21,10 @@ from cou import cli
 from cou.exceptions import COUException, HighestReleaseAchieved, TimeoutException
 from cou.steps import PreUpgradeStep, UpgradePlan
 from cou.steps.analyze import Analysis
+from cou.steps.journal import ExecutionJournal, execution_journal
 from cou.steps.plan import PlanStatus
+from cou.steps.plan_review import ReviewedPlan
+from cou.steps.tracing import StepTracer, step_tracer
 
 
 @pytest.mark.parametrize(
@@ -160,6 +163,193 @@ async def test_analyze_and_generate_plan_with_warnings(
     mock_logger.warning.called_counts = len(mock_plan_status.warning_messages)
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "verbosity, quiet, exp_printed", [(0, False, False), (1, False, True), (0, True, False)]
+)
+@patch("cou.cli.print_upgrade_plan", new_callable=AsyncMock)
+@patch("cou.cli.generate_plan", new_callable=AsyncMock)
+@patch("cou.cli.verify_cloud", new_callable=AsyncMock)
+@patch("cou.cli.Analysis.create", new_callable=AsyncMock)
+async def test_analyze_and_generate_plan_verification_durations(
+    mock_analyze,
+    mock_verify_cloud,
+    mock_generate_plan,
+    mock_print_upgrade_plan,
+    verbosity,
+    quiet,
+    exp_printed,
+    model,
+    cli_args,
+    capsys,
+):
+    """Test printing durations of the cloud verifications in verbose mode."""
+    cli_args.command = "upgrade"
+    cli_args.verbosity = verbosity
+    cli_args.quiet = quiet
+    mock_verify_cloud.return_value = {"vault is unsealed": 0.5, "model is idle": 1.25}
+
+    await cli.analyze_and_generate_plan(model, cli_args)
+
+    output = capsys.readouterr().out
+    assert ("Verifying vault is unsealed took 0.50s" in output) == exp_printed
+    assert ("Verifying model is idle took 1.25s" in output) == exp_printed
+
+
+def _upgrade_plan(plan: str) -> MagicMock:
+    """Get upgrade plan with string representation."""
+    upgrade_plan = MagicMock(spec_set=UpgradePlan)()
+    upgrade_plan.__str__.return_value = plan
+    return upgrade_plan
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.save_plan")
+@patch("cou.cli.get_fingerprint")
+@patch("cou.cli.print_upgrade_plan", new_callable=AsyncMock)
+@patch("cou.cli.generate_plan", new_callable=AsyncMock)
+@patch("cou.cli.verify_cloud", new_callable=AsyncMock)
+@patch("cou.cli.Analysis.create", new_callable=AsyncMock)
+async def test_analyze_and_generate_plan_save_plan(
+    mock_analyze,
+    mock_verify_cloud,
+    mock_generate_plan,
+    mock_print_upgrade_plan,
+    mock_get_fingerprint,
+    mock_save_plan,
+    model,
+    cli_args,
+):
+    """Test analyze_and_generate_plan saving the plan for the plan subcommand."""
+    cli_args.command = "plan"
+    mock_generate_plan.return_value = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.analyze_and_generate_plan(model, cli_args)
+
+    mock_print_upgrade_plan.assert_awaited_once_with(
+        mock_analyze.return_value, mock_generate_plan.return_value, cli_args
+    )
+    mock_get_fingerprint.assert_called_once_with(mock_analyze.return_value, cli_args)
+    mock_save_plan.assert_called_once_with(
+        model.name, ReviewedPlan(mock_get_fingerprint.return_value, "Upgrade cloud\n")
+    )
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.load_plan")
+@patch("cou.cli.print_and_debug")
+async def test_print_upgrade_plan_plan_command(mock_print_and_debug, mock_load_plan, cli_args):
+    """Test printing upgrade plan for the plan subcommand."""
+    cli_args.command = "plan"
+    upgrade_plan = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.print_upgrade_plan(MagicMock(spec_set=Analysis)(), upgrade_plan, cli_args)
+
+    mock_load_plan.assert_not_called()
+    mock_print_and_debug.assert_called_once_with(upgrade_plan)
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.format_plan")
+@patch("cou.cli.get_plan_estimate", new_callable=AsyncMock)
+@patch("cou.cli.print_and_debug")
+async def test_print_upgrade_plan_estimate(
+    mock_print_and_debug, mock_get_plan_estimate, mock_format_plan, cli_args
+):
+    """Test printing upgrade plan with the estimated durations."""
+    cli_args.command = "plan"
+    analysis_result = MagicMock(spec_set=Analysis)()
+    upgrade_plan = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.print_upgrade_plan(analysis_result, upgrade_plan, cli_args)
+
+    mock_get_plan_estimate.assert_awaited_once_with(analysis_result.model, upgrade_plan)
+    mock_format_plan.assert_called_once_with(upgrade_plan, mock_get_plan_estimate.return_value)
+    mock_print_and_debug.assert_called_once_with(mock_format_plan.return_value)
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.get_fingerprint")
+@patch("cou.cli.load_plan")
+@patch("cou.cli.print_and_debug")
+async def test_print_upgrade_plan_without_saved_plan(
+    mock_print_and_debug, mock_load_plan, mock_get_fingerprint, cli_args
+):
+    """Test printing upgrade plan when there is no saved plan."""
+    cli_args.command = "upgrade"
+    mock_load_plan.return_value = None
+    analysis_result = MagicMock(spec_set=Analysis)()
+    upgrade_plan = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.print_upgrade_plan(analysis_result, upgrade_plan, cli_args)
+
+    mock_load_plan.assert_called_once_with(analysis_result.model.name)
+    mock_get_fingerprint.assert_not_called()
+    mock_print_and_debug.assert_called_once_with(upgrade_plan)
+
+
+@pytest.mark.asyncio
+@patch("builtins.print")
+@patch("cou.cli.get_fingerprint")
+@patch("cou.cli.load_plan")
+@patch("cou.cli.print_and_debug")
+async def test_print_upgrade_plan_same_model(
+    mock_print_and_debug, mock_load_plan, mock_get_fingerprint, mock_print, cli_args
+):
+    """Test printing upgrade plan when the model did not change since it was saved."""
+    cli_args.command = "upgrade"
+    mock_load_plan.return_value = ReviewedPlan("fingerprint", "Upgrade cloud\n")
+    mock_get_fingerprint.return_value = "fingerprint"
+    upgrade_plan = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.print_upgrade_plan(MagicMock(spec_set=Analysis)(), upgrade_plan, cli_args)
+
+    # the plan being approved is always printed
+    mock_print_and_debug.assert_called_once_with(upgrade_plan)
+    mock_print.assert_called_once_with(
+        "The cloud did not change since the upgrade plan was generated by 'cou plan'."
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "saved_plan, exp_diff",
+    [
+        ("Upgrade cloud\n", "The upgrade plan did not change."),
+        (
+            "Upgrade cloud from ussuri\n",
+            "--- saved plan\n+++ current plan\n@@ -1 +1 @@\n"
+            "-Upgrade cloud from ussuri\n+Upgrade cloud\n",
+        ),
+    ],
+)
+@patch("builtins.print")
+@patch("cou.cli.get_fingerprint")
+@patch("cou.cli.load_plan")
+@patch("cou.cli.print_and_debug")
+async def test_print_upgrade_plan_changed_model(
+    mock_print_and_debug,
+    mock_load_plan,
+    mock_get_fingerprint,
+    mock_print,
+    saved_plan,
+    exp_diff,
+    cli_args,
+):
+    """Test printing upgrade plan when the model changed since it was saved."""
+    cli_args.command = "upgrade"
+    mock_load_plan.return_value = ReviewedPlan("old-fingerprint", saved_plan)
+    mock_get_fingerprint.return_value = "fingerprint"
+    upgrade_plan = _upgrade_plan("Upgrade cloud\n")
+
+    await cli.print_upgrade_plan(MagicMock(spec_set=Analysis)(), upgrade_plan, cli_args)
+
+    mock_print.assert_called_once_with(
+        "The cloud changed since the upgrade plan was generated by 'cou plan':"
+    )
+    mock_print_and_debug.assert_has_calls([call(upgrade_plan), call(exp_diff)])
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "quiet, expected_print_count",
@@ -195,6 +385,136 @@ async def test_apply_upgrade_plan_quiet_no_prompt(
     mock_print.call_count == expected_print_count
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("completed", [True, False])
+@patch("cou.cli.apply_step")
+@patch("builtins.print")
+async def test_apply_upgrade_plan_journal(mock_print, mock_apply_step, completed, cli_args):
+    """Test apply_upgrade_plan recording execution in journal."""
+    cli_args.prompt = False
+    plan = UpgradePlan(description="Upgrade cloud from 'ussuri' to 'victoria'")
+    journal = MagicMock(spec_set=ExecutionJournal)
+    journal.is_completed.return_value = completed
+    journals = []
+    mock_apply_step.side_effect = lambda *_: journals.append(execution_journal.get())
+
+    await cli.apply_upgrade_plan(plan, cli_args, journal)
+
+    mock_apply_step.assert_awaited_once_with(plan, False)
+    assert journals == [journal]
+    assert execution_journal.get() is None
+    journal.is_completed.assert_called_once_with(plan)
+    assert journal.remove.called is completed
+
+
+@pytest.mark.asyncio
+@patch("cou.cli._print_upgrade_report")
+@patch("cou.cli.apply_step")
+@patch("builtins.print")
+async def test_apply_upgrade_plan_tracer(
+    mock_print, mock_apply_step, mock_print_upgrade_report, cli_args
+):
+    """Test apply_upgrade_plan tracing the execution and exporting the trace."""
+    cli_args.prompt = False
+    plan = UpgradePlan(description="Upgrade cloud from 'ussuri' to 'victoria'")
+    tracer = MagicMock(spec_set=StepTracer(plan))
+    tracers = []
+    mock_apply_step.side_effect = lambda *_: tracers.append(step_tracer.get())
+
+    await cli.apply_upgrade_plan(plan, cli_args, tracer=tracer)
+
+    assert tracers == [tracer]
+    assert step_tracer.get() is None
+    tracer.export.assert_called_once_with()
+    mock_print_upgrade_report.assert_called_once_with(tracer, cli_args)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quiet", [True, False])
+@patch("cou.cli._print_upgrade_report")
+@patch("cou.cli.load_history")
+@patch("builtins.print")
+async def test_run_upgrade_simulation(
+    mock_print, mock_load_history, mock_print_upgrade_report, quiet, model, cli_args, tmp_path
+):
+    """Test simulating upgrade plan in virtual time."""
+    cli_args.quiet = quiet
+    cli_args.execution_policy = "dag"
+    mock_load_history.return_value = {}
+    plan = UpgradePlan("Upgrade cloud")
+    plan.add_step(PreUpgradeStep("Back up MySQL databases", coro=AsyncMock()()))
+    cli.progress_indicator.enabled = True
+
+    with (
+        patch("cou.steps.tracing.COU_DIR_TRACE", tmp_path),
+        patch("cou.cli.simulate_plan", wraps=cli.simulate_plan) as mock_simulate_plan,
+    ):
+        await cli.run_upgrade_simulation(model, plan, cli_args)
+
+    assert cli.progress_indicator.enabled is True
+    mock_simulate_plan.assert_called_once()
+    assert mock_simulate_plan.call_args.args[2] == "dag"
+    tracer = mock_print_upgrade_report.call_args.args[0]
+    assert [span.name for span in tracer.spans] == ["Upgrade cloud", "Back up MySQL databases"]
+    assert len(list(tmp_path.iterdir())) == 2
+    assert mock_print.call_args_list[-1] == call("Simulation completed.")
+    assert len(mock_print.call_args_list) == (1 if quiet else 2)
+
+
+@pytest.mark.parametrize("quiet", [True, False])
+@patch("cou.cli.logger")
+@patch("cou.cli.print_and_debug")
+@patch("cou.cli.generate_report")
+def test_print_upgrade_report(
+    mock_generate_report, mock_print_and_debug, mock_logger, quiet, cli_args
+):
+    """Test printing report of the upgrade or only logging it in quiet mode."""
+    cli_args.quiet = quiet
+    tracer = StepTracer(UpgradePlan("Upgrade cloud"))
+
+    cli._print_upgrade_report(tracer, cli_args)
+
+    mock_generate_report.assert_called_once_with(tracer.spans)
+    if quiet:
+        mock_logger.info.assert_called_once_with(mock_generate_report.return_value)
+        mock_print_and_debug.assert_not_called()
+    else:
+        mock_print_and_debug.assert_called_once_with(mock_generate_report.return_value)
+
+
+@patch("cou.cli.print_and_debug")
+def test_print_upgrade_report_no_steps(mock_print_and_debug, cli_args):
+    """Test no report if no step was run."""
+    cli._print_upgrade_report(StepTracer(UpgradePlan("Upgrade cloud")), cli_args)
+
+    mock_print_and_debug.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prompt, exp_dag", [(False, True), (True, False)])
+@patch("cou.cli.execute_dag")
+@patch("cou.cli.apply_step")
+@patch("cou.cli.continue_upgrade")
+@patch("builtins.print")
+async def test_apply_upgrade_plan_dag_policy(
+    mock_print, mock_continue_upgrade, mock_apply_step, mock_execute_dag, prompt, exp_dag, cli_args
+):
+    """Test apply_upgrade_plan with DAG execution policy used only without prompt."""
+    cli_args.prompt = prompt
+    cli_args.execution_policy = "dag"
+    mock_continue_upgrade.return_value = True
+    plan = UpgradePlan(description="Upgrade cloud from 'ussuri' to 'victoria'")
+
+    await cli.apply_upgrade_plan(plan, cli_args)
+
+    assert mock_execute_dag.called is exp_dag
+    assert mock_apply_step.called is not exp_dag
+    if exp_dag:
+        mock_execute_dag.assert_awaited_once_with(plan)
+    else:
+        mock_apply_step.assert_awaited_once_with(plan, True)
+
+
 @pytest.mark.asyncio
 @patch("cou.cli.apply_step")
 @patch("cou.cli.continue_upgrade")
@@ -300,15 +620,149 @@ async def test_continue_upgrade(
 
 
 @pytest.mark.asyncio
-@pytest.mark.parametrize("command", ["plan", "upgrade", "other1", "other2"])
+@patch("cou.cli.ExecutionJournal")
+@patch("cou.cli.run_upgrade_simulation", new_callable=AsyncMock)
+@patch("cou.cli.get_model", new_callable=AsyncMock)
+@patch("cou.cli.analyze_and_generate_plan", new_callable=AsyncMock)
+@patch("cou.cli.apply_upgrade_plan", new_callable=AsyncMock)
+async def test_run_upgrade_subcommand_simulate(
+    mock_apply_upgrade_plan,
+    mock_analyze_and_generate_plan,
+    mock_get_model,
+    mock_run_upgrade_simulation,
+    mock_execution_journal,
+    cli_args,
+):
+    """Test simulating upgrade instead of applying the plan."""
+    cli_args.simulate = True
+    upgrade_plan = MagicMock(spec_set=UpgradePlan)()
+    mock_analyze_and_generate_plan.return_value = (MagicMock(spec_set=Analysis)(), upgrade_plan)
+
+    await cli.run_upgrade_subcommand(cli_args)
+
+    mock_run_upgrade_simulation.assert_awaited_once_with(
+        mock_get_model.return_value, upgrade_plan, cli_args
+    )
+    mock_execution_journal.open.assert_not_called()
+    mock_apply_upgrade_plan.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.run_post_upgrade_sanity_check", new_callable=AsyncMock)
+@patch("cou.cli.get_model", new_callable=AsyncMock)
+@patch("cou.cli.analyze_and_generate_plan", new_callable=AsyncMock)
+async def test_run_upgrade_subcommand_analysis_failed(
+    mock_analyze_and_generate_plan, mock_get_model, mock_run_post_upgrade_sanity_check, cli_args
+):
+    """Test running the sanity check of the whole cloud when the analysis failed."""
+    cli_args.simulate = False
+    mock_analyze_and_generate_plan.side_effect = COUException("analysis failed")
+
+    with pytest.raises(COUException, match="analysis failed"):
+        await cli.run_upgrade_subcommand(cli_args)
+
+    mock_run_post_upgrade_sanity_check.assert_awaited_once_with(
+        mock_get_model.return_value, None, cli_args
+    )
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.run_post_upgrade_sanity_check", new_callable=AsyncMock)
+@patch("cou.cli.record_durations")
+@patch("cou.cli.get_applications")
+@patch("cou.cli.get_charms", new_callable=AsyncMock)
+@patch("cou.cli.StepTracer")
+@patch("cou.cli.ExecutionJournal")
+@patch("cou.cli.get_model", new_callable=AsyncMock)
+@patch("cou.cli.analyze_and_generate_plan", new_callable=AsyncMock)
+@patch("cou.cli.apply_upgrade_plan", new_callable=AsyncMock)
+async def test_run_upgrade_subcommand_sanity_check_failed(
+    mock_apply_upgrade_plan,
+    mock_analyze_and_generate_plan,
+    mock_get_model,
+    mock_execution_journal,
+    mock_step_tracer,
+    mock_get_charms,
+    mock_get_applications,
+    mock_record_durations,
+    mock_run_post_upgrade_sanity_check,
+    cli_args,
+    caplog,
+):
+    """Test keeping the upgrade error when the sanity check after it failed too."""
+    cli_args.simulate = False
+    analysis_result = MagicMock(spec_set=Analysis)()
+    mock_analyze_and_generate_plan.return_value = (analysis_result, MagicMock())
+    mock_apply_upgrade_plan.side_effect = COUException("upgrade failed")
+    mock_run_post_upgrade_sanity_check.side_effect = ValueError("refresh failed")
+
+    with pytest.raises(COUException, match="upgrade failed"):
+        await cli.run_upgrade_subcommand(cli_args)
+
+    mock_record_durations.assert_called_once_with(
+        mock_step_tracer.return_value.spans, mock_get_charms.return_value
+    )
+    mock_run_post_upgrade_sanity_check.assert_awaited_once_with(
+        mock_get_model.return_value, analysis_result, cli_args
+    )
+    assert "Post upgrade sanity check failed: refresh failed" in caplog.text
+
+
+@pytest.mark.asyncio
+@patch("cou.cli.run_post_upgrade_sanity_check", new_callable=AsyncMock)
+@patch("cou.cli.run_upgrade_simulation", new_callable=AsyncMock)
+@patch("cou.cli.get_model", new_callable=AsyncMock)
+@patch("cou.cli.analyze_and_generate_plan", new_callable=AsyncMock)
+async def test_run_upgrade_subcommand_simulation_failed(
+    mock_analyze_and_generate_plan,
+    mock_get_model,
+    mock_run_upgrade_simulation,
+    mock_run_post_upgrade_sanity_check,
+    cli_args,
+):
+    """Test skipping the sanity check when the simulation failed."""
+    cli_args.simulate = True
+    mock_analyze_and_generate_plan.return_value = (MagicMock(spec_set=Analysis)(), MagicMock())
+    mock_run_upgrade_simulation.side_effect = ValueError("simulation failed")
+
+    with pytest.raises(ValueError, match="simulation failed"):
+        await cli.run_upgrade_subcommand(cli_args)
+
+    mock_run_post_upgrade_sanity_check.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("command", ["plan", "upgrade", "prestage", "other1", "other2"])
+@patch("cou.cli.run_post_upgrade_sanity_check", new_callable=AsyncMock)
+@patch("cou.cli.record_durations")
+@patch("cou.cli.get_applications")
+@patch("cou.cli.get_charms", new_callable=AsyncMock)
+@patch("cou.cli.StepTracer")
+@patch("cou.cli.ExecutionJournal")
+@patch("cou.cli.run_prestage_subcommand")
 @patch("cou.cli.get_model")
 @patch("cou.cli.analyze_and_generate_plan")
 @patch("cou.cli.apply_upgrade_plan")
 async def test_run_command(
-    mock_apply_upgrade_plan, mock_analyze_and_generate_plan, mock_get_model, command, cli_args
+    mock_apply_upgrade_plan,
+    mock_analyze_and_generate_plan,
+    mock_get_model,
+    mock_run_prestage_subcommand,
+    mock_execution_journal,
+    mock_step_tracer,
+    mock_get_charms,
+    mock_get_applications,
+    mock_record_durations,
+    mock_run_post_upgrade_sanity_check,
+    command,
+    cli_args,
 ):
     """Test run command function."""
     cli_args.command = command
+    cli_args.resume = True
+    analysis_result = MagicMock(spec_set=Analysis)()
+    upgrade_plan = MagicMock(spec_set=UpgradePlan)()
+    mock_analyze_and_generate_plan.return_value = (analysis_result, upgrade_plan)
 
     await cli._run_command(cli_args)
 
@@ -317,12 +771,73 @@ async def test_run_command(
         mock_apply_upgrade_plan.assert_not_called()
     elif command == "upgrade":
         mock_analyze_and_generate_plan.assert_awaited_once()
-        mock_apply_upgrade_plan.assert_awaited_once()
+        mock_execution_journal.open.assert_called_once_with(
+            mock_get_model.return_value, upgrade_plan, resume=True
+        )
+        mock_apply_upgrade_plan.assert_awaited_once_with(
+            upgrade_plan,
+            cli_args,
+            mock_execution_journal.open.return_value,
+            mock_step_tracer.return_value,
+        )
+        mock_step_tracer.assert_called_once_with(upgrade_plan)
+        mock_get_applications.assert_called_once_with(upgrade_plan)
+        mock_get_charms.assert_awaited_once_with(
+            mock_get_model.return_value, mock_get_applications.return_value
+        )
+        mock_record_durations.assert_called_once_with(
+            mock_step_tracer.return_value.spans, mock_get_charms.return_value
+        )
+        mock_run_post_upgrade_sanity_check.assert_awaited_once_with(
+            mock_get_model.return_value, analysis_result, cli_args
+        )
+    else:
+        mock_run_post_upgrade_sanity_check.assert_not_awaited()
+
+    if command == "prestage":
+        mock_run_prestage_subcommand.assert_awaited_once_with(cli_args)
+        mock_analyze_and_generate_plan.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quiet, expected_print_count", [(True, 1), (False, 2)])
+@patch("builtins.print")
+@patch("cou.cli.print_and_debug")
+@patch("cou.cli.apply_step")
+@patch("cou.cli.generate_prestage_plan")
+@patch("cou.cli.Analysis.create", new_callable=AsyncMock)
+@patch("cou.cli.get_model")
+async def test_run_prestage_subcommand(
+    mock_get_model,
+    mock_analysis_create,
+    mock_generate_prestage_plan,
+    mock_apply_step,
+    mock_print_and_debug,
+    mock_print,
+    quiet,
+    expected_print_count,
+    cli_args,
+):
+    """Test running the prestage subcommand."""
+    cli_args.quiet = quiet
+    prestage_plan = UpgradePlan("Download software packages")
+    mock_generate_prestage_plan.return_value = prestage_plan
+
+    await cli.run_prestage_subcommand(cli_args)
+
+    mock_analysis_create.assert_awaited_once_with(
+        mock_get_model.return_value, skip_apps=cli_args.skip_apps
+    )
+    mock_generate_prestage_plan.assert_called_once_with(
+        mock_analysis_create.return_value, cli_args
+    )
+    mock_print_and_debug.assert_called_once_with(prestage_plan)
+    mock_apply_step.assert_awaited_once_with(prestage_plan, prompt=False)
+    assert mock_print.call_count == expected_print_count
 
 
 @patch("cou.cli.print")
 @patch("cou.cli.progress_indicator")
-@patch("cou.cli.run_post_upgrade_sanity_check")
 @patch("cou.cli.sys")
 @patch("cou.cli.parse_args")
 @patch("cou.cli.get_log_file")
@@ -336,7 +851,6 @@ def test_entrypoint(
     mock_get_log_file,
     mock_parse_args,
     mock_sys,
-    mock_run_post_upgrade_sanity_check,
     mock_indicator,
     mock_print,
 ):
@@ -355,7 +869,6 @@ def test_entrypoint(
         mock_get_log_level.return_value,
     )
     mock_run_command.assert_awaited_once_with(args)
-    mock_run_post_upgrade_sanity_check.await_count == 2
     mock_print.assert_called_once_with(
         f"Full execution log: '{mock_get_log_file.return_value}'",
     )
@@ -486,15 +999,9 @@ def test_entrypoint_failure_unexpected_exception(mock_run_command, mock_indicato
     ],
 )
 @patch("builtins.print")
-@patch("cou.cli.Model")
 @patch("cou.cli.post_upgrade_sanity_checks", new_callable=AsyncMock)
-@patch("cou.cli.Analysis", new_callable=AsyncMock)
-@patch("cou.cli.PlanStatus", spec_set=PlanStatus)
 async def test_run_run_post_upgrade_sanity_check(
-    mock_plan_status,
-    mock_analyze,
     mock_post_upgrade_sanity_checks,
-    cou_model,
     mock_print,
     quiet,
     expected_print_count,
@@ -502,15 +1009,25 @@ async def test_run_run_post_upgrade_sanity_check(
 ):
     """Test run_post_upgrade_sanity_check function in either quiet or non-quiet mode."""
     cli_args.quiet = quiet
+    analysis_result = MagicMock(spec_set=Analysis)
 
-    cou_model.return_value.connect.side_effect = AsyncMock()
-    analysis_result = Analysis(model=cou_model, apps=[])
-    mock_analyze.return_value = analysis_result
+    await cli.run_post_upgrade_sanity_check(MagicMock(), analysis_result, cli_args)
 
-    mock_plan_status.error_messages = []
-    mock_plan_status.warning_messages = []
+    analysis_result.refresh.assert_awaited_once_with()
+    mock_post_upgrade_sanity_checks.assert_awaited_once_with(analysis_result.refresh.return_value)
+    assert mock_print.call_count == expected_print_count
 
-    await cli.run_post_upgrade_sanity_check(cli_args)
 
-    mock_post_upgrade_sanity_checks.assert_called_once()
-    mock_print.call_count == expected_print_count
+@pytest.mark.asyncio
+@patch("cou.cli.Analysis.create", new_callable=AsyncMock)
+@patch("cou.cli.post_upgrade_sanity_checks", new_callable=AsyncMock)
+async def test_run_post_upgrade_sanity_check_without_analysis(
+    mock_post_upgrade_sanity_checks, mock_analysis_create, cli_args
+):
+    """Test run_post_upgrade_sanity_check analyzing the whole cloud without previous analysis."""
+    model = MagicMock()
+
+    await cli.run_post_upgrade_sanity_check(model, None, cli_args)
+
+    mock_analysis_create.assert_awaited_once_with(model, skip_apps=cli_args.skip_apps)
+    mock_post_upgrade_sanity_checks.assert_awaited_once_with(mock_analysis_create.return_value)
@@ -36,6 +36,7 @@ def test_CLIargs_prompt(auto_approve, expected_result):
         ["help"],
         ["help", "plan"],
         ["help", "upgrade"],
+        ["help", "prestage"],
         ["plan", "-h"],
         ["upgrade", "-h"],
         ["plan", "control-plane", "-h"],
@@ -44,6 +45,7 @@ def test_CLIargs_prompt(auto_approve, expected_result):
         ["upgrade", "control-plane", "-h"],
         ["upgrade", "data-plane", "-h"],
         ["upgrade", "hypervisors", "-h"],
+        ["prestage", "-h"],
     ],
 )
 # NOTE: When we update to use python > 3.10,
@@ -788,6 +790,54 @@ def test_parse_args_plan(args, expected_CLIargs):
                 **{"upgrade_group": "hypervisors"}
             ),
         ),
+        (
+            [
+                "upgrade",
+                "hypervisors",
+                "--max-unavailable=2",
+                "--max-parallel-azs=3",
+                "--max-unavailable-total=5",
+                "--canaries=1",
+            ],
+            CLIargs(
+                command="upgrade",
+                model_name=None,
+                verbosity=0,
+                quiet=False,
+                auto_approve=False,
+                backup=True,
+                force=False,
+                archive_batch_size=1000,
+                archive=True,
+                machines=None,
+                availability_zones=None,
+                max_unavailable="2",
+                max_parallel_azs=3,
+                max_unavailable_total=5,
+                canaries=1,
+                **{"upgrade_group": "hypervisors"}
+            ),
+        ),
+        (
+            ["upgrade", "hypervisors", "--quiet", "--az=1", "--max-unavailable=10%"],
+            CLIargs(
+                command="upgrade",
+                model_name=None,
+                verbosity=0,
+                quiet=True,
+                auto_approve=False,
+                backup=True,
+                force=False,
+                archive_batch_size=1000,
+                archive=True,
+                machines=None,
+                availability_zones={"1"},
+                max_unavailable="10%",
+                max_parallel_azs=1,
+                canaries=0,
+                **{"upgrade_group": "hypervisors"}
+            ),
+        ),
         (
             ["upgrade", "hypervisors", "--force", "--quiet", "--availability-zone=1", "--az=2,3"],
             CLIargs(
@@ -830,6 +880,27 @@ def test_parse_args_plan(args, expected_CLIargs):
                 **{"upgrade_group": "hypervisors"}
             ),
         ),
+        (
+            ["upgrade", "--resume"],
+            CLIargs(command="upgrade", resume=True),
+        ),
+        (
+            ["upgrade", "data-plane", "--resume", "--auto-approve"],
+            CLIargs(command="upgrade", resume=True, auto_approve=True, upgrade_group="data-plane"),
+        ),
+        (
+            ["upgrade", "control-plane", "--auto-approve", "--execution-policy", "dag"],
+            CLIargs(
+                command="upgrade",
+                auto_approve=True,
+                execution_policy="dag",
+                upgrade_group="control-plane",
+            ),
+        ),
+        (
+            ["upgrade", "--simulate", "--execution-policy", "dag"],
+            CLIargs(command="upgrade", simulate=True, execution_policy="dag"),
+        ),
     ],
 )
 def test_parse_args_upgrade(args, expected_CLIargs):
@@ -839,6 +910,28 @@ def test_parse_args_upgrade(args, expected_CLIargs):
     assert parsed_args == expected_CLIargs
 
 
+@pytest.mark.parametrize(
+    "args, expected_CLIargs",
+    [
+        (["prestage"], CLIargs(command="prestage")),
+        (
+            ["prestage", "--model", "foo", "--next-release", "--max-parallel-machines", "5"],
+            CLIargs(
+                command="prestage",
+                model_name="foo",
+                download_next_release=True,
+                max_parallel_machines=5,
+            ),
+        ),
+    ],
+)
+def test_parse_args_prestage(args, expected_CLIargs):
+    """Test parsing 'prestage' subcommand and its options."""
+    parsed_args = commands.parse_args(args)
+
+    assert parsed_args == expected_CLIargs
+
+
 @patch("cou.commands.argparse.ArgumentParser.error", autospec=True)
 def test_parse_args_hypervisors_exclusive_options(mock_error):
     """Test parsing mutually exclusive hypervisors specific options."""
@@ -876,6 +969,7 @@ def test_parse_args_hypervisors_exclusive_options_reverse_order(mock_error):
         ["plan", "--purge_before", "2000-01-02 03:04:05"],
         ["upgrade", "--skip-apps", "vault keystone"],
         ["plan", "--skip_apps", "vault keystone"],
+        ["prestage", "--max-parallel-machines", "0"],
     ],
 )
 def test_parse_invalid_args(args):
@@ -933,6 +1027,31 @@ def test_capitalize_help_message():
     assert "Show this help message and exit." in help_message
 
 
+@pytest.mark.parametrize("val", ["0", "-1"])
+def test_positive_int_arg_invalid(val):
+    """Verify positive integer validator handles error cases."""
+    with pytest.raises(ArgumentTypeError):
+        commands.positive_int_arg(val)
+
+
+def test_positive_int_arg_valid():
+    """Verify positive integer validator handles valid cases."""
+    assert commands.positive_int_arg("3") == 3
+
+
+@pytest.mark.parametrize("val", ["0", "-1", "0%", "101%", "abc", "10.5", "%"])
+def test_max_unavailable_arg_invalid(val):
+    """Verify --max-unavailable validator handles error cases."""
+    with pytest.raises(ArgumentTypeError):
+        commands.max_unavailable_arg(val)
+
+
+@pytest.mark.parametrize("val", ["1", "20", "1%", "100%"])
+def test_max_unavailable_arg_valid(val):
+    """Verify --max-unavailable validator handles valid cases."""
+    assert commands.max_unavailable_arg(val) == val
+
+
 @pytest.mark.parametrize(
     "val",
     [
@@ -14,11 +14,20 @@
 """Module to provide helper for writing unit tests."""
 from pathlib import Path
 from textwrap import dedent
-from unittest.mock import MagicMock
+from typing import Any, Iterable
+from unittest.mock import AsyncMock, MagicMock
 
 from juju.client.client import FullStatus
 
-from cou.steps import BaseStep
+from cou.steps import (
+    ApplicationUpgradePlan,
+    BaseStep,
+    PreUpgradeStep,
+    UnitUpgradeStep,
+    UpgradePlan,
+    UpgradeStep,
+)
+from cou.steps.tracing import Span
 from cou.utils.juju_utils import Application, Machine, Unit
 
 
@@ -45,6 +54,51 @@ def dedent_plan(plan: str) -> str:
     return result
 
 
+def generate_upgrade_plan(
+    app_steps: Iterable[BaseStep], app: str = "keystone", backup: bool = True
+) -> UpgradePlan:
+    """Generate upgrade plan backing up databases and upgrading application with the steps."""
+    plan = UpgradePlan("Upgrade cloud from 'ussuri' to 'victoria'")
+    if backup:
+        plan.add_step(PreUpgradeStep("Back up MySQL databases", coro=AsyncMock()()))
+    app_plan = ApplicationUpgradePlan(f"Upgrade plan for '{app}' to 'victoria'")
+    app_plan.add_steps(app_steps)
+    plan.add_step(app_plan)
+    return plan
+
+
+def generate_units_upgrade_step(app: str, unit_count: int) -> UpgradeStep:
+    """Generate step upgrading the units of application in parallel."""
+    step = UpgradeStep("Upgrade units", parallel=True)
+    step.add_steps(
+        UnitUpgradeStep(f"Upgrade the unit: '{app}/{i}'", coro=AsyncMock()())
+        for i in range(unit_count)
+    )
+    return step
+
+
+def generate_span(
+    span_id: int,
+    parent_id: int | None,
+    name: str,
+    start: float,
+    end: float | None,
+    outcome: str | None = "ok",
+    **kwargs: Any,
+) -> Span:
+    """Generate span of step, UpgradeStep without application and unit by default."""
+    kwargs = {"step_class": "UpgradeStep", "application": None, "unit": None, **kwargs}
+    return Span(
+        span_id=span_id,
+        parent_id=parent_id,
+        name=name,
+        start=start,
+        end=end,
+        outcome=outcome,
+        **kwargs,
+    )
+
+
 def get_applications(
     charm_name: str, app_count: int = 1, unit_count: int = 1
 ) -> list[Application]:
@@ -76,3 +76,59 @@ async def test_application_upgrade_packages_with_hold(model):
     ]
 
     model.run_on_unit.assert_has_awaits(expected_calls)
+
+
+@pytest.mark.asyncio
+async def test_download_packages(model):
+    """Test downloading packages without installing them."""
+    await app_utils.download_packages(unit="keystone/0", model=model)
+
+    model.run_on_unit.assert_awaited_once_with(
+        unit_name="keystone/0",
+        command="apt-get update && apt-get dist-upgrade --download-only -y",
+        timeout=600,
+    )
+
+
+@pytest.mark.asyncio
+async def test_download_packages_cloud_pocket(model):
+    """Test downloading packages from the Ubuntu Cloud Archive pocket as well."""
+    await app_utils.download_packages(
+        unit="keystone/0", model=model, cloud_pocket="focal-victoria"
+    )
+
+    apt_opts = (
+        "-o Dir::Etc::SourceParts=/tmp/cou-prestage/sources.list.d "
+        "-o Dir::State::Lists=/tmp/cou-prestage/lists"
+    )
+    model.run_on_unit.assert_awaited_once_with(
+        unit_name="keystone/0",
+        command="apt-get update && apt-get dist-upgrade --download-only -y && "
+        "rm -rf /tmp/cou-prestage && mkdir -p /tmp/cou-prestage/lists/partial && "
+        "cp -r /etc/apt/sources.list.d /tmp/cou-prestage/ && "
+        "echo 'deb http://ubuntu-cloud.archive.canonical.com/ubuntu focal-updates/victoria main' "
+        "> /tmp/cou-prestage/sources.list.d/cou-focal-victoria.list && "
+        f"apt-get {apt_opts} update && "
+        f"apt-get {apt_opts} dist-upgrade --download-only -y",
+        timeout=600,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_upgradable_packages(model):
+    """Test listing upgradable packages on unit."""
+    model.run_on_unit.return_value = {
+        "return-code": 0,
+        "stdout": "Listing...\n"
+        "nova-common/focal-updates 2:21.2.4-0ubuntu2.7 all [upgradable from: 2:21.2.4]\n"
+        "python3-nova/focal-updates 2:21.2.4-0ubuntu2.7 all [upgradable from: 2:21.2.4]",
+    }
+
+    packages = await app_utils.get_upgradable_packages(unit="nova-compute/0", model=model)
+
+    assert packages == ["nova-common", "python3-nova"]
+    model.run_on_unit.assert_awaited_once_with(
+        unit_name="nova-compute/0",
+        command="apt-get update -qq && apt list --upgradable 2>/dev/null",
+        timeout=600,
+    )
@@ -147,6 +147,110 @@ async def test_retry_failure():
         await test_model.func()
 
 
+@pytest.mark.asyncio
+async def test_api_limiter_concurrency():
+    """Test limiting the number of operations running at the same time."""
+    limiter = juju_utils.APILimiter("read", concurrency=2, rate=0)
+    running, max_running = 0, 0
+
+    async def operation():
+        nonlocal running, max_running
+        async with limiter.limit():
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(operation() for _ in range(5)))
+
+    assert max_running == 2
+    assert limiter.calls == 5
+    assert limiter.queued == 0
+    assert limiter.max_queued == 3
+    assert limiter.max_wait_time > 0
+    assert limiter.wait_time >= limiter.max_wait_time
+    assert repr(limiter).startswith("read: 5 calls, max queue depth 3, waited ")
+
+
+@pytest.mark.asyncio
+async def test_api_limiter_rate():
+    """Test limiting the number of operations started per second."""
+    limiter = juju_utils.APILimiter("action", concurrency=0, rate=100)
+    loop = asyncio.get_running_loop()
+    started = []
+
+    async def operation():
+        async with limiter.limit():
+            started.append(loop.time())
+
+    await asyncio.gather(*(operation() for _ in range(3)))
+
+    assert limiter._get_semaphore() is None
+    assert started[2] - started[0] >= 0.015
+    assert limiter.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_api_limiter_released_on_failure():
+    """Test releasing the slot of failed operation."""
+    limiter = juju_utils.APILimiter("exec", concurrency=1, rate=0)
+
+    with pytest.raises(ValueError):
+        async with limiter.limit():
+            raise ValueError()
+
+    async with limiter.limit():
+        pass
+
+    assert limiter.calls == 2
+
+
+@patch.dict("os.environ", {"COU_JUJU_API_REFRESH_CONCURRENCY": "2"})
+def test_get_api_limit():
+    """Test getting limit of API operations from environment variable."""
+    assert juju_utils._get_api_limit("refresh", "concurrency", 5) == 2
+    assert juju_utils._get_api_limit("refresh", "rate", 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_limit_api():
+    """Test limiting Model operation by process-wide limiter of its class."""
+    limiter = juju_utils.APILimiter("read", concurrency=1, rate=0)
+
+    class TestModel:
+        @juju_utils.limit_api(juju_utils.API_READ)
+        async def func(self):
+            return "result"
+
+    with patch.dict(juju_utils.API_LIMITERS, {juju_utils.API_READ: limiter}):
+        assert await TestModel().func() == "result"
+        calls = []
+        token = juju_utils.api_calls.set(calls)
+        try:
+            assert await TestModel().func() == "result"
+        finally:
+            juju_utils.api_calls.reset(token)
+
+    assert limiter.calls == 2
+    ((operation, start, end),) = calls
+    assert operation == "read"
+    assert end >= start
+
+
+@patch("cou.utils.juju_utils.logger")
+def test_log_api_metrics(mock_logger):
+    """Test logging metrics of the limiters which limited any operation."""
+    limiter = juju_utils.APILimiter("read", concurrency=1, rate=0)
+    limiter.calls = 1
+
+    with patch.dict(juju_utils.API_LIMITERS, {"read": limiter}, clear=True):
+        juju_utils.log_api_metrics()
+    with patch.dict(juju_utils.API_LIMITERS, {"read": juju_utils.APILimiter("read", 1, 0)}):
+        juju_utils.log_api_metrics()
+
+    mock_logger.debug.assert_called_once_with("Juju API %s", limiter)
+
+
 @pytest.mark.parametrize(
     "machine_id, az",
     [
@@ -235,6 +339,13 @@ def test_coumodel_name_connected(mocked_model):
     model.juju_data.current_model.assert_not_called()
 
 
+def test_coumodel_uuid(mocked_model):
+    """Test Model uuid property."""
+    model = juju_utils.Model("test-model")
+
+    assert model.uuid == mocked_model.info.uuid
+
+
 @pytest.mark.asyncio
 async def test_coumodel_connect(mocked_model):
     """Test Model connection."""
@@ -740,6 +851,7 @@ async def test_get_machines(mocked_model):
     machines = await model._get_machines()
 
     assert machines == expected_machines
+    assert [machine.hostname for machine in machines.values()] == ["juju-0", "juju-1", "juju-2"]
 
 
 def _generate_juju_unit(app: str, unit_id: str, machine_id: str) -> MagicMock:
@@ -759,6 +871,7 @@ def _generate_juju_app(charm: str) -> MagicMock:
 def _generate_juju_machine(machine_id: str) -> MagicMock:
     machine = MagicMock(set=Machine)()
     machine.id = machine_id
+    machine.hostname = f"juju-{machine_id}"
     machine.hardware_characteristics = {
         "arch": "amd64",
         "mem": 0,
@@ -883,6 +996,7 @@ async def test_get_applications(mock_get_machines, mock_get_status, mocked_model
                 for name, unit in exp_units_from_status[app].items()
             },
             workload_version=status.workload_version,
+            charm_url=status.charm,
         )
         for app, status in full_status_apps.items()
     }
@@ -910,6 +1024,29 @@ async def test_get_applications(mock_get_machines, mock_get_status, mocked_model
     assert len(apps["app4"].machines) == 1
 
 
+@pytest.mark.asyncio
+@patch("cou.utils.juju_utils.Model.get_status")
+@patch("cou.utils.juju_utils.Model._get_machines")
+async def test_get_applications_by_names(mock_get_machines, mock_get_status, mocked_model):
+    """Test Model getting only selected applications from model."""
+    mocked_model.applications = {app: MagicMock(spec_set=Application)() for app in ["a1", "a2"]}
+    for app in mocked_model.applications.values():
+        app.get_actions = AsyncMock()
+        app.get_config = AsyncMock()
+        app.units = []
+    mock_get_status.return_value.applications = {
+        app: _generate_app_status({}) for app in ["a1", "a2"]
+    }
+    mock_get_machines.return_value = {}
+    model = juju_utils.Model("test-model")
+
+    apps = await model.get_applications(names=["a2"])
+
+    assert list(apps) == ["a2"]
+    mocked_model.applications["a1"].get_config.assert_not_awaited()
+    mocked_model.applications["a2"].get_config.assert_awaited_once_with()
+
+
 def test_unit_repr():
     unit = juju_utils.Unit(name="foo/0", machine=MagicMock(), workload_version="1")
     assert repr(unit) == "foo/0"
@@ -11,12 +11,15 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 from juju.action import Action
+from juju.errors import JujuError
 
-from cou.exceptions import HaltUpgradeExecution
+from cou.exceptions import CommandRunFailed, HaltUpgradeExecution
 from cou.utils import nova_compute
 from cou.utils.juju_utils import Machine, Unit
 
@@ -80,6 +83,111 @@ async def test_get_empty_hypervisors(
     assert {machine.machine_id for machine in result} == expected_result
 
 
+@pytest.mark.asyncio
+@patch("cou.utils.nova_compute.progress_indicator")
+@patch("cou.utils.nova_compute.INSTANCE_COUNT_CONCURRENCY", 2)
+@patch("cou.utils.nova_compute.get_instance_count")
+async def test_get_empty_hypervisors_concurrency(
+    mock_instance_count, mock_progress_indicator, model
+):
+    """Test limiting the number of instance-count actions running at the same time."""
+    running = max_running = 0
+
+    async def instance_count(*_):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(running, max_running)
+        await asyncio.sleep(0)
+        running -= 1
+        return 0
+
+    mock_instance_count.side_effect = instance_count
+    mock_progress_indicator.text = "Generating upgrade plan..."
+    units = [_mock_nova_unit(nova_unit) for nova_unit in range(5)]
+
+    result = await nova_compute.get_empty_hypervisors(units, model)
+
+    assert result == [unit.machine for unit in units]
+    assert mock_instance_count.await_count == 5
+    assert max_running == 2
+    # progress text is restored
+    assert mock_progress_indicator.text == "Generating upgrade plan..."
+
+
+@pytest.mark.asyncio
+@patch("cou.utils.nova_compute.get_instance_count")
+async def test_get_empty_hypervisors_from_nova_cloud_controller(mock_instance_count, model):
+    """Test getting empty hypervisors with the instance counts from nova-cloud-controller."""
+    hostnames = ["node-0", "node-1", "node-2.maas", "node-3", "node-4", None]
+    units = [
+        Unit(f"nova-compute/{i}", Machine(str(i), (), hostname=hostname), "21.0.0")
+        for i, hostname in enumerate(hostnames)
+    ]
+    model.run_on_unit.return_value = {
+        "stdout": json.dumps(
+            {
+                "node-0": 0,
+                "node-1.maas": 2,  # hypervisor registered with FQDN
+                "node-2": 0,  # machine with FQDN hostname
+                # two hypervisors with the same short name
+                "node-3.zone-1.maas": 0,
+                "node-3.zone-2.maas": 0,
+                "other": 1,
+            }
+        )
+    }
+    mock_instance_count.return_value = 0
+
+    with patch("cou.utils.nova_compute.logger") as mock_logger:
+        result = await nova_compute.get_empty_hypervisors(units, model, "nova-cloud-controller/0")
+
+    assert result == [units[i].machine for i in [0, 2, 3, 4, 5]]
+    model.run_on_unit.assert_awaited_once_with(
+        "nova-cloud-controller/0", nova_compute.HYPERVISORS_INSTANCE_COUNT_COMMAND, timeout=600
+    )
+    assert mock_instance_count.await_args_list == [
+        call(f"nova-compute/{i}", model) for i in [3, 4, 5]
+    ]
+    # unmatched units are logged
+    assert [args[1] for args, _ in mock_logger.warning.call_args_list[:3]] == [
+        "nova-compute/3",
+        "nova-compute/4",
+        "nova-compute/5",
+    ]
+
+
+@pytest.mark.parametrize(
+    "error, result",
+    [
+        (CommandRunFailed("request", {"return-code": 1}), None),
+        (JujuError("connection lost"), None),
+        (asyncio.TimeoutError(), None),
+        (None, {"return-code": 0, "stdout": "not json"}),
+        (None, {"return-code": 0, "stdout": '["node-0"]'}),
+        (None, {"return-code": 0, "stdout": '{"node-0": "0"}'}),
+        (None, {"return-code": 0}),
+    ],
+)
+@pytest.mark.asyncio
+@patch("cou.utils.nova_compute.get_instance_count")
+async def test_get_empty_hypervisors_from_nova_cloud_controller_failed(
+    mock_instance_count, error, result, model
+):
+    """Test falling back to the instance-count action when the request failed."""
+    units = [
+        Unit(f"nova-compute/{i}", Machine(str(i), (), hostname=f"node-{i}"), "21.0.0")
+        for i in range(2)
+    ]
+    model.run_on_unit.side_effect = error
+    model.run_on_unit.return_value = result
+    mock_instance_count.side_effect = [1, 0]
+
+    machines = await nova_compute.get_empty_hypervisors(units, model, "nova-cloud-controller/0")
+
+    assert machines == [units[1].machine]
+    assert mock_instance_count.await_count == 2
+
+
 @pytest.mark.parametrize("instance_count", [1, 10, 50])
 @pytest.mark.asyncio
 @patch("cou.utils.nova_compute.logger")
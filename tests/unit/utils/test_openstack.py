@@ -16,9 +16,12 @@ import pytest
 from cou.utils.openstack import (
     OPENSTACK_TO_TRACK_MAPPING,
     TRACK_TO_OPENSTACK_MAPPING,
+    UPGRADE_DEPENDENCIES,
+    UPGRADE_ORDER,
     OpenStackCodenameLookup,
     OpenStackRelease,
     VersionRange,
+    get_upgrade_dependencies,
     is_charm_supported,
 )
 
@@ -596,3 +599,30 @@ def test_track_to_openstack(charm, series, track, exp_result):
 )
 def test_is_charm_supported(charm, exp_result):
     assert is_charm_supported(charm) is exp_result
+
+
+def test_upgrade_dependencies_follow_upgrade_order():
+    """Test the dependencies keep the upgrade order if applications are upgraded one by one."""
+    assert set(UPGRADE_DEPENDENCIES) == set(UPGRADE_ORDER)
+    for charm, dependencies in UPGRADE_DEPENDENCIES.items():
+        for dependency in dependencies:
+            assert UPGRADE_ORDER.index(dependency) < UPGRADE_ORDER.index(charm)
+
+
+@pytest.mark.parametrize(
+    "charms, exp_result",
+    [
+        ([], []),
+        (["keystone", "aodh", "heat"], [set(), {0}, {0}]),
+        # dependency through charm which is not deployed
+        (["ceph-mon", "nova-compute"], [set(), {0}]),
+        (
+            ["keystone", "glance", "placement", "nova-cloud-controller", "nova-compute"],
+            [set(), {0}, {0}, {1, 2}, {3}],
+        ),
+        # charms without known dependencies are upgraded after all previous
+        (["keystone", "aodh", "heat", "my-charm", "other-charm"], [set(), {0}, {0}, {1, 2}, {3}]),
+    ],
+)
+def test_get_upgrade_dependencies(charms, exp_result):
+    assert get_upgrade_dependencies(charms) == exp_result